@@ -121,6 +121,7 @@ setup(
              'scripts/maas-beacon-monitor',
              'scripts/maas-network-monitor',
              'scripts/maas-delete-file',
+             'scripts/maas-file-writer',
              'scripts/maas-test-enlistment',
              'scripts/maas-write-file']),
     ],
@@ -5,16 +5,41 @@
 
 __all__ = [
     'api_auth',
+    'nonce_store',
+    'oauth_cache',
     ]
 
+from collections import OrderedDict
+from copy import deepcopy
+import threading
+import time
+
 from maasserver.exceptions import Unauthorized
 from piston3.authentication import (
+    initialize_server_request,
     OAuthAuthentication,
     send_oauth_error,
 )
-from piston3.oauth import OAuthError
+from piston3.models import (
+    Consumer,
+    Nonce,
+    Token,
+)
+from piston3.oauth import (
+    OAuthDataStore,
+    OAuthError,
+    OAuthServer,
+)
 from piston3.utils import rc
 
+# The number of seconds for which a consumer or token that was looked up for
+# one API request is trusted for later requests. Deleted tokens are forgotten
+# immediately, regardless.
+OAUTH_CACHE_TTL = 10.0
+
+# The number of seconds covered by each bucket of recently used nonces.
+NONCE_BUCKET_SECONDS = 10
+
 
 class OAuthUnauthorized(Unauthorized):
     """Unauthorized error for OAuth signed requests with invalid tokens."""
@@ -36,6 +61,198 @@ class OAuthUnauthorized(Unauthorized):
         return repr(self.error.message)
 
 
+class OAuthCache:
+    """Short-lived cache of OAuth consumers and tokens for this process.
+
+    A token is forgotten as soon as it is changed or deleted: within this
+    process by a signal (see `maasserver.models.signals.oauth`), and in the
+    other region processes when they receive the ``sys_oauth_token``
+    notification (see `maasserver.triggers.system`).
+
+    Lookups return copies, so callers are free to modify them, and any
+    related objects they go on to load (like a token's user) are not kept.
+    """
+
+    def __init__(self, ttl=OAUTH_CACHE_TTL, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.consumers = {}
+        self.tokens = {}
+        # Bumped each time something is forgotten, so that a lookup that
+        # raced with a deletion doesn't cache what it found.
+        self.generation = 0
+
+    def _lookup(self, cache, key, fetch):
+        now = self.clock()
+        with self.lock:
+            entry = cache.get(key)
+            generation = self.generation
+        if entry is not None:
+            expires, obj = entry
+            if now < expires:
+                return deepcopy(obj)
+        obj = fetch()
+        with self.lock:
+            if obj is None:
+                cache.pop(key, None)
+            elif generation == self.generation:
+                cache[key] = now + self.ttl, deepcopy(obj)
+        return obj
+
+    def lookup_consumer(self, key):
+        """Return the `Consumer` with the given key, or `None`."""
+        def fetch():
+            try:
+                return Consumer.objects.get(key=key)
+            except Consumer.DoesNotExist:
+                return None
+        return self._lookup(self.consumers, key, fetch)
+
+    def lookup_token(self, token_type, key):
+        """Return the `Token` of `token_type` with the given key, or `None`.
+
+        :param token_type: Either `Token.REQUEST` or `Token.ACCESS`.
+        """
+        def fetch():
+            try:
+                return Token.objects.select_related("consumer").get(
+                    key=key, token_type=token_type)
+            except Token.DoesNotExist:
+                return None
+        return self._lookup(self.tokens, (token_type, key), fetch)
+
+    def forget_consumer(self, key):
+        with self.lock:
+            self.generation += 1
+            self.consumers.pop(key, None)
+
+    def forget_token(self, key):
+        with self.lock:
+            self.generation += 1
+            for token_type in (Token.REQUEST, Token.ACCESS):
+                self.tokens.pop((token_type, key), None)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.consumers.clear()
+            self.tokens.clear()
+
+    def tokenChanged(self, channel, key):
+        """Called when the ``sys_oauth_token`` notification is received."""
+        self.forget_token(key)
+
+
+class NonceStore:
+    """The OAuth nonces recently used in this process.
+
+    Nonces are remembered in buckets of `bucket_seconds` each, until they're
+    older than `lifetime` seconds. By then any request reusing them fails
+    OAuth's timestamp check anyway.
+
+    New nonces are also kept as pending until `NonceFlushService` writes them
+    to the database in a batch, where the other region processes can find
+    them.
+    """
+
+    def __init__(
+            self, lifetime=(2 * OAuthServer.timestamp_threshold),
+            bucket_seconds=NONCE_BUCKET_SECONDS, clock=time.monotonic):
+        self.lifetime = lifetime
+        self.bucket_seconds = bucket_seconds
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.buckets = OrderedDict()
+        self.pending = []
+
+    def _prune(self, now):
+        oldest = (now - self.lifetime) // self.bucket_seconds
+        while len(self.buckets) > 0 and next(iter(self.buckets)) < oldest:
+            self.buckets.popitem(last=False)
+
+    def add(self, consumer_key, token_key, key):
+        """Record the use of a nonce.
+
+        :return: False if the nonce has already been used in this process,
+            otherwise True.
+        """
+        nonce = consumer_key, token_key, key
+        now = self.clock()
+        with self.lock:
+            self._prune(now)
+            if any(nonce in bucket for bucket in self.buckets.values()):
+                return False
+            bucket = now // self.bucket_seconds
+            self.buckets.setdefault(bucket, set()).add(nonce)
+            self.pending.append(nonce)
+            return True
+
+    def discard(self, consumer_key, token_key, key):
+        """Forget a nonce, so that a request using it can be retried."""
+        nonce = consumer_key, token_key, key
+        with self.lock:
+            for bucket in self.buckets.values():
+                bucket.discard(nonce)
+            if nonce in self.pending:
+                self.pending.remove(nonce)
+
+    def take_pending(self):
+        """Return the nonces not yet written to the database.
+
+        They're no longer pending after this; give them back with
+        `restore_pending` if they could not be written.
+        """
+        with self.lock:
+            pending, self.pending = self.pending, []
+        return pending
+
+    def restore_pending(self, nonces):
+        with self.lock:
+            self.pending[:0] = nonces
+
+
+def save_nonces(nonces):
+    """Write `(consumer_key, token_key, key)` tuples as `Nonce` rows."""
+    Nonce.objects.bulk_create(
+        Nonce(consumer_key=consumer_key, token_key=token_key, key=key)
+        for consumer_key, token_key, key in nonces)
+
+
+class MAASOAuthDataStore(OAuthDataStore):
+    """Look up OAuth consumers, tokens and nonces for an API request.
+
+    This does the same job as Piston's data store, but through `oauth_cache`
+    and `nonce_store`. A nonce is checked against this process's memory and
+    then against the nonces other processes have saved; it is not written to
+    the database while the request is being handled.
+    """
+
+    def lookup_consumer(self, key):
+        return oauth_cache.lookup_consumer(key)
+
+    def lookup_token(self, token_type, token):
+        if token_type == 'request':
+            token_type = Token.REQUEST
+        elif token_type == 'access':
+            token_type = Token.ACCESS
+        return oauth_cache.lookup_token(token_type, token)
+
+    def lookup_nonce(self, oauth_consumer, oauth_token, nonce):
+        if oauth_token is None:
+            return None
+        consumer_key, token_key = oauth_consumer.key, oauth_token.key
+        if not nonce_store.add(consumer_key, token_key, nonce):
+            return nonce
+        used_elsewhere = Nonce.objects.filter(
+            consumer_key=consumer_key, token_key=token_key,
+            key=nonce).exists()
+        if used_elsewhere:
+            return nonce
+        else:
+            return None
+
+
 class MAASAPIAuthentication(OAuthAuthentication):
     """Use the currently logged-in user; resort to OAuth if there isn't one.
 
@@ -64,11 +281,22 @@ class MAASAPIAuthentication(OAuthAuthentication):
 
         return False
 
+    def validate_token(self, request):
+        oauth_server, oauth_request = initialize_server_request(request)
+        oauth_server.set_data_store(MAASOAuthDataStore())
+        return oauth_server.verify_request(oauth_request)
+
     def challenge(self):
         # Beware: this returns 401: Unauthorized, not 403: Forbidden
         # as the name implies.
         return rc.FORBIDDEN
 
 
+# Consumers and tokens used by this process.
+oauth_cache = OAuthCache()
+
+# Nonces used by this process.
+nonce_store = NonceStore()
+
 # OAuth authentication for the APIs.
 api_auth = MAASAPIAuthentication(realm="MAAS API")
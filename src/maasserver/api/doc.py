@@ -9,6 +9,7 @@ __all__ = [
     "describe_resource",
     "find_api_resources",
     "generate_api_docs",
+    "get_api_description",
     "get_api_description_hash",
     ]
 
@@ -26,6 +27,7 @@ from threading import RLock
 
 from django.core.urlresolvers import (
     get_resolver,
+    get_script_prefix,
     RegexURLPattern,
     RegexURLResolver,
 )
@@ -471,6 +473,27 @@ def hash_canonical(description):
     return hashlib.sha1(description_as_json)
 
 
+# Descriptions of the API, keyed on the script prefix in effect when they were
+# generated; handler paths include it.
+api_descriptions = {}
+api_descriptions_lock = RLock()
+
+
+def get_api_description():
+    """Return a description of the whole MAAS API.
+
+    This is what `describe_api` returns, but it's only generated once per
+    process. The description is shared, so take a copy before modifying it.
+    """
+    prefix = get_script_prefix()
+    with api_descriptions_lock:
+        try:
+            return api_descriptions[prefix]
+        except KeyError:
+            description = api_descriptions[prefix] = describe_api()
+            return description
+
+
 api_description_hash = None
 api_description_hash_lock = RLock()
 
@@ -484,7 +507,7 @@ def get_api_description_hash():
     if api_description_hash is None:
         with api_description_hash_lock:
             if api_description_hash is None:
-                api_description = describe_api()
+                api_description = get_api_description()
                 api_description_hasher = hash_canonical(api_description)
                 api_description_hash = api_description_hasher.hexdigest()
 
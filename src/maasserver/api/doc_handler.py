@@ -58,25 +58,39 @@ __all__ = [
     'render_api_docs',
     ]
 
+from collections import namedtuple
+from copy import deepcopy
 from functools import partial
+import hashlib
 from inspect import getdoc
 from io import StringIO
 import json
+import re
 import sys
 from textwrap import dedent
+from threading import RLock
 
+from django.core.urlresolvers import get_script_prefix
 from django.http import HttpResponse
 from django.shortcuts import render
+from django.utils.cache import (
+    get_conditional_response,
+    patch_vary_headers,
+)
 from docutils import core
 from maasserver.api.doc import (
-    describe_api,
     find_api_resources,
     generate_api_docs,
     generate_pod_types_doc,
     generate_power_types_doc,
+    get_api_description,
     get_api_description_hash,
 )
 from maasserver.utils import build_absolute_uri
+from maasserver.utils.cache import (
+    gzip_compress,
+    LRUCache,
+)
 
 # Title section for the API documentation.  Matches in style, format,
 # etc. whatever render_api_docs() produces, so that you can concatenate
@@ -166,28 +180,61 @@ def reST_to_html_fragment(a_str):
     return parts['body_pre_docinfo'] + parts['fragment']
 
 
+# HTML fragments of the API documentation, keyed on the script prefix in
+# effect when they were rendered; it appears in every operation's URI.
+api_doc_fragments = {}
+api_doc_fragments_lock = RLock()
+
+
+def get_api_doc_fragment():
+    """Return the API documentation as an HTML fragment.
+
+    It's rendered once per process; the API can't change without a restart.
+    """
+    prefix = get_script_prefix()
+    with api_doc_fragments_lock:
+        try:
+            return api_doc_fragments[prefix]
+        except KeyError:
+            fragment = api_doc_fragments[prefix] = (
+                reST_to_html_fragment(render_api_docs()))
+            return fragment
+
+
 def api_doc(request):
     """Get ReST documentation for the REST API."""
-    # Generate the documentation and keep it cached.  Note that we can't do
-    # that at the module level because the API doc generation needs Django
-    # fully initialized.
+    # The documentation is generated on first use rather than at the module
+    # level because the API doc generation needs Django fully initialized.
     return render(
-        request, 'maasserver/api_doc.html',
-        {'doc': reST_to_html_fragment(render_api_docs())})
+        request, 'maasserver/api_doc.html', {'doc': get_api_doc_fragment()})
 
 
-def describe(request):
-    """Render a description of the whole MAAS API.
+# A description of the API ready to be served: its JSON encoding, and that
+# compressed with gzip, each with its own strong entity tag.
+RenderedDescription = namedtuple(
+    "RenderedDescription", ("content", "etag", "gzip_content", "gzip_etag"))
 
-    :param request: A "related" HTTP request. This is used to derive the URL
-        where the client expects to see the MAAS API.
-    :return: An `HttpResponse` containing a JSON description of the whole MAAS
-        API. Links to the API will use the same scheme and hostname that the
-        client used in `request`.
+# Rendered descriptions, keyed on the absolute URI of the API as the client
+# addresses it. Only a few are kept; there's one for each name or address
+# that clients use to reach this region.
+rendered_descriptions = LRUCache(16)
+
+accepts_gzip = re.compile(r'\bgzip\b').search
+
+
+def render_description(request):
+    """Render a description of the whole MAAS API for `request`.
+
+    Links to the API use the same scheme and hostname that the client used
+    in `request`. The entity tags are derived from the API description hash
+    and those links, so they change whenever the content does.
+
+    :return: A `RenderedDescription`.
     """
-    description = describe_api()
+    description = deepcopy(get_api_description())
+    api_hash = get_api_description_hash()
     # Add hash so that client can check if things are up to date.
-    description["hash"] = get_api_description_hash()
+    description["hash"] = api_hash
     # Make all URIs absolute. Clients - and the command-line client in
     # particular - expect that all handler URIs are absolute, not just paths.
     # The handler URIs returned by describe_resource() are relative paths.
@@ -197,7 +244,41 @@ def describe(request):
             handler = resource[handler_type]
             if handler is not None:
                 handler["uri"] = absolute(handler["path"])
+    content = json.dumps(description).encode("utf-8")
+    tag = hashlib.sha1(
+        ("%s %s" % (api_hash, absolute(get_script_prefix()))).encode("utf-8"))
+    return RenderedDescription(
+        content, '"%s"' % tag.hexdigest(),
+        gzip_compress(content), '"%s-gzip"' % tag.hexdigest())
+
+
+def get_rendered_description(request):
+    """Return the `RenderedDescription` for `request`, rendering on demand."""
+    key = build_absolute_uri(request, get_script_prefix())
+    return rendered_descriptions.get(
+        key, lambda: render_description(request))
+
+
+def describe(request):
+    """Render a description of the whole MAAS API.
+
+    :param request: A "related" HTTP request. This is used to derive the URL
+        where the client expects to see the MAAS API.
+    :return: An `HttpResponse` containing a JSON description of the whole MAAS
+        API. Links to the API will use the same scheme and hostname that the
+        client used in `request`. The description is compressed with gzip
+        when the client accepts it, and a 304 response is returned instead
+        when the client already has the description.
+    """
+    rendered = get_rendered_description(request)
+    if accepts_gzip(request.META.get("HTTP_ACCEPT_ENCODING", "")):
+        content, etag = rendered.gzip_content, rendered.gzip_etag
+    else:
+        content, etag = rendered.content, rendered.etag
     # Return as a JSON document.
-    return HttpResponse(
-        json.dumps(description),
-        content_type="application/json")
+    response = HttpResponse(content, content_type="application/json")
+    if content is rendered.gzip_content:
+        response["Content-Encoding"] = "gzip"
+    response["ETag"] = etag
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return get_conditional_response(request, etag=etag, response=response)
@@ -8,7 +8,9 @@ __all__ = [
     "get_storage_layout_params",
 ]
 
+from contextlib import contextmanager
 import re
+import time
 
 from django.conf import settings
 from django.core.exceptions import PermissionDenied
@@ -160,6 +162,36 @@ DISPLAYED_ANON_MACHINE_FIELDS = (
 )
 
 
+@contextmanager
+def node_acquire_timed(username, lock):
+    """Obtain `lock`, logging how long allocation spent on it.
+
+    Allocations are serialised by this lock, so the time spent waiting for it
+    and the time spent working while holding it are what govern allocation
+    throughput. The lock itself is held until the transaction ends.
+
+    :param lock: The lock to obtain, or `None` to only time the allocation.
+    """
+    started = time.monotonic()
+    if lock is None:
+        try:
+            yield
+        finally:
+            maaslog.info(
+                "Allocation for user %s worked for %.3f seconds without the "
+                "node acquisition lock.", username, time.monotonic() - started)
+        return
+    with lock:
+        acquired = time.monotonic()
+        try:
+            yield
+        finally:
+            maaslog.info(
+                "Allocation for user %s waited %.3f seconds for the node "
+                "acquisition lock, then worked for %.3f seconds holding it.",
+                username, acquired - started, time.monotonic() - acquired)
+
+
 def get_storage_layout_params(request, required=False, extract_params=False):
     """Return and validate the storage_layout parameter."""
     form = StorageLayoutForm(required=required, data=request.data)
@@ -1200,6 +1232,43 @@ class MachinesHandler(NodesHandler, PowersMixin):
             token, match_ids)
         return machines.order_by('id')
 
+    def _compose_machine(self, request, form):
+        """Compose a machine in a pod to match `form`'s constraints.
+
+        :return: The composed machine, or `None` if no pod could compose one.
+        """
+        cores = form.cleaned_data.get('cpu_count')
+        if cores is not None:
+            cores = int(cores)
+        memory = form.cleaned_data.get('mem')
+        if memory is not None:
+            memory = int(memory)
+        architecture = None
+        architectures = form.cleaned_data.get('arch')
+        if architectures is not None:
+            architecture = (
+                None if len(architectures) == 0
+                else min(architectures))
+        data = {
+            "cores": cores,
+            "memory": memory,
+            "architecture": architecture,
+            "storage": form.cleaned_data.get('storage'),
+        }
+        pods = Pod.objects.select_related('hints')
+        if pods:
+            if form.cleaned_data.get('pod'):
+                pods = pods.filter(name=form.cleaned_data.get('pod'))
+            elif form.cleaned_data.get('pod_type'):
+                pods = pods.filter(
+                    power_type=form.cleaned_data.get('pod_type'))
+            compose_form = ComposeMachineForPodsForm(
+                request=request, data=data, pods=pods,
+                placement=Config.objects.get_config('pod_placement'))
+            if compose_form.is_valid():
+                return compose_form.compose()
+        return None
+
     @operation(idempotent=False)
     def allocate(self, request):
         """Allocate an available machine for deployment.
@@ -1420,53 +1489,43 @@ class MachinesHandler(NodesHandler, PowersMixin):
         if not form.is_valid():
             raise MAASAPIValidationError(form.errors)
 
-        # This lock prevents a machine we've picked as available from
-        # becoming unavailable before our transaction commits.
-        with locks.node_acquire:
+        optimistic = (
+            not dry_run and
+            Config.objects.get_config('optimistic_allocation'))
+        if optimistic:
+            # The machine is claimed with a row lock instead, so concurrent
+            # allocations can each claim a different machine.
+            acquire_lock = None
+        else:
+            # This lock prevents a machine we've picked as available from
+            # becoming unavailable before our transaction commits.
+            acquire_lock = locks.node_acquire
+        with node_acquire_timed(request.user.username, acquire_lock):
             machines = (
                 self.base_model.objects.get_available_machines_for_acquisition(
                     request.user)
                 )
             machines, storage, interfaces = form.filter_nodes(machines)
-            machine = get_first(machines)
+            if optimistic:
+                machines = form.lock_unclaimed_nodes(machines)
+            # Only the cheapest match is needed, so let the database stop
+            # there rather than returning every matching machine.
+            machine = get_first(machines[:1])
             if machine is None:
-                cores = form.cleaned_data.get('cpu_count')
-                if cores is not None:
-                    cores = int(cores)
-                memory = form.cleaned_data.get('mem')
-                if memory is not None:
-                    memory = int(memory)
-                architecture = None
-                architectures = form.cleaned_data.get('arch')
-                if architectures is not None:
-                    architecture = (
-                        None if len(architectures) == 0
-                        else min(architectures))
-                storage = form.cleaned_data.get('storage')
-                data = {
-                    "cores": cores,
-                    "memory": memory,
-                    "architecture": architecture,
-                    "storage": storage,
-                }
-                pods = Pod.objects.all()
-                if pods:
-                    if form.cleaned_data.get('pod'):
-                        pods = pods.filter(name=form.cleaned_data.get('pod'))
-                    elif form.cleaned_data.get('pod_type'):
-                        pods = pods.filter(
-                            power_type=form.cleaned_data.get('pod_type'))
-                    compose_form = ComposeMachineForPodsForm(
-                        request=request, data=data, pods=pods)
-                    if compose_form.is_valid():
-                        machine = compose_form.compose()
-                        if machine is not None:
-                            # Set the storage variable so the constraint_map is
-                            # set correct for the composed machine.
-                            storage = nodes_by_storage(
-                                storage, node_ids=[machine.id])
-                            if storage is None:
-                                storage = {}
+                if optimistic:
+                    # Composing machines in pods is still serialised.
+                    with locks.node_acquire:
+                        machine = self._compose_machine(request, form)
+                else:
+                    machine = self._compose_machine(request, form)
+                if machine is not None:
+                    # Set the storage variable so the constraint_map is
+                    # set correct for the composed machine.
+                    storage = nodes_by_storage(
+                        form.cleaned_data.get('storage'),
+                        node_ids=[machine.id])
+                    if storage is None:
+                        storage = {}
             if machine is None:
                 constraints = form.describe_constraints()
                 if constraints == '':
@@ -5,10 +5,31 @@
 
 __all__ = []
 
-from maasserver.api.auth import OAuthUnauthorized
+import http.client
+
+from django.core.urlresolvers import reverse
+from maasserver.api import auth as auth_module
+from maasserver.api.auth import (
+    MAASOAuthDataStore,
+    NonceStore,
+    OAuthCache,
+    OAuthUnauthorized,
+    save_nonces,
+)
+from maasserver.models.user import (
+    create_auth_token,
+    get_auth_tokens,
+)
+from maasserver.testing.api import APITestCase
 from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from maastesting.djangotestcase import count_queries
 from maastesting.testcase import MAASTestCase
 from oauth import oauth
+from piston3.models import (
+    Nonce,
+    Token,
+)
 from testtools.matchers import Contains
 
 
@@ -30,3 +51,206 @@ class TestOAuthUnauthorized(MAASTestCase):
         self.assertThat(
             str(maas_exception),
             Contains("Authorization Error: Invalid API key."))
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestOAuthCache(MAASServerTestCase):
+
+    def make_cache(self):
+        clock = FakeClock()
+        return OAuthCache(ttl=10, clock=clock), clock
+
+    def test_lookup_token_returns_token(self):
+        token = create_auth_token(factory.make_User())
+        cache, _ = self.make_cache()
+        self.assertEqual(
+            token.id, cache.lookup_token(Token.ACCESS, token.key).id)
+
+    def test_lookup_token_returns_None_for_unknown_token(self):
+        cache, _ = self.make_cache()
+        self.assertIsNone(
+            cache.lookup_token(Token.ACCESS, factory.make_string()))
+
+    def test_lookup_token_uses_cache_until_ttl_expires(self):
+        token = create_auth_token(factory.make_User())
+        cache, clock = self.make_cache()
+        cache.lookup_token(Token.ACCESS, token.key)
+        count, cached = count_queries(
+            cache.lookup_token, Token.ACCESS, token.key)
+        self.assertEqual(0, count)
+        self.assertEqual(token.id, cached.id)
+        clock.now += 10
+        count, _ = count_queries(cache.lookup_token, Token.ACCESS, token.key)
+        self.assertEqual(1, count)
+
+    def test_lookup_token_returns_copies(self):
+        token = create_auth_token(factory.make_User())
+        cache, _ = self.make_cache()
+        self.assertIsNot(
+            cache.lookup_token(Token.ACCESS, token.key),
+            cache.lookup_token(Token.ACCESS, token.key))
+
+    def test_lookup_token_loads_consumer(self):
+        token = create_auth_token(factory.make_User())
+        cache, _ = self.make_cache()
+        cache.lookup_token(Token.ACCESS, token.key)
+        count, cached = count_queries(
+            lambda: cache.lookup_token(Token.ACCESS, token.key).consumer)
+        self.assertEqual(0, count)
+        self.assertEqual(token.consumer_id, cached.id)
+
+    def test_lookup_consumer_uses_cache(self):
+        token = create_auth_token(factory.make_User())
+        cache, _ = self.make_cache()
+        cache.lookup_consumer(token.consumer.key)
+        count, cached = count_queries(
+            cache.lookup_consumer, token.consumer.key)
+        self.assertEqual(0, count)
+        self.assertEqual(token.consumer_id, cached.id)
+
+    def test_forget_token(self):
+        token = create_auth_token(factory.make_User())
+        cache, _ = self.make_cache()
+        cache.lookup_token(Token.ACCESS, token.key)
+        cache.forget_token(token.key)
+        self.assertEqual({}, cache.tokens)
+
+    def test_tokenChanged_forgets_token(self):
+        token = create_auth_token(factory.make_User())
+        cache, _ = self.make_cache()
+        cache.lookup_token(Token.ACCESS, token.key)
+        cache.tokenChanged("sys_oauth_token", token.key)
+        self.assertEqual({}, cache.tokens)
+
+    def test_does_not_cache_token_forgotten_during_lookup(self):
+        token = create_auth_token(factory.make_User())
+        cache, _ = self.make_cache()
+
+        def fetch():
+            cache.forget_token(token.key)
+            return token
+
+        cache._lookup(cache.tokens, (Token.ACCESS, token.key), fetch)
+        self.assertEqual({}, cache.tokens)
+
+    def test_deleting_token_forgets_it(self):
+        token = create_auth_token(factory.make_User())
+        auth_module.oauth_cache.lookup_token(Token.ACCESS, token.key)
+        token.delete()
+        self.assertIsNone(
+            auth_module.oauth_cache.lookup_token(Token.ACCESS, token.key))
+
+
+class TestNonceStore(MAASTestCase):
+
+    def make_store(self):
+        clock = FakeClock()
+        return NonceStore(lifetime=600, bucket_seconds=10, clock=clock), clock
+
+    def test_add_accepts_new_nonce(self):
+        store, _ = self.make_store()
+        self.assertTrue(store.add("consumer", "token", "nonce"))
+        self.assertEqual([("consumer", "token", "nonce")], store.pending)
+
+    def test_add_refuses_used_nonce(self):
+        store, clock = self.make_store()
+        store.add("consumer", "token", "nonce")
+        clock.now += 599
+        self.assertFalse(store.add("consumer", "token", "nonce"))
+
+    def test_add_accepts_nonce_used_by_other_token(self):
+        store, _ = self.make_store()
+        store.add("consumer", "token", "nonce")
+        self.assertTrue(store.add("consumer", "other", "nonce"))
+
+    def test_add_forgets_old_buckets(self):
+        store, clock = self.make_store()
+        store.add("consumer", "token", "nonce")
+        clock.now += 620
+        self.assertTrue(store.add("consumer", "token", "other"))
+        self.assertEqual(1, len(store.buckets))
+
+    def test_discard_allows_nonce_to_be_reused(self):
+        store, _ = self.make_store()
+        store.add("consumer", "token", "nonce")
+        store.discard("consumer", "token", "nonce")
+        self.assertEqual([], store.pending)
+        self.assertTrue(store.add("consumer", "token", "nonce"))
+
+    def test_take_pending_and_restore_pending(self):
+        store, _ = self.make_store()
+        store.add("consumer", "token", "nonce1")
+        pending = store.take_pending()
+        self.assertEqual([], store.pending)
+        store.add("consumer", "token", "nonce2")
+        store.restore_pending(pending)
+        self.assertEqual(
+            [("consumer", "token", "nonce1"), ("consumer", "token", "nonce2")],
+            store.pending)
+
+
+class TestMAASOAuthDataStore(MAASServerTestCase):
+
+    def setUp(self):
+        super(TestMAASOAuthDataStore, self).setUp()
+        self.nonce_store = NonceStore()
+        self.patch(auth_module, "nonce_store", self.nonce_store)
+
+    def test_lookup_nonce_accepts_new_nonce(self):
+        token = create_auth_token(factory.make_User())
+        nonce = factory.make_string()
+        self.assertIsNone(
+            MAASOAuthDataStore().lookup_nonce(token.consumer, token, nonce))
+
+    def test_lookup_nonce_refuses_nonce_used_in_this_process(self):
+        token = create_auth_token(factory.make_User())
+        nonce = factory.make_string()
+        store = MAASOAuthDataStore()
+        store.lookup_nonce(token.consumer, token, nonce)
+        self.assertEqual(
+            nonce, store.lookup_nonce(token.consumer, token, nonce))
+
+    def test_lookup_nonce_refuses_nonce_saved_by_another_process(self):
+        token = create_auth_token(factory.make_User())
+        nonce = factory.make_string()
+        save_nonces([(token.consumer.key, token.key, nonce)])
+        self.assertEqual(
+            nonce,
+            MAASOAuthDataStore().lookup_nonce(token.consumer, token, nonce))
+
+    def test_lookup_nonce_does_not_write_nonce(self):
+        token = create_auth_token(factory.make_User())
+        MAASOAuthDataStore().lookup_nonce(
+            token.consumer, token, factory.make_string())
+        self.assertFalse(Nonce.objects.filter(token_key=token.key).exists())
+        self.assertEqual(1, len(self.nonce_store.pending))
+
+
+class TestMAASAPIAuthentication(APITestCase.ForUser):
+
+    def test_authenticates_with_cached_token(self):
+        uri = reverse('users_handler')
+        self.assertEqual(http.client.OK, self.client.get(uri).status_code)
+        token = get_auth_tokens(self.user)[0]
+        # Subsequent requests don't look up the token or consumer.
+        get_token = self.patch(Token.objects, "select_related")
+        response = self.client.get(uri)
+        self.assertEqual(http.client.OK, response.status_code)
+        self.assertEqual(0, get_token.call_count)
+        self.assertIsNotNone(
+            auth_module.oauth_cache.lookup_token(Token.ACCESS, token.key))
+
+    def test_rejects_deleted_token(self):
+        uri = reverse('users_handler')
+        self.assertEqual(http.client.OK, self.client.get(uri).status_code)
+        get_auth_tokens(self.user)[0].delete()
+        self.assertEqual(
+            http.client.UNAUTHORIZED, self.client.get(uri).status_code)
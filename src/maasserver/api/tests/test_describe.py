@@ -5,6 +5,7 @@
 
 __all__ = []
 
+import gzip
 import http.client
 from operator import itemgetter
 from urllib.parse import urlparse
@@ -15,11 +16,13 @@ from django.core.urlresolvers import (
     reverse,
 )
 from django.test.client import RequestFactory
+from maasserver.api import doc_handler as doc_handler_module
 from maasserver.api.doc import get_api_description_hash
 from maasserver.api.doc_handler import describe
 from maasserver.testing.api import APITestCase
 from maasserver.testing.factory import factory
 from maasserver.utils.converters import json_load_bytes
+from maastesting.matchers import MockNotCalled
 from maastesting.testcase import MAASTestCase
 from testscenarios import multiply_scenarios
 from testtools.matchers import (
@@ -146,3 +149,74 @@ class TestDescribeAbsoluteURIs(MAASTestCase):
         resources = description["resources"]
         self.assertNotEqual([], resources)
         self.assertThat(resources, AllMatch(expected_resource))
+
+
+class TestDescribeCaching(MAASTestCase):
+    """Tests for the `describe` view's cached responses."""
+
+    def setUp(self):
+        super(TestDescribeCaching, self).setUp()
+        self.addCleanup(self.clear_description_cache)
+        self.clear_description_cache()
+
+    def clear_description_cache(self):
+        doc_handler_module.rendered_descriptions.clear()
+
+    def get_description(self, server_name="maas.example.com", **headers):
+        request = RequestFactory().get(
+            "/api/2.0/describe/", SERVER_NAME=server_name, **headers)
+        return describe(request)
+
+    def test_describe_sets_strong_etag(self):
+        response = self.get_description()
+        self.assertThat(response["ETag"], StartsWith('"'))
+        self.assertEqual("Accept-Encoding", response["Vary"])
+
+    def test_describe_etag_is_stable(self):
+        self.assertEqual(
+            self.get_description()["ETag"],
+            self.get_description()["ETag"])
+
+    def test_describe_etag_differs_by_host(self):
+        self.assertNotEqual(
+            self.get_description(server_name="maas1.example.com")["ETag"],
+            self.get_description(server_name="maas2.example.com")["ETag"])
+
+    def test_describe_reuses_rendered_description(self):
+        self.get_description()
+        render_description = self.patch(
+            doc_handler_module, "render_description")
+        self.get_description()
+        self.assertThat(render_description, MockNotCalled())
+
+    def test_describe_keeps_few_rendered_descriptions(self):
+        self.patch(doc_handler_module.rendered_descriptions, "size", 2)
+        for _ in range(3):
+            self.get_description(server_name=factory.make_hostname())
+        self.assertEqual(2, len(doc_handler_module.rendered_descriptions))
+
+    def test_describe_compresses_for_clients_accepting_gzip(self):
+        plain = self.get_description()
+        compressed = self.get_description(HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual("gzip", compressed["Content-Encoding"])
+        self.assertEqual(plain.content, gzip.decompress(compressed.content))
+        self.assertNotEqual(plain["ETag"], compressed["ETag"])
+
+    def test_describe_returns_not_modified_for_matching_etag(self):
+        etag = self.get_description()["ETag"]
+        response = self.get_description(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(http.client.NOT_MODIFIED, response.status_code)
+        self.assertEqual(etag, response["ETag"])
+        self.assertEqual(b"", response.content)
+
+    def test_describe_returns_not_modified_for_weak_etag(self):
+        etag = self.get_description(HTTP_ACCEPT_ENCODING="gzip")["ETag"]
+        response = self.get_description(
+            HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH="W/" + etag)
+        self.assertEqual(http.client.NOT_MODIFIED, response.status_code)
+
+    def test_describe_returns_description_for_other_etag(self):
+        etag = self.get_description(HTTP_ACCEPT_ENCODING="gzip")["ETag"]
+        response = self.get_description(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(http.client.OK, response.status_code)
+        self.assertThat(response.content, StartsWith(b"{"))
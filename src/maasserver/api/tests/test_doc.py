@@ -29,6 +29,7 @@ from maasserver.api.doc import (
     generate_api_docs,
     generate_pod_types_doc,
     generate_power_types_doc,
+    get_api_description,
     get_api_description_hash,
     hash_canonical,
 )
@@ -597,6 +598,37 @@ class TestHashCanonical(MAASTestCase):
                 "3bd746ab7fe760d0926546318cbf2b6f0a7a56f8"))
 
 
+class TestGetAPIDescription(MAASTestCase):
+    """Tests for `get_api_description`."""
+
+    def setUp(self):
+        super(TestGetAPIDescription, self).setUp()
+        self.addCleanup(self.clear_description_cache)
+        self.clear_description_cache()
+
+    def clear_description_cache(self):
+        with doc_module.api_descriptions_lock:
+            doc_module.api_descriptions.clear()
+
+    def test__caches_description(self):
+        api_description = factory.make_string()
+        # The description can only be generated once before crashing.
+        self.patch(doc_module, "describe_api").side_effect = [
+            api_description, factory.make_exception_type(),
+        ]
+        self.assertThat(get_api_description(), Is(api_description))
+        self.assertThat(get_api_description(), Is(api_description))
+
+    def test__caches_description_for_each_script_prefix(self):
+        self.patch(doc_module, "get_script_prefix").side_effect = [
+            "/MAAS/", "/", "/MAAS/"]
+        describe_api = self.patch(doc_module, "describe_api")
+        describe_api.side_effect = [sentinel.maas, sentinel.root]
+        self.assertThat(get_api_description(), Is(sentinel.maas))
+        self.assertThat(get_api_description(), Is(sentinel.root))
+        self.assertThat(get_api_description(), Is(sentinel.maas))
+
+
 class TestGetAPIDescriptionHash(MAASTestCase):
     """Tests for `get_api_description_hash`."""
 
@@ -606,9 +638,11 @@ class TestGetAPIDescriptionHash(MAASTestCase):
         self.clear_hash_cache()
 
     def clear_hash_cache(self):
-        # Clear the API description hash cache.
+        # Clear the API description hash cache, and the description itself.
         with doc_module.api_description_hash_lock:
             doc_module.api_description_hash = None
+        with doc_module.api_descriptions_lock:
+            doc_module.api_descriptions.clear()
 
     def test__calculates_hash_from_api_description(self):
         # Fake the API description.
@@ -8,20 +8,19 @@ __all__ = []
 import http.client
 import json
 import random
+from unittest.mock import ANY
 
 from django.conf import settings
 from django.core.urlresolvers import reverse
 from django.test import RequestFactory
-from maasserver import (
-    eventloop,
-    middleware,
-)
+from maasserver import eventloop
 from maasserver.api import machines as machines_module
 from maasserver.enum import (
     INTERFACE_TYPE,
     NODE_STATUS,
     NODE_STATUS_CHOICES_DICT,
     NODE_TYPE,
+    POD_PLACEMENT,
     POWER_STATE,
 )
 import maasserver.forms as forms_module
@@ -59,6 +58,8 @@ from maasserver.utils import (
 from maasserver.utils.orm import reload_object
 from maastesting.djangotestcase import count_queries
 from maastesting.matchers import (
+    MockAnyCall,
+    MockCalledOnce,
     MockCalledOnceWith,
     MockCalledWith,
     MockNotCalled,
@@ -309,11 +310,6 @@ class TestMachinesAPI(APITestCase.ForUser):
         self.assertIsNone(parsed_result[0]['pod'])
 
     def test_GET_machines_issues_constant_number_of_queries(self):
-        # Patch middleware so it does not affect query counting.
-        self.patch(
-            middleware.ExternalComponentsMiddleware,
-            '_check_rack_controller_connectivity')
-
         for _ in range(10):
             factory.make_Node_with_Interface_on_Subnet()
         num_queries1, response1 = count_queries(
@@ -631,6 +627,22 @@ class TestMachinesAPI(APITestCase.ForUser):
         self.assertEqual(machine.system_id, parsed_result['system_id'])
         self.assertThat(mock_compose, MockCalledOnceWith())
 
+    def test_POST_allocate_composes_with_configured_pod_placement(self):
+        Config.objects.set_config('pod_placement', POD_PLACEMENT.SPREAD)
+        factory.make_Pod(architectures=["amd64/generic"])
+        machine = factory.make_Node(
+            status=NODE_STATUS.READY, owner=None, with_boot_disk=True)
+        mock_filter_nodes = self.patch(AcquireNodeForm, 'filter_nodes')
+        mock_filter_nodes.return_value = [], {}, {}
+        mock_compose = self.patch_autospec(
+            ComposeMachineForPodsForm, 'compose')
+        mock_compose.return_value = machine
+        response = self.client.post(
+            reverse('machines_handler'), {'op': 'allocate'})
+        self.assertEqual(http.client.OK, response.status_code)
+        [compose_form], _ = mock_compose.call_args
+        self.assertEqual(POD_PLACEMENT.SPREAD, compose_form.placement)
+
     def test_POST_allocate_returns_a_composed_machine_constraints(self):
         # The "allocate" operation returns a composed machine.
         available_status = NODE_STATUS.READY
@@ -796,6 +808,40 @@ class TestMachinesAPI(APITestCase.ForUser):
         self.assertThat(
             machine_acquire.__exit__, MockCalledOnceWith(None, None, None))
 
+    def test_POST_allocate_optimistic_does_not_use_machine_acquire_lock(self):
+        Config.objects.set_config('optimistic_allocation', True)
+        machine = factory.make_Node(
+            status=NODE_STATUS.READY, owner=None, with_boot_disk=True)
+        machine_acquire = self.patch(machines_module.locks, 'node_acquire')
+        response = self.client.post(
+            reverse('machines_handler'), {'op': 'allocate'})
+        self.assertThat(response, HasStatusCode(http.client.OK))
+        self.assertThat(machine_acquire.__enter__, MockNotCalled())
+        self.assertEqual(self.user, reload_object(machine).owner)
+
+    def test_POST_allocate_optimistic_claims_unlocked_machine(self):
+        Config.objects.set_config('optimistic_allocation', True)
+        machine = factory.make_Node(
+            status=NODE_STATUS.READY, owner=None, with_boot_disk=True)
+        lock_unclaimed_nodes = self.patch(
+            AcquireNodeForm, 'lock_unclaimed_nodes')
+        lock_unclaimed_nodes.return_value = Machine.objects.filter(
+            id=machine.id)
+        response = self.client.post(
+            reverse('machines_handler'), {'op': 'allocate'})
+        self.assertThat(response, HasStatusCode(http.client.OK))
+        self.assertThat(lock_unclaimed_nodes, MockCalledOnce())
+
+    def test_POST_allocate_logs_node_acquire_lock_timing(self):
+        factory.make_Node(
+            status=NODE_STATUS.READY, owner=None, with_boot_disk=True)
+        maaslog = self.patch(machines_module.maaslog, 'info')
+        self.client.post(reverse('machines_handler'), {'op': 'allocate'})
+        self.assertThat(maaslog, MockAnyCall(
+            "Allocation for user %s waited %.3f seconds for the node "
+            "acquisition lock, then worked for %.3f seconds holding it.",
+            self.user.username, ANY, ANY))
+
     def test_POST_allocate_sets_agent_name(self):
         available_status = NODE_STATUS.READY
         machine = factory.make_Node(
@@ -4,6 +4,7 @@
 """RPC helpers relating to nodes."""
 
 __all__ = [
+    "PowerCommandBatcher",
     "power_off_node",
     "power_on_node",
 ]
@@ -27,7 +28,11 @@ from provisioningserver.utils.twisted import (
     FOREVER,
 )
 from twisted.internet import reactor
-from twisted.internet.defer import DeferredList
+from twisted.internet.defer import (
+    Deferred,
+    DeferredList,
+    maybeDeferred,
+)
 from twisted.protocols.amp import UnhandledCommand
 
 
@@ -35,6 +40,105 @@ logger = logging.getLogger(__name__)
 maaslog = get_maas_logger("power")
 
 
+class PowerCommandBatcher:
+    """Send the power commands issued to a rack together in batches.
+
+    Commands for the same rack controller that are issued within `delay`
+    seconds of the first are sent with `Client.batch` calls of up to
+    `batch_size` commands each, e.g. when a bulk action powers on many
+    machines at once. A lone command is sent as a normal call, as is each
+    command in a batch that fails as a whole.
+    """
+
+    # Seconds to wait for more commands before sending.
+    delay = 0.05
+
+    # The most commands to send in one batch. The results of a batch arrive
+    # together, once its slowest command has finished, so this is kept small.
+    batch_size = 20
+
+    def __init__(self, clock=reactor):
+        super(PowerCommandBatcher, self).__init__()
+        self.clock = clock
+        # Commands waiting to be sent, as lists of `(command, kwargs,
+        # deferred, sent)`, keyed by client.
+        self.pending = {}
+
+    def call(self, client, command, **kwargs):
+        """Call `command` on `client` with `kwargs`, with other commands.
+
+        :return: A `Deferred` that fires with the result of this command.
+        """
+        sent = []
+
+        def cancel(d):
+            # Cancel the command itself if it was sent on its own.
+            for result in sent:
+                result.cancel()
+
+        d = Deferred(cancel)
+        calls = self.pending.get(client)
+        if calls is None:
+            calls = self.pending[client] = []
+            self.clock.callLater(self.delay, self._send, client)
+        calls.append((command, kwargs, d, sent))
+        return d
+
+    def _send(self, client):
+        # Don't send commands whose callers have already given up.
+        calls = [
+            call for call in self.pending.pop(client)
+            if not call[2].called
+        ]
+        for index in range(0, len(calls), self.batch_size):
+            batch = calls[index:index + self.batch_size]
+            if len(batch) == 1:
+                self._send_one(client, batch[0])
+            else:
+                self._send_batch(client, batch)
+
+    def _send_one(self, client, call):
+        command, kwargs, d, sent = call
+        result = maybeDeferred(client, command, **kwargs)
+        sent.append(result)
+        result.addCallbacks(
+            partial(_fire, d, True), partial(_fire, d, False))
+
+    def _send_batch(self, client, calls):
+
+        def distribute(results):
+            for (_, _, d, _), (success, result) in zip(calls, results):
+                _fire(d, success, result)
+
+        def send_one_by_one(failure):
+            maaslog.warning(
+                "Sending %d power commands to rack controller together "
+                "failed; sending them one by one instead: %s",
+                len(calls), failure.getErrorMessage())
+            for call in calls:
+                if not call[2].called:
+                    self._send_one(client, call)
+
+        maaslog.debug(
+            "Sending %d power commands to rack controller together.",
+            len(calls))
+        result = maybeDeferred(client.batch, [
+            (command, kwargs) for command, kwargs, _, _ in calls])
+        result.addCallbacks(distribute, send_one_by_one)
+
+
+def _fire(d, success, result):
+    """Fire `d` with `result` unless its caller has already given up."""
+    if not d.called:
+        if success:
+            d.callback(result)
+        else:
+            d.errback(result)
+
+
+power_batcher = PowerCommandBatcher()
+
+
 @asynchronous(timeout=15)
 def power_node(command, client, system_id, hostname, power_info):
     """Power-on/off the given nodes.
@@ -63,8 +167,8 @@ def power_node(command, client, system_id, hostname, power_info):
     # they can choose to chain onto it, or to "cap it off", so that
     # result gets consumed (Twisted will complain if an error is not
     # consumed).
-    return client(
-        command, system_id=system_id, hostname=hostname,
+    return power_batcher.call(
+        client, command, system_id=system_id, hostname=hostname,
         power_type=power_info.power_type,
         context=power_info.power_parameters)
 
@@ -101,8 +205,8 @@ def power_cycle(client, system_id, hostname, power_info):
     # they can choose to chain onto it, or to "cap it off", so that
     # result gets consumed (Twisted will complain if an error is not
     # consumed).
-    return client(
-        PowerCycle, system_id=system_id, hostname=hostname,
+    return power_batcher.call(
+        client, PowerCycle, system_id=system_id, hostname=hostname,
         power_type=power_info.power_type,
         context=power_info.power_parameters)
 
@@ -135,8 +239,8 @@ def power_query(client, system_id, hostname, power_info):
     # they can choose to chain onto it, or to "cap it off", so that
     # result gets consumed (Twisted will complain if an error is not
     # consumed).
-    return client(
-        PowerQuery, system_id=system_id, hostname=hostname,
+    return power_batcher.call(
+        client, PowerQuery, system_id=system_id, hostname=hostname,
         power_type=power_info.power_type,
         context=power_info.power_parameters)
 
@@ -205,8 +309,8 @@ def power_query_all(system_id, hostname, power_info, timeout=30):
     call_order = []
     clients = getAllClients()
     for client in clients:
-        d = client(
-            PowerQuery,
+        d = power_batcher.call(
+            client, PowerQuery,
             system_id=system_id, hostname=hostname,
             power_type=power_info.power_type,
             context=power_info.power_parameters)
@@ -6,12 +6,17 @@
 __all__ = []
 
 import random
-from unittest.mock import Mock
+from unittest.mock import (
+    call,
+    Mock,
+    sentinel,
+)
 
 from crochet import wait_for
 from maasserver.clusterrpc import power as power_module
 from maasserver.clusterrpc.power import (
     pick_best_power_state,
+    PowerCommandBatcher,
     power_cycle,
     power_driver_check,
     power_off_node,
@@ -27,7 +32,12 @@ from maasserver.testing.testcase import (
 )
 from maasserver.utils.orm import transactional
 from maasserver.utils.threads import deferToDatabase
-from maastesting.matchers import MockCalledOnceWith
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockCallsMatch,
+    MockNotCalled,
+)
+from maastesting.twisted import extract_result
 from provisioningserver.rpc.cluster import (
     PowerCycle,
     PowerDriverCheck,
@@ -41,7 +51,11 @@ from twisted.internet.defer import (
     inlineCallbacks,
     succeed,
 )
-from twisted.internet.task import deferLater
+from twisted.internet.task import (
+    Clock,
+    deferLater,
+)
+from twisted.python.failure import Failure
 
 
 wait_for_reactor = wait_for(30)  # 30 seconds.
@@ -73,6 +87,99 @@ class TestPowerNode(MAASServerTestCase):
             ))
 
 
+class TestPowerCommandBatcher(MAASServerTestCase):
+    """Tests for `PowerCommandBatcher`."""
+
+    def test__sends_lone_command_as_normal_call(self):
+        clock = Clock()
+        batcher = PowerCommandBatcher(clock)
+        client = Mock()
+        client.return_value = succeed(sentinel.result)
+        d = batcher.call(client, PowerOn, system_id=sentinel.system_id)
+        self.assertThat(client, MockNotCalled())
+        clock.advance(batcher.delay)
+        self.assertThat(
+            client, MockCalledOnceWith(PowerOn, system_id=sentinel.system_id))
+        self.assertThat(client.batch, MockNotCalled())
+        self.assertIs(sentinel.result, extract_result(d))
+
+    def test__sends_commands_for_same_client_in_one_batch(self):
+        clock = Clock()
+        batcher = PowerCommandBatcher(clock)
+        client = Mock()
+        exception = factory.make_exception()
+        client.batch.return_value = succeed([
+            (True, sentinel.on), (False, Failure(exception))])
+        d_on = batcher.call(client, PowerOn, system_id=sentinel.on)
+        d_off = batcher.call(client, PowerOff, system_id=sentinel.off)
+        clock.advance(batcher.delay)
+        self.assertThat(client, MockNotCalled())
+        self.assertThat(client.batch, MockCalledOnceWith([
+            (PowerOn, {"system_id": sentinel.on}),
+            (PowerOff, {"system_id": sentinel.off}),
+        ]))
+        self.assertIs(sentinel.on, extract_result(d_on))
+        self.assertRaises(type(exception), extract_result, d_off)
+
+    def test__sends_commands_for_each_client_separately(self):
+        clock = Clock()
+        batcher = PowerCommandBatcher(clock)
+        clients = [Mock(), Mock()]
+        for client in clients:
+            client.return_value = succeed(None)
+            batcher.call(client, PowerOn)
+        clock.advance(batcher.delay)
+        for client in clients:
+            self.assertThat(client, MockCalledOnceWith(PowerOn))
+
+    def test__sends_at_most_batch_size_commands_in_each_batch(self):
+        clock = Clock()
+        batcher = PowerCommandBatcher(clock)
+        batcher.batch_size = 2
+        client = Mock()
+        client.return_value = succeed(sentinel.lone)
+        client.batch.side_effect = (
+            lambda calls: succeed([(True, sentinel.batched)] * len(calls)))
+        ds = [batcher.call(client, PowerOn) for _ in range(5)]
+        clock.advance(batcher.delay)
+        self.assertThat(client.batch, MockCallsMatch(
+            call([(PowerOn, {}), (PowerOn, {})]),
+            call([(PowerOn, {}), (PowerOn, {})])))
+        self.assertThat(client, MockCalledOnceWith(PowerOn))
+        self.assertEqual(
+            [sentinel.batched] * 4 + [sentinel.lone],
+            [extract_result(d) for d in ds])
+
+    def test__sends_commands_one_by_one_when_batch_fails(self):
+        clock = Clock()
+        batcher = PowerCommandBatcher(clock)
+        client = Mock()
+        exception = factory.make_exception()
+        client.batch.return_value = fail(exception)
+        client.side_effect = (
+            lambda command, system_id: succeed(system_id))
+        system_ids = [factory.make_name("system_id") for _ in range(3)]
+        ds = [
+            batcher.call(client, PowerOn, system_id=system_id)
+            for system_id in system_ids
+        ]
+        clock.advance(batcher.delay)
+        self.assertThat(client, MockCallsMatch(*(
+            call(PowerOn, system_id=system_id)
+            for system_id in system_ids)))
+        self.assertEqual(system_ids, [extract_result(d) for d in ds])
+
+    def test__does_not_send_cancelled_command(self):
+        clock = Clock()
+        batcher = PowerCommandBatcher(clock)
+        client = Mock()
+        d = batcher.call(client, PowerOn)
+        d.addErrback(lambda failure: None)
+        d.cancel()
+        clock.advance(batcher.delay)
+        self.assertThat(client, MockNotCalled())
+
+
 class TestPowerCycle(MAASServerTestCase):
     """Tests for `power_cycle`."""
 
@@ -102,56 +102,43 @@ maasserver_discovery = dedent("""\
 # IP addresses that are in subnets with the same space ID. Typically this view
 # should not be used without constraining, say, the sets of nodes, to find
 # addresses that are mutually routable between region controllers for example.
+#
+# The addresses come from `maasserver_routable_address`, which is kept up to
+# date by triggers (see `maasserver.triggers.system`), so constraining by node
+# is a pair of indexed lookups rather than a join over interfaces, addresses,
+# subnets, and VLANs.
 maasserver_routable_pairs = dedent("""\
     SELECT
            -- "Left" node.
-           if_left.node_id AS left_node_id,
-           if_left.id AS left_interface_id,
-           subnet_left.id AS left_subnet_id,
-           vlan_left.id AS left_vlan_id,
-           sip_left.ip AS left_ip,
+           addr_left.node_id AS left_node_id,
+           addr_left.interface_id AS left_interface_id,
+           addr_left.subnet_id AS left_subnet_id,
+           addr_left.vlan_id AS left_vlan_id,
+           addr_left.ip AS left_ip,
 
            -- "Right" node.
-           if_right.node_id AS right_node_id,
-           if_right.id AS right_interface_id,
-           subnet_right.id AS right_subnet_id,
-           vlan_right.id AS right_vlan_id,
-           sip_right.ip AS right_ip,
+           addr_right.node_id AS right_node_id,
+           addr_right.interface_id AS right_interface_id,
+           addr_right.subnet_id AS right_subnet_id,
+           addr_right.vlan_id AS right_vlan_id,
+           addr_right.ip AS right_ip,
 
            -- Space that left and right have in commmon. Can be NULL.
-           vlan_left.space_id AS space_id,
+           addr_left.space_id AS space_id,
 
            -- Relative metric; lower is better.
            CASE
-             WHEN if_left.node_id = if_right.node_id THEN 0
-             WHEN subnet_left.id = subnet_right.id THEN 1
-             WHEN vlan_left.id = vlan_right.id THEN 2
-             WHEN vlan_left.space_id IS NOT NULL THEN 3
+             WHEN addr_left.node_id = addr_right.node_id THEN 0
+             WHEN addr_left.subnet_id = addr_right.subnet_id THEN 1
+             WHEN addr_left.vlan_id = addr_right.vlan_id THEN 2
+             WHEN addr_left.space_id IS NOT NULL THEN 3
              ELSE 4  -- The NULL space.
            END AS metric
 
-      FROM maasserver_interface AS if_left
-      JOIN maasserver_interface_ip_addresses AS ifia_left
-        ON if_left.id = ifia_left.interface_id
-      JOIN maasserver_staticipaddress AS sip_left
-        ON ifia_left.staticipaddress_id = sip_left.id
-      JOIN maasserver_subnet AS subnet_left
-        ON sip_left.subnet_id = subnet_left.id
-      JOIN maasserver_vlan AS vlan_left
-        ON subnet_left.vlan_id = vlan_left.id
-      JOIN maasserver_vlan AS vlan_right
-        ON vlan_left.space_id IS NOT DISTINCT FROM vlan_right.space_id
-      JOIN maasserver_subnet AS subnet_right
-        ON vlan_right.id = subnet_right.vlan_id
-      JOIN maasserver_staticipaddress AS sip_right
-        ON subnet_right.id = sip_right.subnet_id
-      JOIN maasserver_interface_ip_addresses AS ifia_right
-        ON sip_right.id = ifia_right.staticipaddress_id
-      JOIN maasserver_interface AS if_right
-        ON ifia_right.interface_id = if_right.id
-     WHERE if_left.enabled AND sip_left.ip IS NOT NULL
-       AND if_right.enabled AND sip_right.ip IS NOT NULL
-       AND family(sip_left.ip) = family(sip_right.ip)
+      FROM maasserver_routable_address AS addr_left
+      JOIN maasserver_routable_address AS addr_right
+        ON addr_left.space_id IS NOT DISTINCT FROM addr_right.space_id
+     WHERE family(addr_left.ip) = family(addr_right.ip)
     """)
 
 # Views that are helpful for supporting MAAS.
@@ -228,10 +228,6 @@ MIDDLEWARE_CLASSES = (
     # Used for rendering API exceptions for maasserver Web API.
     'maasserver.middleware.APIErrorsMiddleware',
 
-    # Used to display errors about disconnected clusters. FIXME: This should
-    # not be done on every request!
-    'maasserver.middleware.ExternalComponentsMiddleware',
-
     # Handle errors that should really be handled in application code:
     # NoConnectionsAvailable, PowerActionAlreadyInProgress, TimeoutError.
     # FIXME.
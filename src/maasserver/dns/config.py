@@ -8,7 +8,10 @@ __all__ = [
     'dns_update_all_zones',
     ]
 
+from hashlib import sha256
+
 from django.conf import settings
+from django.db.models import Max
 from maasserver.dns.zonegenerator import ZoneGenerator
 from maasserver.enum import RDNS_MODE
 from maasserver.models.config import Config
@@ -27,6 +30,9 @@ from provisioningserver.logger import get_maas_logger
 
 maaslog = get_maas_logger("dns")
 
+# The source of publications made by `dns_force_reload`.
+FORCE_RELOAD_SOURCE = "Force reload"
+
 
 def current_zone_serial():
     return '%0.10d' % DNSPublication.objects.get_most_recent().serial
@@ -39,10 +45,16 @@ def is_dns_enabled():
 
 def dns_force_reload():
     """Force the DNS to be regenerated."""
-    DNSPublication(source="Force reload").save()
+    DNSPublication(source=FORCE_RELOAD_SOURCE).save()
+
+
+def get_last_forced_publication():
+    """Return the ID of the most recent forced publication, or `None`."""
+    return DNSPublication.objects.filter(
+        source=FORCE_RELOAD_SOURCE).aggregate(Max("id"))["id__max"]
 
 
-def dns_update_all_zones(reload_retry=False):
+def dns_update_all_zones(reload_retry=False, previous_fingerprint=None):
     """Update all zone files for all domains.
 
     Serving these zone files means updating BIND's configuration to include
@@ -51,9 +63,15 @@ def dns_update_all_zones(reload_retry=False):
     :param reload_retry: Should the DNS server reload be retried in case
         of failure? Defaults to `False`.
     :type reload_retry: bool
+    :param previous_fingerprint: The fingerprint returned by a previous call.
+        If the configuration has not changed since then, and DNS has not been
+        forced to reload with `dns_force_reload`, BIND's configuration is
+        neither written nor reloaded.
+    :return: A fingerprint of the configuration, ignoring zone serials, or
+        `None` if MAAS is not managing DNS or BIND could not be reloaded.
     """
     if not is_dns_enabled():
-        return
+        return None
 
     domains = Domain.objects.filter(authoritative=True)
     subnets = Subnet.objects.exclude(rdns_mode=RDNS_MODE.DISABLED)
@@ -62,6 +80,15 @@ def dns_update_all_zones(reload_retry=False):
     zones = ZoneGenerator(
         domains, subnets, default_ttl,
         serial).as_list()
+    upstream_dns = get_upstream_dns()
+    dnssec_validation = get_dnssec_validation()
+    trusted_networks = get_trusted_networks()
+    fingerprint = get_dns_fingerprint(
+        zones, upstream_dns, dnssec_validation, trusted_networks,
+        get_last_forced_publication())
+    if fingerprint == previous_fingerprint:
+        return fingerprint
+
     bind_write_zones(zones)
 
     # We should not be calling bind_write_options() here; call-sites should be
@@ -70,23 +97,68 @@ def dns_update_all_zones(reload_retry=False):
     # some that call it for this side-effect alone. At present all it does is
     # set the upstream DNS servers, nothing to do with serving zones at all!
     bind_write_options(
-        upstream_dns=get_upstream_dns(),
-        dnssec_validation=get_dnssec_validation())
+        upstream_dns=upstream_dns,
+        dnssec_validation=dnssec_validation)
 
     # Nor should we be rewriting ACLs that are related only to allowing
     # recursive queries to the upstream DNS servers. Again, this is legacy,
     # where the "trusted" ACL ended up in the same configuration file as the
     # zone stanzas, and so both need to be rewritten at the same time.
-    bind_write_configuration(zones, trusted_networks=get_trusted_networks())
+    bind_write_configuration(zones, trusted_networks=trusted_networks)
 
     # Reloading with retries may be a legacy from Celery days, or it may be
     # necessary to recover from races during start-up. We're not sure if it is
     # actually needed but it seems safer to maintain this behaviour until we
     # have a better understanding.
     if reload_retry:
-        bind_reload_with_retries()
+        reloaded = bind_reload_with_retries()
+    else:
+        reloaded = bind_reload()
+
+    # Don't let a failed reload be mistaken for an unchanged configuration.
+    return fingerprint if reloaded else None
+
+
+def _canonicalise(value):
+    """Return a representation of `value` that is stable for equal values.
+
+    Sets and dicts are sorted, and objects are reduced to their attributes,
+    so that the result does not depend on iteration order or identity.
+    """
+    if isinstance(value, dict):
+        return sorted(
+            (repr(_canonicalise(key)), _canonicalise(item))
+            for key, item in value.items())
+    elif isinstance(value, (set, frozenset)):
+        return sorted(repr(_canonicalise(item)) for item in value)
+    elif isinstance(value, (list, tuple)):
+        return [_canonicalise(item) for item in value]
+    elif hasattr(value, '__dict__') and not isinstance(value, type):
+        return (type(value).__name__, _canonicalise(vars(value)))
     else:
-        bind_reload()
+        return repr(value)
+
+
+def get_dns_fingerprint(zones, *options):
+    """Return a fingerprint of the DNS configuration.
+
+    The zone serials are excluded so that a new `DNSPublication` that does
+    not change any records produces the same fingerprint. Pass the ID of the
+    last forced publication in `options` so that forcing a reload changes it.
+
+    :param zones: The zones, as generated by `ZoneGenerator`.
+    :param options: Any other values that affect BIND's configuration.
+    """
+    hasher = sha256()
+    for zone in zones:
+        state = {
+            name: value for name, value in vars(zone).items()
+            if name != 'serial'
+        }
+        hasher.update(repr(
+            (type(zone).__name__, _canonicalise(state))).encode("utf-8"))
+    hasher.update(repr(_canonicalise(options)).encode("utf-8"))
+    return hasher.hexdigest()
 
 
 def get_upstream_dns():
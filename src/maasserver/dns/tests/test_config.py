@@ -33,7 +33,10 @@ from maasserver.models.dnspublication import DNSPublication
 from maasserver.testing.config import RegionConfigurationFixture
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
-from maastesting.matchers import MockCalledOnceWith
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockNotCalled,
+)
 from netaddr import IPAddress
 from provisioningserver.dns.config import (
     compose_config_path,
@@ -279,6 +282,60 @@ class TestDNSConfigModifications(TestDNSServer):
             compose_config_path(DNSConfig.target_file_name),
             FileContains(matcher=Contains(trusted_network)))
 
+    def test_dns_update_all_zones_returns_fingerprint(self):
+        self.patch(settings, 'DNS_CONNECT', True)
+        self.create_node_with_static_ip()
+        fingerprint = dns_update_all_zones()
+        # A new publication changes the serial but not the fingerprint.
+        DNSPublication(source=factory.make_name("source")).save()
+        self.assertEqual(fingerprint, dns_update_all_zones())
+
+    def test_dns_update_all_zones_skips_unchanged_configuration(self):
+        self.patch(settings, 'DNS_CONNECT', True)
+        fingerprint = dns_update_all_zones()
+        bind_write_zones = self.patch_autospec(
+            dns_config_module, "bind_write_zones")
+        bind_reload = self.patch_autospec(dns_config_module, "bind_reload")
+        DNSPublication(source=factory.make_name("source")).save()
+        self.assertEqual(
+            fingerprint,
+            dns_update_all_zones(previous_fingerprint=fingerprint))
+        self.assertThat(bind_write_zones, MockNotCalled())
+        self.assertThat(bind_reload, MockNotCalled())
+
+    def test_dns_update_all_zones_writes_forced_publication(self):
+        self.patch(settings, 'DNS_CONNECT', True)
+        fingerprint = dns_update_all_zones()
+        bind_write_zones = self.patch_autospec(
+            dns_config_module, "bind_write_zones")
+        bind_reload = self.patch_autospec(dns_config_module, "bind_reload")
+        dns_force_reload()
+        self.assertNotEqual(
+            fingerprint,
+            dns_update_all_zones(previous_fingerprint=fingerprint))
+        # The zones are written with the forced publication's serial.
+        serial = DNSPublication.objects.get_most_recent().serial
+        [zones], _ = bind_write_zones.call_args
+        self.assertEqual(
+            {"%0.10d" % serial}, {zone.serial for zone in zones})
+        self.assertThat(bind_reload, MockCalledOnceWith())
+
+    def test_dns_update_all_zones_returns_None_when_reload_fails(self):
+        self.patch(settings, 'DNS_CONNECT', True)
+        bind_reload = self.patch_autospec(dns_config_module, "bind_reload")
+        bind_reload.return_value = False
+        self.assertIsNone(dns_update_all_zones())
+
+    def test_dns_update_all_zones_writes_changed_configuration(self):
+        self.patch(settings, 'DNS_CONNECT', True)
+        fingerprint = dns_update_all_zones()
+        bind_reload = self.patch_autospec(dns_config_module, "bind_reload")
+        self.create_node_with_static_ip()
+        self.assertNotEqual(
+            fingerprint,
+            dns_update_all_zones(previous_fingerprint=fingerprint))
+        self.assertThat(bind_reload, MockCalledOnceWith())
+
     def test_dns_config_has_NS_record(self):
         self.patch(settings, 'DNS_CONNECT', True)
         ip = factory.make_ipv4_address()
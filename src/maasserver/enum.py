@@ -22,6 +22,8 @@ __all__ = [
     'NODE_STATUS_CHOICES_DICT',
     'PARTITION_TABLE_TYPE',
     'PARTITION_TABLE_TYPE_CHOICES',
+    'POD_PLACEMENT',
+    'POD_PLACEMENT_CHOICES',
     'PRESEED_TYPE',
     'RDNS_MODE',
     'RDNS_MODE_CHOICES',
@@ -200,6 +202,20 @@ class NODE_CREATION_TYPE:
     DYNAMIC = 3
 
 
+class POD_PLACEMENT:
+    """Strategies for choosing the pod to compose a machine on."""
+    #: Best fit, prefer the pod with the least capacity left over.
+    BEST_FIT = 'best-fit'
+    #: Spread, prefer the pod with the most capacity left over.
+    SPREAD = 'spread'
+
+
+POD_PLACEMENT_CHOICES = (
+    (POD_PLACEMENT.BEST_FIT, "Best fit (fill up the fullest pods first)"),
+    (POD_PLACEMENT.SPREAD, "Spread (use the emptiest pods first)"),
+)
+
+
 class NODE_PERMISSION:
     """Permissions relating to nodes."""
     VIEW = 'view_node'
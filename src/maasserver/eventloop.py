@@ -90,6 +90,16 @@ def make_NonceCleanupService():
     return nonces_cleanup.NonceCleanupService()
 
 
+def make_NonceFlushService():
+    from maasserver import nonces_cleanup
+    return nonces_cleanup.NonceFlushService()
+
+
+def make_EventsCleanupService():
+    from maasserver import events_cleanup
+    return events_cleanup.EventsCleanupService()
+
+
 def make_DNSPublicationGarbageService():
     from maasserver.dns import publication
     return publication.DNSPublicationGarbageService()
@@ -125,6 +135,11 @@ def make_StatusWorkerService(dbtasks):
     return StatusWorkerService(dbtasks)
 
 
+def make_PostCommissioningService():
+    from metadataserver.post_commissioning import PostCommissioningService
+    return PostCommissioningService()
+
+
 def make_ServiceMonitorService(advertisingService):
     from maasserver.regiondservices import service_monitor_service
     return service_monitor_service.ServiceMonitorService(advertisingService)
@@ -223,6 +238,16 @@ class RegionEventLoop:
             "factory": make_NonceCleanupService,
             "requires": [],
         },
+        "nonce-flush": {
+            "only_on_master": False,
+            "factory": make_NonceFlushService,
+            "requires": [],
+        },
+        "events-cleanup": {
+            "only_on_master": True,
+            "factory": make_EventsCleanupService,
+            "requires": [],
+        },
         "dns-publication-cleanup": {
             "only_on_master": True,
             "factory": make_DNSPublicationGarbageService,
@@ -263,6 +288,11 @@ class RegionEventLoop:
             "factory": make_StatusWorkerService,
             "requires": ["database-tasks"],
         },
+        "post-commissioning": {
+            "only_on_master": False,
+            "factory": make_PostCommissioningService,
+            "requires": [],
+        },
         "networks-monitor": {
             "only_on_master": False,
             "factory": make_NetworksMonitoringService,
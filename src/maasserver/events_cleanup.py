@@ -0,0 +1,86 @@
+# Copyright 2017 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Events cleanup utilities."""
+
+__all__ = [
+    'cleanup_old_events',
+    'EventsCleanupService',
+    ]
+
+from datetime import (
+    datetime,
+    timedelta,
+)
+
+from maasserver.models import (
+    Config,
+    Event,
+)
+from maasserver.utils.orm import transactional
+from maasserver.utils.threads import deferToDatabase
+from provisioningserver.utils.twisted import synchronous
+from twisted.application.internet import TimerService
+
+# The maximum number of events deleted in a single transaction.
+DELETE_BATCH_SIZE = 1000
+
+
+@transactional
+def get_retention_cutoff():
+    """Return the time before which events should be removed.
+
+    Returns None if events are to be kept forever.
+    """
+    retention_days = Config.objects.get_config('events_retention_days')
+    if not retention_days:
+        return None
+    else:
+        return datetime.now() - timedelta(days=retention_days)
+
+
+@transactional
+def delete_old_events(cutoff, batch_size=DELETE_BATCH_SIZE):
+    """Delete up to `batch_size` of the oldest events created before `cutoff`.
+
+    :return: The number of events deleted.
+    """
+    ids = list(
+        Event.objects.filter(created__lt=cutoff).order_by(
+            'id').values_list('id', flat=True)[:batch_size])
+    if len(ids) > 0:
+        Event.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def cleanup_old_events(batch_size=DELETE_BATCH_SIZE):
+    """Remove events older than the `events_retention_days` setting.
+
+    Events are deleted in batches of `batch_size`, each in its own
+    transaction, so that a large backlog of old events never holds locks on
+    the events table for long.
+
+    :return: The number of events deleted.
+    """
+    cutoff = get_retention_cutoff()
+    if cutoff is None:
+        return 0
+    count = 0
+    while True:
+        deleted = delete_old_events(cutoff, batch_size)
+        count += deleted
+        if deleted < batch_size:
+            return count
+
+
+class EventsCleanupService(TimerService, object):
+    """Service to periodically remove old events.
+
+    This will run immediately when it's started, then once again each
+    hour, though the interval can be overridden by passing it to the
+    constructor.
+    """
+
+    def __init__(self, interval=(60 * 60)):
+        super(EventsCleanupService, self).__init__(
+            interval, deferToDatabase, synchronous(cleanup_old_events))
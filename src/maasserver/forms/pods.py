@@ -30,6 +30,7 @@ from maasserver.clusterrpc.pods import (
 from maasserver.enum import (
     BMC_TYPE,
     NODE_CREATION_TYPE,
+    POD_PLACEMENT,
 )
 from maasserver.exceptions import PodProblem
 from maasserver.forms import MAASModelForm
@@ -307,13 +308,16 @@ class ComposeMachineForm(forms.Form):
             self.fields['cpu_speed'] = IntegerField(
                 min_value=300, required=False)
         self.fields['hostname'] = CharField(required=False)
-        self.initial['hostname'] = make_unique_hostname()
+        if 'hostname' not in self.initial:
+            self.initial['hostname'] = make_unique_hostname()
         self.fields['domain'] = ModelChoiceField(
             required=False, queryset=Domain.objects.all())
-        self.initial['domain'] = Domain.objects.get_default_domain()
+        if 'domain' not in self.initial:
+            self.initial['domain'] = Domain.objects.get_default_domain()
         self.fields['zone'] = ModelChoiceField(
             required=False, queryset=Zone.objects.all())
-        self.initial['zone'] = Zone.objects.get_default_zone()
+        if 'zone' not in self.initial:
+            self.initial['zone'] = Zone.objects.get_default_zone()
         self.fields['storage'] = CharField(
             validators=[storage_validator], required=False)
         self.initial['storage'] = 'root:8(local)'
@@ -329,6 +333,33 @@ class ComposeMachineForm(forms.Form):
         else:
             return None
 
+    def get_leftover_capacity(self):
+        """Return the fraction of the pod's capacity that would be left over
+        after composing the requested machine.
+
+        This is the mean of the fractions of cores, memory and local storage
+        that would remain, according to the pod's hints. Resources without a
+        hint are ignored. The result is negative if the requested machine
+        does not fit.
+        """
+        requested = self.get_requested_machine()
+        hints = self.pod.hints
+        fractions = []
+        for available, wanted in (
+                (hints.cores, requested.cores),
+                (hints.memory, requested.memory),
+                (hints.local_storage, sum(
+                    block_device.size
+                    for block_device in requested.block_devices))):
+            if available > 0:
+                fractions.append((available - wanted) / available)
+        if len(fractions) == 0:
+            return 0.0
+        elif min(fractions) < 0:
+            return min(fractions)
+        else:
+            return sum(fractions) / len(fractions)
+
     def get_requested_machine(self):
         """Return the `RequestedMachine`."""
         # XXX blake_r 2017-04-04: Interfaces are hard coded at the
@@ -425,9 +456,19 @@ class ComposeMachineForPodsForm(forms.Form):
         self.pods = kwargs.pop('pods', None)
         if self.pods is None:
             raise ValueError("'pods' kwargs is required.")
+        self.placement = kwargs.pop('placement', POD_PLACEMENT.BEST_FIT)
         super(ComposeMachineForPodsForm, self).__init__(*args, **kwargs)
+        # Only one of the pods will compose the machine, so the defaults can
+        # be shared rather than queried for each pod.
+        initial = {
+            'hostname': make_unique_hostname(),
+            'domain': Domain.objects.get_default_domain(),
+            'zone': Zone.objects.get_default_zone(),
+        }
         self.pod_forms = [
-            ComposeMachineForm(request=self.request, data=self.data, pod=pod)
+            ComposeMachineForm(
+                request=self.request, data=self.data, pod=pod,
+                initial=dict(initial))
             for pod in self.pods
         ]
 
@@ -435,18 +476,35 @@ class ComposeMachineForPodsForm(forms.Form):
         """Prevent from usage."""
         raise AttributeError("Use `compose` instead of `save`.")
 
+    def get_ranked_pod_forms(self, pod_forms):
+        """Return `pod_forms` ordered by how well the requested machine fits.
+
+        Pods the machine does not fit on, according to their hints, come
+        last. The rest are ordered according to `self.placement`.
+        """
+        def rank(form):
+            leftover = form.get_leftover_capacity()
+            if leftover < 0:
+                return (1, -leftover)
+            elif self.placement == POD_PLACEMENT.SPREAD:
+                return (0, -leftover)
+            else:
+                return (0, leftover)
+
+        return sorted(pod_forms, key=rank)
+
     def compose(self):
         """Composed machine from available pod."""
-        non_commit_forms = [
+        non_commit_forms = self.get_ranked_pod_forms(
             form
             for form in self.valid_pod_forms
             if Capabilities.OVER_COMMIT not in form.pod.capabilities
-        ]
-        commit_forms = [
+        )
+        commit_forms = self.get_ranked_pod_forms(
             form
             for form in self.valid_pod_forms
             if Capabilities.OVER_COMMIT in form.pod.capabilities
-        ]
+        )
         # First, try to compose a machine from non-commitable pods.
         for form in non_commit_forms:
             try:
@@ -18,6 +18,10 @@ from socket import gethostname
 from django import forms
 from django.core.exceptions import ValidationError
 from maasserver.bootresources import IMPORT_RESOURCES_SERVICE_PERIOD
+from maasserver.enum import (
+    POD_PLACEMENT,
+    POD_PLACEMENT_CHOICES,
+)
 from maasserver.fields import (
     HostListFormField,
     IPListFormField,
@@ -526,6 +530,17 @@ CONFIG_ITEMS = {
             'min_value': 1,
         },
     },
+    'events_retention_days': {
+        'default': 0,
+        'form': forms.IntegerField,
+        'form_kwargs': {
+            'required': False,
+            'label': (
+                "The number of days node events are kept for before being "
+                "removed (0 keeps events forever)"),
+            'min_value': 0,
+        },
+    },
     'subnet_ip_exhaustion_threshold_count': {
         'default': 16,
         'form': forms.IntegerField,
@@ -546,6 +561,29 @@ CONFIG_ITEMS = {
             'required': False
         }
     },
+    'optimistic_allocation': {
+        'default': False,
+        'form': forms.BooleanField,
+        'form_kwargs': {
+            'required': False,
+            'label': "Allocate machines concurrently",
+            'help_text': (
+                "Allocations claim the machine they select with a row lock, "
+                "skipping machines claimed by concurrent allocations, rather "
+                "than all waiting for one region-wide lock.")
+        }
+    },
+    'pod_placement': {
+        'default': POD_PLACEMENT.BEST_FIT,
+        'form': forms.ChoiceField,
+        'form_kwargs': {
+            'label': "Pod placement",
+            'choices': POD_PLACEMENT_CHOICES,
+            'help_text': (
+                "How to choose the pod to compose a machine on when "
+                "allocating, among those the machine fits on.")
+        }
+    },
 }
 
 
@@ -20,6 +20,7 @@ from django.core.validators import (
 from maasserver.enum import (
     BMC_TYPE,
     NODE_CREATION_TYPE,
+    POD_PLACEMENT,
 )
 from maasserver.exceptions import PodProblem
 from maasserver.forms import pods as pods_module
@@ -961,6 +962,71 @@ class TestComposeMachineForPodsForm(MAASServerTestCase):
                 skip_commissioning=True,
                 creation_type=NODE_CREATION_TYPE.DYNAMIC)))
 
+    def make_pods_with_cores(self, *cores):
+        pods = self.make_pods()[:len(cores)]
+        for pod, pod_cores in zip(pods, cores):
+            pod.hints.cores = pod_cores
+            pod.hints.memory = 8192
+            pod.hints.save()
+        return pods
+
+    def get_composed_pods(self, form):
+        composed = []
+
+        def compose(form_self, **kwargs):
+            composed.append(form_self.pod)
+            raise factory.make_exception()
+
+        self.patch(ComposeMachineForm, 'compose', compose)
+        form.compose()
+        return composed
+
+    def test_compose_tries_best_fit_pod_first(self):
+        request = MagicMock()
+        pods = self.make_pods_with_cores(16, 4, 8)
+        data = {"cores": 4, "memory": 1024}
+        form = ComposeMachineForPodsForm(request=request, data=data, pods=pods)
+        self.assertTrue(form.is_valid())
+        self.assertThat(
+            self.get_composed_pods(form),
+            Equals([pods[1], pods[2], pods[0]]))
+
+    def test_compose_tries_emptiest_pod_first_when_spreading(self):
+        request = MagicMock()
+        pods = self.make_pods_with_cores(16, 4, 8)
+        data = {"cores": 4, "memory": 1024}
+        form = ComposeMachineForPodsForm(
+            request=request, data=data, pods=pods,
+            placement=POD_PLACEMENT.SPREAD)
+        self.assertTrue(form.is_valid())
+        self.assertThat(
+            self.get_composed_pods(form),
+            Equals([pods[0], pods[2], pods[1]]))
+
+    def test_compose_tries_pods_without_enough_storage_last(self):
+        request = MagicMock()
+        pods = self.make_pods_with_cores(4, 16)
+        pods[0].hints.local_storage = 4 * (1000 ** 3)
+        pods[0].hints.save()
+        data = {"cores": 4, "memory": 1024, "storage": "root:8"}
+        form = ComposeMachineForPodsForm(request=request, data=data, pods=pods)
+        self.assertTrue(form.is_valid())
+        self.assertThat(
+            self.get_composed_pods(form), Equals([pods[1], pods[0]]))
+
+    def test__shares_default_hostname_domain_and_zone(self):
+        request = MagicMock()
+        pods = self.make_pods()
+        data = self.make_data(pods)
+        make_unique_hostname = self.patch(
+            pods_module, 'make_unique_hostname')
+        make_unique_hostname.return_value = factory.make_name('hostname')
+        form = ComposeMachineForPodsForm(request=request, data=data, pods=pods)
+        self.assertThat(make_unique_hostname, MockCalledOnce())
+        self.assertThat(
+            {pod_form.initial['hostname'] for pod_form in form.pod_forms},
+            Equals({make_unique_hostname.return_value}))
+
     def test_clean_adds_error_for_no_matching_constraints(self):
         request = MagicMock()
         pods = self.make_pods()
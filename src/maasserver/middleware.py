@@ -41,15 +41,8 @@ from django.utils.http import urlquote_plus
 from maasserver import logger
 from maasserver.bootresources import SIMPLESTREAMS_URL_REGEXP
 from maasserver.clusterrpc.utils import get_error_message_for_exception
-from maasserver.components import (
-    discard_persistent_error,
-    register_persistent_error,
-)
-from maasserver.enum import COMPONENT
 from maasserver.exceptions import MAASAPIException
 from maasserver.models.config import Config
-from maasserver.models.node import RackController
-from maasserver.rpc import getAllClients
 from maasserver.utils.orm import is_retryable_failure
 from maasserver.views.combo import MERGE_VIEWS
 from provisioningserver.rpc.exceptions import (
@@ -121,46 +114,6 @@ class AccessMiddleware:
                 return None
 
 
-class ExternalComponentsMiddleware:
-    """Middleware to check external components at regular intervals."""
-
-    def _check_rack_controller_connectivity(self):
-        """Check each rack controller to see if it's connected.
-
-        If any rack controllers are disconnected, add a persistent error.
-        """
-        controllers = RackController.objects.all()
-        connected_ids = {client.ident for client in getAllClients()}
-        disconnected_controllers = {
-            controller
-            for controller in controllers
-            if controller.system_id not in connected_ids
-        }
-        if len(disconnected_controllers) == 0:
-            discard_persistent_error(COMPONENT.RACK_CONTROLLERS)
-        else:
-            if len(disconnected_controllers) == 1:
-                message = (
-                    "One rack controller is not yet connected to the region")
-            else:
-                message = (
-                    "%d rack controllers are not yet connected to the region"
-                    % len(disconnected_controllers))
-            message = (
-                "%s. Visit the <a href=\"%s#/nodes?tab=controllers\">"
-                "rack controllers page</a> for "
-                "more information." % (message, reverse('index')))
-            register_persistent_error(COMPONENT.RACK_CONTROLLERS, message)
-
-    def process_request(self, request):
-        # This middleware hijacks the request to perform checks.  Any
-        # error raised during these checks should be caught to avoid
-        # disturbing the handling of the request.  Proper error reporting
-        # should be handled in the check method itself.
-        self._check_rack_controller_connectivity()
-        return None
-
-
 class ExceptionMiddleware(metaclass=ABCMeta):
     """Convert exceptions into appropriate HttpResponse responses.
 
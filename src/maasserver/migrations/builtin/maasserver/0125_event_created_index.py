@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maasserver', '0124_staticipaddress_address_family_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX maasserver_event__created ON maasserver_event (created)",
+            "DROP INDEX maasserver_event__created"
+        )
+    ]
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maasserver', '0125_event_created_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            """
+            CREATE TABLE maasserver_routable_address (
+                node_id integer NOT NULL,
+                interface_id integer NOT NULL,
+                staticipaddress_id integer NOT NULL,
+                ip inet NOT NULL,
+                subnet_id integer NOT NULL,
+                vlan_id integer NOT NULL,
+                space_id integer NULL
+            );
+            CREATE INDEX maasserver_routable_address__node_id
+                ON maasserver_routable_address (node_id);
+            CREATE INDEX maasserver_routable_address__interface_id
+                ON maasserver_routable_address (interface_id);
+            CREATE INDEX maasserver_routable_address__staticipaddress_id
+                ON maasserver_routable_address (staticipaddress_id);
+            CREATE INDEX maasserver_routable_address__subnet_id
+                ON maasserver_routable_address (subnet_id);
+            CREATE INDEX maasserver_routable_address__vlan_id
+                ON maasserver_routable_address (vlan_id);
+            INSERT INTO maasserver_routable_address
+                (node_id, interface_id, staticipaddress_id, ip,
+                 subnet_id, vlan_id, space_id)
+            SELECT iface.node_id, iface.id, sip.id, sip.ip,
+                   subnet.id, vlan.id, vlan.space_id
+              FROM maasserver_interface AS iface
+              JOIN maasserver_interface_ip_addresses AS ifia
+                ON iface.id = ifia.interface_id
+              JOIN maasserver_staticipaddress AS sip
+                ON ifia.staticipaddress_id = sip.id
+              JOIN maasserver_subnet AS subnet
+                ON sip.subnet_id = subnet.id
+              JOIN maasserver_vlan AS vlan
+                ON subnet.vlan_id = vlan.id
+             WHERE iface.node_id IS NOT NULL AND iface.enabled
+               AND sip.ip IS NOT NULL;
+            """,
+            "DROP TABLE maasserver_routable_address",
+        )
+    ]
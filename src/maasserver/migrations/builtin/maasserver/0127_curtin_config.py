@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maasserver', '0126_routable_address'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            """
+            CREATE TABLE maasserver_curtin_config (
+                node_id integer NOT NULL PRIMARY KEY,
+                storage_version bigint NOT NULL DEFAULT 0,
+                storage_key text NULL,
+                storage_config text NULL,
+                network_version bigint NOT NULL DEFAULT 0,
+                network_key text NULL,
+                network_config text NULL
+            );
+            """,
+            "DROP TABLE maasserver_curtin_config",
+        )
+    ]
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('piston3', '0002_auto_20151209_1652'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX piston3_nonce_key_idx "
+            "ON piston3_nonce (key, token_key, consumer_key)",
+            "DROP INDEX piston3_nonce_key_idx",
+        ),
+    ]
@@ -24,6 +24,7 @@ from django.db.models import (
     Manager,
     ManyToManyField,
     SET_NULL,
+    Sum,
     TextField,
 )
 from django.db.models.query import QuerySet
@@ -36,6 +37,7 @@ from maasserver.enum import (
     IPADDRESS_TYPE,
     NODE_CREATION_TYPE,
     NODE_STATUS,
+    NODE_TYPE,
 )
 from maasserver.exceptions import PodProblem
 from maasserver.fields import JSONObjectField
@@ -870,6 +872,24 @@ class Pod(BMC):
         podlog.info(
             "%s: finished syncing discovered information" % self.name)
 
+    def _sum_machines(self, field):
+        """Sum `field` over the machines in this pod, in the database."""
+        total = Machine.objects.filter(bmc__id=self.id).aggregate(
+            total=Sum(field))['total']
+        return 0 if total is None else total
+
+    def _get_block_devices(self, model):
+        """Return the `model` block devices of the machines in this pod."""
+        return model.objects.filter(
+            node__bmc__id=self.id, node__node_type=NODE_TYPE.MACHINE)
+
+    def _sum_block_devices(self, model, field):
+        """Sum `field` over the `model` block devices of the machines in this
+        pod, in the database."""
+        total = self._get_block_devices(model).aggregate(
+            total=Sum(field))['total']
+        return 0 if total is None else total
+
     def get_used_cores(self, machines=None):
         """Get the number of used cores in the pod.
 
@@ -878,7 +898,7 @@ class Pod(BMC):
             and no extra query needs to be performed.
         """
         if machines is None:
-            machines = Machine.objects.filter(bmc__id=self.id)
+            return self._sum_machines('cpu_count')
         return sum(
             machine.cpu_count
             for machine in machines
@@ -892,7 +912,7 @@ class Pod(BMC):
             and no extra query needs to be performed.
         """
         if machines is None:
-            machines = Machine.objects.filter(bmc__id=self.id)
+            return self._sum_machines('memory')
         return sum(
             machine.memory
             for machine in machines
@@ -906,11 +926,7 @@ class Pod(BMC):
             and no extra query needs to be performed.
         """
         if machines is None:
-            machines = (
-                Machine.objects.filter(bmc__id=self.id)
-                .prefetch_related('blockdevice_set__iscsiblockdevice')
-                .prefetch_related('blockdevice_set__virtualblockdevice')
-                .prefetch_related('blockdevice_set__physicalblockdevice'))
+            return self._sum_block_devices(PhysicalBlockDevice, 'size')
         return sum(
             blockdevice.size
             for machine in machines
@@ -926,11 +942,7 @@ class Pod(BMC):
             and no extra query needs to be performed.
         """
         if machines is None:
-            machines = (
-                Machine.objects.filter(bmc__id=self.id)
-                .prefetch_related('blockdevice_set__iscsiblockdevice')
-                .prefetch_related('blockdevice_set__virtualblockdevice')
-                .prefetch_related('blockdevice_set__physicalblockdevice'))
+            return self._get_block_devices(PhysicalBlockDevice).count()
         return len([
             blockdevice
             for machine in machines
@@ -946,11 +958,7 @@ class Pod(BMC):
             and no extra query needs to be performed.
         """
         if machines is None:
-            machines = (
-                Machine.objects.filter(bmc__id=self.id)
-                .prefetch_related('blockdevice_set__iscsiblockdevice')
-                .prefetch_related('blockdevice_set__virtualblockdevice')
-                .prefetch_related('blockdevice_set__physicalblockdevice'))
+            return self._sum_block_devices(ISCSIBlockDevice, 'size')
         return sum(
             blockdevice.size
             for machine in machines
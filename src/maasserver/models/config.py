@@ -100,9 +100,14 @@ def get_default_config():
         'max_node_commissioning_results': 10,
         'max_node_testing_results': 10,
         'max_node_installation_results': 1,
+        # Events.
+        'events_retention_days': 0,
         # Notifications.
         'subnet_ip_exhaustion_threshold_count': 16,
         'http_boot': False,
+        # Allocation.
+        'optimistic_allocation': False,
+        'pod_placement': 'best-fit',
     }
 
 
@@ -94,15 +94,23 @@ class BaseFilesystemGroupManager(Manager):
     def filter_by_block_device(self, block_device):
         """Return all the `FilesystemGroup`s that are related to
         block_device."""
-        cache_set_partition_query = Q(
-            cache_set__filesystems__partition__partition_table__block_device=(
-                block_device))
-        partition_query = Q(
-            filesystems__partition__partition_table__block_device=block_device)
+        return self.filter_by_block_devices([block_device])
+
+    def filter_by_block_devices(self, block_devices):
+        """Return all the `FilesystemGroup`s that are related to any of
+        block_devices."""
+        cache_set_partition_query = Q(**{
+            "cache_set__filesystems__partition__partition_table__"
+            "block_device__in": block_devices,
+            })
+        partition_query = Q(**{
+            "filesystems__partition__partition_table__block_device__in": (
+                block_devices),
+            })
         return self.filter(
-            Q(cache_set__filesystems__block_device=block_device) |
+            Q(cache_set__filesystems__block_device__in=block_devices) |
             cache_set_partition_query |
-            Q(filesystems__block_device=block_device) |
+            Q(filesystems__block_device__in=block_devices) |
             partition_query).distinct()
 
     def filter_by_node(self, node):
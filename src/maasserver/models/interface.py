@@ -189,7 +189,7 @@ class InterfaceQueriesMixin(MAASQueriesMixin):
         items = item.split("&&")
         return op(current_q, Q(tags__contains=items))
 
-    def get_matching_node_map(self, specifiers):
+    def get_matching_node_map(self, specifiers, node_ids=None):
         """Returns a tuple where the first element is a set of matching node
         IDs, and the second element is a dictionary mapping a node ID to a list
         of matching interfaces, such as:
@@ -200,10 +200,11 @@ class InterfaceQueriesMixin(MAASQueriesMixin):
             ...
         }
 
+        :param node_ids: If given, only interfaces on these nodes are matched.
         :returns: tuple (set, dict)
         """
         return super(InterfaceQueriesMixin, self).get_matching_object_map(
-            specifiers, 'node__id')
+            specifiers, 'node__id', foreign_ids=node_ids)
 
     @staticmethod
     def _resolve_interfaces_for_root(
@@ -1323,60 +1324,51 @@ class Interface(CleanSave, TimestampedModel):
 
         Input is expected to be the neighbour JSON from the controller.
         """
+        neighbours = self.update_neighbours([neighbour_json])
+        return None if neighbours is None else neighbours[0]
+
+    def update_neighbours(self, neighbours_json: list):
+        """Updates the neighbour table for this interface in bulk.
+
+        Input is expected to be a list of neighbour JSON from the controller.
+        Returns the resulting neighbour for each observation, in order.
+        """
         # Circular imports
         from maasserver.models.neighbour import Neighbour
         if self.neighbour_discovery_state is False:
             return None
-        ip = neighbour_json['ip']
-        mac = neighbour_json['mac']
-        time = neighbour_json['time']
-        vid = neighbour_json.get('vid', None)
-        deleted = Neighbour.objects.delete_and_log_obsolete_neighbours(
-            ip, mac, interface=self, vid=vid)
-        neighbour = Neighbour.objects.get_current_binding(
-            ip, mac, interface=self, vid=vid)
-        if neighbour is None:
-            neighbour = Neighbour.objects.create(
-                interface=self, ip=ip, vid=vid, mac_address=mac, time=time)
-            # If we deleted a previous neighbour, then we have already
-            # generated a log statement about this neighbour.
-            if not deleted:
-                maaslog.info("%s: New MAC, IP binding observed%s: %s, %s" % (
-                    self.get_log_string(),
-                    Neighbour.objects.get_vid_log_snippet(vid), mac, ip))
-        else:
-            neighbour.time = time
-            neighbour.count += 1
-            neighbour.save(update_fields=['time', 'count', 'updated'])
-        return neighbour
+        neighbours, new_neighbours = Neighbour.objects.update_neighbours(
+            self, neighbours_json)
+        for neighbour in new_neighbours:
+            maaslog.info("%s: New MAC, IP binding observed%s: %s, %s" % (
+                self.get_log_string(),
+                Neighbour.objects.get_vid_log_snippet(neighbour.vid),
+                neighbour.mac_address, neighbour.ip))
+        return neighbours
 
     def update_mdns_entry(self, avahi_json: dict):
         """Updates an mDNS entry observed on this interface.
 
         Input is expected to be the mDNS JSON from the controller.
         """
+        entries = self.update_mdns_entries([avahi_json])
+        return None if entries is None else entries[0]
+
+    def update_mdns_entries(self, avahi_json: list):
+        """Updates the mDNS entries observed on this interface in bulk.
+
+        Input is expected to be a list of mDNS JSON from the controller.
+        Returns the resulting mDNS entry for each observation, in order.
+        """
         # Circular imports
         from maasserver.models.mdns import MDNS
         if self.mdns_discovery_state is False:
             return None
-        ip = avahi_json['address']
-        hostname = avahi_json['hostname']
-        deleted = MDNS.objects.delete_and_log_obsolete_mdns_entries(
-            hostname, ip, interface=self)
-        binding = MDNS.objects.get_current_entry(
-            hostname, ip, interface=self)
-        if binding is None:
-            binding = MDNS.objects.create(
-                interface=self, ip=ip, hostname=hostname)
-            # If we deleted a previous mDNS entry, then we have already
-            # generated a log statement about this mDNS entry.
-            if not deleted:
-                maaslog.info("%s: New mDNS entry resolved: '%s' on %s." % (
-                    self.get_log_string(), hostname, ip))
-        else:
-            binding.count += 1
-            binding.save(update_fields=['count', 'updated'])
-        return binding
+        entries, new_entries = MDNS.objects.update_entries(self, avahi_json)
+        for entry in new_entries:
+            maaslog.info("%s: New mDNS entry resolved: '%s' on %s." % (
+                self.get_log_string(), entry.hostname, entry.ip))
+        return entries
 
     def update_discovery_state(self, discovery_mode, settings: dict):
         """Updates the state of interface monitoring. Uses
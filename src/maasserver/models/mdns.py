@@ -8,17 +8,22 @@ __all__ = [
 ]
 
 
+from django.db import connection
 from django.db.models import (
     CASCADE,
     CharField,
     ForeignKey,
     IntegerField,
     Manager,
+    Q,
 )
 from maasserver import DefaultMeta
 from maasserver.fields import MAASIPAddressField
 from maasserver.models.cleansave import CleanSave
-from maasserver.models.timestampedmodel import TimestampedModel
+from maasserver.models.timestampedmodel import (
+    now,
+    TimestampedModel,
+)
 from maasserver.utils.orm import (
     get_one,
     UniqueViolation,
@@ -84,6 +89,103 @@ class MDNSManager(Manager):
         # a UniqueViolation so this operation can be retried.
         return get_one(query, exception_class=UniqueViolation)
 
+    def update_entries(self, interface, entries):
+        """Apply a batch of mDNS entries for `interface` in bulk.
+
+        Each entry is a dictionary in the format the rack sends, with
+        `hostname` and `address` keys. Entries are applied in order, exactly
+        as if each had been processed on its own with
+        `delete_and_log_obsolete_mdns_entries()`, `get_current_entry()` and a
+        create or update, but the database is consulted with a fixed number
+        of queries regardless of the size of the batch.
+
+        :return: A tuple of (bindings, new_bindings). `bindings` contains the
+            resulting entry for each mDNS entry given, in the same order.
+            `new_bindings` contains the entries that did not previously exist
+            and did not replace an obsolete entry.
+        """
+        entries = [
+            (entry['hostname'], str(IPAddress(entry['address'])))
+            for entry in entries
+        ]
+        if len(entries) == 0:
+            return [], []
+        current, obsolete = {}, []
+        existing = self.filter(interface=interface).filter(
+            Q(hostname__in={hostname for hostname, _ in entries}) |
+            Q(ip__in={ip for _, ip in entries})).order_by('id')
+        for binding in existing:
+            key = binding.hostname, str(IPAddress(binding.ip))
+            if key in current:
+                # Duplicate of an earlier entry; keep only the oldest.
+                obsolete.append(binding.id)
+            else:
+                current[key] = binding
+        seen = set()
+        bindings, new_bindings = [], []
+        for hostname, ip in entries:
+            ip_version = IPAddress(ip).version
+            deleted = False
+            for other_hostname, other_ip in list(current):
+                if other_hostname == hostname and other_ip != ip:
+                    if ip_version != IPAddress(other_ip).version:
+                        # Don't move hostnames between address families.
+                        continue
+                    maaslog.info("%s: Hostname '%s' moved from %s to %s." % (
+                        interface.get_log_string(), hostname, other_ip, ip))
+                elif other_ip == ip and other_hostname != hostname:
+                    maaslog.info(
+                        "%s: Hostname for %s updated from '%s' to '%s'." % (
+                            interface.get_log_string(), ip, other_hostname,
+                            hostname))
+                else:
+                    continue
+                binding = current.pop((other_hostname, other_ip))
+                if binding.id is not None:
+                    obsolete.append(binding.id)
+                deleted = True
+            binding = current.get((hostname, ip))
+            if binding is None:
+                binding = current[hostname, ip] = self.model(
+                    interface=interface, ip=ip, hostname=hostname, count=1)
+                # If we deleted a previous mDNS entry, then we have already
+                # generated a log statement about this mDNS entry.
+                if not deleted:
+                    new_bindings.append(binding)
+            else:
+                binding.count += 1
+                # Unsaved bindings are unhashable; they'll be created anyway.
+                if binding.id is not None:
+                    seen.add(binding.id)
+            bindings.append(binding)
+        if len(obsolete) > 0:
+            self.filter(id__in=obsolete).delete()
+        # Only entries that survived the whole batch are written back.
+        created = [
+            binding for binding in current.values() if binding.id is None]
+        updated = [
+            binding for binding in current.values()
+            if binding.id is not None and binding.id in seen]
+        timestamp = now()
+        if len(created) > 0:
+            for binding in created:
+                binding.created = binding.updated = timestamp
+            self.bulk_create(created)
+        if len(updated) > 0:
+            values = ", ".join(["(%s, %s)"] * len(updated))
+            params = [timestamp]
+            for binding in updated:
+                binding.updated = timestamp
+                params.extend((binding.id, binding.count))
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE maasserver_mdns AS mdns
+                    SET count = v.count, updated = %%s
+                    FROM (VALUES %s) AS v(id, count)
+                    WHERE mdns.id = v.id
+                    """ % values, params)
+        return bindings, new_bindings
+
 
 class MDNS(CleanSave, TimestampedModel):
     """Represents data gathered from mDNS-browse for a particular IP address.
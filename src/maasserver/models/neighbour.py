@@ -7,6 +7,7 @@ __all__ = [
     'Neighbour',
 ]
 
+from django.db import connection
 from django.db.models import (
     CASCADE,
     ForeignKey,
@@ -21,14 +22,24 @@ from maasserver.fields import (
 )
 from maasserver.models.cleansave import CleanSave
 from maasserver.models.interface import Interface
-from maasserver.models.timestampedmodel import TimestampedModel
+from maasserver.models.timestampedmodel import (
+    now,
+    TimestampedModel,
+)
 from maasserver.utils.orm import (
     get_one,
     MAASQueriesMixin,
     UniqueViolation,
 )
+from netaddr import (
+    EUI,
+    IPAddress,
+)
 from provisioningserver.logger import get_maas_logger
-from provisioningserver.utils.network import get_mac_organization
+from provisioningserver.utils.network import (
+    format_eui,
+    get_mac_organization,
+)
 
 
 maaslog = get_maas_logger("neighbour")
@@ -132,6 +143,100 @@ class NeighbourManager(Manager, NeighbourQueriesMixin):
         # a UniqueViolation so this operation can be retried.
         return get_one(query, exception_class=UniqueViolation)
 
+    def update_neighbours(self, interface, observations):
+        """Apply a batch of observations for `interface` in bulk.
+
+        Each observation is a dictionary in the format the rack sends, with
+        `ip`, `mac`, `time`, and (optionally) `vid` keys. Observations are
+        applied in order, exactly as if each had been processed on its own
+        with `delete_and_log_obsolete_neighbours()`, `get_current_binding()`
+        and a create or update, but the database is consulted with a fixed
+        number of queries regardless of the size of the batch.
+
+        :return: A tuple of (bindings, new_bindings). `bindings` contains the
+            resulting neighbour for each observation, in the same order.
+            `new_bindings` contains the neighbours that did not previously
+            exist and did not replace a binding for another MAC address.
+        """
+        observations = [
+            (str(IPAddress(observation['ip'])),
+             format_eui(EUI(observation['mac'])),
+             observation['time'], observation.get('vid', None))
+            for observation in observations
+        ]
+        if len(observations) == 0:
+            return [], []
+        # Map each (ip, vid) to the bindings it currently has, keyed by MAC.
+        current = {}
+        existing = self.filter(
+            interface=interface,
+            ip__in={ip for ip, _, _, _ in observations})
+        for neighbour in existing:
+            key = str(IPAddress(neighbour.ip)), neighbour.vid
+            mac = format_eui(EUI(str(neighbour.mac_address)))
+            current.setdefault(key, {})[mac] = neighbour
+        obsolete, seen = [], set()
+        bindings, new_bindings = [], []
+        for ip, mac, time, vid in observations:
+            macs = current.setdefault((ip, vid), {})
+            deleted = False
+            for other_mac in [other for other in macs if other != mac]:
+                maaslog.info("%s: IP address %s%s moved from %s to %s" % (
+                    interface.get_log_string(), ip,
+                    self.get_vid_log_snippet(vid), other_mac, mac))
+                binding = macs.pop(other_mac)
+                if binding.id is not None:
+                    obsolete.append(binding.id)
+                deleted = True
+            neighbour = macs.get(mac)
+            if neighbour is None:
+                neighbour = macs[mac] = self.model(
+                    interface=interface, ip=ip, vid=vid, mac_address=mac,
+                    time=time, count=1)
+                # If we deleted a previous neighbour, then we have already
+                # generated a log statement about this neighbour.
+                if not deleted:
+                    new_bindings.append(neighbour)
+            else:
+                neighbour.time = time
+                neighbour.count += 1
+                # Unsaved bindings are unhashable; they'll be created anyway.
+                if neighbour.id is not None:
+                    seen.add(neighbour.id)
+            bindings.append(neighbour)
+        if len(obsolete) > 0:
+            self.filter(id__in=obsolete).delete()
+        # Only bindings that survived the whole batch are written back.
+        survivors = [
+            neighbour
+            for macs in current.values()
+            for neighbour in macs.values()
+        ]
+        created = [
+            neighbour for neighbour in survivors if neighbour.id is None]
+        updated = [
+            neighbour for neighbour in survivors
+            if neighbour.id is not None and neighbour.id in seen]
+        timestamp = now()
+        if len(created) > 0:
+            for neighbour in created:
+                neighbour.created = neighbour.updated = timestamp
+            self.bulk_create(created)
+        if len(updated) > 0:
+            values = ", ".join(["(%s, %s, %s)"] * len(updated))
+            params = [timestamp]
+            for neighbour in updated:
+                neighbour.updated = timestamp
+                params.extend((neighbour.id, neighbour.time, neighbour.count))
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE maasserver_neighbour AS neighbour
+                    SET time = v.time, count = v.count, updated = %%s
+                    FROM (VALUES %s) AS v(id, time, count)
+                    WHERE neighbour.id = v.id
+                    """ % values, params)
+        return bindings, new_bindings
+
     def get_by_updated_with_related_nodes(self):
         """Returns a `QuerySet` of neighbours, while also selecting related
         interfaces and nodes.
@@ -547,7 +547,10 @@ class MachineManager(BaseNodeManager):
         :rtype: `django.db.models.query.QuerySet`
         """
         available_machines = self.get_nodes(for_user, NODE_PERMISSION.VIEW)
-        return available_machines.filter(status=NODE_STATUS.READY)
+        # Machines still being set up after commissioning aren't available,
+        # e.g. they may not have a storage layout yet.
+        return available_machines.filter(
+            status=NODE_STATUS.READY, post_commissioning_tasks=None)
 
 
 class DeviceManager(BaseNodeManager):
@@ -1732,13 +1735,17 @@ class Node(CleanSave, TimestampedModel):
     def _abort_all_tests(self, script_set_id):
         # Avoid circular imports.
         from metadataserver.models import ScriptSet
+        from metadataserver.models.scriptset import (
+            DEFERRED_SCRIPT_RESULT_FIELDS,
+        )
         try:
             script_set = ScriptSet.objects.get(id=script_set_id)
         except ScriptSet.DoesNotExist:
             return
 
-        for script in script_set.scriptresult_set.filter(
-                status__in={SCRIPT_STATUS.PENDING, SCRIPT_STATUS.RUNNING}):
+        qs = script_set.scriptresult_set.filter(
+            status__in={SCRIPT_STATUS.PENDING, SCRIPT_STATUS.RUNNING})
+        for script in qs.defer(*DEFERRED_SCRIPT_RESULT_FIELDS):
             script.status = SCRIPT_STATUS.ABORTED
             script.save(update_fields=['status'])
 
@@ -1882,6 +1889,9 @@ class Node(CleanSave, TimestampedModel):
             NodeUserData,
             ScriptSet,
         )
+        from metadataserver.models.scriptset import (
+            DEFERRED_SCRIPT_RESULT_FIELDS,
+        )
 
         if not user.has_perm(NODE_PERMISSION.EDIT, self):
             # You can't enter rescue mode on a node you don't own,
@@ -1898,8 +1908,8 @@ class Node(CleanSave, TimestampedModel):
         script_set = ScriptSet.objects.create_testing_script_set(
             self, testing_scripts)
         if NODE_STATUS.DEPLOYED in (self.status, self.previous_status):
-            qs = script_set.scriptresult_set.all()
-            qs.prefetch_related('script')
+            qs = script_set.scriptresult_set.select_related('script')
+            qs = qs.defer(*DEFERRED_SCRIPT_RESULT_FIELDS)
             for script_result in qs:
                 if script_result.script.destructive:
                     script_set.delete()
@@ -2510,9 +2520,17 @@ class Node(CleanSave, TimestampedModel):
     def acquire(
             self, user, token=None, agent_name='', comment=None,
             bridge_all=False, bridge_stp=None, bridge_fd=None):
-        """Mark commissioned node as acquired by the given user and token."""
+        """Mark commissioned node as acquired by the given user and token.
+
+        :raise NodeStateViolation: If the node is still being set up after
+            commissioning, e.g. it may not have a storage layout yet.
+        """
         assert self.owner is None or self.owner == user
         assert token is None or token.user == user
+        if self.post_commissioning_tasks.exists():
+            raise NodeStateViolation(
+                "%s is still being set up after commissioning; try again "
+                "shortly." % self.hostname)
 
         self._create_acquired_filesystems()
         self._register_request_event(
@@ -3601,6 +3619,7 @@ class Node(CleanSave, TimestampedModel):
             powered on manually.
         """
         # Avoid circular imports.
+        from maasserver.preseed_cache import warm_curtin_config
         from maasserver.utils.osystems import list_all_usable_osystems
         from metadataserver.models import NodeUserData
 
@@ -3646,6 +3665,9 @@ class Node(CleanSave, TimestampedModel):
             deployment_timeout = self.get_deployment_time()
             self._start_deployment()
             claimed_ips = True
+            # Render the node's curtin configuration while it boots, so that
+            # it's ready by the time the node asks for it.
+            warm_curtin_config(self)
         else:
             deployment_timeout = None
             claimed_ips = False
@@ -4591,15 +4613,18 @@ class Controller(Node):
             running on each rack interface.
         """
         # Determine which interfaces' neighbours need updating.
-        interface_set = {neighbour['interface'] for neighbour in neighbours}
-        interfaces = Interface.objects.get_interface_dict_for_node(
-            self, names=interface_set, fetch_fabric_vlan=True)
+        by_interface = defaultdict(list)
         for neighbour in neighbours:
-            interface = interfaces.get(neighbour['interface'], None)
+            by_interface[neighbour['interface']].append(neighbour)
+        interfaces = Interface.objects.get_interface_dict_for_node(
+            self, names=set(by_interface), fetch_fabric_vlan=True)
+        for name, observations in by_interface.items():
+            interface = interfaces.get(name, None)
             if interface is not None:
-                interface.update_neighbour(neighbour)
-                vid = neighbour.get("vid", None)
-                if vid is not None:
+                interface.update_neighbours(observations)
+                vids = {
+                    neighbour.get("vid", None) for neighbour in observations}
+                for vid in sorted(vids - {None}):
                     interface.report_vid(vid)
 
     def report_mdns_entries(self, entries):
@@ -4610,13 +4635,15 @@ class Controller(Node):
             running on each rack interface.
         """
         # Determine which interfaces' entries need updating.
-        interface_set = {entry['interface'] for entry in entries}
-        interfaces = Interface.objects.get_interface_dict_for_node(
-            self, names=interface_set)
+        by_interface = defaultdict(list)
         for entry in entries:
-            interface = interfaces.get(entry['interface'], None)
+            by_interface[entry['interface']].append(entry)
+        interfaces = Interface.objects.get_interface_dict_for_node(
+            self, names=set(by_interface))
+        for name, observations in by_interface.items():
+            interface = interfaces.get(name, None)
             if interface is not None:
-                interface.update_mdns_entry(entry)
+                interface.update_mdns_entries(observations)
 
     def get_discovery_state(self):
         """Returns the interface monitoring state for this Controller.
@@ -4840,6 +4867,7 @@ class RackController(Controller):
     def delete(self):
         """Delete this rack controller."""
         # Avoid circular imports
+        from maasserver import rack_connectivity
         from maasserver.models import RegionRackRPCConnection
 
         primary_vlans = VLAN.objects.filter(primary_rack=self)
@@ -4880,6 +4908,10 @@ class RackController(Controller):
         else:
             super().delete()
 
+        # Removing the connections above counted this rack controller as
+        # disconnected; it's no longer a rack controller at all.
+        rack_connectivity.update_rack_controller_connectivity()
+
     def update_rackd_status(self):
         """Update the status of the "rackd" service for this rack controller.
 
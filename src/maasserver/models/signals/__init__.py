@@ -16,6 +16,7 @@ __all__ = [
     "keysource",
     "largefiles",
     "nodes",
+    "oauth",
     "partitions",
     "power",
     "services",
@@ -35,6 +36,7 @@ from maasserver.models.signals import (
     keysource,
     largefiles,
     nodes,
+    oauth,
     partitions,
     power,
     services,
@@ -0,0 +1,48 @@
+# Copyright 2017 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Keep the OAuth cache of this process up to date."""
+
+__all__ = [
+    "signals",
+]
+
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+)
+from maasserver.utils.signals import SignalsManager
+from piston3.models import (
+    Consumer,
+    Token,
+)
+
+
+signals = SignalsManager()
+
+
+def forget_consumer(sender, instance, **kwargs):
+    """Forget the cached copy of a changed or deleted consumer."""
+    # Circular imports.
+    from maasserver.api.auth import oauth_cache
+    oauth_cache.forget_consumer(instance.key)
+
+
+def forget_token(sender, instance, **kwargs):
+    """Forget the cached copy of a changed or deleted token.
+
+    Other region processes are told by the ``sys_oauth_token`` notification
+    once the change is committed.
+    """
+    # Circular imports.
+    from maasserver.api.auth import oauth_cache
+    oauth_cache.forget_token(instance.key)
+
+
+signals.watch(post_save, forget_consumer, sender=Consumer)
+signals.watch(post_delete, forget_consumer, sender=Consumer)
+signals.watch(post_save, forget_token, sender=Token)
+signals.watch(post_delete, forget_token, sender=Token)
+
+# Enable all signals by default.
+signals.enable()
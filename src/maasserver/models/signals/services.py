@@ -38,6 +38,24 @@ signals.watch(
     sender=RegionRackRPCConnection)
 
 
+def update_rack_controller_connectivity(sender, instance, **kwargs):
+    """Update the disconnected rack controllers error when an RPC connection
+    is added or removed.
+    """
+    # Circular imports.
+    from maasserver import rack_connectivity
+    rack_connectivity.update_rack_controller_connectivity()
+
+
+signals.watch(
+    post_save, update_rack_controller_connectivity,
+    sender=RegionRackRPCConnection)
+
+signals.watch(
+    post_delete, update_rack_controller_connectivity,
+    sender=RegionRackRPCConnection)
+
+
 def update_all_rackd_status(sender, instance, **kwargs):
     """Update status of all rackd services when a region controller process is
     added or removed.
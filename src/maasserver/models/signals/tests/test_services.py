@@ -7,6 +7,7 @@ __all__ = []
 
 from unittest.mock import call
 
+from maasserver import rack_connectivity
 from maasserver.models import (
     RackController,
     RegionRackRPCConnection,
@@ -83,6 +84,22 @@ class TestRegionRackRPCConnection(MAASServerTestCase):
         self.assertThat(
             mock_update_rackd_status, MockCallsMatch(call(), call()))
 
+    def test__updates_rack_controller_connectivity_on_create(self):
+        rack_controller = factory.make_RackController()
+        endpoint = factory.make_RegionControllerProcessEndpoint()
+        mock_update = self.patch(
+            rack_connectivity, "update_rack_controller_connectivity")
+        RegionRackRPCConnection.objects.create(
+            endpoint=endpoint, rack_controller=rack_controller)
+        self.assertThat(mock_update, MockCalledOnceWith())
+
+    def test__updates_rack_controller_connectivity_on_delete(self):
+        connection = factory.make_RegionRackRPCConnection()
+        mock_update = self.patch(
+            rack_connectivity, "update_rack_controller_connectivity")
+        connection.delete()
+        self.assertThat(mock_update, MockCalledOnceWith())
+
 
 class TestRegionControllerProcess(MAASServerTestCase):
 
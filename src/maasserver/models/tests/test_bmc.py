@@ -45,6 +45,7 @@ from maasserver.testing.testcase import (
 )
 from maasserver.utils.orm import reload_object
 from maasserver.utils.threads import deferToDatabase
+from maastesting.djangotestcase import count_queries
 from maastesting.matchers import MockCalledOnceWith
 from provisioningserver.drivers.pod import (
     BlockDeviceType,
@@ -1314,6 +1315,22 @@ class TestPod(MAASServerTestCase):
             factory.make_ISCSIBlockDevice(node=node, size=storage)
         self.assertEquals(total_storage, pod.get_used_iscsi_storage())
 
+    def test_get_used_returns_zero_for_empty_pod(self):
+        pod = factory.make_Pod()
+        self.assertEquals(0, pod.get_used_cores())
+        self.assertEquals(0, pod.get_used_memory())
+        self.assertEquals(0, pod.get_used_local_storage())
+        self.assertEquals(0, pod.get_used_local_disks())
+        self.assertEquals(0, pod.get_used_iscsi_storage())
+
+    def test_get_used_local_storage_uses_one_query(self):
+        pod = factory.make_Pod()
+        for _ in range(3):
+            node = factory.make_Node(bmc=pod, with_boot_disk=False)
+            factory.make_PhysicalBlockDevice(node=node)
+        count, _ = count_queries(pod.get_used_local_storage)
+        self.assertEquals(1, count)
+
 
 class TestPodDelete(MAASTransactionServerTestCase):
 
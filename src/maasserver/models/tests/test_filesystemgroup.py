@@ -350,6 +350,36 @@ class TestManagersFilterByBlockDevice(MAASServerTestCase):
             [filesystem_group.id], result_filesystem_group_ids)
 
 
+class TestManagersFilterByBlockDevices(MAASServerTestCase):
+    """Tests for the managers `filter_by_block_devices`."""
+
+    def test__volume_groups_on_block_devices(self):
+        node = factory.make_Node()
+        block_devices, filesystem_groups = [], []
+        for _ in range(2):
+            block_device = factory.make_PhysicalBlockDevice(node=node)
+            filesystem = factory.make_Filesystem(
+                fstype=FILESYSTEM_TYPE.LVM_PV, block_device=block_device)
+            filesystem_groups.append(factory.make_FilesystemGroup(
+                group_type=FILESYSTEM_GROUP_TYPE.LVM_VG,
+                filesystems=[filesystem]))
+            block_devices.append(block_device)
+        other_block_device = factory.make_PhysicalBlockDevice(node=node)
+        factory.make_FilesystemGroup(
+            group_type=FILESYSTEM_GROUP_TYPE.LVM_VG,
+            filesystems=[factory.make_Filesystem(
+                fstype=FILESYSTEM_TYPE.LVM_PV,
+                block_device=other_block_device)])
+        result_filesystem_group_ids = [
+            fsgroup.id
+            for fsgroup in VolumeGroup.objects.filter_by_block_devices(
+                block_devices)
+        ]
+        self.assertItemsEqual(
+            [fsgroup.id for fsgroup in filesystem_groups],
+            result_filesystem_group_ids)
+
+
 class TestManagersFilterByNode(MAASServerTestCase):
     """Tests for the managers `filter_by_node`."""
 
@@ -32,6 +32,7 @@ from maasserver.models import (
     interface as interface_module,
     MDNS,
     Neighbour,
+    Node,
     Space,
     StaticIPAddress,
     Subnet,
@@ -80,6 +81,7 @@ from testtools import ExpectedException
 from testtools.matchers import (
     Contains,
     Equals,
+    HasLength,
     Is,
     MatchesDict,
     MatchesListwise,
@@ -734,6 +736,19 @@ class TestInterfaceQueriesMixin(MAASServerTestCase):
         self.assertItemsEqual(nodes, [node.id])
         self.assertEqual(map, {node.id: [interface.id]})
 
+    def test__get_matching_node_map_restricted_to_node_ids(self):
+        tag = factory.make_name("tag")
+        node1 = factory.make_Node()
+        interface = factory.make_Interface(
+            INTERFACE_TYPE.PHYSICAL, node=node1, tags=[tag])
+        node2 = factory.make_Node()
+        factory.make_Interface(INTERFACE_TYPE.PHYSICAL, node=node2, tags=[tag])
+        nodes, map = Interface.objects.get_matching_node_map(
+            "tag:%s" % tag,
+            node_ids=Node.objects.filter(id=node1.id).values('id'))
+        self.assertItemsEqual(nodes, [node1.id])
+        self.assertEqual(map, {node1.id: [interface.id]})
+
     def test__get_matching_node_map_by_tag(self):
         tags = [
             factory.make_name("tag")
@@ -1195,6 +1210,52 @@ class InterfaceUpdateNeighbourTest(MAASServerTestCase):
             "...: IP address...moved from...to...",
             maaslog.output)
 
+    def test__update_neighbours_applies_observations_in_order(self):
+        iface = factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
+        iface.neighbour_discovery_state = True
+        first = self.make_neighbour_json()
+        second = dict(first, mac=factory.make_mac_address())
+        third = dict(second, time=second['time'] + 1)
+        neighbours = iface.update_neighbours([first, second, third])
+        self.assertThat(neighbours, HasLength(3))
+        neighbour = get_one(Neighbour.objects.all())
+        self.assertThat(neighbour.mac_address, Equals(second['mac']))
+        self.assertThat(neighbour.time, Equals(third['time']))
+        self.assertThat(neighbour.count, Equals(2))
+
+    def test__update_neighbours_counts_new_binding_seen_twice(self):
+        iface = factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
+        iface.neighbour_discovery_state = True
+        first = self.make_neighbour_json()
+        second = dict(first, time=first['time'] + 1)
+        neighbours = iface.update_neighbours([first, second])
+        self.assertThat(neighbours, HasLength(2))
+        neighbour = get_one(Neighbour.objects.all())
+        self.assertThat(neighbour.time, Equals(second['time']))
+        self.assertThat(neighbour.count, Equals(2))
+
+    def test__update_neighbours_uses_constant_number_of_queries(self):
+        iface = factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
+        iface.neighbour_discovery_state = True
+
+        def count_update_queries(count):
+            existing = [self.make_neighbour_json() for _ in range(count)]
+            iface.update_neighbours(existing)
+            # Update, move, and create in one batch.
+            observations = [
+                dict(json, time=json['time'] + 1) for json in existing]
+            observations[0]['mac'] = factory.make_mac_address()
+            observations.extend(
+                self.make_neighbour_json() for _ in range(count))
+            counter = CountQueries()
+            with counter:
+                iface.update_neighbours(observations)
+            return counter.num_queries
+
+        self.assertThat(
+            count_update_queries(3), Equals(count_update_queries(10)))
+        self.assertThat(Neighbour.objects.count(), Equals(26))
+
 
 class InterfaceUpdateMDNSEntryTest(MAASServerTestCase):
     """Tests for `Interface.update_mdns_entry`."""
@@ -1296,6 +1357,47 @@ class InterfaceUpdateMDNSEntryTest(MAASServerTestCase):
             "...: Hostname for...updated from...to...",
             maaslog.output)
 
+    def test__update_mdns_entries_applies_entries_in_order(self):
+        iface = factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
+        iface.mdns_discovery_state = True
+        first = self.make_mdns_entry_json()
+        second = dict(first, address=factory.make_ip_address(ipv6=False))
+        entries = iface.update_mdns_entries([first, second, second])
+        self.assertThat(entries, HasLength(3))
+        entry = get_one(MDNS.objects.all())
+        self.assertThat(entry.ip, Equals(second['address']))
+        self.assertThat(entry.count, Equals(2))
+
+    def test__update_mdns_entries_counts_new_entry_seen_twice(self):
+        iface = factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
+        iface.mdns_discovery_state = True
+        json = self.make_mdns_entry_json()
+        entries = iface.update_mdns_entries([json, json])
+        self.assertThat(entries, HasLength(2))
+        entry = get_one(MDNS.objects.all())
+        self.assertThat(entry.count, Equals(2))
+
+    def test__update_mdns_entries_uses_constant_number_of_queries(self):
+        iface = factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
+        iface.mdns_discovery_state = True
+
+        def count_update_queries(count):
+            existing = [self.make_mdns_entry_json() for _ in range(count)]
+            iface.update_mdns_entries(existing)
+            # Update, move, and create in one batch.
+            entries = [dict(json) for json in existing]
+            entries[0]['address'] = factory.make_ip_address(ipv6=False)
+            entries.extend(
+                self.make_mdns_entry_json() for _ in range(count))
+            counter = CountQueries()
+            with counter:
+                iface.update_mdns_entries(entries)
+            return counter.num_queries
+
+        self.assertThat(
+            count_update_queries(3), Equals(count_update_queries(10)))
+        self.assertThat(MDNS.objects.count(), Equals(26))
+
 
 class PhysicalInterfaceTest(MAASServerTestCase):
 
@@ -43,7 +43,9 @@ from maasserver.clusterrpc.power import (
     power_query,
 )
 from maasserver.clusterrpc.testing.boot_images import make_rpc_boot_image
+from maasserver.components import get_persistent_error
 from maasserver.enum import (
+    COMPONENT,
     FILESYSTEM_GROUP_TYPE,
     FILESYSTEM_TYPE,
     INTERFACE_LINK_TYPE,
@@ -115,6 +117,7 @@ from maasserver.node_status import (
     NODE_TRANSITIONS,
 )
 from maasserver.preseed import CURTIN_INSTALL_LOG
+import maasserver.preseed_cache as preseed_cache_module
 from maasserver.rpc.testing.fixtures import MockLiveRegionToClusterRPCFixture
 import maasserver.server_address as server_address_module
 from maasserver.storage_layouts import (
@@ -162,6 +165,7 @@ from metadataserver.enum import (
 from metadataserver.models import (
     NodeKey,
     NodeUserData,
+    PostCommissioningTask,
     ScriptResult,
     ScriptSet,
 )
@@ -387,6 +391,14 @@ class TestMachineManager(MAASServerTestCase):
             [],
             list(Machine.objects.get_available_machines_for_acquisition(user)))
 
+    def test_get_available_machines_ignores_machines_being_set_up(self):
+        user = factory.make_User()
+        machine = self.make_machine(None)
+        PostCommissioningTask.objects.enqueue(machine)
+        self.assertEqual(
+            [],
+            list(Machine.objects.get_available_machines_for_acquisition(user)))
+
 
 class TestControllerManager(MAASServerTestCase):
 
@@ -1425,6 +1437,15 @@ class TestNode(MAASServerTestCase):
             (user, NODE_STATUS.ALLOCATED, agent_name),
             (node.owner, node.status, node.agent_name))
 
+    def test_acquire_refuses_node_with_pending_post_commissioning_task(self):
+        node = factory.make_Node(status=NODE_STATUS.READY, with_boot_disk=True)
+        PostCommissioningTask.objects.enqueue(node)
+        user = factory.make_User()
+        self.assertRaises(NodeStateViolation, node.acquire, user)
+        node = reload_object(node)
+        self.assertEqual(
+            (None, NODE_STATUS.READY), (node.owner, node.status))
+
     def test_acquire_calls__create_acquired_filesystems(self):
         node = factory.make_Node(status=NODE_STATUS.READY, with_boot_disk=True)
         user = factory.make_User()
@@ -5984,6 +6005,15 @@ class TestNode_Start(MAASTransactionServerTestCase):
         self.expectThat(
             claim_auto_ips, MockCalledOnceWith())
 
+    def test__warms_curtin_config(self):
+        user = factory.make_User()
+        node = self.make_acquired_node_with_interface(
+            user, power_type="manual")
+        warm_curtin_config = self.patch(
+            preseed_cache_module, "warm_curtin_config")
+        node.start(user)
+        self.assertThat(warm_curtin_config, MockCalledOnceWith(node))
+
     def test__only_claims_auto_addresses_when_allocated(self):
         user = factory.make_User()
         node = self.make_acquired_node_with_interface(
@@ -6657,32 +6687,33 @@ class TestControllerUpdateDiscoveryState(MAASServerTestCase):
 class TestReportNeighbours(MAASServerTestCase):
     """Tests for `Controller.report_neighbours()."""
 
-    def test__calls_update_neighbour_for_each_neighbour(self):
+    def test__calls_update_neighbours_once_per_interface(self):
         rack = factory.make_RackController()
         factory.make_Interface(name='eth0', node=rack)
         factory.make_Interface(name='eth1', node=rack)
-        update_neighbour = self.patch(
-            interface_module.Interface, 'update_neighbour')
+        update_neighbours = self.patch(
+            interface_module.Interface, 'update_neighbours')
         neighbours = [
             {'interface': 'eth0', 'mac': factory.make_mac_address()},
             {'interface': 'eth1', 'mac': factory.make_mac_address()},
+            {'interface': 'eth0', 'mac': factory.make_mac_address()},
         ]
         rack.report_neighbours(neighbours)
-        self.assertThat(update_neighbour, MockCallsMatch(
-            *[call(neighbour) for neighbour in neighbours]
-        ))
+        self.assertThat(update_neighbours, MockCallsMatch(
+            call([neighbours[0], neighbours[2]]), call([neighbours[1]])))
 
     def test__calls_report_vid_for_each_vid(self):
         rack = factory.make_RackController()
         factory.make_Interface(name='eth0', node=rack)
         factory.make_Interface(name='eth1', node=rack)
         # Just make this a no-op for simplicity.
-        self.patch(interface_module.Interface, 'update_neighbour')
+        self.patch(interface_module.Interface, 'update_neighbours')
         report_vid = self.patch(
             interface_module.Interface, 'report_vid')
         neighbours = [
             {'interface': 'eth0', 'mac': factory.make_mac_address(), 'vid': 3},
             {'interface': 'eth1', 'mac': factory.make_mac_address(), 'vid': 7},
+            {'interface': 'eth0', 'mac': factory.make_mac_address(), 'vid': 3},
         ]
         rack.report_neighbours(neighbours)
         self.assertThat(report_vid, MockCallsMatch(call(3), call(7)))
@@ -6691,20 +6722,20 @@ class TestReportNeighbours(MAASServerTestCase):
 class TestReportMDNSEntries(MAASServerTestCase):
     """Tests for `Controller.report_mdns_entries()."""
 
-    def test__calls_update_mdns_entry_for_each_entry(self):
+    def test__calls_update_mdns_entries_once_per_interface(self):
         rack = factory.make_RackController()
         factory.make_Interface(name='eth0', node=rack)
         factory.make_Interface(name='eth1', node=rack)
-        update_mdns_entry = self.patch(
-            interface_module.Interface, 'update_mdns_entry')
+        update_mdns_entries = self.patch(
+            interface_module.Interface, 'update_mdns_entries')
         entries = [
             {'interface': 'eth0', 'hostname': factory.make_name('eth0')},
             {'interface': 'eth1', 'hostname': factory.make_name('eth1')},
+            {'interface': 'eth0', 'hostname': factory.make_name('eth0')},
         ]
         rack.report_mdns_entries(entries)
-        self.assertThat(update_mdns_entry, MockCallsMatch(
-            *[call(entry) for entry in entries]
-        ))
+        self.assertThat(update_mdns_entries, MockCallsMatch(
+            call([entries[0], entries[2]]), call([entries[1]])))
 
 
 class TestUpdateInterfaces(MAASServerTestCase):
@@ -9496,6 +9527,12 @@ class TestRackController(MAASTransactionServerTestCase):
         rack.delete()
         self.assertItemsEqual([], RegionRackRPCConnection.objects.all())
 
+    def test_delete_discards_error_for_deleted_rack_controller(self):
+        rack = factory.make_RackController()
+        factory.make_RegionRackRPCConnection(rack_controller=rack)
+        rack.delete()
+        self.assertIsNone(get_persistent_error(COMPONENT.RACK_CONTROLLERS))
+
     def test_delete_converts_region_and_rack_to_region(self):
         region_and_rack = factory.make_Node(
             node_type=NODE_TYPE.REGION_AND_RACK_CONTROLLER)
@@ -14,6 +14,7 @@ order as they do in `ACTION_CLASSES`.
 
 __all__ = [
     'compile_node_actions',
+    'execute_bulk_node_action',
 ]
 
 from abc import (
@@ -24,7 +25,10 @@ from abc import (
 from collections import OrderedDict
 
 from crochet import TimeoutError
-from django.core.exceptions import ValidationError
+from django.core.exceptions import (
+    PermissionDenied,
+    ValidationError,
+)
 from maasserver import locks
 from maasserver.clusterrpc.boot_images import RackControllersImporter
 from maasserver.enum import (
@@ -37,6 +41,7 @@ from maasserver.enum import (
 )
 from maasserver.exceptions import (
     NodeActionError,
+    NodeStateViolation,
     StaticIPAddressExhaustion,
 )
 from maasserver.models import Zone
@@ -44,7 +49,10 @@ from maasserver.node_status import (
     is_failed_status,
     NON_MONITORED_STATUSES,
 )
-from maasserver.utils.orm import post_commit_do
+from maasserver.utils.orm import (
+    post_commit_do,
+    savepoint,
+)
 from maasserver.utils.osystems import (
     validate_hwe_kernel,
     validate_osystem_and_distro_series,
@@ -310,7 +318,10 @@ class Acquire(NodeAction):
     def execute(self):
         """See `NodeAction.execute`."""
         with locks.node_acquire:
-            self.node.acquire(self.user, token=None)
+            try:
+                self.node.acquire(self.user, token=None)
+            except NodeStateViolation as error:
+                raise NodeActionError(error)
 
 
 class Deploy(NodeAction):
@@ -326,7 +337,10 @@ class Deploy(NodeAction):
         """See `NodeAction.execute`."""
         if self.node.owner is None:
             with locks.node_acquire:
-                self.node.acquire(self.user, token=None)
+                try:
+                    self.node.acquire(self.user, token=None)
+                except NodeStateViolation as error:
+                    raise NodeActionError(error)
 
         if osystem and distro_series:
             try:
@@ -608,3 +622,52 @@ def compile_node_actions(node, user, request=None, classes=ACTION_CLASSES):
         (action.name, action)
         for action in applicable_actions
         if action.is_permitted())
+
+
+def execute_bulk_node_action(
+        nodes, user, action_name, request=None, params=None):
+    """Perform the named action on many nodes in one transaction.
+
+    Permission and state are checked for every node before any action is
+    performed. Each node's action then runs in its own savepoint, so a
+    failure affects only that node. Power commands are issued post-commit,
+    so they are all dispatched together once the transaction commits, in one
+    batch per rack controller.
+
+    :param nodes: The nodes to act on, e.g. a `QuerySet`.
+    :param user: The :class:`User` making the request.
+    :param action_name: The name of the action, e.g. "deploy".
+    :param request: The :class:`HttpRequest` being serviced, if any.
+    :param params: Extra parameters for the action's `execute` method.
+    :return: A dict mapping each node's system_id to `None` if the action
+        was performed, or to a message describing why it was not.
+    """
+    if params is None:
+        params = {}
+    action_class = ACTIONS_DICT.get(action_name)
+    if action_class is None:
+        raise NodeActionError("%s action does not exist." % action_name)
+    results = OrderedDict()
+    actions = []
+    for node in nodes:
+        action = action_class(node, user, request)
+        if action.is_actionable() and action.is_permitted():
+            actions.append(action)
+        else:
+            results[node.system_id] = (
+                "%s action is not available for this node." % action_name)
+    for action in actions:
+        system_id = action.node.system_id
+        try:
+            # This also discards the post-commit hooks of a failed action.
+            with savepoint():
+                action.execute(**params)
+        except ValidationError as error:
+            results[system_id] = " ".join(error.messages)
+        except PermissionDenied:
+            results[system_id] = "Permission denied."
+        except NodeActionError as error:
+            results[system_id] = str(error)
+        else:
+            results[system_id] = None
+    return results
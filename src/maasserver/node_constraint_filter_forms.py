@@ -320,6 +320,8 @@ def nodes_by_storage(storage, node_ids=None):
     The first constraint always refers to the block device that has the lowest
     id. The remaining constraints can match any device of that node
 
+    :param node_ids: If given, only these nodes are considered. This may be a
+        QuerySet of node IDs, in which case it is evaluated as a subquery.
     """
     constraints = get_storage_constraints_from_string(storage)
     # Return early if no constraints were given
@@ -354,8 +356,12 @@ def nodes_by_storage(storage, node_ids=None):
                         'partition__partition_table__block_device'
                         '__node_id__in': node_ids
                     }))
-            filesystems = filesystems.prefetch_related(
-                'block_device', 'partition__partition_table__block_device')
+            # Fetch only the IDs of each device and its node, rather than
+            # building filesystem, partition and block device objects.
+            filesystems = filesystems.values_list(
+                'block_device_id', 'block_device__node_id',
+                'partition__partition_table__block_device_id',
+                'partition__partition_table__block_device__node_id')
 
             # Only keep the first device for every node. This is done to make
             # sure filtering out the size and tags is not done to all the
@@ -363,16 +369,15 @@ def nodes_by_storage(storage, node_ids=None):
             # device.
             found_nodes = set()
             matched_devices = []
-            for filesystem in filesystems:
-                if filesystem.block_device is not None:
-                    device = filesystem.block_device
-                else:
-                    device = (
-                        filesystem.partition.partition_table.block_device)
-                if device.node_id in found_nodes:
+            for (device_id, device_node_id, partition_device_id,
+                 partition_node_id) in filesystems:
+                if device_id is None:
+                    device_id = partition_device_id
+                    device_node_id = partition_node_id
+                if device_node_id in found_nodes:
                     continue
-                matched_devices.append(device)
-                found_nodes.add(device.node_id)
+                matched_devices.append((device_id, device_node_id))
+                found_nodes.add(device_node_id)
         else:
             # Query for any block device the closest size and, if specified,
             # the given tags. # The block device must also be unused in the
@@ -385,21 +390,19 @@ def nodes_by_storage(storage, node_ids=None):
             if node_ids is not None:
                 matched_devices = matched_devices.filter(
                     node_id__in=node_ids)
-            matched_devices = list(matched_devices.order_by('size'))
+            matched_devices = matched_devices.order_by('size').values_list(
+                'id', 'node_id')
 
         # Loop through all the returned devices. Insert only the first
         # device from each node into `matches`.
-        matched_in_loop = []
-        for device in matched_devices:
-            device_id = device.id
-            device_node_id = device.node_id
-
+        matched_in_loop = set()
+        for device_id, device_node_id in matched_devices:
             if device_node_id in matched_in_loop:
                 continue
             if device_id in matches[device_node_id]:
                 continue
             matches[device_node_id][device_id] = constraint_name
-            matched_in_loop.append(device_node_id)
+            matched_in_loop.add(device_node_id)
 
     # Return only the nodes that have the correct number of disks.
     nodes = {
@@ -414,7 +417,7 @@ def nodes_by_storage(storage, node_ids=None):
     return nodes
 
 
-def nodes_by_interface(interfaces_label_map):
+def nodes_by_interface(interfaces_label_map, node_ids=None):
     """Determines the set of nodes that match the specified
     LabeledConstraintMap (which must be a map of interface constraints.)
 
@@ -429,8 +432,11 @@ def nodes_by_interface(interfaces_label_map):
     }
 
     :param interfaces_label_map: LabeledConstraintMap
+    :param node_ids: If given, only these nodes are considered. This may be a
+        QuerySet of node IDs, in which case it is evaluated as a subquery.
     :return: dict
     """
+    candidate_ids = node_ids
     node_ids = None
     label_map = {}
     for label in interfaces_label_map:
@@ -439,7 +445,7 @@ def nodes_by_interface(interfaces_label_map):
             # The first time through the filter, build the list
             # of candidate nodes.
             node_ids, node_map = Interface.objects.get_matching_node_map(
-                constraints)
+                constraints, node_ids=candidate_ids)
             label_map[label] = node_map
         else:
             # For subsequent labels, only match nodes that already matched a
@@ -450,12 +456,22 @@ def nodes_by_interface(interfaces_label_map):
             # to filter the nodes starting from an 'id__in' filter using the
             # current 'node_ids' set.
             new_node_ids, node_map = Interface.objects.get_matching_node_map(
-                constraints)
+                constraints, node_ids=candidate_ids)
             label_map[label] = node_map
             node_ids &= new_node_ids
     return node_ids, label_map
 
 
+def order_nodes_by_cost(nodes):
+    """Order `nodes` by their cost, cheapest first.
+
+    This uses a very simple procedure to compute a machine's cost, loosely
+    based on how ec2 computes the costs of machines.
+    """
+    nodes = nodes.extra(select={'cost': "cpu_count + memory / 1024."})
+    return nodes.order_by("cost")
+
+
 class LabeledConstraintMapField(Field):
 
     def __init__(self, *args, **kwargs):
@@ -772,15 +788,26 @@ class AcquireNodeForm(RenamableFieldsForm):
         return filtered_nodes, compatible_nodes, compatible_interfaces
 
     def reorder_nodes_by_cost(self, filtered_nodes):
-        # This uses a very simple procedure to compute a machine's
-        # cost. This procedure is loosely based on how ec2 computes
-        # the costs of machines. This is here to give a hint to let
-        # the call to acquire() decide which machine to return based
-        # on the machine's cost when multiple machines match the
-        # constraints.
-        filtered_nodes = filtered_nodes.distinct().extra(
-            select={'cost': "cpu_count + memory / 1024."})
-        return filtered_nodes.order_by("cost")
+        # This is here to give a hint to let the call to acquire() decide
+        # which machine to return based on the machine's cost when multiple
+        # machines match the constraints.
+        return order_nodes_by_cost(filtered_nodes.distinct())
+
+    def lock_unclaimed_nodes(self, filtered_nodes):
+        """Return the unlocked nodes in `filtered_nodes`, cheapest first.
+
+        The nodes are locked as they are fetched with ``SELECT ... FOR
+        UPDATE SKIP LOCKED``, so concurrent allocations each claim a
+        different node instead of waiting for one another. Slice the result
+        to claim only as many nodes as are needed.
+
+        :param filtered_nodes: A QuerySet returned from `filter_nodes`.
+        """
+        # FOR UPDATE cannot be combined with DISTINCT, so match the nodes by
+        # ID instead; ordering is dropped from the subquery.
+        nodes = filtered_nodes.model.objects.filter(
+            id__in=filtered_nodes.values('id'))
+        return order_nodes_by_cost(nodes).select_for_update(skip_locked=True)
 
     def filter_by_interfaces(self, filtered_nodes):
         compatible_interfaces = {}
@@ -788,7 +815,8 @@ class AcquireNodeForm(RenamableFieldsForm):
             self.get_field_name('interfaces'))
         if interfaces_label_map is not None:
             node_ids, compatible_interfaces = nodes_by_interface(
-                interfaces_label_map)
+                interfaces_label_map,
+                node_ids=filtered_nodes.values('id'))
             if node_ids is not None:
                 filtered_nodes = filtered_nodes.filter(id__in=node_ids)
 
@@ -799,7 +827,8 @@ class AcquireNodeForm(RenamableFieldsForm):
         storage = self.cleaned_data.get(
             self.get_field_name('storage'))
         if storage:
-            compatible_nodes = nodes_by_storage(storage)
+            compatible_nodes = nodes_by_storage(
+                storage, node_ids=filtered_nodes.values('id'))
             node_ids = list(compatible_nodes)
             if node_ids is not None:
                 filtered_nodes = filtered_nodes.filter(id__in=node_ids)
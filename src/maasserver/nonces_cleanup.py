@@ -6,17 +6,27 @@
 __all__ = [
     'cleanup_old_nonces',
     'NonceCleanupService',
+    'NonceFlushService',
     ]
 
 
 import time
 
+from maasserver.api.auth import (
+    nonce_store,
+    save_nonces,
+)
 from maasserver.utils.orm import transactional
 from maasserver.utils.threads import deferToDatabase
 from oauth.oauth import OAuthServer
 from piston3.models import Nonce
+from provisioningserver.logger import LegacyLogger
 from provisioningserver.utils.twisted import synchronous
 from twisted.application.internet import TimerService
+from twisted.internet.defer import succeed
+
+
+log = LegacyLogger()
 
 
 timestamp_threshold = OAuthServer.timestamp_threshold
@@ -68,9 +78,7 @@ def get_time_string(time_value):
 
 def delete_old_nonces(checkpoint):
     """Delete nonces older than the given nonce."""
-    nonce_to_delete = Nonce.objects.filter(id__lte=checkpoint.id)
-    count = nonce_to_delete.count()
-    nonce_to_delete.delete()
+    count, _ = Nonce.objects.filter(id__lte=checkpoint.id).delete()
     return count
 
 
@@ -102,3 +110,29 @@ class NonceCleanupService(TimerService, object):
         cleanup = synchronous(transactional(cleanup_old_nonces))
         super(NonceCleanupService, self).__init__(
             interval, deferToDatabase, cleanup)
+
+
+class NonceFlushService(TimerService, object):
+    """Service to periodically save the nonces used by API requests.
+
+    Requests authenticated by this process only record their nonces in
+    memory (see `maasserver.api.auth.NonceStore`). This writes them to the
+    database in a batch, once a second by default, so that other region
+    processes refuse to accept them again.
+    """
+
+    def __init__(self, interval=1):
+        super(NonceFlushService, self).__init__(interval, self.flush)
+
+    def flush(self):
+        nonces = nonce_store.take_pending()
+        if len(nonces) == 0:
+            return succeed(None)
+
+        def failed(failure):
+            nonce_store.restore_pending(nonces)
+            log.err(failure, "Failed to save OAuth nonces.")
+
+        d = deferToDatabase(synchronous(transactional(save_nonces)), nonces)
+        d.addErrback(failed)
+        return d
@@ -0,0 +1,91 @@
+# Copyright 2017 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Cache of the curtin configuration rendered for nodes.
+
+Rendering a node's storage and network configuration walks all of its block
+devices, partitions, filesystems, interfaces and addresses. The result is
+kept in the maasserver_curtin_config table along with the version stamp it
+was rendered at. System triggers on the tables the configuration is rendered
+from bump the stamps of the affected nodes (see `maasserver.triggers.system`),
+so a cached configuration is used only until something it depends on changes.
+"""
+
+__all__ = [
+    "get_cached_config",
+    "warm_curtin_config",
+]
+
+from contextlib import closing
+
+from django.db import connection
+from maasserver.utils.orm import (
+    is_retryable_failure,
+    savepoint,
+)
+from provisioningserver.logger import get_maas_logger
+
+
+maaslog = get_maas_logger("preseed")
+
+# Each kind of configuration has its own version stamp, key and configuration
+# columns in maasserver_curtin_config.
+CONFIG_KINDS = ("storage", "network")
+
+
+def get_cached_config(node, kind, key, generate):
+    """Return `node`'s `kind` of curtin configuration.
+
+    :param kind: One of `CONFIG_KINDS`.
+    :param key: A string describing the state of `node` that the
+        configuration depends on but that the triggers don't track, such as
+        its architecture. A cached configuration is only used when `key` is
+        the same as when it was rendered.
+    :param generate: A callable that renders the configuration as a string.
+        It's only called when there's no usable cached configuration.
+    """
+    assert kind in CONFIG_KINDS, "Unknown configuration: %s" % kind
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(
+            "SELECT {kind}_version, {kind}_key, {kind}_config "
+            "FROM maasserver_curtin_config "
+            "WHERE node_id = %s".format(kind=kind), [node.id])
+        row = cursor.fetchone()
+        version = 0 if row is None else row[0]
+        versioned_key = "%d:%s" % (version, key)
+        if row is not None and row[1] == versioned_key:
+            return row[2]
+        config = generate()
+        # Only cache the configuration if the version stamp hasn't been
+        # bumped since it was read above.
+        cursor.execute(
+            "INSERT INTO maasserver_curtin_config AS config "
+            "(node_id, {kind}_key, {kind}_config) VALUES (%s, %s, %s) "
+            "ON CONFLICT (node_id) DO UPDATE "
+            "SET {kind}_key = EXCLUDED.{kind}_key, "
+            "{kind}_config = EXCLUDED.{kind}_config "
+            "WHERE config.{kind}_version = %s".format(kind=kind),
+            [node.id, versioned_key, config, version])
+        return config
+
+
+def warm_curtin_config(node):
+    """Render and cache `node`'s curtin configuration ahead of time.
+
+    This is done when a deployment starts, so that the configuration is ready
+    by the time the node asks for it. Failures are logged rather than raised;
+    the node's own request will report them.
+    """
+    # Circular imports.
+    from maasserver.preseed_network import compose_curtin_network_config
+    from maasserver.preseed_storage import compose_curtin_storage_config
+    try:
+        with savepoint():
+            compose_curtin_storage_config(node)
+            compose_curtin_network_config(node)
+    except Exception as error:
+        if is_retryable_failure(error):
+            raise
+        maaslog.warning(
+            "%s: Unable to render curtin configuration: %s",
+            node.hostname, error)
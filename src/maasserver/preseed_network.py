@@ -6,16 +6,26 @@
 __all__ = []
 
 from collections import defaultdict
+from copy import deepcopy
+import json
 from operator import attrgetter
 
+from django.db.models import (
+    Prefetch,
+    prefetch_related_objects,
+)
 from maasserver.dns.zonegenerator import get_dns_search_paths
 from maasserver.enum import (
     INTERFACE_TYPE,
     IPADDRESS_FAMILY,
     IPADDRESS_TYPE,
 )
-from maasserver.models import Interface
+from maasserver.models import (
+    Interface,
+    StaticIPAddress,
+)
 from maasserver.models.staticroute import StaticRoute
+from maasserver.preseed_cache import get_cached_config
 from netaddr import IPNetwork
 from provisioningserver.utils.netplan import (
     get_netplan_bond_parameters,
@@ -128,8 +138,11 @@ class InterfaceConfiguration:
     def _get_dhcp_type(self):
         """Return the DHCP type for the interface."""
         dhcp_types = set()
-        for dhcp_ip in self.iface.ip_addresses.filter(
-                alloc_type=IPADDRESS_TYPE.DHCP).select_related("subnet"):
+        dhcp_ips = [
+            address for address in self.iface.ip_addresses.all()
+            if address.alloc_type == IPADDRESS_TYPE.DHCP
+        ]
+        for dhcp_ip in dhcp_ips:
             if dhcp_ip.subnet is None:
                 # No subnet is linked so no IP family can be determined. So
                 # we allow both families to be DHCP'd.
@@ -192,7 +205,7 @@ class InterfaceConfiguration:
         return {
             route
             for route in self.routes
-            if route.source == source
+            if route.source_id == source.id
         }
 
     def _generate_addresses(self, version=1):
@@ -201,12 +214,13 @@ class InterfaceConfiguration:
         v2_cidrs = []
         v2_config = {}
         v2_nameservers = {}
-        addresses = list(
-            self.iface.ip_addresses.exclude(
-                alloc_type__in=[
-                    IPADDRESS_TYPE.DISCOVERED,
-                    IPADDRESS_TYPE.DHCP,
-                ]).order_by('id'))
+        addresses = [
+            address for address in self.iface.ip_addresses.all()
+            if address.alloc_type not in [
+                IPADDRESS_TYPE.DISCOVERED,
+                IPADDRESS_TYPE.DHCP,
+            ]
+        ]
         dhcp_type = self._get_dhcp_type()
         if _is_link_up(addresses) and not dhcp_type:
             if version == 1:
@@ -416,9 +430,13 @@ class InterfaceConfiguration:
 class NodeNetworkConfiguration:
     """Generator for the YAML network configuration for curtin."""
 
-    def __init__(self, node, version=1):
+    def __init__(self, node, version=1, links=None):
         """Create the YAML network configuration for the specified node, and
         store it in the `config` ivar.
+
+        :param links: The configuration of the node's interfaces and routes,
+            from the `links` ivar of an earlier generator. It's generated
+            from the node's interfaces when not given.
         """
         self.node = node
         self.matching_routes = set()
@@ -435,10 +453,47 @@ class NodeNetworkConfiguration:
         # The default value is False: expected keys are 4 and 6.
         self.addr_family_present = defaultdict(bool)
 
-        self.gateways = self.node.get_default_gateways()
-        self.routes = StaticRoute.objects.all()
+        if links is None:
+            links = self._generate_links(version=version)
+        self.links = links
+
+        # The nameservers are not part of `links`: the default DNS servers
+        # depend on the region and rack controllers, and the search list on
+        # every domain.
+        network_config = deepcopy(links["config"])
+        default_dns_servers = self.node.get_default_dns_servers(
+            ipv4=links["ipv4"], ipv6=links["ipv6"])
+        search_list = [self.node.domain.name] + [
+            name
+            for name in sorted(get_dns_search_paths())
+            if name != self.node.domain.name]
+        if version == 1:
+            network_config["network"]["config"].append({
+                "type": "nameserver",
+                "address": default_dns_servers,
+                "search": search_list,
+            })
+        # XXX mpontillo 2017-02-17: netplan has no concept of "default" DNS
+        # servers, so they're left out of the v2 YAML. Need to define how to
+        # convey this. See launchpad bug #1664806.
+        self.config = network_config
 
-        interfaces = Interface.objects.all_interfaces_parents_first(self.node)
+    def _generate_links(self, version=1):
+        """Generate the configuration of the node's interfaces and routes.
+
+        :return: A dict of the configuration, without nameservers, and of
+            whether IPv4 and IPv6 are in use. It only holds JSON types, so it
+            can be cached.
+        """
+        self.gateways = self.node.get_default_gateways()
+        self.routes = list(StaticRoute.objects.select_related("destination"))
+
+        interfaces = list(
+            Interface.objects.all_interfaces_parents_first(self.node))
+        prefetch_related_objects(
+            interfaces, "vlan", Prefetch(
+                "ip_addresses", queryset=StaticIPAddress.objects.order_by(
+                    "id").select_related("subnet")))
         for iface in interfaces:
             if not iface.is_enabled():
                 continue
@@ -462,18 +517,7 @@ class NodeNetworkConfiguration:
         # that we at least get some address.
         if not self.addr_family_present[6]:
             self.addr_family_present[4] = True
-        default_dns_servers = self.node.get_default_dns_servers(
-            ipv4=self.addr_family_present[4], ipv6=self.addr_family_present[6])
-        search_list = [self.node.domain.name] + [
-            name
-            for name in sorted(get_dns_search_paths())
-            if name != self.node.domain.name]
         self._generate_route_operations(version=version)
-        self.v1_config.append({
-            "type": "nameserver",
-            "address": default_dns_servers,
-            "search": search_list,
-        })
         if version == 1:
             network_config = {
                 "network": {
@@ -494,17 +538,11 @@ class NodeNetworkConfiguration:
                 v2_config.update({"bonds": self.v2_bonds})
             if len(self.v2_bridges) > 0:
                 v2_config.update({"bridges": self.v2_bridges})
-            # XXX mpontillo 2017-02-17: netplan has no concept of "default"
-            # DNS servers. Need to define how to convey this.
-            # See launchpad bug #1664806.
-            # if len(default_dns_servers) > 0 or len(search_list) > 0:
-            #     nameservers = {}
-            #     if len(search_list) > 0:
-            #         nameservers.update({"search": search_list})
-            #     if len(default_dns_servers) > 0:
-            #         nameservers.update({"addresses": default_dns_servers})
-            #     v2_config.update({"nameservers": nameservers})
-        self.config = network_config
+        return {
+            "config": network_config,
+            "ipv4": self.addr_family_present[4],
+            "ipv6": self.addr_family_present[6],
+        }
 
     def _generate_route_operations(self, version=1):
         """Generate all route operations."""
@@ -518,8 +556,21 @@ class NodeNetworkConfiguration:
 
 
 def compose_curtin_network_config(node, version=1):
-    """Compose the network configuration for curtin."""
-    generator = NodeNetworkConfiguration(node, version=version)
+    """Compose the network configuration for curtin.
+
+    The configuration of the node's interfaces and routes is cached until
+    they, or the addresses, subnets and VLANs they use, change.
+    """
+    # The configuration also depends on these, which aren't tracked by the
+    # version stamp.
+    key = "%d:%s:%s:%s" % (
+        version, node.boot_interface_id, node.gateway_link_ipv4_id,
+        node.gateway_link_ipv6_id)
+    links = get_cached_config(
+        node, "network", key, lambda: json.dumps(
+            NodeNetworkConfiguration(node, version=version).links))
+    generator = NodeNetworkConfiguration(
+        node, version=version, links=json.loads(links))
     curtin_config = {
         "network_commands": {
             "builtin": ["curtin", "net-meta", "custom"],
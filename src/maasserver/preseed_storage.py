@@ -9,14 +9,12 @@ __all__ = [
 
 from operator import attrgetter
 
-from django.db.models import Sum
 from maasserver.enum import (
     FILESYSTEM_GROUP_TYPE,
     FILESYSTEM_TYPE,
     PARTITION_TABLE_TYPE,
 )
 from maasserver.models.iscsiblockdevice import ISCSIBlockDevice
-from maasserver.models.partition import Partition
 from maasserver.models.partitiontable import (
     BIOS_GRUB_PARTITION_SIZE,
     GPT_REQUIRED_SIZE,
@@ -26,6 +24,7 @@ from maasserver.models.partitiontable import (
 )
 from maasserver.models.physicalblockdevice import PhysicalBlockDevice
 from maasserver.models.virtualblockdevice import VirtualBlockDevice
+from maasserver.preseed_cache import get_cached_config
 import yaml
 
 
@@ -34,7 +33,17 @@ class CurtinStorageGenerator:
 
     def __init__(self, node):
         self.node = node
-        self.boot_disk = node.get_boot_disk()
+        self.block_devices = self._get_block_devices()
+        self.block_devices_by_id = {
+            block_device.id: block_device
+            for block_device in self.block_devices
+        }
+        self.boot_disk = self._get_boot_disk()
+        self.partitions = {
+            partition.id: partition
+            for block_device in self.block_devices
+            for partition in self._get_partitions(block_device)
+        }
         self.boot_disk_first_partition = None
         self.operations = {
             "disk": [],
@@ -84,14 +93,77 @@ class CurtinStorageGenerator:
         }
         return yaml.safe_dump(storage_config)
 
+    def _get_block_devices(self):
+        """Return the node's block devices, ordered by ID.
+
+        Their partitions and filesystems are fetched along with them, in a
+        fixed number of queries however many devices there are.
+        """
+        related = [
+            "filesystem_set",
+            "partitiontable_set__partitions__filesystem_set",
+        ]
+        querysets = [
+            ISCSIBlockDevice.objects.prefetch_related(*related),
+            PhysicalBlockDevice.objects.prefetch_related(*related),
+            VirtualBlockDevice.objects.prefetch_related(
+                "filesystem_group__filesystems", *related),
+        ]
+        block_devices = []
+        for queryset in querysets:
+            for block_device in queryset.filter(node=self.node):
+                # Save each device fetching the same node again.
+                block_device.node = self.node
+                block_devices.append(block_device)
+        return sorted(block_devices, key=attrgetter('id'))
+
+    def _get_boot_disk(self):
+        """Return the node's boot disk, as `Node.get_boot_disk` does, but
+        from the block devices fetched up front."""
+        if self.node.boot_disk_id is None:
+            # Fallback to using the first created physical block device as
+            # the boot disk.
+            for block_device in self.block_devices:
+                if isinstance(block_device, PhysicalBlockDevice):
+                    return block_device
+            return None
+        elif self.node.boot_disk_id in self.block_devices_by_id:
+            return self.block_devices_by_id[self.node.boot_disk_id]
+        else:
+            return self.node.get_boot_disk()
+
+    def _get_partitions(self, block_device):
+        """Return the partitions on `block_device`, ordered by ID."""
+        partition_table = block_device.get_partitiontable()
+        if partition_table is None:
+            return []
+        else:
+            return sorted(
+                partition_table.partitions.all(), key=attrgetter('id'))
+
+    def _get_parent(self, filesystem):
+        """Return the block device or partition that `filesystem` is on.
+
+        The devices and partitions fetched up front are used when possible.
+        """
+        if filesystem.partition_id is not None:
+            parent = self.partitions.get(filesystem.partition_id)
+        elif filesystem.block_device_id is not None:
+            parent = self.block_devices_by_id.get(filesystem.block_device_id)
+        else:
+            parent = None
+        if parent is None:
+            return filesystem.get_parent()
+        else:
+            return parent
+
     def _add_disk_and_filesystem_group_operations(self):
         """Add all disk and filesystem group (lvm, raid, bcache) operations.
 
         These operations come from all of the physical block devices attached
         to the node.
         """
-        for block_device in self.node.blockdevice_set.order_by('id'):
-            block_device = block_device.actual_instance
+        for block_device in self.block_devices:
             if isinstance(
                     block_device, (ISCSIBlockDevice, PhysicalBlockDevice)):
                 self.operations["disk"].append(block_device)
@@ -136,20 +208,18 @@ class CurtinStorageGenerator:
         These operations come from all the partitions on all block devices
         attached to the node.
         """
-        for block_device in self.node.blockdevice_set.order_by('id'):
+        for block_device in self.block_devices:
             requires_prep = self._requires_prep_partition(block_device)
             requires_bios_grub = self._requires_bios_grub_partition(
                 block_device)
-            partition_table = block_device.get_partitiontable()
-            if partition_table is not None:
-                partitions = list(partition_table.partitions.order_by('id'))
-                for idx, partition in enumerate(partitions):
-                    # If this is the first partition and prep or bios_grub
-                    # partition is required then set boot_disk_first_partition
-                    # so partition creation can occur in the correct order.
-                    if (requires_prep or requires_bios_grub) and idx == 0:
-                        self.boot_disk_first_partition = partition
-                    self.operations["partition"].append(partition)
+            partitions = self._get_partitions(block_device)
+            for idx, partition in enumerate(partitions):
+                # If this is the first partition and prep or bios_grub
+                # partition is required then set boot_disk_first_partition
+                # so partition creation can occur in the correct order.
+                if (requires_prep or requires_bios_grub) and idx == 0:
+                    self.boot_disk_first_partition = partition
+                self.operations["partition"].append(partition)
 
     def _add_format_and_mount_operations(self):
         """Add all the format and mount operations.
@@ -157,32 +227,30 @@ class CurtinStorageGenerator:
         These operations come from all the block devices and partitions
         attached to the node.
         """
-        for block_device in self.node.blockdevice_set.order_by('id'):
+        for block_device in self.block_devices:
             filesystem = block_device.get_effective_filesystem()
             if self._requires_format_operation(filesystem):
                 self.operations["format"].append(filesystem)
                 if filesystem.is_mounted:
                     self.operations["mount"].append(filesystem)
             else:
-                partition_table = block_device.get_partitiontable()
-                if partition_table is not None:
-                    for partition in partition_table.partitions.order_by('id'):
-                        partition_filesystem = (
-                            partition.get_effective_filesystem())
-                        if self._requires_format_operation(
-                                partition_filesystem):
-                            self.operations["format"].append(
+                for partition in self._get_partitions(block_device):
+                    partition_filesystem = (
+                        partition.get_effective_filesystem())
+                    if self._requires_format_operation(
+                            partition_filesystem):
+                        self.operations["format"].append(
+                            partition_filesystem)
+                        if partition_filesystem.is_mounted:
+                            self.operations["mount"].append(
                                 partition_filesystem)
-                            if partition_filesystem.is_mounted:
-                                self.operations["mount"].append(
-                                    partition_filesystem)
 
     def _requires_format_operation(self, filesystem):
         """Return True if the filesystem requires a format operation."""
         return (
             filesystem is not None and
             filesystem.filesystem_group_id is None and
-            filesystem.cache_set is None)
+            filesystem.cache_set_id is None)
 
     def _generate_disk_operations(self):
         """Generate all disk operations."""
@@ -349,17 +417,18 @@ class CurtinStorageGenerator:
                 # Calculate the remaining size of the disk available for the
                 # extended partition.
                 extended_size = block_device.size - PARTITION_TABLE_EXTRA_SPACE
-                previous_partitions = Partition.objects.filter(
-                    id__lt=partition.id, partition_table=partition_table)
-                extended_size = extended_size - (
-                    previous_partitions.aggregate(Sum('size'))['size__sum'])
+                partitions = partition_table.partitions.all()
+                extended_size = extended_size - sum(
+                    previous.size for previous in partitions
+                    if previous.id < partition.id)
                 # Curtin adds 1MiB between each logical partition inside the
                 # extended partition. It incorrectly adds onto the size
                 # automatically so we have to extract that size from the
                 # overall size of the extended partition.
-                following_partitions = Partition.objects.filter(
-                    id__gte=partition.id, partition_table=partition_table)
-                logical_extra_space = following_partitions.count() * (1 << 20)
+                following_partitions = [
+                    following for following in partitions
+                    if following.id >= partition.id]
+                logical_extra_space = len(following_partitions) * (1 << 20)
                 extended_size = extended_size - logical_extra_space
                 self.storage_config.append({
                     "id": "%s-part4" % block_device.get_name(),
@@ -389,7 +458,7 @@ class CurtinStorageGenerator:
     def _generate_format_operation(self, filesystem):
         """Generate format operation for `filesystem` and place in
         `storage_config`."""
-        device_or_partition = filesystem.get_parent()
+        device_or_partition = self._get_parent(filesystem)
         self.storage_config.append({
             "id": "%s_format" % device_or_partition.get_name(),
             "type": "format",
@@ -415,7 +484,7 @@ class CurtinStorageGenerator:
             "devices": [],
         }
         for filesystem in filesystem_group.filesystems.all():
-            block_or_partition = filesystem.get_parent()
+            block_or_partition = self._get_parent(filesystem)
             volume_group_operation["devices"].append(
                 block_or_partition.get_name())
         volume_group_operation["devices"] = sorted(
@@ -455,7 +524,7 @@ class CurtinStorageGenerator:
             "spare_devices": [],
         }
         for filesystem in filesystem_group.filesystems.all():
-            block_or_partition = filesystem.get_parent()
+            block_or_partition = self._get_parent(filesystem)
             if filesystem.fstype == FILESYSTEM_TYPE.RAID:
                 raid_operation["devices"].append(
                     block_or_partition.get_name())
@@ -604,7 +673,7 @@ class CurtinStorageGenerator:
     def _generate_mount_operation(self, filesystem):
         """Generate mount operation for `filesystem` and place in
         `storage_config`."""
-        device_or_partition = filesystem.get_parent()
+        device_or_partition = self._get_parent(filesystem)
         stanza = {
             "id": "%s_mount" % device_or_partition.get_name(),
             "type": "mount",
@@ -618,6 +687,17 @@ class CurtinStorageGenerator:
 
 
 def compose_curtin_storage_config(node):
-    """Compose the storage configuration for curtin."""
-    generator = CurtinStorageGenerator(node)
-    return [generator.generate()]
+    """Compose the storage configuration for curtin.
+
+    The configuration is cached until the node's storage changes.
+    """
+    # The configuration also depends on these, which aren't tracked by the
+    # version stamp: the effective filesystems change when the node is
+    # allocated.
+    key = "%s:%s:%s:%s" % (
+        node.architecture, node.bios_boot_method, node.boot_disk_id,
+        node.is_in_allocated_state())
+    storage_config = get_cached_config(
+        node, "storage", key,
+        lambda: CurtinStorageGenerator(node).generate())
+    return [storage_config]
@@ -0,0 +1,58 @@
+# Copyright 2017 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Track whether every rack controller is connected to a region.
+
+Region processes record each RPC connection from a rack controller as a
+`RegionRackRPCConnection` (see `RegionAdvertising.registerConnection`), so
+that table is the connectivity state shared by every region process. The
+persistent error telling admins about disconnected rack controllers is
+updated whenever a connection is recorded or removed, instead of being
+recomputed for every web request.
+"""
+
+__all__ = [
+    "update_rack_controller_connectivity",
+]
+
+from django.core.urlresolvers import reverse
+from maasserver.components import (
+    discard_persistent_error,
+    register_persistent_error,
+)
+from maasserver.enum import COMPONENT
+from maasserver.models.node import RackController
+from maasserver.utils.orm import transactional
+
+
+def get_disconnected_message(count):
+    """Return the persistent error message for `count` disconnected racks."""
+    if count == 1:
+        message = "One rack controller is not yet connected to the region"
+    else:
+        message = (
+            "%d rack controllers are not yet connected to the region"
+            % count)
+    return (
+        "%s. Visit the <a href=\"%s#/nodes?tab=controllers\">"
+        "rack controllers page</a> for "
+        "more information." % (message, reverse('index')))
+
+
+@transactional
+def update_rack_controller_connectivity():
+    """Register or discard the rack controller connectivity error.
+
+    A rack controller is disconnected when no region process has recorded a
+    connection from it. The error is only written when its message changes:
+    `register_persistent_error` leaves an identical notification alone, and
+    discarding an error that isn't there deletes nothing.
+    """
+    disconnected = RackController.objects.filter(
+        connections__isnull=True).count()
+    if disconnected == 0:
+        discard_persistent_error(COMPONENT.RACK_CONTROLLERS)
+    else:
+        register_persistent_error(
+            COMPONENT.RACK_CONTROLLERS,
+            get_disconnected_message(disconnected))
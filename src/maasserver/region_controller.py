@@ -10,7 +10,10 @@ DNS:
     The regiond process listens for messages from Postgres on channel
     'sys_dns'. Any time a message is recieved on that channel the DNS is marked
     as requiring an update. Once marked for update the DNS configuration is
-    updated and bind9 is told to reload.
+    updated and bind9 is told to reload. Messages that arrive in quick
+    succession are coalesced into a single update, and bind9 is not reloaded
+    if the update does not change its configuration. If bind9 cannot be
+    reloaded the update is tried again after `dnsRetryInterval` seconds.
 
 Proxy:
     The regiond process listens for messages from Postgres on channel
@@ -23,7 +26,10 @@ __all__ = [
     "RegionControllerService",
 ]
 
-from maasserver.dns.config import dns_update_all_zones
+from maasserver.dns.config import (
+    dns_update_all_zones,
+    is_dns_enabled,
+)
 from maasserver.proxyconfig import proxy_update_config
 from maasserver.utils.orm import transactional
 from maasserver.utils.threads import deferToDatabase
@@ -50,6 +56,14 @@ class RegionControllerService(Service):
     See module documentation for more details.
     """
 
+    # DNS is updated once changes have settled for this many seconds, and no
+    # more often than this...
+    dnsMinimumInterval = 1.0
+    # ... unless changes have been pending for this many seconds.
+    dnsMaximumDelay = 5.0
+    # DNS is updated again this many seconds after bind9 failed to reload.
+    dnsRetryInterval = 10.0
+
     def __init__(self, postgresListener, clock=reactor):
         """Initialise a new `RegionControllerService`.
 
@@ -64,6 +78,22 @@ class RegionControllerService(Service):
         self.needsDNSUpdate = False
         self.needsProxyUpdate = False
         self.postgresListener = postgresListener
+        # When the first and last pending DNS changes were signalled, and
+        # when DNS was last updated.
+        self.dnsPendingSince = None
+        self.dnsLastMarked = None
+        self.dnsLastUpdated = None
+        # Fingerprint of the last DNS configuration written.
+        self.dnsFingerprint = None
+        # The delayed call that retries a failed DNS update.
+        self.dnsRetry = None
+        self.dnsStats = {
+            "updates": 0,
+            "unchanged": 0,
+            "coalesced": 0,
+            "failures": 0,
+            "last_latency": None,
+        }
 
     @asynchronous(timeout=FOREVER)
     def startService(self):
@@ -82,6 +112,9 @@ class RegionControllerService(Service):
         super(RegionControllerService, self).stopService()
         self.postgresListener.unregister("sys_dns", self.markDNSForUpdate)
         self.postgresListener.unregister("sys_proxy", self.markProxyForUpdate)
+        if self.dnsRetry is not None and self.dnsRetry.active():
+            self.dnsRetry.cancel()
+        self.dnsRetry = None
         if self.processingDefer is not None:
             self.processingDefer, d = None, self.processingDefer
             self.processing.stop()
@@ -89,6 +122,12 @@ class RegionControllerService(Service):
 
     def markDNSForUpdate(self, channel, message):
         """Called when the `sys_dns` message is received."""
+        now = self.clock.seconds()
+        if self.dnsPendingSince is None:
+            self.dnsPendingSince = now
+        else:
+            self.dnsStats["coalesced"] += 1
+        self.dnsLastMarked = now
         self.needsDNSUpdate = True
         self.startProcessing()
 
@@ -102,19 +141,74 @@ class RegionControllerService(Service):
         if not self.processing.running:
             self.processingDefer = self.processing.start(0.1, now=False)
 
+    def isDNSUpdateDue(self):
+        """Return whether pending DNS changes should be published now.
+
+        Changes are published once they have settled for
+        `dnsMinimumInterval` and at least `dnsMinimumInterval` has passed
+        since the last update, or once they have been pending for
+        `dnsMaximumDelay`, whichever comes first.
+        """
+        if self.dnsPendingSince is None:
+            return True
+        now = self.clock.seconds()
+        if now - self.dnsPendingSince >= self.dnsMaximumDelay:
+            return True
+        elif now - self.dnsLastMarked < self.dnsMinimumInterval:
+            return False
+        elif self.dnsLastUpdated is None:
+            return True
+        else:
+            return now - self.dnsLastUpdated >= self.dnsMinimumInterval
+
+    def updateDNS(self):
+        """Update the DNS configuration, coalescing all pending changes."""
+        pendingSince, self.dnsPendingSince = self.dnsPendingSince, None
+        previous = self.dnsFingerprint
+        self.needsDNSUpdate = False
+        self.dnsLastUpdated = self.clock.seconds()
+
+        def updated(fingerprint):
+            if pendingSince is not None:
+                self.dnsStats["last_latency"] = (
+                    self.clock.seconds() - pendingSince)
+            if fingerprint is not None and fingerprint == previous:
+                self.dnsStats["unchanged"] += 1
+                log.msg("DNS configuration unchanged; not reloading.")
+            elif fingerprint is None and is_dns_enabled():
+                # bind9 was not reloaded, so the next update must write and
+                # reload again even if nothing has changed by then.
+                self.dnsStats["failures"] += 1
+                self.dnsFingerprint = None
+                log.msg(
+                    "Failed to reload DNS; retrying in %d seconds." % (
+                        self.dnsRetryInterval, ))
+                self.scheduleDNSRetry()
+            else:
+                self.dnsStats["updates"] += 1
+                self.dnsFingerprint = fingerprint
+                log.msg("Successfully configured DNS.")
+
+        d = deferToDatabase(
+            transactional(dns_update_all_zones),
+            previous_fingerprint=previous)
+        d.addCallback(updated)
+        d.addErrback(
+            log.err,
+            "Failed configuring DNS.")
+        return d
+
+    def scheduleDNSRetry(self):
+        """Update DNS again after `dnsRetryInterval` seconds."""
+        if self.dnsRetry is None or not self.dnsRetry.active():
+            self.dnsRetry = self.clock.callLater(
+                self.dnsRetryInterval, self.markDNSForUpdate, None, None)
+
     def process(self):
         """Process the DNS and/or proxy update."""
         defers = []
-        if self.needsDNSUpdate:
-            self.needsDNSUpdate = False
-            d = deferToDatabase(transactional(dns_update_all_zones))
-            d.addCallback(
-                lambda _: log.msg(
-                    "Successfully configured DNS."))
-            d.addErrback(
-                log.err,
-                "Failed configuring DNS.")
-            defers.append(d)
+        if self.needsDNSUpdate and self.isDNSUpdateDue():
+            defers.append(self.updateDNS())
         if self.needsProxyUpdate:
             self.needsProxyUpdate = False
             d = proxy_update_config(reload_proxy=True)
@@ -125,9 +219,9 @@ class RegionControllerService(Service):
                 log.err,
                 "Failed configuring proxy.")
             defers.append(d)
-        if len(defers) == 0:
+        if len(defers) != 0:
+            return DeferredList(defers)
+        elif not self.needsDNSUpdate:
             # Nothing more to do.
             self.processing.stop()
             self.processingDefer = None
-        else:
-            return DeferredList(defers)
@@ -7,26 +7,61 @@ __all__ = [
     "ReverseDNSService"
 ]
 
-from typing import List
+from typing import (
+    Dict,
+    List,
+    Optional,
+)
 
 from maasserver.listener import PostgresListenerService
 from maasserver.models import (
     RDNS,
     RegionController,
 )
+from maasserver.utils.orm import transactional
 from maasserver.utils.threads import deferToDatabase
 from provisioningserver.logger import LegacyLogger
 from provisioningserver.utils.network import reverseResolve
-from provisioningserver.utils.twisted import suppress
+from provisioningserver.utils.twisted import (
+    callOut,
+    suppress,
+)
 from twisted.application.service import Service
-from twisted.internet import defer
+from twisted.internet import (
+    defer,
+    reactor,
+)
+from twisted.internet.defer import (
+    Deferred,
+    DeferredSemaphore,
+    succeed,
+)
+from twisted.internet.task import deferLater
 
 
 log = LegacyLogger()
 
 
 class ReverseDNSService(Service):
-    """Service to resolve and cache reverse DNS names for neighbour entries."""
+    """Service to resolve and cache reverse DNS names for neighbour entries.
+
+    Lookups are throttled per IP address: an address that has been resolved
+    within the last `cache_ttl` seconds (by any rack's observation) or whose
+    lookup is still in flight is not resolved again. At most
+    `max_concurrent_lookups` lookups run at once, and the results are written
+    to the database in batches every `write_interval` seconds.
+    """
+
+    # Seconds for which a resolved IP address is not resolved again.
+    cache_ttl = 5 * 60
+
+    # The maximum number of reverse lookups in flight at once.
+    max_concurrent_lookups = 16
+
+    # Seconds to wait to batch writes to the database.
+    write_interval = 0.5
+
+    clock = reactor
 
     def __init__(self, postgresListener: PostgresListenerService=None):
         super().__init__()
@@ -34,6 +69,19 @@ class ReverseDNSService(Service):
         # We will cache a reference to the region model object so we don't
         # need to look it up every time a DNS entry changes.
         self.region = None
+        # Map of IP address to the time it was last resolved.
+        self.resolved = {}
+        # IP addresses with a lookup in flight.
+        self.resolving = set()
+        self.lookups = DeferredSemaphore(self.max_concurrent_lookups)
+        # Map of IP address to its pending results; None means delete.
+        self.pendingWrites = {}
+        self.pendingWritesDone = None
+        self.stats = {
+            "lookups": 0,
+            "suppressed": 0,
+            "writes": 0,
+        }
 
     @defer.inlineCallbacks
     def startService(self):
@@ -68,7 +116,78 @@ class ReverseDNSService(Service):
         """
         RDNS.objects.delete_current_entry(ip, self.region)
 
+    @transactional
+    def update_rdns_entries(self, updates: Dict[str, Optional[List[str]]]):
+        """Set or delete the reverse-DNS entries for many IP addresses.
+
+        Must run in a thread where database access is permitted.
+
+        :param updates: a dict mapping IP addresses to a non-empty list of
+            hostnames, or to None to delete the entry.
+        """
+        for ip, results in updates.items():
+            if results is None:
+                self.delete_rdns_entry(ip)
+            else:
+                self.set_rdns_entry(ip, results)
+
+    def _writeLater(self, ip: str, results: Optional[List[str]]):
+        """Queue a write of the entry for `ip` with the next batch.
+
+        :return: a `Deferred` that fires once the batch has been written.
+        """
+        self.pendingWrites[ip] = results
+        if self.pendingWritesDone is None:
+            self.pendingWritesDone = deferLater(
+                self.clock, self.write_interval, self._writePending)
+            self.pendingWritesDone.addErrback(
+                log.err, "Failed to update reverse-DNS entries.",
+                system="reverse-dns")
+        done = Deferred()
+        self.pendingWritesDone.addBoth(callOut, done.callback, None)
+        return done
+
+    def _writePending(self):
+        updates, self.pendingWrites = self.pendingWrites, {}
+        self.pendingWritesDone = None
+        self.stats["writes"] += 1
+        self._expireResolved()
+        return deferToDatabase(self.update_rdns_entries, updates)
+
+    def _expireResolved(self):
+        expired = self.clock.seconds() - self.cache_ttl
+        for ip, when in list(self.resolved.items()):
+            if when <= expired:
+                del self.resolved[ip]
+
+    def _isSuppressed(self, ip: str):
+        """Return True if `ip` was resolved recently or is being resolved."""
+        if ip in self.resolving:
+            return True
+        resolved = self.resolved.get(ip)
+        return (
+            resolved is not None and
+            self.clock.seconds() - resolved < self.cache_ttl)
+
     @defer.inlineCallbacks
+    def _resolve(self, ip: str):
+        self.stats["lookups"] += 1
+        try:
+            results = yield self.lookups.run(reverseResolve, ip).addErrback(
+                suppress, defer.TimeoutError, instead=None)
+        finally:
+            self.resolving.discard(ip)
+        if results is not None:
+            self.resolved[ip] = self.clock.seconds()
+            if len(results) > 0:
+                yield self._writeLater(ip, results)
+            else:
+                yield self._writeLater(ip, None)
+        else:
+            # A return of 'None' indicates a timeout or other possibly-
+            # temporary failure, so take no action.
+            pass
+
     def consumeNeighbourEvent(self, action: str=None, cidr: str=None):
         """Given an event from the postgresListener, resolve RDNS for an IP.
 
@@ -81,24 +200,19 @@ class ReverseDNSService(Service):
         """
         ip = cidr.split('/')[0]  # Strip off the "/<prefixlen>".
         if action in ('create', 'update'):
-            # XXX mpontillo 2016-10-19: We might consider throttling this on
-            # a per-IP-address basis, both because multiple racks can observe
-            # the same IP address, and because an IP address might repeatedly
-            # go back-and-forth between two MACs in the case of a duplicate IP
-            # address.
-            results = yield reverseResolve(ip).addErrback(
-                suppress, defer.TimeoutError, instead=None)
-            if results is not None:
-                if len(results) > 0:
-                    yield deferToDatabase(self.set_rdns_entry, ip, results)
-                else:
-                    yield deferToDatabase(self.delete_rdns_entry, ip)
+            # Multiple racks can observe the same IP address, and an IP
+            # address might repeatedly go back-and-forth between two MACs in
+            # the case of a duplicate IP address, so throttle per IP address.
+            if self._isSuppressed(ip):
+                self.stats["suppressed"] += 1
+                return succeed(None)
             else:
-                # A return of 'None' indicates a timeout or other possibly-
-                # temporary failure, so take no action.
-                pass
+                self.resolving.add(ip)
+                return self._resolve(ip)
         elif action == 'delete':
-            yield deferToDatabase(self.delete_rdns_entry, ip)
+            self.resolved.pop(ip, None)
+            return self._writeLater(ip, None)
         else:
             log.msg("Unsupported event from listener: action=%r, cidr=%r" % (
                 action, cidr), system="reverse-dns")
+            return succeed(None)
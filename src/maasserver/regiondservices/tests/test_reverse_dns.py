@@ -5,7 +5,10 @@
 
 __all__ = []
 
-from unittest.mock import Mock
+from unittest.mock import (
+    call,
+    Mock,
+)
 
 from crochet import wait_for
 from maasserver.models import RDNS
@@ -14,17 +17,22 @@ from maasserver.regiondservices.reverse_dns import ReverseDNSService
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASTransactionServerTestCase
 from maasserver.utils.threads import deferToDatabase
-from maastesting.matchers import MockCalledOnceWith
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockCallsMatch,
+)
 from provisioningserver.utils.testing import callWithServiceRunning
 from provisioningserver.utils.tests.test_network import (
     TestReverseResolveMixIn,
 )
 from testtools.matchers import (
+    ContainsDict,
     Equals,
     Is,
 )
 from twisted.internet import defer
 from twisted.internet.defer import inlineCallbacks
+from twisted.internet.task import Clock
 
 
 class TestReverseDNSService(
@@ -72,6 +80,8 @@ class TestReverseDNSService(
         hostname2 = factory.make_hostname()
         self.set_fake_twisted_dns_reply([hostname])
         service = ReverseDNSService()
+        # Don't suppress the second lookup.
+        service.cache_ttl = 0
         yield service.startService()
         ip = factory.make_ip_address(ipv6=False)
         yield service.consumeNeighbourEvent("create", "%s/32" % ip)
@@ -125,3 +135,86 @@ class TestReverseDNSService(
         self.assertThat(reverseResolve, MockCalledOnceWith(ip))
         result = yield deferToDatabase(RDNS.objects.first)
         self.assertThat(result, Is(None))
+
+    @wait_for(30)
+    @inlineCallbacks
+    def test__suppresses_repeated_lookups_for_same_ip(self):
+        reverseResolve = self.patch(reverse_dns_module, "reverseResolve")
+        reverseResolve.return_value = defer.succeed([factory.make_hostname()])
+        ip = factory.make_ip_address(ipv6=False)
+        service = ReverseDNSService()
+        yield service.startService()
+        yield service.consumeNeighbourEvent("create", "%s/32" % ip)
+        yield service.consumeNeighbourEvent("update", "%s/32" % ip)
+        service.stopService()
+        self.assertThat(reverseResolve, MockCalledOnceWith(ip))
+        self.assertThat(service.stats, ContainsDict({
+            "lookups": Equals(1),
+            "suppressed": Equals(1),
+        }))
+
+    @wait_for(30)
+    @inlineCallbacks
+    def test__suppresses_lookups_in_flight(self):
+        reverseResolve = self.patch(reverse_dns_module, "reverseResolve")
+        result = defer.Deferred()
+        reverseResolve.return_value = result
+        ip = factory.make_ip_address(ipv6=False)
+        service = ReverseDNSService()
+        yield service.startService()
+        d1 = service.consumeNeighbourEvent("create", "%s/32" % ip)
+        d2 = service.consumeNeighbourEvent("update", "%s/32" % ip)
+        result.callback([])
+        yield d1
+        yield d2
+        service.stopService()
+        self.assertThat(reverseResolve, MockCalledOnceWith(ip))
+
+    @wait_for(30)
+    @inlineCallbacks
+    def test__delete_resets_throttling_for_ip(self):
+        reverseResolve = self.patch(reverse_dns_module, "reverseResolve")
+        reverseResolve.return_value = defer.succeed([factory.make_hostname()])
+        ip = factory.make_ip_address(ipv6=False)
+        service = ReverseDNSService()
+        yield service.startService()
+        yield service.consumeNeighbourEvent("create", "%s/32" % ip)
+        yield service.consumeNeighbourEvent("delete", "%s/32" % ip)
+        yield service.consumeNeighbourEvent("create", "%s/32" % ip)
+        service.stopService()
+        self.assertThat(reverseResolve, MockCallsMatch(call(ip), call(ip)))
+
+    @wait_for(30)
+    @inlineCallbacks
+    def test__batches_writes(self):
+        reverseResolve = self.patch(reverse_dns_module, "reverseResolve")
+        reverseResolve.side_effect = lambda ip: defer.succeed(
+            [factory.make_hostname()])
+        ips = [factory.make_ip_address(ipv6=False) for _ in range(3)]
+        service = ReverseDNSService()
+        yield service.startService()
+        yield defer.DeferredList([
+            service.consumeNeighbourEvent("create", "%s/32" % ip)
+            for ip in ips
+        ])
+        service.stopService()
+        self.assertThat(service.stats["writes"], Equals(1))
+        results = yield deferToDatabase(
+            lambda: list(RDNS.objects.values_list("ip", flat=True)))
+        self.assertItemsEqual(ips, results)
+
+    def test__expires_resolved_ips_after_cache_ttl(self):
+        service = ReverseDNSService()
+        service.clock = Clock()
+        ip = factory.make_ip_address(ipv6=False)
+        service.resolved[ip] = service.clock.seconds()
+        self.assertTrue(service._isSuppressed(ip))
+        service.clock.advance(service.cache_ttl)
+        self.assertFalse(service._isSuppressed(ip))
+        service._expireResolved()
+        self.assertThat(service.resolved, Equals({}))
+
+    def test__limits_concurrent_lookups(self):
+        service = ReverseDNSService()
+        self.assertThat(
+            service.lookups.limit, Equals(service.max_concurrent_lookups))
@@ -7,6 +7,7 @@ __all__ = [
     "register_event_type",
     "send_event",
     "send_event_mac_address",
+    "send_events",
 ]
 
 from maasserver.enum import INTERFACE_TYPE
@@ -17,8 +18,13 @@ from maasserver.models import (
     Node,
 )
 from maasserver.utils.orm import transactional
+from netaddr import (
+    AddrFormatError,
+    EUI,
+)
 from provisioningserver.logger import get_maas_logger
 from provisioningserver.rpc.exceptions import NoSuchEventType
+from provisioningserver.utils.network import format_eui
 from provisioningserver.utils.twisted import synchronous
 
 
@@ -90,3 +96,83 @@ def send_event_mac_address(mac_address, type_name, description, timestamp):
         Event.objects.create(
             node=interface.node, type=event_type, description=description,
             created=timestamp)
+
+
+def _normalise_mac_address(mac_address):
+    """Return `mac_address` in the format PostgreSQL returns it, or None."""
+    try:
+        return format_eui(EUI(mac_address))
+    except (AddrFormatError, TypeError, ValueError):
+        return None
+
+
+@synchronous
+@transactional
+def send_events(events, timestamp):
+    """Send many events at once.
+
+    for :py:class:`~provisioningserver.rpc.region.SendEvents`.
+
+    Event types, nodes by system ID, and nodes by MAC address are each
+    resolved with a single query, then all the events are inserted with one
+    bulk insert. Events for unknown types or non-existent nodes are dropped.
+    """
+    type_names = {event["type_name"] for event in events}
+    event_type_ids = dict(
+        EventType.objects.filter(name__in=type_names).values_list(
+            "name", "id"))
+
+    system_ids = {
+        event["system_id"]
+        for event in events
+        if event.get("system_id") is not None
+    }
+    node_ids_by_system_id = {}
+    if len(system_ids) > 0:
+        node_ids_by_system_id = dict(
+            Node.objects.filter(system_id__in=system_ids).values_list(
+                "system_id", "id"))
+
+    mac_addresses = {
+        _normalise_mac_address(event["mac_address"])
+        for event in events
+        if event.get("mac_address") is not None
+    }
+    mac_addresses.discard(None)
+    node_ids_by_mac_address = {}
+    if len(mac_addresses) > 0:
+        interfaces = Interface.objects.filter(
+            type=INTERFACE_TYPE.PHYSICAL, mac_address__in=mac_addresses,
+            node__isnull=False)
+        node_ids_by_mac_address = {
+            str(mac_address): node_id
+            for mac_address, node_id in interfaces.values_list(
+                "mac_address", "node_id")
+        }
+
+    new_events = []
+    for event in events:
+        type_name = event["type_name"]
+        description = event["description"]
+        event_type_id = event_type_ids.get(type_name)
+        if event_type_id is None:
+            maaslog.debug(
+                "Event '%s: %s' sent with unregistered event type.",
+                type_name, description)
+            continue
+        if event.get("system_id") is not None:
+            node_id = node_ids_by_system_id.get(event["system_id"])
+        else:
+            node_id = node_ids_by_mac_address.get(
+                _normalise_mac_address(event.get("mac_address")))
+        if node_id is None:
+            # See send_event; this is most likely a node trying to enlist.
+            maaslog.debug(
+                "Event '%s: %s' sent for non-existent node '%s'.",
+                type_name, description,
+                event.get("system_id") or event.get("mac_address"))
+            continue
+        new_events.append(Event(
+            node_id=node_id, type_id=event_type_id, description=description,
+            created=timestamp, updated=timestamp))
+    Event.objects.bulk_create(new_events)
@@ -50,6 +50,7 @@ from maasserver.rpc import (
     packagerepository,
     rackcontrollers,
 )
+from maasserver.rpc.events import send_events
 from maasserver.rpc.nodes import (
     commission_node,
     create_node,
@@ -361,6 +362,19 @@ class Region(RPCProtocol):
         # Don't wait for the record to be written.
         return succeed({})
 
+    @region.SendEvents.responder
+    def send_events(self, events):
+        """send_events()
+
+        Implementation of
+        :py:class:`~provisioningserver.rpc.region.SendEvents`.
+        """
+        timestamp = datetime.now()
+        dbtasks = eventloop.services.getServiceNamed("database-tasks")
+        dbtasks.addTask(send_events, events, timestamp)
+        # Don't wait for the records to be written.
+        return succeed({})
+
     @region.ReportForeignDHCPServer.responder
     def report_foreign_dhcp_server(
             self, system_id, interface_name, dhcp_ip=None):
@@ -771,7 +785,7 @@ class RegionService(service.Service, object):
             waiters.add(d)
             return d
         else:
-            connection = random.choice(conns)
+            connection = get_least_busy(conns)
             return defer.succeed(connection)
 
     def _getConnectionFromIdentifiers(self, identifiers, timeout):
@@ -787,7 +801,7 @@ class RegionService(service.Service, object):
         for ident in identifiers:
             conns = list(self.connections[ident])
             if len(conns) > 0:
-                matched_connections.append(random.choice(conns))
+                matched_connections.append(get_least_busy(conns))
         if len(matched_connections) > 0:
             return defer.succeed(matched_connections)
         else:
@@ -941,7 +955,8 @@ class RegionService(service.Service, object):
 
         If more than one connection exists to that rack controller - implying
         that there are multiple rack controllers for the particular
-        cluster, for HA - one of them will be returned at random.
+        cluster, for HA - the one with the fewest calls in flight will be
+        returned, chosen at random if there's a tie.
 
         :param system_id: The system_id - as a string - of the rack controller
             that a connection is wanted for.
@@ -966,7 +981,7 @@ class RegionService(service.Service, object):
         identifiers.
 
         If more than one connection exists to that given `identifiers`, then
-        one of them will be returned at random.
+        the one with the fewest calls in flight will be returned.
 
         :param identifiers: List of system_id's of the rack controller
             that a connection is wanted for.
@@ -984,7 +999,7 @@ class RegionService(service.Service, object):
                 "available." % ','.join(identifiers))
 
         def cb_client(conns):
-            return common.Client(random.choice(conns))
+            return common.Client(get_least_busy(conns))
 
         return d.addCallbacks(cb_client, cancelled)
 
@@ -992,7 +1007,7 @@ class RegionService(service.Service, object):
     def getAllClients(self):
         """Return a list with one connection per rack controller."""
         return [
-            common.Client(random.choice(list(connections)))
+            common.Client(get_least_busy(connections))
             for connections in self.connections.values()
             if len(connections) > 0
         ]
@@ -1010,7 +1025,20 @@ class RegionService(service.Service, object):
             # The connection object is a set of RegionServer objects.
             # Make sure a sane set was returned.
             assert len(connection) > 0, "Connection set empty."
-            return common.Client(random.choice(list(connection)))
+            return common.Client(get_least_busy(connection))
+
+
+def get_least_busy(connections):
+    """Return the connection with the fewest calls in flight.
+
+    Ties are broken at random, so that load is spread across all connections
+    to a rack controller even when it is light.
+    """
+    fewest = min(conn.inFlight for conn in connections)
+    return random.choice([
+        conn for conn in connections
+        if conn.inFlight == fewest
+    ])
 
 
 def ignoreCancellation(failure):
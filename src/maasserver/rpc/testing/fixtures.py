@@ -76,6 +76,7 @@ class FakeConnection:
         super(FakeConnection, self).__init__()
         self.protocol = clusterservice.Cluster()
         self.ident = ident
+        self.inFlight = 0
 
     def callRemote(self, cmd, **arguments):
         return call_responder(self.protocol, cmd, arguments)
@@ -872,6 +872,22 @@ class TestRegionService(MAASTestCase):
 
         return service.getClientFor(uuid).addCallback(check)
 
+    @wait_for_reactor
+    def test_getClientFor_returns_least_busy_connection(self):
+        c1 = DummyConnection()
+        c1.inFlight = 3
+        c2 = DummyConnection()
+        c2.inFlight = 1
+
+        service = RegionService(sentinel.advertiser)
+        uuid = factory.make_UUID()
+        service.connections[uuid].update({c1, c2})
+
+        def check(client):
+            self.assertThat(client, Equals(common.Client(c2)))
+
+        return service.getClientFor(uuid).addCallback(check)
+
     @wait_for_reactor
     def test_getAllClients_empty(self):
         service = RegionService(sentinel.advertiser)
@@ -18,6 +18,7 @@ import random
 from random import randint
 import time
 from unittest import skip
+from unittest.mock import call
 from urllib.parse import urlparse
 
 from crochet import wait_for
@@ -60,10 +61,12 @@ from maasserver.utils.orm import (
     transactional,
 )
 from maasserver.utils.threads import deferToDatabase
+from maastesting.djangotestcase import count_queries
 from maastesting.matchers import (
     MockCalledOnce,
     MockCalledOnceWith,
     MockCalledWith,
+    MockCallsMatch,
 )
 from maastesting.testcase import MAASTestCase
 from maastesting.twisted import TwistedLoggerFixture
@@ -93,6 +96,7 @@ from provisioningserver.rpc.region import (
     RequestRackRefresh,
     SendEvent,
     SendEventMACAddress,
+    SendEvents,
     UpdateInterfaces,
     UpdateLease,
     UpdateNodePowerState,
@@ -999,6 +1003,150 @@ class TestRegionProtocol_SendEventMACAddress(MAASTransactionServerTestCase):
                 "'%s'.", name, event_description, mac_address))
 
 
+class TestRegionProtocol_SendEvents(MAASTransactionServerTestCase):
+
+    def setUp(self):
+        super(TestRegionProtocol_SendEvents, self).setUp()
+        self.useFixture(RegionEventLoopFixture("database-tasks"))
+
+    def test_send_events_is_registered(self):
+        protocol = Region()
+        responder = protocol.locateResponder(SendEvents.commandName)
+        self.assertIsNotNone(responder)
+
+    @transactional
+    def get_events(self, type_name):
+        return [
+            (event.node.system_id, event.description, event.created)
+            for event in Event.objects.filter(
+                type__name=type_name).select_related('node').order_by('id')
+        ]
+
+    @transactional
+    def create_event_type(self, name):
+        EventType.objects.create(name=name, description="", level=0)
+
+    @transactional
+    def make_interface(self):
+        interface = factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
+        return interface.node.system_id, interface.mac_address.get_raw()
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_send_events_stores_events_for_system_ids_and_macs(self):
+        timestamp = datetime.now() - timedelta(seconds=randint(99, 99999))
+        self.patch(regionservice, "datetime").now.return_value = timestamp
+        name = factory.make_name('type_name')
+        yield deferToDatabase(self.create_event_type, name)
+        system_id, mac_address = yield deferToDatabase(self.make_interface)
+
+        yield eventloop.start()
+        try:
+            response = yield call_responder(
+                Region(), SendEvents, {
+                    'events': [
+                        {
+                            'system_id': system_id,
+                            'type_name': name,
+                            'description': 'by system_id',
+                        },
+                        {
+                            'mac_address': mac_address.upper(),
+                            'type_name': name,
+                            'description': 'by mac_address',
+                        },
+                    ],
+                })
+        finally:
+            yield eventloop.reset()
+
+        self.assertEqual({}, response)
+        events = yield deferToDatabase(self.get_events, name)
+        self.assertEqual([
+            (system_id, 'by system_id', timestamp),
+            (system_id, 'by mac_address', timestamp),
+        ], events)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_send_events_drops_unknown_types_and_nodes(self):
+        maaslog = self.patch(events_module, 'maaslog')
+        name = factory.make_name('type_name')
+        unknown_name = factory.make_name('type_name')
+        yield deferToDatabase(self.create_event_type, name)
+        system_id, _ = yield deferToDatabase(self.make_interface)
+        unknown_mac_address = factory.make_mac_address()
+
+        yield eventloop.start()
+        try:
+            yield call_responder(
+                Region(), SendEvents, {
+                    'events': [
+                        {
+                            'system_id': system_id,
+                            'type_name': unknown_name,
+                            'description': 'unknown type',
+                        },
+                        {
+                            'mac_address': unknown_mac_address,
+                            'type_name': name,
+                            'description': 'unknown node',
+                        },
+                        {
+                            'system_id': system_id,
+                            'type_name': name,
+                            'description': 'known',
+                        },
+                    ],
+                })
+        finally:
+            yield eventloop.reset()
+
+        events = yield deferToDatabase(self.get_events, name)
+        self.assertEqual(['known'], [event[1] for event in events])
+        self.assertThat(maaslog.debug, MockCallsMatch(
+            call(
+                "Event '%s: %s' sent with unregistered event type.",
+                unknown_name, 'unknown type'),
+            call(
+                "Event '%s: %s' sent for non-existent node '%s'.",
+                name, 'unknown node', unknown_mac_address)))
+
+    @transactional
+    def make_events(self, name, count):
+        interfaces = [
+            factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
+            for _ in range(count)
+        ]
+        return [
+            {
+                'system_id': interface.node.system_id,
+                'type_name': name,
+                'description': factory.make_name('description'),
+            }
+            for interface in interfaces
+        ] + [
+            {
+                'mac_address': interface.mac_address.get_raw(),
+                'type_name': name,
+                'description': factory.make_name('description'),
+            }
+            for interface in interfaces
+        ]
+
+    def test_send_events_uses_constant_number_of_queries(self):
+        name = factory.make_name('type_name')
+        self.create_event_type(name)
+        count_2, _ = count_queries(
+            events_module.send_events, self.make_events(name, 1),
+            datetime.now())
+        count_20, _ = count_queries(
+            events_module.send_events, self.make_events(name, 10),
+            datetime.now())
+        self.assertEqual(count_2, count_20)
+        self.assertEqual(22, len(self.get_events(name)))
+
+
 class TestRegionProtocol_UpdateServices(MAASTransactionServerTestCase):
 
     def setUp(self):
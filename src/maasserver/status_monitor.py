@@ -26,6 +26,7 @@ from maasserver.node_status import (
 from maasserver.utils.orm import transactional
 from maasserver.utils.threads import deferToDatabase
 from metadataserver.enum import SCRIPT_STATUS
+from metadataserver.models.scriptset import DEFERRED_SCRIPT_RESULT_FIELDS
 from provisioningserver.refresh.node_info_scripts import NODE_INFO_SCRIPTS
 from provisioningserver.utils.twisted import synchronous
 from twisted.application.internet import TimerService
@@ -88,7 +89,8 @@ def mark_nodes_failed_after_missing_script_timeout():
 
         # Check for scripts which have gone past their timeout.
         script_qs = script_set.scriptresult_set.filter(
-            status=SCRIPT_STATUS.RUNNING).prefetch_related('script')
+            status=SCRIPT_STATUS.RUNNING).prefetch_related('script').defer(
+                *DEFERRED_SCRIPT_RESULT_FIELDS)
         for script_result in script_qs:
             if script_result.name in NODE_INFO_SCRIPTS:
                 timeout = NODE_INFO_SCRIPTS[script_result.name]['timeout']
@@ -13,6 +13,7 @@ from django.db import connections
 from maasserver import (
     bootresources,
     eventloop,
+    events_cleanup,
     nonces_cleanup,
     rack_controller,
     region_controller,
@@ -32,7 +33,10 @@ from maasserver.utils.orm import (
 )
 from maastesting.factory import factory
 from maastesting.testcase import MAASTestCase
-from metadataserver import api_twisted
+from metadataserver import (
+    api_twisted,
+    post_commissioning,
+)
 from testtools.matchers import (
     Equals,
     IsInstance,
@@ -234,6 +238,28 @@ class TestFactories(MAASTestCase):
         self.assertTrue(
             eventloop.loop.factories["nonce-cleanup"]["only_on_master"])
 
+    def test_make_NonceFlushService(self):
+        service = eventloop.make_NonceFlushService()
+        self.assertThat(service, IsInstance(
+            nonces_cleanup.NonceFlushService))
+        # It is registered as a factory in RegionEventLoop.
+        self.assertIs(
+            eventloop.make_NonceFlushService,
+            eventloop.loop.factories["nonce-flush"]["factory"])
+        self.assertFalse(
+            eventloop.loop.factories["nonce-flush"]["only_on_master"])
+
+    def test_make_EventsCleanupService(self):
+        service = eventloop.make_EventsCleanupService()
+        self.assertThat(service, IsInstance(
+            events_cleanup.EventsCleanupService))
+        # It is registered as a factory in RegionEventLoop.
+        self.assertIs(
+            eventloop.make_EventsCleanupService,
+            eventloop.loop.factories["events-cleanup"]["factory"])
+        self.assertTrue(
+            eventloop.loop.factories["events-cleanup"]["only_on_master"])
+
     def test_make_StatusMonitorService(self):
         service = eventloop.make_StatusMonitorService()
         self.assertThat(service, IsInstance(
@@ -328,6 +354,17 @@ class TestFactories(MAASTestCase):
         self.assertFalse(
             eventloop.loop.factories["status-worker"]["only_on_master"])
 
+    def test_make_PostCommissioningService(self):
+        service = eventloop.make_PostCommissioningService()
+        self.assertThat(service, IsInstance(
+            post_commissioning.PostCommissioningService))
+        # It is registered as a factory in RegionEventLoop.
+        self.assertIs(
+            eventloop.make_PostCommissioningService,
+            eventloop.loop.factories["post-commissioning"]["factory"])
+        self.assertFalse(
+            eventloop.loop.factories["post-commissioning"]["only_on_master"])
+
 
 class TestDisablingDatabaseConnections(MAASServerTestCase):
 
@@ -0,0 +1,92 @@
+# Copyright 2017 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for the events cleanup module."""
+
+__all__ = []
+
+from datetime import (
+    datetime,
+    timedelta,
+)
+
+from maasserver import events_cleanup
+from maasserver.events_cleanup import (
+    cleanup_old_events,
+    delete_old_events,
+    EventsCleanupService,
+    get_retention_cutoff,
+)
+from maasserver.models import (
+    Config,
+    Event,
+)
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockNotCalled,
+)
+from twisted.internet.defer import maybeDeferred
+from twisted.internet.task import Clock
+
+
+def make_old_event(days):
+    event = factory.make_Event()
+    event.save(_created=datetime.now() - timedelta(days=days))
+    return event
+
+
+class TestCleanupOldEvents(MAASServerTestCase):
+
+    def test_get_retention_cutoff_returns_None_when_disabled(self):
+        Config.objects.set_config('events_retention_days', 0)
+        self.assertIsNone(get_retention_cutoff())
+
+    def test_get_retention_cutoff_returns_time(self):
+        Config.objects.set_config('events_retention_days', 7)
+        cutoff = get_retention_cutoff()
+        expected = datetime.now() - timedelta(days=7)
+        self.assertLess(abs(expected - cutoff), timedelta(minutes=1))
+
+    def test_delete_old_events_deletes_up_to_batch_size(self):
+        old_events = [make_old_event(10) for _ in range(3)]
+        new_event = factory.make_Event()
+        cutoff = datetime.now() - timedelta(days=5)
+        self.assertEqual(2, delete_old_events(cutoff, batch_size=2))
+        # The oldest events are deleted first.
+        self.assertItemsEqual(
+            [old_events[2], new_event], Event.objects.all())
+
+    def test_cleanup_old_events_does_nothing_when_disabled(self):
+        Config.objects.set_config('events_retention_days', 0)
+        make_old_event(1000)
+        self.assertEqual(0, cleanup_old_events())
+        self.assertEqual(1, Event.objects.count())
+
+    def test_cleanup_old_events_deletes_in_batches(self):
+        Config.objects.set_config('events_retention_days', 5)
+        for _ in range(5):
+            make_old_event(10)
+        new_event = factory.make_Event()
+        self.assertEqual(5, cleanup_old_events(batch_size=2))
+        self.assertItemsEqual([new_event], Event.objects.all())
+
+
+class TestEventsCleanupService(MAASServerTestCase):
+
+    def test_runs_cleanup_every_hour(self):
+        cleanup_old_events = self.patch(events_cleanup, "cleanup_old_events")
+        self.patch(events_cleanup, "deferToDatabase", maybeDeferred)
+        service = EventsCleanupService()
+        service.clock = Clock()
+        self.assertEqual(60 * 60, service.step)
+        self.assertThat(cleanup_old_events, MockNotCalled())
+        service.startService()
+        self.assertThat(cleanup_old_events, MockCalledOnceWith())
+        service.stopService()
+
+    def test_interval_can_be_set(self):
+        interval = self.getUniqueInteger()
+        service = EventsCleanupService(interval)
+        self.assertEqual(interval, service.step)
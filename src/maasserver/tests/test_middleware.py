@@ -9,7 +9,6 @@ import http.client
 import json
 import logging
 import random
-from unittest.mock import Mock
 
 from crochet import TimeoutError
 from django.conf import settings
@@ -18,15 +17,9 @@ from django.core.exceptions import (
     PermissionDenied,
     ValidationError,
 )
-from django.core.urlresolvers import reverse
 from django.http import HttpResponse
 from fixtures import FakeLogger
 from maasserver import middleware as middleware_module
-from maasserver.components import (
-    get_persistent_error,
-    register_persistent_error,
-)
-from maasserver.enum import COMPONENT
 from maasserver.exceptions import (
     MAASAPIException,
     MAASAPINotFound,
@@ -37,7 +30,6 @@ from maasserver.middleware import (
     CSRFHelperMiddleware,
     DebuggingLoggerMiddleware,
     ExceptionMiddleware,
-    ExternalComponentsMiddleware,
     RPCErrorsMiddleware,
 )
 from maasserver.testing import extract_redirect
@@ -47,7 +39,6 @@ from maasserver.utils.orm import (
     make_deadlock_failure,
     make_serialization_failure,
 )
-from maastesting.matchers import MockCalledOnceWith
 from maastesting.utils import sample_binary_data
 from provisioningserver.rpc.exceptions import (
     NoConnectionsAvailable,
@@ -462,93 +453,6 @@ class APIRPCErrorsMiddlewareTest(MAASServerTestCase):
         self.assertIsNone(response)
 
 
-class ExternalComponentsMiddlewareTest(MAASServerTestCase):
-    """Tests for the ExternalComponentsMiddleware."""
-
-    def test__checks_connectivity_of_rack_controllers(self):
-        getAllClients = self.patch(middleware_module, 'getAllClients')
-
-        request = factory.make_fake_request(factory.make_string(), 'GET')
-        middleware = ExternalComponentsMiddleware()
-        middleware.process_request(request)
-
-        self.assertThat(getAllClients, MockCalledOnceWith())
-
-    def test__registers_error_if_all_rack_controllers_are_disconnected(self):
-        factory.make_RackController()
-
-        getAllClients = self.patch(middleware_module, 'getAllClients')
-        getAllClients.return_value = []
-
-        request = factory.make_fake_request(factory.make_string(), 'GET')
-        middleware = ExternalComponentsMiddleware()
-        middleware.process_request(request)
-
-        error = get_persistent_error(COMPONENT.RACK_CONTROLLERS)
-        self.assertEqual(
-            "One rack controller is not yet connected to the region. Visit "
-            "the <a href=\"%s#/nodes?tab=controllers\">"
-            "rack controllers page</a> for more "
-            "information." % (
-                reverse('index')),
-            error)
-
-    def test__registers_error_if_any_clusters_are_disconnected(self):
-        rack_controllers = [
-            factory.make_RackController(),
-            factory.make_RackController(),
-            factory.make_RackController(),
-        ]
-
-        getAllClients = self.patch(middleware_module, 'getAllClients')
-        getAllClients.return_value = [
-            Mock(ident=rack_controllers[0].system_id)]
-
-        request = factory.make_fake_request(factory.make_string(), 'GET')
-        middleware = ExternalComponentsMiddleware()
-        middleware.process_request(request)
-
-        error = get_persistent_error(COMPONENT.RACK_CONTROLLERS)
-        self.assertEqual(
-            "2 rack controllers are not yet connected to the region. Visit "
-            "the <a href=\"%s#/nodes?tab=controllers\">"
-            "rack controllers page</a> for more "
-            "information." %
-            reverse('index'),
-            error)
-
-    def test__removes_error_once_all_clusters_are_connected(self):
-        rack_controllers = [
-            factory.make_RackController(),
-            factory.make_RackController(),
-        ]
-
-        getAllClients = self.patch(middleware_module, 'getAllClients')
-        getAllClients.return_value = [
-            Mock(ident=rack.system_id) for rack in rack_controllers
-        ]
-
-        register_persistent_error(
-            COMPONENT.RACK_CONTROLLERS, "Who flung that batter pudding?")
-
-        request = factory.make_fake_request(factory.make_string(), 'GET')
-        middleware = ExternalComponentsMiddleware()
-        middleware.process_request(request)
-
-        error = get_persistent_error(COMPONENT.RACK_CONTROLLERS)
-        self.assertIsNone(error)
-
-    def test__does_not_suppress_exceptions_from_connectivity_checks(self):
-        middleware = ExternalComponentsMiddleware()
-        error_type = factory.make_exception_type()
-        check_rack_controller_connectivity = self.patch(
-            middleware, "_check_rack_controller_connectivity")
-        check_rack_controller_connectivity.side_effect = error_type
-        self.assertRaises(error_type, middleware.process_request, None)
-        self.assertThat(
-            check_rack_controller_connectivity, MockCalledOnceWith())
-
-
 class CSRFHelperMiddlewareTest(MAASServerTestCase):
     """Tests for the CSRFHelperMiddleware."""
 
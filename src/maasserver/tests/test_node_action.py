@@ -25,6 +25,7 @@ from maasserver.enum import (
 )
 from maasserver.exceptions import NodeActionError
 from maasserver.models import (
+    Node,
     signals,
     StaticIPAddress,
 )
@@ -36,6 +37,7 @@ from maasserver.node_action import (
     compile_node_actions,
     Delete,
     Deploy,
+    execute_bulk_node_action,
     ExitRescueMode,
     ImportImages,
     MarkBroken,
@@ -77,6 +79,7 @@ from metadataserver.enum import (
     SCRIPT_STATUS,
     SCRIPT_TYPE,
 )
+from metadataserver.models import PostCommissioningTask
 from netaddr import IPNetwork
 from provisioningserver.utils.shell import ExternalProcessError
 from testtools.matchers import Equals
@@ -464,6 +467,15 @@ class TestAcquireNodeAction(MAASServerTestCase):
         self.assertThat(
             node_acquire.__exit__, MockCalledOnceWith(None, None, None))
 
+    def test_Acquire_refuses_node_with_pending_post_commissioning(self):
+        node = factory.make_Node(
+            interface=True, status=NODE_STATUS.READY,
+            power_type='manual', with_boot_disk=True)
+        PostCommissioningTask.objects.enqueue(node)
+        user = factory.make_User()
+        self.assertRaises(NodeActionError, Acquire(node, user).execute)
+        self.assertIsNone(reload_object(node).owner)
+
 
 class TestDeployAction(MAASServerTestCase):
 
@@ -1141,3 +1153,62 @@ class TestActionsErrorHandling(MAASServerTestCase):
             get_error_message_for_exception(
                 action.node.stop_rescue_mode.side_effect),
             str(exception))
+
+
+class TestExecuteBulkNodeAction(MAASServerTestCase):
+
+    def test__performs_action_on_every_node(self):
+        admin = factory.make_admin()
+        zone = factory.make_Zone()
+        nodes = [factory.make_Node() for _ in range(3)]
+        results = execute_bulk_node_action(
+            Node.objects.filter(id__in=[node.id for node in nodes]),
+            admin, SetZone.name, params={"zone_id": zone.id})
+        self.assertEqual(
+            {node.system_id: None for node in nodes}, dict(results))
+        self.assertEqual(
+            [zone] * 3, [reload_object(node).zone for node in nodes])
+
+    def test__reports_nodes_the_action_is_not_available_for(self):
+        user = factory.make_User()
+        owned = factory.make_Node(
+            interface=True, status=NODE_STATUS.ALLOCATED,
+            power_type='manual', owner=user)
+        other = factory.make_Node(
+            status=NODE_STATUS.ALLOCATED, owner=factory.make_User())
+        self.patch(Node, "_start").return_value = None
+        results = execute_bulk_node_action(
+            [owned, other], user, PowerOn.name)
+        self.assertEqual({
+            owned.system_id: None,
+            other.system_id: "on action is not available for this node.",
+        }, dict(results))
+
+    def test__rolls_back_only_the_failed_node(self):
+        admin = factory.make_admin()
+        nodes = [
+            factory.make_Node(status=NODE_STATUS.READY) for _ in range(3)]
+        failing = nodes[1]
+
+        def mark_broken(node, user, comment):
+            node.status = NODE_STATUS.BROKEN
+            node.save()
+            if node.id == failing.id:
+                raise NodeActionError("Broken beyond repair.")
+
+        self.patch(Node, "mark_broken", mark_broken)
+        results = execute_bulk_node_action(nodes, admin, MarkBroken.name)
+        self.assertEqual({
+            nodes[0].system_id: None,
+            nodes[1].system_id: "Broken beyond repair.",
+            nodes[2].system_id: None,
+        }, dict(results))
+        self.assertEqual(
+            [NODE_STATUS.BROKEN, NODE_STATUS.READY, NODE_STATUS.BROKEN],
+            [reload_object(node).status for node in nodes])
+
+    def test__raises_error_for_unknown_action(self):
+        self.assertRaises(
+            NodeActionError, execute_bulk_node_action,
+            [factory.make_Node()], factory.make_admin(),
+            factory.make_name("action"))
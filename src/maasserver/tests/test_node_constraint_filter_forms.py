@@ -6,9 +6,11 @@
 __all__ = []
 
 from random import randint
+import threading
 
 from django import forms
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from maasserver.enum import (
     FILESYSTEM_GROUP_TYPE,
     FILESYSTEM_TYPE,
@@ -36,8 +38,15 @@ from maasserver.testing.factory import (
     factory,
     RANDOM,
 )
-from maasserver.testing.testcase import MAASServerTestCase
+from maasserver.testing.testcase import (
+    MAASServerTestCase,
+    MAASTransactionServerTestCase,
+)
 from maasserver.utils import ignore_unused
+from maasserver.utils.orm import (
+    get_first,
+    transactional,
+)
 from testtools.matchers import (
     Contains,
     ContainsAll,
@@ -925,6 +934,17 @@ class TestAcquireNodeForm(MAASServerTestCase):
         factory.make_Filesystem(mount_point='/', block_device=virtual)
         self.assertConstrainedNodes([node1], {'storage': '4'})
 
+    def test_storage_only_matches_candidate_nodes(self):
+        node1 = factory.make_Node(with_boot_disk=False)
+        factory.make_PhysicalBlockDevice(node=node1, formatted_root=True)
+        node2 = factory.make_Node(with_boot_disk=False)
+        factory.make_PhysicalBlockDevice(node=node2, formatted_root=True)
+        form = AcquireNodeForm({'name': node1.hostname, 'storage': '0'})
+        self.assertTrue(form.is_valid(), dict(form.errors))
+        filtered_nodes, storage, _ = form.filter_nodes(Machine.objects.all())
+        self.assertItemsEqual([node1], filtered_nodes)
+        self.assertItemsEqual([node1.id], storage)
+
     def test_storage_multi_contraint_matches_physical_and_unused(self):
         node1 = factory.make_Node(with_boot_disk=False)
         factory.make_PhysicalBlockDevice(
@@ -1219,6 +1239,19 @@ class TestAcquireNodeForm(MAASServerTestCase):
         filtered_nodes, _, _ = form.filter_nodes(Machine.objects)
         self.assertItemsEqual([node1], filtered_nodes)
 
+    def test_interfaces_only_matches_candidate_nodes(self):
+        fabric = factory.make_Fabric(class_type="10g")
+        node1 = factory.make_Node_with_Interface_on_Subnet(fabric=fabric)
+        node2 = factory.make_Node_with_Interface_on_Subnet(fabric=fabric)
+        form = AcquireNodeForm({
+            'name': node1.hostname,
+            'interfaces': 'label:fabric_class=10g'})
+        self.assertTrue(form.is_valid(), dict(form.errors))
+        filtered_nodes, _, interfaces = form.filter_nodes(Machine.objects)
+        self.assertItemsEqual([node1], filtered_nodes)
+        self.assertItemsEqual([node1.id], interfaces['label'])
+        self.assertNotIn(node2.id, interfaces['label'])
+
     def test_interfaces_filters_work_with_multiple_labels(self):
         fabric1 = factory.make_Fabric(class_type="1g")
         fabric2 = factory.make_Fabric(class_type="10g")
@@ -1434,3 +1467,56 @@ class TestAcquireNodeFormOrdersResults(MAASServerTestCase):
         self.assertEqual(
             sorted_nodes,
             list(filtered_nodes))
+
+    def test_lock_unclaimed_nodes_orders_based_on_cost(self):
+        nodes = [
+            factory.make_Node(
+                cpu_count=randint(5, 32),
+                memory=randint(1024, 256 * 1024)
+            )
+            for _ in range(4)]
+        sorted_nodes = sorted(
+            nodes, key=lambda n: n.cpu_count + n.memory / 1024)
+        form = AcquireNodeForm(data={'cpu_count': 4})
+        self.assertTrue(form.is_valid(), form.errors)
+        filtered_nodes, _, _ = form.filter_nodes(Machine.objects.all())
+        self.assertEqual(
+            sorted_nodes,
+            list(form.lock_unclaimed_nodes(filtered_nodes)))
+
+
+class TestAcquireNodeFormLocksUnclaimedNodes(MAASTransactionServerTestCase):
+
+    def claim_node(self, form):
+        filtered_nodes, _, _ = form.filter_nodes(Machine.objects.all())
+        return get_first(form.lock_unclaimed_nodes(filtered_nodes)[:1])
+
+    def test_skips_nodes_claimed_by_other_transactions(self):
+        with transaction.atomic():
+            cheap = factory.make_Node(cpu_count=1, memory=1024)
+            dear = factory.make_Node(cpu_count=2, memory=2048)
+        form = AcquireNodeForm(data={})
+        self.assertTrue(form.is_valid(), form.errors)
+
+        claimed = []
+        held = threading.Event()
+        done = threading.Event()
+
+        @transactional
+        def claim_in_other_thread():
+            claimed.append(self.claim_node(form))
+            held.set()
+            done.wait(10)
+
+        thread = threading.Thread(target=claim_in_other_thread)
+        thread.start()
+        try:
+            held.wait(10)
+            with transaction.atomic():
+                node = self.claim_node(form)
+        finally:
+            done.set()
+            thread.join()
+
+        self.assertEqual([cheap], claimed)
+        self.assertEqual(dear, node)
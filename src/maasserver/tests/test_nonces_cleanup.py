@@ -18,15 +18,18 @@ from maasserver.nonces_cleanup import (
     get_time_string,
     key_prefix,
     NonceCleanupService,
+    NonceFlushService,
     time as module_time,
     timestamp_threshold,
 )
+from maasserver.api.auth import NonceStore
 from maasserver.testing.testcase import MAASServerTestCase
 from maastesting.matchers import (
     MockCalledOnceWith,
     MockCallsMatch,
     MockNotCalled,
 )
+from maastesting.twisted import TwistedLoggerFixture
 from piston3.models import Nonce
 from testtools.matchers import (
     ContainsAll,
@@ -161,3 +164,41 @@ class TestNonceCleanupService(MAASServerTestCase):
         interval = self.getUniqueInteger()
         service = NonceCleanupService(interval)
         self.assertEqual(interval, service.step)
+
+
+class TestNonceFlushService(MAASServerTestCase):
+
+    def setUp(self):
+        super(TestNonceFlushService, self).setUp()
+        self.nonce_store = NonceStore()
+        self.patch(nonces_cleanup, "nonce_store", self.nonce_store)
+        # Making `deferToDatabase` use the current thread helps testing.
+        self.patch(nonces_cleanup, "deferToDatabase", maybeDeferred)
+
+    def test_init_with_default_interval(self):
+        self.assertEqual(1, NonceFlushService().step)
+
+    def test_flush_saves_pending_nonces(self):
+        self.nonce_store.add("consumer", "token", "nonce1")
+        self.nonce_store.add("consumer", "token", "nonce2")
+        NonceFlushService().flush()
+        self.assertItemsEqual(
+            ["nonce1", "nonce2"],
+            Nonce.objects.filter(token_key="token").values_list(
+                "key", flat=True))
+        self.assertEqual([], self.nonce_store.pending)
+
+    def test_flush_does_nothing_without_pending_nonces(self):
+        save_nonces = self.patch(nonces_cleanup, "save_nonces")
+        NonceFlushService().flush()
+        self.assertThat(save_nonces, MockNotCalled())
+
+    def test_flush_restores_nonces_that_could_not_be_saved(self):
+        self.patch(nonces_cleanup, "save_nonces").side_effect = (
+            ZeroDivisionError())
+        self.nonce_store.add("consumer", "token", "nonce")
+        with TwistedLoggerFixture() as logger:
+            NonceFlushService().flush()
+        self.assertEqual(
+            [("consumer", "token", "nonce")], self.nonce_store.pending)
+        self.assertIn("Failed to save OAuth nonces.", logger.output)
@@ -95,11 +95,13 @@ class TestRegionServiceMaker(MAASTestCase):
             "active-discovery",
             "database-tasks",
             "dns-publication-cleanup",
+            "events-cleanup",
             "import-resources",
             "import-resources-progress",
             "networks-monitor",
             "nonce-cleanup",
             "ntp",
+            "post-commissioning",
             "postgres-listener",
             "rack-controller",
             "region-controller",
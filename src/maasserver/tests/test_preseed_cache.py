@@ -0,0 +1,130 @@
+# Copyright 2017 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `maasserver.preseed_cache`."""
+
+__all__ = []
+
+from contextlib import closing
+import logging
+from unittest.mock import Mock
+
+from django.db import connection
+from fixtures import FakeLogger
+from maasserver import (
+    preseed_network,
+    preseed_storage,
+)
+from maasserver.enum import (
+    FILESYSTEM_TYPE,
+    NODE_STATUS,
+)
+from maasserver.preseed_cache import (
+    get_cached_config,
+    warm_curtin_config,
+)
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockNotCalled,
+)
+
+
+class TestGetCachedConfig(MAASServerTestCase):
+
+    def cache_config(self, node, kind="storage", key="key"):
+        config = factory.make_name("config")
+        self.assertEqual(
+            config, get_cached_config(node, kind, key, lambda: config))
+        return config
+
+    def assertCached(self, node, config, kind="storage", key="key"):
+        generate = Mock()
+        self.assertEqual(config, get_cached_config(node, kind, key, generate))
+        self.assertThat(generate, MockNotCalled())
+
+    def assertRegenerates(self, node, kind="storage", key="key"):
+        generate = Mock(return_value=factory.make_name("config"))
+        self.assertEqual(
+            generate.return_value,
+            get_cached_config(node, kind, key, generate))
+        self.assertThat(generate, MockCalledOnceWith())
+
+    def test__returns_cached_config(self):
+        node = factory.make_Node()
+        config = self.cache_config(node)
+        self.assertCached(node, config)
+
+    def test__regenerates_when_key_changes(self):
+        node = factory.make_Node()
+        self.cache_config(node, key="key")
+        self.assertRegenerates(node, key="other")
+
+    def test__caches_each_kind_separately(self):
+        node = factory.make_Node()
+        self.cache_config(node, kind="storage")
+        self.assertRegenerates(node, kind="network")
+
+    def test__regenerates_after_storage_changes(self):
+        node = factory.make_Node(with_boot_disk=False)
+        block_device = factory.make_PhysicalBlockDevice(node=node)
+        self.cache_config(node, kind="storage")
+        network_config = self.cache_config(node, kind="network")
+        factory.make_Filesystem(
+            block_device=block_device, fstype=FILESYSTEM_TYPE.EXT4)
+        self.assertRegenerates(node, kind="storage")
+        self.assertCached(node, network_config, kind="network")
+
+    def test__regenerates_after_interface_changes(self):
+        node = factory.make_Node(interface=True)
+        self.cache_config(node, kind="network")
+        interface = node.get_boot_interface()
+        interface.params = {"mtu": 9000}
+        interface.save()
+        self.assertRegenerates(node, kind="network")
+
+    def test__regenerates_after_vlan_changes(self):
+        node = factory.make_Node(interface=True)
+        self.cache_config(node, kind="network")
+        vlan = node.get_boot_interface().vlan
+        vlan.mtu = 9000
+        vlan.save()
+        self.assertRegenerates(node, kind="network")
+
+    def test__forgets_deleted_node(self):
+        node = factory.make_Node(interface=True)
+        self.cache_config(node, kind="network")
+        node_id = node.id
+        node.delete()
+        with closing(connection.cursor()) as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM maasserver_curtin_config "
+                "WHERE node_id = %s", [node_id])
+            self.assertEqual((0,), cursor.fetchone())
+
+
+class TestWarmCurtinConfig(MAASServerTestCase):
+
+    def test__caches_storage_and_network_config(self):
+        node = factory.make_Node(interface=True, status=NODE_STATUS.DEPLOYING)
+        warm_curtin_config(node)
+        generate_storage = self.patch(
+            preseed_storage.CurtinStorageGenerator, "generate")
+        generate_network = self.patch(
+            preseed_network.NodeNetworkConfiguration, "_generate_links")
+        preseed_storage.compose_curtin_storage_config(node)
+        preseed_network.compose_curtin_network_config(node)
+        self.assertThat(generate_storage, MockNotCalled())
+        self.assertThat(generate_network, MockNotCalled())
+
+    def test__logs_failures(self):
+        node = factory.make_Node()
+        self.patch(
+            preseed_storage, "compose_curtin_storage_config").side_effect = (
+                ValueError("Unknown block device"))
+        with FakeLogger("maas", logging.WARNING) as logger:
+            warm_curtin_config(node)
+        self.assertIn(
+            "Unable to render curtin configuration: Unknown block device",
+            logger.output)
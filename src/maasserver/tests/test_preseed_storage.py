@@ -26,9 +26,13 @@ from maasserver.models.partitiontable import (
     PARTITION_TABLE_EXTRA_SPACE,
     PREP_PARTITION_SIZE,
 )
-from maasserver.preseed_storage import compose_curtin_storage_config
+from maasserver.preseed_storage import (
+    compose_curtin_storage_config,
+    CurtinStorageGenerator,
+)
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
+from maastesting.djangotestcase import count_queries
 from testtools.content import text_content
 from testtools.matchers import (
     ContainsDict,
@@ -1506,3 +1510,32 @@ class TestComplexDiskLayoutWithISCSI(
         node._create_acquired_filesystems()
         config = compose_curtin_storage_config(node)
         self.assertStorageConfig(self.STORAGE_CONFIG, config)
+
+
+class TestCurtinStorageGeneratorQueries(MAASServerTestCase):
+
+    def make_node(self, num_disks):
+        node = factory.make_Node(
+            status=NODE_STATUS.ALLOCATED, architecture="amd64/generic",
+            bios_boot_method="pxe", with_boot_disk=False)
+        for _ in range(num_disks):
+            block_device = factory.make_PhysicalBlockDevice(
+                node=node, size=8 * 1024 ** 3)
+            partition_table = factory.make_PartitionTable(
+                table_type=PARTITION_TABLE_TYPE.MBR, block_device=block_device)
+            for _ in range(2):
+                partition = factory.make_Partition(
+                    partition_table=partition_table, size=1024 ** 3)
+                factory.make_Filesystem(
+                    partition=partition, fstype=FILESYSTEM_TYPE.EXT4,
+                    mount_point=factory.make_absolute_path(), acquired=True)
+        return node
+
+    def test__query_count_is_independent_of_number_of_disks(self):
+        counts = []
+        for num_disks in (1, 5):
+            node = self.make_node(num_disks)
+            count, _ = count_queries(
+                lambda: CurtinStorageGenerator(node).generate())
+            counts.append(count)
+        self.assertEqual(counts[0], counts[1])
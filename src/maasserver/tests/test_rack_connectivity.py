@@ -0,0 +1,85 @@
+# Copyright 2017 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `maasserver.rack_connectivity`."""
+
+__all__ = []
+
+from django.core.urlresolvers import reverse
+from maasserver.components import (
+    get_persistent_error,
+    register_persistent_error,
+)
+from maasserver.enum import COMPONENT
+from maasserver.models import Notification
+from maasserver.rack_connectivity import update_rack_controller_connectivity
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from maasserver.utils.orm import reload_object
+from maastesting.djangotestcase import count_queries
+
+
+class TestUpdateRackControllerConnectivity(MAASServerTestCase):
+
+    def test__registers_error_if_all_rack_controllers_are_disconnected(self):
+        factory.make_RackController()
+        update_rack_controller_connectivity()
+        error = get_persistent_error(COMPONENT.RACK_CONTROLLERS)
+        self.assertEqual(
+            "One rack controller is not yet connected to the region. Visit "
+            "the <a href=\"%s#/nodes?tab=controllers\">"
+            "rack controllers page</a> for more "
+            "information." % reverse('index'),
+            error)
+
+    def test__registers_error_if_any_rack_controllers_are_disconnected(self):
+        factory.make_RegionRackRPCConnection()
+        factory.make_RackController()
+        factory.make_RackController()
+        update_rack_controller_connectivity()
+        error = get_persistent_error(COMPONENT.RACK_CONTROLLERS)
+        self.assertEqual(
+            "2 rack controllers are not yet connected to the region. Visit "
+            "the <a href=\"%s#/nodes?tab=controllers\">"
+            "rack controllers page</a> for more "
+            "information." % reverse('index'),
+            error)
+
+    def test__removes_error_once_all_rack_controllers_are_connected(self):
+        factory.make_RegionRackRPCConnection()
+        factory.make_RegionRackRPCConnection()
+        register_persistent_error(
+            COMPONENT.RACK_CONTROLLERS, "Who flung that batter pudding?")
+        update_rack_controller_connectivity()
+        self.assertIsNone(get_persistent_error(COMPONENT.RACK_CONTROLLERS))
+
+    def test__ignores_machines_and_region_controllers(self):
+        factory.make_Node()
+        factory.make_RegionController()
+        update_rack_controller_connectivity()
+        self.assertIsNone(get_persistent_error(COMPONENT.RACK_CONTROLLERS))
+
+    def test__leaves_unchanged_error_alone(self):
+        factory.make_RackController()
+        update_rack_controller_connectivity()
+        notification = Notification.objects.get(
+            ident=COMPONENT.RACK_CONTROLLERS)
+        updated = notification.updated
+        update_rack_controller_connectivity()
+        self.assertEqual(updated, reload_object(notification).updated)
+
+    def test__updates_as_rack_controllers_connect_and_disconnect(self):
+        rack_controller = factory.make_RackController()
+        connection = factory.make_RegionRackRPCConnection(
+            rack_controller=rack_controller)
+        self.assertIsNone(get_persistent_error(COMPONENT.RACK_CONTROLLERS))
+        connection.delete()
+        self.assertIsNotNone(get_persistent_error(COMPONENT.RACK_CONTROLLERS))
+
+    def test__uses_constant_number_of_queries(self):
+        factory.make_RackController()
+        count1, _ = count_queries(update_rack_controller_connectivity)
+        for _ in range(3):
+            factory.make_RackController()
+        count2, _ = count_queries(update_rack_controller_connectivity)
+        self.assertEqual(count1, count2)
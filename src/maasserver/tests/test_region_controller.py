@@ -24,6 +24,7 @@ from maastesting.matchers import (
 )
 from testtools.matchers import MatchesStructure
 from twisted.internet import reactor
+from twisted.internet.task import Clock
 from twisted.internet.defer import (
     fail,
     inlineCallbacks,
@@ -107,6 +108,51 @@ class TestRegionControllerService(MAASServerTestCase):
         self.assertTrue(service.needsDNSUpdate)
         self.assertThat(mock_startProcessing, MockCalledOnceWith())
 
+    def test_markDNSForUpdate_coalesces_pending_changes(self):
+        clock = Clock()
+        service = RegionControllerService(MagicMock(), clock=clock)
+        self.patch(service, "startProcessing")
+        service.markDNSForUpdate(None, None)
+        clock.advance(0.5)
+        service.markDNSForUpdate(None, None)
+        self.assertThat(
+            service, MatchesStructure.byEquality(
+                dnsPendingSince=0.0, dnsLastMarked=0.5))
+        self.assertEqual(1, service.dnsStats["coalesced"])
+
+    def test_isDNSUpdateDue_waits_for_changes_to_settle(self):
+        clock = Clock()
+        service = RegionControllerService(MagicMock(), clock=clock)
+        self.patch(service, "startProcessing")
+        service.markDNSForUpdate(None, None)
+        clock.advance(service.dnsMinimumInterval / 2)
+        self.assertFalse(service.isDNSUpdateDue())
+        clock.advance(service.dnsMinimumInterval / 2)
+        self.assertTrue(service.isDNSUpdateDue())
+
+    def test_isDNSUpdateDue_limits_update_frequency(self):
+        clock = Clock()
+        service = RegionControllerService(MagicMock(), clock=clock)
+        self.patch(service, "startProcessing")
+        service.dnsLastUpdated = clock.seconds()
+        service.markDNSForUpdate(None, None)
+        clock.advance(service.dnsMinimumInterval / 2)
+        service.dnsLastMarked = 0.0
+        self.assertFalse(service.isDNSUpdateDue())
+        clock.advance(service.dnsMinimumInterval / 2)
+        self.assertTrue(service.isDNSUpdateDue())
+
+    def test_isDNSUpdateDue_after_maximum_delay(self):
+        clock = Clock()
+        service = RegionControllerService(MagicMock(), clock=clock)
+        self.patch(service, "startProcessing")
+        service.markDNSForUpdate(None, None)
+        while clock.seconds() < service.dnsMaximumDelay:
+            self.assertFalse(service.isDNSUpdateDue())
+            clock.advance(service.dnsMinimumInterval / 2)
+            service.markDNSForUpdate(None, None)
+        self.assertTrue(service.isDNSUpdateDue())
+
     def test_markProxyForUpdate_sets_needsProxyUpdate_and_starts_process(self):
         listener = MagicMock()
         service = RegionControllerService(listener)
@@ -172,11 +218,81 @@ class TestRegionControllerService(MAASServerTestCase):
             region_controller.log, "msg")
         service.startProcessing()
         yield service.processingDefer
-        self.assertThat(mock_dns_update_all_zones, MockCalledOnceWith())
+        self.assertThat(
+            mock_dns_update_all_zones,
+            MockCalledOnceWith(previous_fingerprint=None))
         self.assertThat(
             mock_msg,
             MockCalledOnceWith("Successfully configured DNS."))
 
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_process_passes_previous_fingerprint(self):
+        service = RegionControllerService(sentinel.listener)
+        service.needsDNSUpdate = True
+        service.dnsFingerprint = sentinel.previous
+        mock_dns_update_all_zones = self.patch(
+            region_controller, "dns_update_all_zones")
+        mock_dns_update_all_zones.return_value = sentinel.fingerprint
+        service.startProcessing()
+        yield service.processingDefer
+        self.assertThat(
+            mock_dns_update_all_zones,
+            MockCalledOnceWith(previous_fingerprint=sentinel.previous))
+        self.assertEqual(sentinel.fingerprint, service.dnsFingerprint)
+        self.assertEqual(1, service.dnsStats["updates"])
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_process_logs_unchanged_zones(self):
+        service = RegionControllerService(sentinel.listener)
+        service.needsDNSUpdate = True
+        service.dnsFingerprint = sentinel.fingerprint
+        mock_dns_update_all_zones = self.patch(
+            region_controller, "dns_update_all_zones")
+        mock_dns_update_all_zones.return_value = sentinel.fingerprint
+        mock_msg = self.patch(
+            region_controller.log, "msg")
+        service.startProcessing()
+        yield service.processingDefer
+        self.assertThat(
+            mock_msg,
+            MockCalledOnceWith("DNS configuration unchanged; not reloading."))
+        self.assertEqual(1, service.dnsStats["unchanged"])
+        self.assertEqual(0, service.dnsStats["updates"])
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_updateDNS_retries_when_reload_fails(self):
+        clock = Clock()
+        service = RegionControllerService(sentinel.listener, clock=clock)
+        service.dnsFingerprint = sentinel.previous
+        self.patch(region_controller, "is_dns_enabled").return_value = True
+        mock_dns_update_all_zones = self.patch(
+            region_controller, "dns_update_all_zones")
+        mock_dns_update_all_zones.return_value = None
+        mock_startProcessing = self.patch(service, "startProcessing")
+        yield service.updateDNS()
+        self.assertIsNone(service.dnsFingerprint)
+        self.assertEqual(1, service.dnsStats["failures"])
+        self.assertFalse(service.needsDNSUpdate)
+        clock.advance(service.dnsRetryInterval)
+        self.assertTrue(service.needsDNSUpdate)
+        self.assertThat(mock_startProcessing, MockCalledOnceWith())
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_updateDNS_does_not_retry_when_dns_is_disabled(self):
+        clock = Clock()
+        service = RegionControllerService(sentinel.listener, clock=clock)
+        self.patch(region_controller, "is_dns_enabled").return_value = False
+        mock_dns_update_all_zones = self.patch(
+            region_controller, "dns_update_all_zones")
+        mock_dns_update_all_zones.return_value = None
+        yield service.updateDNS()
+        self.assertEqual(0, service.dnsStats["failures"])
+        self.assertEqual([], clock.getDelayedCalls())
+
     @wait_for_reactor
     @inlineCallbacks
     def test_process_updates_proxy(self):
@@ -207,7 +323,9 @@ class TestRegionControllerService(MAASServerTestCase):
             region_controller.log, "err")
         service.startProcessing()
         yield service.processingDefer
-        self.assertThat(mock_dns_update_all_zones, MockCalledOnceWith())
+        self.assertThat(
+            mock_dns_update_all_zones,
+            MockCalledOnceWith(previous_fingerprint=None))
         self.assertThat(
             mock_err,
             MockCalledOnceWith(ANY, "Failed configuring DNS."))
@@ -244,6 +362,7 @@ class TestRegionControllerService(MAASServerTestCase):
         service.startProcessing()
         yield service.processingDefer
         self.assertThat(
-            mock_dns_update_all_zones, MockCalledOnceWith())
+            mock_dns_update_all_zones,
+            MockCalledOnceWith(previous_fingerprint=None))
         self.assertThat(
             mock_proxy_update_config, MockCalledOnceWith(reload_proxy=True))
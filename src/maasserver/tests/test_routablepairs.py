@@ -231,3 +231,36 @@ class TestFindAddressesBetweenNodes(MAASServerTestCase):
         )
         self.assertItemsEqual(
             expected_mutual, observed_mutual)
+
+    def make_routable_nodes(self):
+        space = factory.make_Space()
+        network1 = factory.make_ip4_or_6_network()
+        network2 = factory.make_ip4_or_6_network(version=network1.version)
+        node1, ip1 = self.make_node_with_address(space, network1)
+        node2, ip2 = self.make_node_with_address(space, network2)
+        self.assertItemsEqual(
+            [(node1, ip1, node2, ip2)],
+            find_addresses_between_nodes([node1], [node2]))
+        return node1, node2
+
+    def test__follows_vlan_moving_to_another_space(self):
+        node1, node2 = self.make_routable_nodes()
+        vlan = node1.interface_set.first().ip_addresses.first().subnet.vlan
+        vlan.space = factory.make_Space()
+        vlan.save()
+        self.assertItemsEqual(
+            [], find_addresses_between_nodes([node1], [node2]))
+
+    def test__follows_interface_being_disabled(self):
+        node1, node2 = self.make_routable_nodes()
+        iface = node2.interface_set.first()
+        iface.enabled = False
+        iface.save()
+        self.assertItemsEqual(
+            [], find_addresses_between_nodes([node1], [node2]))
+
+    def test__follows_address_being_deleted(self):
+        node1, node2 = self.make_routable_nodes()
+        node2.interface_set.first().ip_addresses.first().delete()
+        self.assertItemsEqual(
+            [], find_addresses_between_nodes([node1], [node2]))
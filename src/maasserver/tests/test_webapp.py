@@ -16,6 +16,7 @@ from maasserver import (
     eventloop,
     webapp,
 )
+from maasserver.api.auth import oauth_cache
 from maasserver.testing.listener import FakePostgresListenerService
 from maasserver.webapp import OverlaySite
 from maasserver.websockets.protocol import WebSocketFactory
@@ -316,6 +317,23 @@ class TestWebApplicationService(MAASTestCase):
             _reactor=Is(reactor), _threadpool=Is(service.threadpool),
             _application=IsInstance(WSGIHandler)))
 
+    def test__startService_registers_for_oauth_token_changes(self):
+        service = self.make_webapp()
+        self.addCleanup(service.stopService)
+
+        service.startService()
+
+        self.assertEqual(
+            [oauth_cache.tokenChanged],
+            service.listener.listeners["sys_oauth_token"])
+
+    def test__stopService_unregisters_for_oauth_token_changes(self):
+        service = self.make_webapp()
+        service.startService()
+        service.stopService()
+
+        self.assertEqual([], service.listener.listeners["sys_oauth_token"])
+
     def test__stopService_stops_the_service(self):
         service = self.make_webapp()
         service.startService()
@@ -13,8 +13,10 @@ __all__ = [
     "register_system_triggers"
     ]
 
+from contextlib import closing
 from textwrap import dedent
 
+from django.db import connection
 from maasserver.models.dnspublication import zone_serial
 from maasserver.triggers import (
     register_procedure,
@@ -1082,6 +1084,396 @@ PEER_PROXY_CONFIG_UPDATE = dedent("""\
     """)
 
 
+# Triggered when an OAuth token is changed or deleted. Tells the region
+# processes to forget any copy of the token they have cached.
+OAUTH_TOKEN_EXPIRE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_oauth_token_expire()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM pg_notify('sys_oauth_token', OLD.key);
+      RETURN OLD;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+
+# Selects the rows of maasserver_routable_address: one for each address on an
+# enabled interface of a node, along with the address's subnet, VLAN and space.
+ROUTABLE_ADDRESS_SELECT = dedent("""\
+    SELECT iface.node_id, iface.id, sip.id, sip.ip,
+           subnet.id, vlan.id, vlan.space_id
+      FROM maasserver_interface AS iface
+      JOIN maasserver_interface_ip_addresses AS ifia
+        ON iface.id = ifia.interface_id
+      JOIN maasserver_staticipaddress AS sip
+        ON ifia.staticipaddress_id = sip.id
+      JOIN maasserver_subnet AS subnet
+        ON sip.subnet_id = subnet.id
+      JOIN maasserver_vlan AS vlan
+        ON subnet.vlan_id = vlan.id
+     WHERE iface.node_id IS NOT NULL AND iface.enabled
+       AND sip.ip IS NOT NULL
+    """)
+
+
+def render_sys_routable_refresh_procedure(proc_name, column, alias):
+    """Render a database procedure that rebuilds the rows in
+    maasserver_routable_address with the given `column` value.
+
+    :param proc_name: Name of the procedure.
+    :param column: Column of maasserver_routable_address to refresh by.
+    :param alias: Alias of the table in `ROUTABLE_ADDRESS_SELECT` that
+        `column` refers to.
+    """
+    return dedent("""\
+        CREATE OR REPLACE FUNCTION {proc}(refresh_id integer)
+        RETURNS void as $$
+        BEGIN
+          DELETE FROM maasserver_routable_address
+           WHERE {column} = refresh_id;
+          INSERT INTO maasserver_routable_address
+            (node_id, interface_id, staticipaddress_id, ip,
+             subnet_id, vlan_id, space_id)
+          {select}
+             AND {alias}.id = refresh_id;
+        END;
+        $$ LANGUAGE plpgsql;
+        """).format(
+        proc=proc_name, column=column, alias=alias,
+        select=ROUTABLE_ADDRESS_SELECT.strip())
+
+
+# Rebuilds the whole of maasserver_routable_address.
+ROUTABLE_REFRESH_ALL = dedent("""\
+    TRUNCATE maasserver_routable_address;
+    INSERT INTO maasserver_routable_address
+      (node_id, interface_id, staticipaddress_id, ip,
+       subnet_id, vlan_id, space_id)
+    %s;
+    """) % ROUTABLE_ADDRESS_SELECT.strip()
+
+
+# Triggered when an interface is updated. Refreshes its addresses if it is
+# enabled or disabled, or moved to another node.
+ROUTABLE_INTERFACE_UPDATE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_routable_interface_update()
+    RETURNS trigger as $$
+    BEGIN
+      IF OLD.enabled != NEW.enabled OR
+         OLD.node_id IS DISTINCT FROM NEW.node_id THEN
+        PERFORM sys_routable_refresh_interface(NEW.id);
+      END IF;
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+
+# Triggered when an interface is deleted.
+ROUTABLE_INTERFACE_DELETE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_routable_interface_delete()
+    RETURNS trigger as $$
+    BEGIN
+      DELETE FROM maasserver_routable_address
+       WHERE interface_id = OLD.id;
+      RETURN OLD;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+
+# Triggered when an IP address is linked to an interface.
+ROUTABLE_NIC_IP_LINK = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_routable_nic_ip_link()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_routable_refresh_interface(NEW.interface_id);
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+
+# Triggered when an IP address is unlinked from an interface.
+ROUTABLE_NIC_IP_UNLINK = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_routable_nic_ip_unlink()
+    RETURNS trigger as $$
+    BEGIN
+      DELETE FROM maasserver_routable_address
+       WHERE interface_id = OLD.interface_id
+         AND staticipaddress_id = OLD.staticipaddress_id;
+      RETURN OLD;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+
+# Triggered when an IP address is updated. Refreshes it on every interface it
+# is linked to if its address or subnet changed.
+ROUTABLE_STATICIPADDRESS_UPDATE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_routable_staticipaddress_update()
+    RETURNS trigger as $$
+    BEGIN
+      IF OLD.ip IS DISTINCT FROM NEW.ip OR
+         OLD.subnet_id IS DISTINCT FROM NEW.subnet_id THEN
+        PERFORM sys_routable_refresh_staticipaddress(NEW.id);
+      END IF;
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+
+# Triggered when an IP address is deleted.
+ROUTABLE_STATICIPADDRESS_DELETE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_routable_staticipaddress_delete()
+    RETURNS trigger as $$
+    BEGIN
+      DELETE FROM maasserver_routable_address
+       WHERE staticipaddress_id = OLD.id;
+      RETURN OLD;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+
+# Triggered when a subnet is updated. Follows the subnet to its new VLAN.
+ROUTABLE_SUBNET_UPDATE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_routable_subnet_update()
+    RETURNS trigger as $$
+    BEGIN
+      IF OLD.vlan_id != NEW.vlan_id THEN
+        UPDATE maasserver_routable_address
+           SET vlan_id = NEW.vlan_id,
+               space_id = (
+                 SELECT space_id FROM maasserver_vlan
+                  WHERE id = NEW.vlan_id)
+         WHERE subnet_id = NEW.id;
+      END IF;
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+
+# Triggered when a subnet is deleted.
+ROUTABLE_SUBNET_DELETE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_routable_subnet_delete()
+    RETURNS trigger as $$
+    BEGIN
+      DELETE FROM maasserver_routable_address
+       WHERE subnet_id = OLD.id;
+      RETURN OLD;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+
+# Triggered when a VLAN is updated. Follows the VLAN to its new space.
+ROUTABLE_VLAN_UPDATE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_routable_vlan_update()
+    RETURNS trigger as $$
+    BEGIN
+      IF OLD.space_id IS DISTINCT FROM NEW.space_id THEN
+        UPDATE maasserver_routable_address
+           SET space_id = NEW.space_id
+         WHERE vlan_id = NEW.id;
+      END IF;
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+
+def render_sys_curtin_config_bump_procedure(kind):
+    """Render a database procedure that bumps the version stamp of a node's
+    cached `kind` of curtin configuration.
+
+    The node's row in maasserver_curtin_config is created if it doesn't yet
+    exist. This way a configuration rendered concurrently, from data that
+    predates the change, can never be cached as current.
+
+    :param kind: Either "storage" or "network".
+    """
+    return dedent("""\
+        CREATE OR REPLACE FUNCTION sys_curtin_config_bump_{kind}(
+            bump_node_id integer)
+        RETURNS void as $$
+        BEGIN
+          IF bump_node_id IS NOT NULL THEN
+            INSERT INTO maasserver_curtin_config AS config
+              (node_id, {kind}_version)
+            VALUES (bump_node_id, 1)
+            ON CONFLICT (node_id) DO UPDATE
+              SET {kind}_version = config.{kind}_version + 1;
+          END IF;
+        END;
+        $$ LANGUAGE plpgsql;
+        """).format(kind=kind)
+
+
+def render_sys_curtin_config_procedure(proc_name, kind, select):
+    """Render a database procedure that bumps the version stamp of the cached
+    `kind` of curtin configuration of the nodes a changed row belongs to.
+
+    :param proc_name: Name of the procedure.
+    :param kind: Either "storage" or "network".
+    :param select: Query selecting the IDs of the nodes, with `{row}` in place
+        of the row (OLD or NEW).
+    """
+    return dedent("""\
+        CREATE OR REPLACE FUNCTION {proc}() RETURNS trigger AS $$
+        BEGIN
+          IF TG_OP = 'INSERT' THEN
+            PERFORM sys_curtin_config_bump_{kind}(node_id)
+               FROM ({new}) AS changed (node_id)
+              GROUP BY node_id;
+          ELSIF TG_OP = 'DELETE' THEN
+            PERFORM sys_curtin_config_bump_{kind}(node_id)
+               FROM ({old}) AS changed (node_id)
+              GROUP BY node_id;
+          ELSE
+            PERFORM sys_curtin_config_bump_{kind}(node_id)
+               FROM (({old}) UNION ({new})) AS changed (node_id);
+          END IF;
+          RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """).format(
+        proc=proc_name, kind=kind,
+        old=select.format(row="OLD"), new=select.format(row="NEW"))
+
+
+# Selects the nodes with an address on a subnet, given an expression for
+# the subnet's ID and optionally the tables to join to find it.
+CURTIN_CONFIG_SUBNET_NODES = dedent("""\
+    SELECT iface.node_id
+      FROM maasserver_staticipaddress AS sip
+      JOIN maasserver_interface_ip_addresses AS ifia
+        ON ifia.staticipaddress_id = sip.id
+      JOIN maasserver_interface AS iface
+        ON iface.id = ifia.interface_id
+      {join}
+     WHERE sip.subnet_id = {subnet_id}
+    """)
+
+
+# The tables that curtin configuration is rendered from. For each table: the
+# kind of configuration, the events that change it, and a query selecting the
+# nodes that a row belongs to. Rows of the block device subclasses are
+# inserted and deleted along with their maasserver_blockdevice row, so only
+# their updates are watched.
+CURTIN_CONFIG_SOURCES = (
+    ("maasserver_blockdevice", "storage", "insert or update or delete", """
+        SELECT {row}.node_id
+     """),
+    ("maasserver_physicalblockdevice", "storage", "update", """
+        SELECT block.node_id FROM maasserver_blockdevice AS block
+         WHERE block.id = {row}.blockdevice_ptr_id
+     """),
+    ("maasserver_iscsiblockdevice", "storage", "update", """
+        SELECT block.node_id FROM maasserver_blockdevice AS block
+         WHERE block.id = {row}.blockdevice_ptr_id
+     """),
+    ("maasserver_virtualblockdevice", "storage", "update", """
+        SELECT block.node_id FROM maasserver_blockdevice AS block
+         WHERE block.id = {row}.blockdevice_ptr_id
+     """),
+    ("maasserver_partitiontable", "storage", "insert or update or delete", """
+        SELECT block.node_id FROM maasserver_blockdevice AS block
+         WHERE block.id = {row}.block_device_id
+     """),
+    ("maasserver_partition", "storage", "insert or update or delete", """
+        SELECT block.node_id
+          FROM maasserver_partitiontable AS ptable
+          JOIN maasserver_blockdevice AS block
+            ON block.id = ptable.block_device_id
+         WHERE ptable.id = {row}.partition_table_id
+     """),
+    ("maasserver_filesystem", "storage", "insert or update or delete", """
+        SELECT block.node_id FROM maasserver_blockdevice AS block
+         WHERE block.id = {row}.block_device_id
+        UNION
+        SELECT block.node_id
+          FROM maasserver_partition AS part
+          JOIN maasserver_partitiontable AS ptable
+            ON ptable.id = part.partition_table_id
+          JOIN maasserver_blockdevice AS block
+            ON block.id = ptable.block_device_id
+         WHERE part.id = {row}.partition_id
+        UNION
+        SELECT {row}.node_id
+     """),
+    ("maasserver_filesystemgroup", "storage", "update", """
+        SELECT block.node_id
+          FROM maasserver_virtualblockdevice AS vbd
+          JOIN maasserver_blockdevice AS block
+            ON block.id = vbd.blockdevice_ptr_id
+         WHERE vbd.filesystem_group_id = {row}.id
+     """),
+    ("maasserver_interface", "network", "insert or update or delete", """
+        SELECT {row}.node_id
+     """),
+    ("maasserver_interfacerelationship", "network",
+     "insert or update or delete", """
+        SELECT iface.node_id FROM maasserver_interface AS iface
+         WHERE iface.id = {row}.child_id
+     """),
+    ("maasserver_interface_ip_addresses", "network",
+     "insert or update or delete", """
+        SELECT iface.node_id FROM maasserver_interface AS iface
+         WHERE iface.id = {row}.interface_id
+     """),
+    ("maasserver_staticipaddress", "network", "update", """
+        SELECT iface.node_id
+          FROM maasserver_interface_ip_addresses AS ifia
+          JOIN maasserver_interface AS iface
+            ON iface.id = ifia.interface_id
+         WHERE ifia.staticipaddress_id = {row}.id
+     """),
+    # Routes are matched to the subnets of the node's addresses, and render
+    # the CIDRs of the subnets they lead to.
+    ("maasserver_subnet", "network", "update or delete", "\n UNION \n".join((
+        CURTIN_CONFIG_SUBNET_NODES.format(join="", subnet_id="{row}.id"),
+        CURTIN_CONFIG_SUBNET_NODES.format(
+            join=(
+                "JOIN maasserver_staticroute AS route "
+                "ON route.destination_id = {row}.id"),
+            subnet_id="route.source_id"),
+    ))),
+    # An interface renders its VLAN's ID and MTU, while the DHCP setting of
+    # the VLANs of its addresses' subnets picks the default gateways.
+    ("maasserver_vlan", "network", "update", "\n UNION \n".join((
+        """
+        SELECT iface.node_id FROM maasserver_interface AS iface
+         WHERE iface.vlan_id = {row}.id
+        """,
+        CURTIN_CONFIG_SUBNET_NODES.format(
+            join=(
+                "JOIN maasserver_subnet AS subnet "
+                "ON subnet.vlan_id = {row}.id"),
+            subnet_id="subnet.id"),
+    ))),
+    ("maasserver_staticroute", "network", "insert or update or delete",
+     CURTIN_CONFIG_SUBNET_NODES.format(
+         join="", subnet_id="{row}.source_id")),
+)
+
+
+# Triggered when a node is deleted. Its rows in other tables are deleted
+# first, bumping its version stamps, so the node's row is deleted last.
+CURTIN_CONFIG_NODE_DELETE = dedent("""\
+    CREATE OR REPLACE FUNCTION sys_curtin_config_node_delete()
+    RETURNS trigger as $$
+    BEGIN
+      DELETE FROM maasserver_curtin_config
+       WHERE node_id = OLD.id;
+      RETURN OLD;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+
+
 def render_sys_dns_procedure(proc_name, on_delete=False):
     """Render a database procedure that creates a new DNS publication.
 
@@ -1380,3 +1772,83 @@ def register_system_triggers():
     register_trigger(
         "maasserver_config", "sys_proxy_config_use_peer_proxy_update",
         "update")
+
+    # OAuth
+
+    # - Token
+    register_procedure(OAUTH_TOKEN_EXPIRE)
+    register_trigger(
+        "piston3_token", "sys_oauth_token_expire", "update or delete")
+
+    # Routable addresses
+
+    register_procedure(
+        render_sys_routable_refresh_procedure(
+            "sys_routable_refresh_interface", "interface_id", "iface"))
+    register_procedure(
+        render_sys_routable_refresh_procedure(
+            "sys_routable_refresh_staticipaddress", "staticipaddress_id",
+            "sip"))
+
+    # - Interface
+    register_procedure(ROUTABLE_INTERFACE_UPDATE)
+    register_trigger(
+        "maasserver_interface", "sys_routable_interface_update", "update")
+    register_procedure(ROUTABLE_INTERFACE_DELETE)
+    register_trigger(
+        "maasserver_interface", "sys_routable_interface_delete", "delete")
+
+    # - Interface IP addresses
+    register_procedure(ROUTABLE_NIC_IP_LINK)
+    register_trigger(
+        "maasserver_interface_ip_addresses",
+        "sys_routable_nic_ip_link", "insert")
+    register_procedure(ROUTABLE_NIC_IP_UNLINK)
+    register_trigger(
+        "maasserver_interface_ip_addresses",
+        "sys_routable_nic_ip_unlink", "delete")
+
+    # - StaticIPAddress
+    register_procedure(ROUTABLE_STATICIPADDRESS_UPDATE)
+    register_trigger(
+        "maasserver_staticipaddress",
+        "sys_routable_staticipaddress_update", "update")
+    register_procedure(ROUTABLE_STATICIPADDRESS_DELETE)
+    register_trigger(
+        "maasserver_staticipaddress",
+        "sys_routable_staticipaddress_delete", "delete")
+
+    # - Subnet
+    register_procedure(ROUTABLE_SUBNET_UPDATE)
+    register_trigger(
+        "maasserver_subnet", "sys_routable_subnet_update", "update")
+    register_procedure(ROUTABLE_SUBNET_DELETE)
+    register_trigger(
+        "maasserver_subnet", "sys_routable_subnet_delete", "delete")
+
+    # - VLAN
+    register_procedure(ROUTABLE_VLAN_UPDATE)
+    register_trigger(
+        "maasserver_vlan", "sys_routable_vlan_update", "update")
+
+    # Curtin configuration
+
+    register_procedure(render_sys_curtin_config_bump_procedure("storage"))
+    register_procedure(render_sys_curtin_config_bump_procedure("network"))
+    for table, kind, events, select in CURTIN_CONFIG_SOURCES:
+        proc_name = "sys_curtin_config_%s" % table[len("maasserver_"):]
+        register_procedure(
+            render_sys_curtin_config_procedure(proc_name, kind, select))
+        register_trigger(table, proc_name, events)
+
+    # - Node
+    register_procedure(CURTIN_CONFIG_NODE_DELETE)
+    register_trigger(
+        "maasserver_node", "sys_curtin_config_node_delete", "delete")
+
+    # Changes made before the triggers above existed (e.g. by migrations
+    # during this upgrade) were not tracked, so rebuild from scratch, and
+    # forget any configuration cached before then.
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(ROUTABLE_REFRESH_ALL)
+        cursor.execute("TRUNCATE maasserver_curtin_config")
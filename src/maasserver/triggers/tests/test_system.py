@@ -61,6 +61,32 @@ class TestTriggers(MAASServerTestCase):
             "subnet_sys_proxy_subnet_insert",
             "subnet_sys_proxy_subnet_update",
             "subnet_sys_proxy_subnet_delete",
+            "piston3_token_sys_oauth_token_expire",
+            "interface_sys_routable_interface_update",
+            "interface_sys_routable_interface_delete",
+            "interface_ip_addresses_sys_routable_nic_ip_link",
+            "interface_ip_addresses_sys_routable_nic_ip_unlink",
+            "staticipaddress_sys_routable_staticipaddress_update",
+            "staticipaddress_sys_routable_staticipaddress_delete",
+            "subnet_sys_routable_subnet_update",
+            "subnet_sys_routable_subnet_delete",
+            "vlan_sys_routable_vlan_update",
+            "blockdevice_sys_curtin_config_blockdevice",
+            "physicalblockdevice_sys_curtin_config_physicalblockdevice",
+            "iscsiblockdevice_sys_curtin_config_iscsiblockdevice",
+            "virtualblockdevice_sys_curtin_config_virtualblockdevice",
+            "partitiontable_sys_curtin_config_partitiontable",
+            "partition_sys_curtin_config_partition",
+            "filesystem_sys_curtin_config_filesystem",
+            "filesystemgroup_sys_curtin_config_filesystemgroup",
+            "interface_sys_curtin_config_interface",
+            "interfacerelationship_sys_curtin_config_interfacerelationship",
+            "interface_ip_addresses_sys_curtin_config_interface_ip_addresses",
+            "staticipaddress_sys_curtin_config_staticipaddress",
+            "subnet_sys_curtin_config_subnet",
+            "vlan_sys_curtin_config_vlan",
+            "staticroute_sys_curtin_config_staticroute",
+            "node_sys_curtin_config_node_delete",
             ]
         sql, args = psql_array(triggers, sql_type="text")
         with closing(connection.cursor()) as cursor:
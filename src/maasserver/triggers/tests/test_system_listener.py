@@ -27,6 +27,7 @@ from maasserver.models.interface import (
     PhysicalInterface,
     UnknownInterface,
 )
+from maasserver.models.user import create_auth_token
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import (
     MAASLegacyTransactionServerTestCase,
@@ -40,6 +41,7 @@ from maasserver.triggers.testing import (
 from maasserver.utils.orm import transactional
 from maasserver.utils.threads import deferToDatabase
 from netaddr import IPAddress
+from piston3.models import Token
 from provisioningserver.utils.twisted import DeferredValue
 from testtools.matchers import Equals
 from twisted.internet.defer import (
@@ -3883,3 +3885,33 @@ class TestProxyListener(
             yield dv.get(timeout=2)
         finally:
             yield listener.stopService()
+
+
+class TestOAuthTokenListener(
+        MAASTransactionServerTestCase, TransactionalHelpersMixin):
+    """End-to-end test for the OAuth token triggers code."""
+
+    @transactional
+    def create_token(self):
+        return create_auth_token(factory.make_User())
+
+    @transactional
+    def delete_token(self, id):
+        Token.objects.filter(id=id).delete()
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_message_for_token_delete(self):
+        yield deferToDatabase(register_system_triggers)
+        token = yield deferToDatabase(self.create_token)
+        dv = DeferredValue()
+        listener = self.make_listener_without_delay()
+        listener.register(
+            "sys_oauth_token", lambda *args: dv.set(args))
+        yield listener.startService()
+        try:
+            yield deferToDatabase(self.delete_token, token.id)
+            yield dv.get(timeout=2)
+            self.assertEqual(("sys_oauth_token", token.key), dv.value)
+        finally:
+            yield listener.stopService()
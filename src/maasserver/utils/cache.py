@@ -0,0 +1,65 @@
+# Copyright 2017 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Utilities for caching rendered content."""
+
+__all__ = [
+    'gzip_compress',
+    'LRUCache',
+    ]
+
+from collections import OrderedDict
+import gzip
+from threading import RLock
+
+
+def gzip_compress(content):
+    """Compress `content` with gzip, the same way every time.
+
+    The modification time in the gzip header is fixed so that the compressed
+    content, and hence any entity tag derived from it, is the same in every
+    region process.
+    """
+    return gzip.compress(content, mtime=0)
+
+
+class LRUCache:
+    """A thread-safe cache of the `size` most recently used values."""
+
+    def __init__(self, size):
+        super(LRUCache, self).__init__()
+        self.size = size
+        self._values = OrderedDict()
+        self._lock = RLock()
+
+    def __len__(self):
+        return len(self._values)
+
+    def get(self, key, make, is_current=None):
+        """Return the value cached for `key`, making it if necessary.
+
+        The lock is held while the value is made, so a value is made only
+        once even when many threads want it at the same time.
+
+        :param make: Called with no arguments to make the value when it is
+            not cached.
+        :param is_current: Optional; called with a cached value, which is made
+            again when this returns false.
+        """
+        with self._lock:
+            try:
+                value = self._values.pop(key)
+            except KeyError:
+                value = make()
+            else:
+                if is_current is not None and not is_current(value):
+                    value = make()
+            while len(self._values) >= self.size:
+                self._values.popitem(last=False)
+            self._values[key] = value
+            return value
+
+    def clear(self):
+        """Forget every cached value."""
+        with self._lock:
+            self._values.clear()
@@ -1156,7 +1156,7 @@ class MAASQueriesMixin(object):
         current_q = op(current_q, Q(vlan__vid=vid))
         return current_q
 
-    def get_matching_object_map(self, specifiers, query):
+    def get_matching_object_map(self, specifiers, query, foreign_ids=None):
         """This method is intended to be called with a query for foreign object
         IDs. For example, if called from the Interface object (with a list
         of interface specifiers), it might be called with a query string like
@@ -1171,8 +1171,14 @@ class MAASQueriesMixin(object):
         In other words, call this method when you want a map from a related
         object IDs (specified by 'query') to a list of objects (of the current
         type) which match a query.
+
+        If `foreign_ids` is given, only objects whose foreign object ID is
+        in it are matched. It may be a QuerySet, in which case the database
+        evaluates it as a subquery.
         """
         filter = self.filter_by_specifiers(specifiers)
+        if foreign_ids is not None:
+            filter = filter.filter(**{query + '__in': foreign_ids})
         # We'll be looping through the list assuming a particular order later
         # in this function, so make sure the interfaces are grouped by their
         # attached nodes.
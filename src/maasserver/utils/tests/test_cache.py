@@ -0,0 +1,74 @@
+# Copyright 2017 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `maasserver.utils.cache`."""
+
+__all__ = []
+
+import gzip
+from unittest.mock import (
+    Mock,
+    sentinel,
+)
+
+from maasserver.utils.cache import (
+    gzip_compress,
+    LRUCache,
+)
+from maastesting.factory import factory
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockNotCalled,
+)
+from maastesting.testcase import MAASTestCase
+
+
+class TestGzipCompress(MAASTestCase):
+
+    def test__fixes_modification_time(self):
+        content = factory.make_bytes()
+        compressed = gzip_compress(content)
+        self.assertEqual(content, gzip.decompress(compressed))
+        # The modification time in the header is zero.
+        self.assertEqual(b"\0\0\0\0", compressed[4:8])
+
+
+class TestLRUCache(MAASTestCase):
+
+    def test_get_makes_value_when_missing(self):
+        cache = LRUCache(2)
+        make = Mock(return_value=sentinel.value)
+        self.assertIs(sentinel.value, cache.get(sentinel.key, make))
+        self.assertThat(make, MockCalledOnceWith())
+
+    def test_get_reuses_cached_value(self):
+        cache = LRUCache(2)
+        cache.get(sentinel.key, lambda: sentinel.value)
+        make = Mock()
+        self.assertIs(sentinel.value, cache.get(sentinel.key, make))
+        self.assertThat(make, MockNotCalled())
+
+    def test_get_makes_value_again_when_not_current(self):
+        cache = LRUCache(2)
+        cache.get(sentinel.key, lambda: sentinel.old)
+        is_current = Mock(return_value=False)
+        self.assertIs(sentinel.new, cache.get(
+            sentinel.key, lambda: sentinel.new, is_current))
+        self.assertThat(is_current, MockCalledOnceWith(sentinel.old))
+        self.assertIs(sentinel.new, cache.get(sentinel.key, Mock()))
+
+    def test_get_discards_least_recently_used_value(self):
+        cache = LRUCache(2)
+        cache.get(sentinel.a, lambda: sentinel.a)
+        cache.get(sentinel.b, lambda: sentinel.b)
+        cache.get(sentinel.a, Mock())
+        cache.get(sentinel.c, lambda: sentinel.c)
+        self.assertEqual(2, len(cache))
+        self.assertIs(sentinel.a, cache.get(sentinel.a, Mock()))
+        self.assertIs(sentinel.b2, cache.get(sentinel.b, lambda: sentinel.b2))
+
+    def test_clear_discards_every_value(self):
+        cache = LRUCache(2)
+        cache.get(sentinel.key, lambda: sentinel.value)
+        cache.clear()
+        self.assertEqual(0, len(cache))
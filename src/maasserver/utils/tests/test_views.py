@@ -31,6 +31,7 @@ from django.core.urlresolvers import get_resolver
 from django.db import connection
 from django.http import HttpResponse
 from fixtures import FakeLogger
+from maasserver.api.auth import NonceStore
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import (
     MAASServerTestCase,
@@ -158,6 +159,22 @@ class TestDeleteOAuthNonce(MAASServerTestCase):
                 consumer_key=oauth_consumer_key, token_key=oauth_token,
                 key=oauth_nonce)
 
+    def test__discards_nonce_from_nonce_store(self):
+        nonce_store = self.patch(views, "nonce_store", NonceStore())
+        oauth_consumer_key = factory.make_string(18)
+        oauth_token = factory.make_string(18)
+        oauth_nonce = str(randint(0, 99999))
+        nonce_store.add(oauth_consumer_key, oauth_token, oauth_nonce)
+        oauth_env = {
+            'oauth_consumer_key': oauth_consumer_key,
+            'oauth_token': oauth_token,
+            'oauth_nonce': oauth_nonce,
+        }
+        request = make_request(oauth_env=oauth_env)
+        views.delete_oauth_nonce(request)
+        self.assertTrue(
+            nonce_store.add(oauth_consumer_key, oauth_token, oauth_nonce))
+
     def test__skips_missing_nonce(self):
         oauth_consumer_key = factory.make_string(18)
         oauth_token = factory.make_string(18)
@@ -19,6 +19,7 @@ from django.core.handlers.wsgi import WSGIHandler
 from django.core.urlresolvers import get_resolver
 from django.db import transaction
 from django.template.response import SimpleTemplateResponse
+from maasserver.api.auth import nonce_store
 from maasserver.utils.orm import (
     gen_retry_intervals,
     is_retryable_failure,
@@ -53,7 +54,8 @@ def log_final_failed_attempt(request, attempt, elapsed):
 
 
 def delete_oauth_nonce(request):
-    """Delete the OAuth nonce for the given request from the database.
+    """Delete the OAuth nonce for the given request from the database, and
+    from the nonces recently used by this process.
 
     This is to allow the exact same request to be retried.
     """
@@ -67,6 +69,7 @@ def delete_oauth_nonce(request):
             # Missing OAuth parameter: skip Nonce deletion.
             pass
         else:
+            nonce_store.discard(consumer_key, token_key, nonce)
             Nonce.objects.filter(
                 consumer_key=consumer_key, token_key=token_key,
                 key=nonce).delete()
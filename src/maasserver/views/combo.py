@@ -7,8 +7,11 @@ __all__ = [
     'get_combo_view',
     ]
 
+from collections import namedtuple
 from functools import partial
+import hashlib
 import os
+import re
 
 from convoy.combo import (
     combine_files,
@@ -21,6 +24,20 @@ from django.http import (
     HttpResponseNotFound,
     HttpResponseRedirect,
 )
+from django.utils.cache import (
+    get_conditional_response,
+    patch_vary_headers,
+)
+from maasserver.utils.cache import (
+    gzip_compress,
+    LRUCache,
+)
+
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 
 MERGE_VIEWS = {
@@ -227,6 +244,93 @@ def get_combo_view(location='', default_redirect=None):
         combo_view, location=location, default_redirect=default_redirect)
 
 
+# Combined files, keyed on the location and names of the files and the
+# encoding they're read with. Query strings to the combo view are chosen by
+# clients, so only a few combinations are kept.
+combined_files = LRUCache(64)
+
+# Files combined into one, with their states when they were combined, and
+# the content in each content coding, keyed on the coding's name; identity
+# is the empty string. Each coding has its own strong entity tag.
+CombinedFiles = namedtuple("CombinedFiles", ("states", "content", "etags"))
+
+# Content codings, most preferred first, and how to detect them in an
+# Accept-Encoding header.
+content_codings = [
+    ("br", re.compile(r'\bbr\b').search),
+    ("gzip", re.compile(r'\bgzip\b').search),
+]
+
+
+def get_file_state(path):
+    """Return the modification time and size of `path`, or `None`."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    else:
+        return stat.st_mtime_ns, stat.st_size
+
+
+def combine(fnames, location, encoding):
+    """Combine `fnames` from `location`, in every content coding.
+
+    :return: ``(content, etags)``, as for `CombinedFiles`.
+    """
+    content = "".join(
+        [content.decode(encoding) for content in combine_files(
+            fnames, location, resource_prefix='/', rewrite_urls=True)])
+    content = content.encode(settings.DEFAULT_CHARSET)
+    codings = {"": content, "gzip": gzip_compress(content)}
+    if brotli is not None:
+        codings["br"] = brotli.compress(content)
+    digest = hashlib.sha1(content).hexdigest()
+    etags = {
+        coding: '"%s-%s"' % (digest, coding) if coding else '"%s"' % digest
+        for coding in codings
+    }
+    return codings, etags
+
+
+def get_combined_files(fnames, location, encoding='utf-8'):
+    """Return `fnames` from `location` combined, as a `CombinedFiles`.
+
+    The files are combined again only when one of them has been added,
+    removed, or changed since they were last combined.
+    """
+    key = location, tuple(fnames), encoding
+    states = tuple(
+        get_file_state(os.path.join(location, fname)) for fname in fnames)
+    return combined_files.get(
+        key, lambda: CombinedFiles(
+            states, *combine(fnames, location, encoding)),
+        lambda combined: combined.states == states)
+
+
+def make_combined_response(request, combined, content_type):
+    """Return a response for `request` containing `combined`.
+
+    The content is compressed with the most preferred coding the client
+    accepts. When the request carries the entity tag of that content, a 304
+    response is returned instead.
+    """
+    accept_encoding = request.META.get("HTTP_ACCEPT_ENCODING", "")
+    for coding, accepts in content_codings:
+        if coding in combined.content and accepts(accept_encoding):
+            break
+    else:
+        coding = ""
+    etag = combined.etags[coding]
+    response = HttpResponse(
+        content_type=content_type, status=200,
+        content=combined.content[coding])
+    if coding:
+        response["Content-Encoding"] = coding
+    response["ETag"] = etag
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return get_conditional_response(request, etag=etag, response=response)
+
+
 def combo_view(request, location, default_redirect=None, encoding='utf8'):
     """Handle a request for combining a set of files.
 
@@ -247,12 +351,8 @@ def combo_view(request, location, default_redirect=None, encoding='utf8'):
             return HttpResponseBadRequest(
                 "Invalid file type requested.",
                 content_type="text/plain; charset=UTF-8")
-        content = "".join(
-            [content.decode(encoding) for content in combine_files(
-                fnames, location, resource_prefix='/', rewrite_urls=True)])
-
-        return HttpResponse(
-            content_type=content_type, status=200, content=content)
+        combined = get_combined_files(fnames, location, encoding)
+        return make_combined_response(request, combined, content_type)
 
     return HttpResponseNotFound()
 
@@ -267,9 +367,6 @@ def merge_view(request, filename):
     location = merge_info.get("location", None)
     if location is None:
         location = get_absolute_location()
-    content = "".join(
-        [content.decode('utf-8') for content in combine_files(
-            merge_info["files"], location,
-            resource_prefix='/', rewrite_urls=True)])
-    return HttpResponse(
-        content_type=merge_info["content_type"], status=200, content=content)
+    combined = get_combined_files(merge_info["files"], location)
+    return make_combined_response(
+        request, combined, merge_info["content_type"])
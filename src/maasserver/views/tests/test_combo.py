@@ -6,6 +6,7 @@
 __all__ = []
 
 from collections import Callable
+import gzip
 import http.client
 import os
 
@@ -15,12 +16,15 @@ from django.test.client import RequestFactory
 from maasserver.testing import extract_redirect
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
+from maasserver.views import combo as combo_module
 from maasserver.views.combo import (
     get_absolute_location,
+    get_combined_files,
     get_combo_view,
     MERGE_VIEWS,
 )
 from maastesting.fixtures import ImportErrorFixture
+from maastesting.matchers import MockNotCalled
 
 
 class TestUtilities(MAASServerTestCase):
@@ -172,3 +176,91 @@ class TestMergeLoaderView(MAASServerTestCase):
     def test_load_unknown_returns_302_blocked_by_middleware(self):
         response = self.client.get(reverse('merge', args=["unknown.js"]))
         self.assertEqual(http.client.FOUND, response.status_code)
+
+
+class TestCombinedFilesCache(MAASServerTestCase):
+    """Tests for the cache of combined files behind the combo views."""
+
+    def setUp(self):
+        super(TestCombinedFilesCache, self).setUp()
+        self.addCleanup(self.clear_cache)
+        self.clear_cache()
+        self.location = self.make_dir()
+
+    def clear_cache(self):
+        combo_module.combined_files.clear()
+
+    def make_js_file(self, contents=None):
+        path = factory.make_file(
+            self.location, "%s.js" % factory.make_name("file"), contents)
+        return os.path.basename(path)
+
+    def get(self, *fnames, **headers):
+        view = get_combo_view(self.location)
+        return view(RequestFactory().get(
+            "/test/?%s" % "&".join(fnames), **headers))
+
+    def test_reuses_combined_files(self):
+        fname = self.make_js_file()
+        combined = get_combined_files([fname], self.location)
+        combine_files = self.patch(combo_module, "combine_files")
+        self.assertIs(combined, get_combined_files([fname], self.location))
+        self.assertThat(combine_files, MockNotCalled())
+
+    def test_combines_again_when_a_file_changes(self):
+        fname = self.make_js_file()
+        get_combined_files([fname], self.location)
+        contents = factory.make_string()
+        path = os.path.join(self.location, fname)
+        with open(path, "w") as fd:
+            fd.write(contents)
+        # Make sure that the change is visible even with coarse timestamps.
+        os.utime(path, ns=(0, 0))
+        combined = get_combined_files([fname], self.location)
+        self.assertIn(contents.encode("utf-8"), combined.content[""])
+
+    def test_combines_again_when_a_missing_file_appears(self):
+        fname = "%s.js" % factory.make_name("file")
+        get_combined_files([fname], self.location)
+        contents = factory.make_string()
+        factory.make_file(self.location, fname, contents)
+        combined = get_combined_files([fname], self.location)
+        self.assertIn(contents.encode("utf-8"), combined.content[""])
+
+    def test_keeps_few_combinations(self):
+        self.patch(combo_module.combined_files, "size", 2)
+        for _ in range(3):
+            get_combined_files([self.make_js_file()], self.location)
+        self.assertEqual(2, len(combo_module.combined_files))
+
+    def test_sets_strong_etag(self):
+        response = self.get(self.make_js_file())
+        self.assertTrue(response["ETag"].startswith('"'))
+        self.assertEqual("Accept-Encoding", response["Vary"])
+
+    def test_compresses_for_clients_accepting_gzip(self):
+        self.patch(combo_module, "brotli", None)
+        fname = self.make_js_file()
+        plain = self.get(fname)
+        compressed = self.get(fname, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual("gzip", compressed["Content-Encoding"])
+        self.assertEqual(plain.content, gzip.decompress(compressed.content))
+        self.assertNotEqual(plain["ETag"], compressed["ETag"])
+
+    def test_returns_not_modified_for_matching_etag(self):
+        fname = self.make_js_file()
+        etag = self.get(fname)["ETag"]
+        response = self.get(fname, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(http.client.NOT_MODIFIED, response.status_code)
+        self.assertEqual(etag, response["ETag"])
+        self.assertEqual(b"", response.content)
+
+    def test_returns_files_once_they_change(self):
+        fname = self.make_js_file()
+        etag = self.get(fname)["ETag"]
+        path = os.path.join(self.location, fname)
+        with open(path, "w") as fd:
+            fd.write(factory.make_string())
+        os.utime(path, ns=(0, 0))
+        response = self.get(fname, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(http.client.OK, response.status_code)
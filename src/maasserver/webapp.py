@@ -15,6 +15,7 @@ import re
 from django.conf import settings
 from lxml import html
 from maasserver import concurrency
+from maasserver.api.auth import oauth_cache
 from maasserver.utils.views import WebApplicationHandler
 from maasserver.websockets.protocol import WebSocketFactory
 from maasserver.websockets.websockets import (
@@ -189,6 +190,7 @@ class WebApplicationService(StreamServerEndpointService):
             StartPage(), logFormatter=reducedWebLogFormatter)
         self.site.requestFactory = CleanPathRequest
         super(WebApplicationService, self).__init__(endpoint, self.site)
+        self.listener = listener
         self.websocket = WebSocketFactory(listener)
         self.threadpool = ThreadPoolLimiter(
             reactor.threadpoolForDatabase, concurrency.webapp)
@@ -261,10 +263,13 @@ class WebApplicationService(StreamServerEndpointService):
     @asynchronous(timeout=30)
     def startService(self):
         super(WebApplicationService, self).startService()
+        # Forget cached OAuth tokens when they're changed by another process.
+        self.listener.register("sys_oauth_token", oauth_cache.tokenChanged)
         return self.startApplication()
 
     @asynchronous(timeout=30)
     def stopService(self):
+        self.listener.unregister("sys_oauth_token", oauth_cache.tokenChanged)
         d = super(WebApplicationService, self).stopService()
         d.addCallback(lambda _: self.websocket.stopFactory())
         return d
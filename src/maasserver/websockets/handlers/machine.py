@@ -65,7 +65,10 @@ from maasserver.models.node import (
 from maasserver.models.partition import Partition
 from maasserver.models.subnet import Subnet
 from maasserver.models.tag import Tag
-from maasserver.node_action import compile_node_actions
+from maasserver.node_action import (
+    compile_node_actions,
+    execute_bulk_node_action,
+)
 from maasserver.utils.orm import (
     reload_object,
     transactional,
@@ -99,6 +102,7 @@ class MachineHandler(NodeHandler):
             'create',
             'update',
             'action',
+            'bulk_action',
             'set_active',
             'check_power',
             'create_physical',
@@ -734,6 +738,24 @@ class MachineHandler(NodeHandler):
         extra_params = params.get("extra", {})
         return action.execute(**extra_params)
 
+    def bulk_action(self, params):
+        """Perform the action on many machines in one transaction.
+
+        Returns a dict mapping each system_id to `None` if the action was
+        performed, or to a message describing why it was not.
+        """
+        system_ids = params.get("system_ids", [])
+        action_name = params.get("action")
+        machines = Machine.objects.get_nodes(
+            self.user, NODE_PERMISSION.VIEW).filter(system_id__in=system_ids)
+        results = execute_bulk_node_action(
+            machines, self.user, action_name,
+            params=params.get("extra", {}))
+        for system_id in system_ids:
+            if system_id not in results:
+                results[system_id] = "Not found"
+        return results
+
     def _create_link_on_interface(self, interface, params):
         """Create a link on a new interface."""
         mode = params.get("mode", None)
@@ -2053,6 +2053,36 @@ class TestMachineHandler(MAASServerTestCase):
         handler.action({"system_id": node.system_id, "action": "delete"})
         self.assertIsNone(reload_object(node))
 
+    def test_bulk_action_performs_action_on_each_machine(self):
+        admin = factory.make_admin()
+        nodes = [
+            factory.make_Node(status=NODE_STATUS.ALLOCATED, owner=admin)
+            for _ in range(3)
+        ]
+        handler = MachineHandler(admin, {})
+        results = handler.bulk_action({
+            "system_ids": [node.system_id for node in nodes],
+            "action": "delete",
+        })
+        self.assertEqual({node.system_id: None for node in nodes}, results)
+        self.assertEqual(
+            [None] * 3, [reload_object(node) for node in nodes])
+
+    def test_bulk_action_reports_machines_not_found(self):
+        user = factory.make_User()
+        hidden = factory.make_Node(
+            status=NODE_STATUS.ALLOCATED, owner=factory.make_User())
+        missing = factory.make_name("system_id")
+        handler = MachineHandler(user, {})
+        results = handler.bulk_action({
+            "system_ids": [hidden.system_id, missing],
+            "action": "release",
+        })
+        self.assertEqual({
+            hidden.system_id: "Not found",
+            missing: "Not found",
+        }, results)
+
     def test_action_performs_action_passing_extra(self):
         user = factory.make_User()
         factory.make_SSHKey(user)
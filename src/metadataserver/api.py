@@ -18,12 +18,10 @@ import base64
 from datetime import datetime
 from functools import partial
 import http.client
-from io import BytesIO
 from itertools import chain
 import json
 from operator import itemgetter
 import os
-import tarfile
 import time
 
 from django.conf import settings
@@ -61,9 +59,7 @@ from maasserver.models import (
     SSLKey,
 )
 from maasserver.models.event import Event
-from maasserver.models.tag import Tag
 from maasserver.node_status import NODE_TESTING_RESET_READY_TRANSITIONS
-from maasserver.populate_tags import populate_tags_for_single_node
 from maasserver.preseed import (
     get_curtin_userdata,
     get_enlist_preseed,
@@ -83,9 +79,16 @@ from metadataserver.enum import (
 from metadataserver.models import (
     NodeKey,
     NodeUserData,
+    PostCommissioningTask,
     Script,
     ScriptResult,
 )
+from metadataserver.models.scriptset import DEFERRED_SCRIPT_RESULT_FIELDS
+from metadataserver.script_archive import (
+    get_builtin_script_key,
+    get_script_key,
+    ScriptArchive,
+)
 from metadataserver.user_data import generate_user_data_for_poweroff
 from metadataserver.vendor_data import get_vendor_data
 from piston3.utils import rc
@@ -465,17 +468,10 @@ class VersionIndexHandler(MetadataViewHandler):
             node, node.current_commissioning_script_set, request, status)
 
         # This is skipped when its the rack controller using this endpoint.
-        if node.node_type not in (
-                NODE_TYPE.RACK_CONTROLLER,
-                NODE_TYPE.REGION_AND_RACK_CONTROLLER):
-            # Commissioning was successful, setup the default storage layout
-            # and the initial networking configuration for the node.
-            if status in (SIGNAL_STATUS.TESTING, SIGNAL_STATUS.OK):
-                # XXX 2016-05-10 ltrager, LP:1580405 - Exceptions raised
-                # here are not logged or shown to the user.
-                node.set_default_storage_layout()
-                node.set_initial_networking_configuration()
-
+        is_rack = node.node_type in (
+            NODE_TYPE.RACK_CONTROLLER,
+            NODE_TYPE.REGION_AND_RACK_CONTROLLER)
+        if not is_rack:
             # XXX 2014-10-21 newell, bug=1382075
             # Auto detection for IPMI tries to save power parameters
             # for Moonshot and RSD.  This causes issues if the node's power
@@ -496,14 +492,19 @@ class VersionIndexHandler(MetadataViewHandler):
         target_status = signaling_statuses.get(status)
 
         if target_status in [NODE_STATUS.READY, NODE_STATUS.TESTING]:
-            # Recalculate tags when commissioning ends.
-            populate_tags_for_single_node(Tag.objects.all(), node)
+            # Commissioning was successful. Setup the default storage layout
+            # and the initial networking configuration for the node, and
+            # recalculate its tags, in the background; the node shouldn't
+            # have to wait for any of that.
+            PostCommissioningTask.objects.enqueue(
+                node, configure_node=not is_rack)
         elif (target_status == NODE_STATUS.FAILED_COMMISSIONING and
                 node.current_testing_script_set is not None):
             # If commissioning failed testing doesn't run, mark any pending
             # scripts as aborted.
             qs = node.current_testing_script_set.scriptresult_set.filter(
-                status=SCRIPT_STATUS.PENDING)
+                status=SCRIPT_STATUS.PENDING).defer(
+                    *DEFERRED_SCRIPT_RESULT_FIELDS)
             for script_result in qs:
                 script_result.status = SCRIPT_STATUS.ABORTED
                 script_result.save(update_fields=['status'])
@@ -767,18 +768,6 @@ class CurtinUserDataHandler(MetadataViewHandler):
             content_type='application/octet-stream')
 
 
-def add_file_to_tar(tar, path, content, mtime, permission=0o755):
-    """Add a script to a tar."""
-    assert isinstance(content, bytes), "Script content must be binary."
-    tarinfo = tarfile.TarInfo(name=path)
-    tarinfo.size = len(content)
-    tarinfo.mode = permission
-    # Modification time defaults to Epoch, which elicits annoying
-    # warnings when decompressing.
-    tarinfo.mtime = mtime
-    tar.addfile(tarinfo, BytesIO(content))
-
-
 class CommissioningScriptsHandler(MetadataViewHandler):
     """Return a tar archive containing the commissioning scripts.
 
@@ -787,18 +776,27 @@ class CommissioningScriptsHandler(MetadataViewHandler):
 
     def _iter_builtin_scripts(self):
         for script in NODE_INFO_SCRIPTS.values():
-            yield script['name'], script['content']
+            name, content = script['name'], script['content']
+            yield (
+                name, get_builtin_script_key(name, content),
+                partial(bytes, content))
 
     def _iter_user_scripts(self):
-        for script in Script.objects.filter(
-                script_type=SCRIPT_TYPE.COMMISSIONING):
-            try:
-                # Check if the script is a base64 encoded binary.
-                content = base64.b64decode(script.script.data)
-            except:
-                # If it isn't encode the text as binary data.
-                content = script.script.data.encode()
-            yield script.name, content
+        scripts = Script.objects.filter(
+            script_type=SCRIPT_TYPE.COMMISSIONING).select_related(
+            'script').defer('script__data')
+        for script in scripts:
+            yield (
+                script.name, get_script_key(script.script.id),
+                partial(self._get_user_script_content, script.script))
+
+    def _get_user_script_content(self, script):
+        try:
+            # Check if the script is a base64 encoded binary.
+            return base64.b64decode(script.data)
+        except:
+            # If it isn't encode the text as binary data.
+            return script.data.encode()
 
     def _iter_scripts(self):
         return chain(
@@ -811,28 +809,30 @@ class CommissioningScriptsHandler(MetadataViewHandler):
 
         Each of the scripts will be in the `ARCHIVE_PREFIX` directory.
         """
-        binary = BytesIO()
-        scripts = sorted(self._iter_scripts())
-        with tarfile.open(mode='w', fileobj=binary) as tarball:
-            add_script = partial(
-                add_file_to_tar, tarball, mtime=time.time())
-            for name, content in scripts:
-                add_script(os.path.join("commissioning.d", name), content)
-        return binary.getvalue()
+        archive = ScriptArchive(mtime=time.time())
+        scripts = sorted(self._iter_scripts(), key=itemgetter(0, 1))
+        for name, key, get_content in scripts:
+            archive.add(
+                os.path.join("commissioning.d", name), key, get_content)
+        return archive
 
     def read(self, request, version, mac=None):
         check_version(version)
-        return HttpResponse(
-            self._get_archive(), content_type='application/tar')
+        return self._get_archive().make_response(
+            request, content_type='application/tar')
 
 
 class MAASScriptsHandler(OperationsHandler):
 
-    def _add_script_set_to_tar(self, script_set, tar, prefix, mtime):
+    def _add_script_set_to_archive(self, script_set, archive, prefix):
         if script_set is None:
             return []
         meta_data = []
-        for script_result in script_set:
+        # The scripts themselves are only loaded when they're not cached.
+        qs = script_set.scriptresult_set.select_related(
+            'script', 'script__script').defer(
+            *DEFERRED_SCRIPT_RESULT_FIELDS, 'script__script__data')
+        for script_result in qs:
             # Don't rerun Scripts which have already run.
             if script_result.status not in (
                     SCRIPT_STATUS.PENDING, SCRIPT_STATUS.RUNNING):
@@ -844,7 +844,10 @@ class MAASScriptsHandler(OperationsHandler):
                 # data from the source.
                 if script_result.name in NODE_INFO_SCRIPTS:
                     script = NODE_INFO_SCRIPTS[script_result.name]
-                    add_file_to_tar(tar, path, script['content'], mtime)
+                    content = script['content']
+                    archive.add(
+                        path, get_builtin_script_key(script['name'], content),
+                        partial(bytes, content))
                     meta_data.append({
                         'name': script_result.name,
                         'path': path,
@@ -857,8 +860,10 @@ class MAASScriptsHandler(OperationsHandler):
                     script_result.delete()
                     continue
             else:
-                content = script_result.script.script.data.encode()
-                add_file_to_tar(tar, path, content, mtime)
+                script = script_result.script.script
+                archive.add(
+                    path, get_script_key(script.id),
+                    partial(self._get_script_content, script))
                 meta_data.append({
                     'name': script_result.name,
                     'path': path,
@@ -868,6 +873,9 @@ class MAASScriptsHandler(OperationsHandler):
                 })
         return meta_data
 
+    def _get_script_content(self, script):
+        return script.data.encode()
+
     def read(self, request, version, mac=None):
         """Returns a tar containing user and status selected scripts.
 
@@ -877,35 +885,38 @@ class MAASScriptsHandler(OperationsHandler):
         so auto-decompress is suggested. If the node returns a script status
         and calls this request again only the scripts which havn't been run
         will be returned.
+
+        The response has an entity tag, derived from the versions of the
+        scripts and the results that are expected, so a node that already
+        has the scripts can ask for them with If-None-Match.
         """
         node = get_queried_node(request)
-        binary = BytesIO()
-        mtime = time.time()
+        archive = ScriptArchive(mtime=time.time())
         tar_meta_data = {}
         # Responses are currently gzip compressed using
         # django.middleware.gzip.GZipMiddleware.
-        with tarfile.open(mode='w', fileobj=binary) as tar:
-            # Commissioning scripts should only be run during commissioning.
-            if node.status == NODE_STATUS.COMMISSIONING:
-                meta_data = self._add_script_set_to_tar(
-                    node.current_commissioning_script_set, tar,
-                    'commissioning', mtime)
-                if meta_data != []:
-                    tar_meta_data['commissioning_scripts'] = sorted(
-                        meta_data, key=itemgetter('name', 'script_result_id'))
-
-            # Always send testing scripts.
-            meta_data = self._add_script_set_to_tar(
-                node.current_testing_script_set, tar, 'testing', mtime)
+
+        # Commissioning scripts should only be run during commissioning.
+        if node.status == NODE_STATUS.COMMISSIONING:
+            meta_data = self._add_script_set_to_archive(
+                node.current_commissioning_script_set, archive,
+                'commissioning')
             if meta_data != []:
-                tar_meta_data['testing_scripts'] = sorted(
+                tar_meta_data['commissioning_scripts'] = sorted(
                     meta_data, key=itemgetter('name', 'script_result_id'))
 
-            add_file_to_tar(
-                tar, 'index.json', json.dumps({'1.0': tar_meta_data}).encode(),
-                mtime, 0o644)
-        return HttpResponse(
-            binary.getvalue(), content_type='application/x-tar')
+        # Always send testing scripts.
+        meta_data = self._add_script_set_to_archive(
+            node.current_testing_script_set, archive, 'testing')
+        if meta_data != []:
+            tar_meta_data['testing_scripts'] = sorted(
+                meta_data, key=itemgetter('name', 'script_result_id'))
+
+        archive.add_file(
+            'index.json',
+            json.dumps({'1.0': tar_meta_data}, sort_keys=True).encode(),
+            0o644)
+        return archive.make_response(request, content_type='application/x-tar')
 
 
 class EnlistMetaDataHandler(OperationsHandler):
@@ -19,6 +19,7 @@ from maasserver.models.timestampedmodel import now
 from maasserver.preseed import CURTIN_INSTALL_LOG
 from maasserver.utils.orm import (
     in_transaction,
+    is_retryable_failure,
     make_serialization_failure,
     transactional,
     TransactionManagementError,
@@ -38,6 +39,10 @@ from provisioningserver.logger import LegacyLogger
 from provisioningserver.utils.twisted import deferred
 from twisted.application.internet import TimerService
 from twisted.internet import reactor
+from twisted.internet.defer import (
+    Deferred,
+    QueueOverflow,
+)
 from twisted.web.resource import Resource
 from twisted.web.server import NOT_DONE_YET
 
@@ -181,9 +186,24 @@ class StatusHandlerResource(Resource):
 
 
 class StatusWorkerService(TimerService, object):
-    """Service to update nodes from recieved status messages."""
+    """Service to update nodes from recieved status messages.
+
+    Messages are queued in memory and flushed to the database every
+    `check_interval` seconds, or as soon as `flush_threshold` messages are
+    waiting. All messages in a flush are written in a single transaction.
+
+    Once `max_queue_size` messages are waiting, for example because the
+    database tasks queue is saturated, callers of `queueMessage` are made to
+    wait until the next flush has completed.
+    """
+
+    check_interval = 1  # Every second.
 
-    check_interval = 60  # Every second.
+    # Flush the queue early once this many messages are waiting.
+    flush_threshold = 100
+
+    # Apply back-pressure once this many messages are waiting.
+    max_queue_size = 1000
 
     def __init__(self, dbtasks, clock=reactor):
         # Call self._tryUpdateNodes() every self.check_interval.
@@ -192,14 +212,71 @@ class StatusWorkerService(TimerService, object):
         self.dbtasks = dbtasks
         self.clock = clock
         self.queue = defaultdict(list)
+        self.queueDepth = 0
+        self.flushing = None
+        self.flushCall = None
+        self.waiting = []
+        self.stats = {
+            "queued": 0,
+            "processed": 0,
+            "failed": 0,
+            "flushes": 0,
+            "last_flush_size": 0,
+        }
+
+    def getStats(self):
+        """Return the statistics of this service, including its queue depth.
+
+        `queue_depth` is the number of messages waiting to be flushed and
+        `waiting` is the number of callers held back by back-pressure.
+        """
+        stats = dict(self.stats)
+        stats["queue_depth"] = self.queueDepth
+        stats["waiting"] = len(self.waiting)
+        return stats
 
     def _tryUpdateNodes(self):
-        if len(self.queue) != 0:
+        self.flushCall = None
+        if self.flushing is not None:
+            # Messages queued meanwhile will be picked up by the next flush.
+            return None
+        elif len(self.queue) != 0:
             queue, self.queue = self.queue, defaultdict(list)
+            queue_depth, self.queueDepth = self.queueDepth, 0
+            self.stats["flushes"] += 1
+            self.stats["last_flush_size"] = queue_depth
             d = deferToDatabase(self._preProcessQueue, queue)
             d.addCallback(self._processMessagesLater)
+            d.addErrback(self._requeue, queue, queue_depth)
             d.addErrback(log.err, "Failed to process node status messages.")
+            d.addBoth(self._flushDone)
+            self.flushing = d
             return d
+        else:
+            self._releaseWaiting()
+            return None
+
+    def _flushDone(self, result):
+        self.flushing = None
+        self._releaseWaiting()
+        if self.queueDepth >= self.flush_threshold:
+            self._scheduleFlush()
+        return result
+
+    def _releaseWaiting(self):
+        waiting, self.waiting = self.waiting, []
+        for d in waiting:
+            d.callback(None)
+
+    def _requeue(self, failure, queue, queue_depth):
+        """Put the messages back on the queue if the database is saturated."""
+        failure.trap(QueueOverflow)
+        log.msg(
+            "Database tasks queue is full; %d status message(s) will be "
+            "retried on the next flush." % queue_depth)
+        for authorization, messages in queue.items():
+            self.queue[authorization][:0] = messages
+        self.queueDepth += queue_depth
 
     @transactional
     def _preProcessQueue(self, queue):
@@ -216,42 +293,67 @@ class StatusWorkerService(TimerService, object):
         ]
 
     def _processMessagesLater(self, tasks):
-        # Move all messages on the queue off onto the database tasks queue.
-        # We're not going to wait for them to be processed because we can't /
-        # don't apply back-pressure to those systems that are producing these
-        # messages anyway.
-        for node, messages in tasks:
-            self.dbtasks.addTask(self._processMessages, node, messages)
+        # Move all messages on the queue off onto the database tasks queue as
+        # a single task. The returned `Deferred` fires once they have been
+        # written, so the next flush waits for the database to catch up.
+        if len(tasks) != 0:
+            d = self.dbtasks.deferTask(self._processMessagesForNodes, tasks)
+            d.addCallback(self._updateStats)
+            return d
 
-    def _processMessages(self, node, messages):
-        # Push the messages into the database, recording them for this node.
-        # This should be called in a non-reactor thread with a pre-existing
-        # connection (e.g. via deferToDatabase).
+    def _updateStats(self, counts):
+        processed, failed = counts
+        self.stats["processed"] += processed
+        self.stats["failed"] += failed
+
+    def _processMessagesForNodes(self, tasks):
+        # Push the messages for all nodes into the database in one
+        # transaction. This should be called in a non-reactor thread with a
+        # pre-existing connection (e.g. via deferToDatabase).
         if in_transaction():
             raise TransactionManagementError(
-                "_processMessages must be called from "
+                "_processMessagesForNodes must be called from "
                 "outside of a transaction.")
         else:
-            # Here we're in a database thread, with a database connection.
-            # We only save the last_ping off the last message in the
-            # list of messages. This removes the number of database saves
-            # required.
-            for idx, message in enumerate(messages):
+            return transactional(self._processAllMessages)(tasks)
+
+    def _processAllMessages(self, tasks):
+        """Process the messages for all nodes within one transaction.
+
+        Each message is processed within its own savepoint, so a failure
+        only discards that message. Retryable failures are re-raised so that
+        the whole transaction is retried.
+
+        :return: A tuple of (processed, failed) message counts.
+        """
+        processed, failed = 0, 0
+        for node, messages in tasks:
+            for message in messages:
                 try:
                     self._processMessage(node, message)
-                except:
+                except Exception as error:
+                    if is_retryable_failure(error):
+                        raise
+                    failed += 1
                     log.err(
                         None,
                         "Failed to process message "
                         "for node: %s" % node.hostname)
-                if idx == len(messages) - 1:
-                    try:
-                        self._updateLastPing(node, message)
-                    except:
-                        log.err(
-                            None,
-                            "Failed to update last ping "
-                            "for node: %s" % node.hostname)
+                else:
+                    processed += 1
+            # We only save the last_ping off the last message in the
+            # list of messages. This removes the number of database saves
+            # required.
+            try:
+                self._updateLastPing(node, messages[-1])
+            except Exception as error:
+                if is_retryable_failure(error):
+                    raise
+                log.err(
+                    None,
+                    "Failed to update last ping "
+                    "for node: %s" % node.hostname)
+        return processed, failed
 
     @transactional
     def _updateLastPing(self, node, message):
@@ -390,6 +492,10 @@ class StatusWorkerService(TimerService, object):
         """Top-level events do not have slashes in their names."""
         return '/' not in activity_name
 
+    def _scheduleFlush(self):
+        if self.flushing is None and self.flushCall is None:
+            self.flushCall = self.clock.callLater(0, self._tryUpdateNodes)
+
     def _processMessageNow(self, authorization, message):
         # This should be called in a non-reactor thread with a pre-existing
         # connection (e.g. via deferToDatabase).
@@ -440,3 +546,14 @@ class StatusWorkerService(TimerService, object):
             return d
         else:
             self.queue[authorization].append(message)
+            self.queueDepth += 1
+            self.stats["queued"] += 1
+            if self.queueDepth >= self.max_queue_size:
+                # Apply back-pressure: acknowledge this message only once the
+                # queue has been flushed.
+                d = Deferred()
+                self.waiting.append(d)
+                self._scheduleFlush()
+                return d
+            elif self.queueDepth >= self.flush_threshold:
+                self._scheduleFlush()
@@ -8,21 +8,33 @@ __all__ = [
     'update_node_network_information',
     ]
 
+from collections import (
+    defaultdict,
+    OrderedDict,
+)
 import fnmatch
 import json
 import logging
 import math
 import re
 
+from django.db import connection
 from lxml import etree
+from maasserver.enum import IPADDRESS_TYPE
 from maasserver.models import Fabric
-from maasserver.models.blockdevice import MIN_BLOCK_DEVICE_SIZE
+from maasserver.models.blockdevice import (
+    BlockDevice,
+    MIN_BLOCK_DEVICE_SIZE,
+)
+from maasserver.models.filesystemgroup import FilesystemGroup
 from maasserver.models.interface import (
     Interface,
     PhysicalInterface,
 )
 from maasserver.models.physicalblockdevice import PhysicalBlockDevice
+from maasserver.models.staticipaddress import StaticIPAddress
 from maasserver.models.tag import Tag
+from maasserver.models.timestampedmodel import now
 from maasserver.utils.orm import get_one
 from provisioningserver.refresh.node_info_scripts import (
     IPADDR_OUTPUT_NAME,
@@ -75,24 +87,17 @@ SWITCH_HARDWARE = [
 ]
 
 
-def _create_default_physical_interface(node, ifname, mac):
-    """Assigns the specified interface to the specified Node.
-
-    Creates or updates a PhysicalInterface that corresponds to the given MAC.
+def _make_default_physical_interface(node, ifname, mac, vlan):
+    """Return a new, unsaved, PhysicalInterface for the specified Node.
 
     :param node: Node model object
     :param ifname: the interface name (for example, 'eth0')
-    :param mac: the Interface to update and associate
+    :param mac: the MAC address of the interface
+    :param vlan: the VLAN of the interface, or `None` if it's disconnected
     """
-    # We don't yet have enough information to put this newly-created Interface
-    # into the proper Fabric/VLAN. (We'll do this on a "best effort" basis
-    # later, if we are able to determine that the interface is on a particular
-    # subnet due to a DHCP reply during commissioning.)
-    fabric = Fabric.objects.get_default_fabric()
-    vlan = fabric.get_default_vlan()
-    interface = PhysicalInterface.objects.create(
+    interface = PhysicalInterface(
         mac_address=mac, name=ifname, node=node, vlan=vlan)
-
+    interface.clean_fields(exclude=["node", "vlan"])
     return interface
 
 
@@ -102,6 +107,11 @@ def update_node_network_information(node, output, exit_status):
     Creates and deletes an Interface according to what we currently know about
     this node's hardware.
 
+    The existing interfaces are loaded in one query, new interfaces are
+    created in one statement and renamed interfaces are updated in one
+    statement. Only interfaces with addresses, and those that have become
+    disconnected, are then updated one at a time.
+
     If `exit_status` is non-zero, this function returns without doing
     anything.
 
@@ -117,51 +127,109 @@ def update_node_network_information(node, output, exit_status):
     if node.skip_networking:
         return
 
-    # Get the MAC addresses of all connected interfaces.
+    # Get the MAC addresses of all connected interfaces, ignoring loopback
+    # interfaces. When links share a MAC address the last one wins.
     ip_addr_info = parse_ip_addr(output)
-    current_interfaces = set()
-
-    for link in ip_addr_info.values():
-        link_mac = link.get('mac')
-        # Ignore loopback interfaces.
-        if link_mac is None:
-            continue
-        else:
-            ifname = link['name']
-            try:
-                interface = PhysicalInterface.objects.get(
-                    mac_address=link_mac)
-                if interface.node is not None and interface.node != node:
-                    logger.warning(
-                        "Interface with MAC %s moved from node %s to %s. "
-                        "(The existing interface will be deleted.)" %
-                        (interface.mac_address, interface.node.fqdn,
-                         node.fqdn))
-                    interface.delete()
-                    interface = _create_default_physical_interface(
-                        node, ifname, link_mac)
-                else:
-                    # Interface already exists on this Node, so just update
-                    # the name.
-                    if interface.name != ifname:
-                        interface.name = ifname
-                        interface.save(update_fields=['name', 'updated'])
-            except PhysicalInterface.DoesNotExist:
-                interface = _create_default_physical_interface(
-                    node, ifname, link_mac)
-
-            current_interfaces.add(interface)
-            ips = link.get('inet', []) + link.get('inet6', [])
+    links = OrderedDict(
+        (link['mac'].lower(), link)
+        for link in ip_addr_info.values()
+        if link.get('mac') is not None)
+    existing = {
+        str(interface.mac_address).lower(): interface
+        for interface in PhysicalInterface.objects.filter(
+            mac_address__in=list(links)).select_related('node')
+    }
+
+    current_interfaces, disconnected_interfaces = [], []
+    renamed, created = [], []
+    default_vlan = None
+    for mac, link in links.items():
+        ifname = link['name']
+        disconnected = 'NO-CARRIER' in link.get('flags', [])
+        interface = existing.get(mac)
+        if interface is not None and interface.node_id not in (None, node.id):
+            logger.warning(
+                "Interface with MAC %s moved from node %s to %s. "
+                "(The existing interface will be deleted.)" %
+                (interface.mac_address, interface.node.fqdn,
+                 node.fqdn))
+            interface.delete()
+            interface = None
+        if interface is None:
+            # We don't yet have enough information to put this newly-created
+            # Interface into the proper Fabric/VLAN. (We'll do this on a "best
+            # effort" basis later, if we are able to determine that the
+            # interface is on a particular subnet due to a DHCP reply during
+            # commissioning.)
+            if disconnected:
+                vlan = None
+            else:
+                if default_vlan is None:
+                    fabric = Fabric.objects.get_default_fabric()
+                    default_vlan = fabric.get_default_vlan()
+                vlan = default_vlan
+            interface = _make_default_physical_interface(
+                node, ifname, link['mac'], vlan)
+            created.append(interface)
+        elif interface.name != ifname:
+            # Interface already exists on this Node, so just update the name.
+            interface.name = ifname
+            interface.clean_fields(exclude=["node", "vlan"])
+            renamed.append(interface)
+        current_interfaces.append((interface, _get_link_ips(link)))
+        if disconnected:
+            disconnected_interfaces.append(interface)
+
+    _apply_interface_changes(renamed, created)
+
+    # Discovered addresses are replaced by what was seen this time, so clear
+    # them in one go from the interfaces that didn't report any. New
+    # interfaces have none to clear.
+    StaticIPAddress.objects.filter(
+        alloc_type=IPADDRESS_TYPE.DISCOVERED,
+        interface__in=[
+            interface for interface, ips in current_interfaces
+            if len(ips) == 0 and interface not in created
+        ]).delete()
+    for interface, ips in current_interfaces:
+        if len(ips) > 0:
             interface.update_ip_addresses(ips)
-            if 'NO-CARRIER' in link.get('flags', []):
-                # This interface is now disconnected.
-                if interface.vlan is not None:
-                    interface.vlan = None
-                    interface.save(update_fields=['vlan', 'updated'])
-
-    for iface in Interface.objects.filter(node=node):
-        if iface not in current_interfaces:
-            iface.delete()
+    for interface in disconnected_interfaces:
+        # This interface is now disconnected.
+        if interface.vlan is not None:
+            interface.vlan = None
+            interface.save(update_fields=['vlan', 'updated'])
+
+    stale_interfaces = Interface.objects.filter(node=node).exclude(
+        id__in=[interface.id for interface, _ in current_interfaces])
+    for iface in stale_interfaces:
+        iface.delete()
+
+
+def _get_link_ips(link):
+    return link.get('inet', []) + link.get('inet6', [])
+
+
+def _apply_interface_changes(renamed, created):
+    """Write the interfaces changed by `update_node_network_information`."""
+    if len(renamed) > 0:
+        values, params = _values(
+            [(interface.id, interface.name) for interface in renamed],
+            "(%s::integer, %s::text)")
+        # This skips the signal that saves child interfaces again when their
+        # parent is saved, but all child interfaces are deleted afterwards as
+        # they are not reported.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE " + Interface._meta.db_table + " AS i "
+                "SET name = v.name, updated = now() "
+                "FROM (VALUES " + values + ") AS v (id, name) "
+                "WHERE i.id = v.id", params)
+    if len(created) > 0:
+        time = now()
+        for interface in created:
+            interface.created = interface.updated = time
+        PhysicalInterface.objects.bulk_create(created)
 
 
 def update_node_network_interface_tags(node, output, exit_status):
@@ -299,17 +367,49 @@ def get_tags_from_block_info(block_info):
     return tags
 
 
-def get_matching_block_device(block_devices, serial=None, id_path=None):
-    """Return the matching block device based on `serial` or `id_path` from
-    the provided list of `block_devices`."""
+def _values(rows, template):
+    """Return the SQL and parameters for a ``VALUES`` list of `rows`.
+
+    :param template: The SQL for one row, e.g. ``(%s::integer, %s::text)``.
+        Casts are needed because Postgres can't always infer the types of
+        the columns of a ``VALUES`` list.
+    """
+    sql = ", ".join([template] * len(rows))
+    params = [value for row in rows for value in row]
+    return sql, params
+
+
+def index_block_devices(block_devices):
+    """Index `block_devices` by serial and by id_path.
+
+    Each index maps to a list of block devices, in the order given, so that
+    the first match is always used, as a linear scan would.
+    """
+    by_serial, by_id_path = defaultdict(list), defaultdict(list)
+    for block_device in block_devices:
+        by_serial[block_device.serial].append(block_device)
+        by_id_path[block_device.id_path].append(block_device)
+    return by_serial, by_id_path
+
+
+def pop_matching_block_device(index, unmatched, serial=None, id_path=None):
+    """Return and remove from `unmatched` the first block device that
+    matches `serial` or, when there's no serial, `id_path`.
+
+    :param index: A tuple of indexes from `index_block_devices`.
+    :param unmatched: An ordered mapping of IDs to block devices that have
+        not been matched yet.
+    """
+    by_serial, by_id_path = index
     if serial:
-        for block_device in block_devices:
-            if block_device.serial == serial:
-                return block_device
+        candidates = by_serial.get(serial, ())
     elif id_path:
-        for block_device in block_devices:
-            if block_device.id_path == id_path:
-                return block_device
+        candidates = by_id_path.get(id_path, ())
+    else:
+        candidates = ()
+    for block_device in candidates:
+        if block_device.id in unmatched:
+            return unmatched.pop(block_device.id)
     return None
 
 
@@ -318,6 +418,12 @@ def update_node_physical_block_devices(node, output, exit_status):
 
     This updates the physical block devices that are attached to a node.
 
+    The existing devices are loaded once and diffed against the output, then
+    the changes are applied with a fixed number of statements, however many
+    devices the node has: one to delete the devices that are gone, one to
+    move devices that were renamed out of the way, one per table to update
+    the devices that changed, and one per table to create the new devices.
+
     If `exit_status` is non-zero, this function returns without doing
     anything.
     """
@@ -336,8 +442,11 @@ def update_node_physical_block_devices(node, output, exit_status):
         blockdevs = json.loads(output.decode("ascii"))
     except ValueError as e:
         raise ValueError(e.message + ': ' + output)
-    previous_block_devices = list(
-        PhysicalBlockDevice.objects.filter(node=node).all())
+    previous_block_devices = OrderedDict(
+        (block_device.id, block_device)
+        for block_device in PhysicalBlockDevice.objects.filter(node=node))
+    index = index_block_devices(previous_block_devices.values())
+    updated, renamed, resized, created = [], [], [], []
     for block_info in blockdevs:
         # Skip the read-only devices. We keep them in the output for
         # the user to view but they do not get an entry in the database.
@@ -355,13 +464,23 @@ def update_node_physical_block_devices(node, output, exit_status):
         size = int(block_info["SIZE"])
         block_size = int(block_info["BLOCK_SIZE"])
         tags = get_tags_from_block_info(block_info)
-        block_device = get_matching_block_device(
-            previous_block_devices, serial, id_path)
+        block_device = pop_matching_block_device(
+            index, previous_block_devices, serial, id_path)
         if block_device is not None:
             # Already exists for the node. Keep the original object so the
             # ID doesn't change and if its set to the boot_disk that FK will
             # not need to be updated.
-            previous_block_devices.remove(block_device)
+            current = (
+                block_device.name, block_device.model, block_device.serial,
+                block_device.id_path, block_device.size,
+                block_device.block_size, block_device.tags)
+            if current == (
+                    name, model, serial, id_path, size, block_size, tags):
+                continue
+            if block_device.name != name:
+                renamed.append(block_device)
+            if block_device.size != size:
+                resized.append(block_device)
             block_device.name = name
             block_device.model = model
             block_device.serial = serial
@@ -369,7 +488,9 @@ def update_node_physical_block_devices(node, output, exit_status):
             block_device.size = size
             block_device.block_size = block_size
             block_device.tags = tags
-            block_device.save()
+            block_device.clean_fields(exclude=["node"])
+            block_device.clean()
+            updated.append(block_device)
         else:
             # MAAS doesn't allow disks smaller than 4MiB so skip them
             if size <= MIN_BLOCK_DEVICE_SIZE:
@@ -377,18 +498,8 @@ def update_node_physical_block_devices(node, output, exit_status):
             # Skip loopback devices as they won't be available on next boot
             if id_path.startswith('/dev/loop'):
                 continue
-
-            # First check if there is an existing device with the same name.
-            # If so, we need to rename it. Its name will be changed back later,
-            # when we loop around to it.
-            existing = PhysicalBlockDevice.objects.filter(
-                node=node, name=name).all()
-            for device in existing:
-                # Use the device ID to ensure a unique temporary name.
-                device.name = "%s.%d" % (device.name, device.id)
-                device.save()
             # New block device. Create it on the node.
-            PhysicalBlockDevice.objects.create(
+            block_device = PhysicalBlockDevice(
                 node=node,
                 name=name,
                 id_path=id_path,
@@ -398,24 +509,97 @@ def update_node_physical_block_devices(node, output, exit_status):
                 model=model,
                 serial=serial,
                 )
+            block_device.clean_fields(exclude=["node"])
+            block_device.clean()
+            created.append(block_device)
 
     # Clear boot_disk if it is being removed.
     boot_disk = node.boot_disk
-    if boot_disk is not None and boot_disk in previous_block_devices:
+    if boot_disk is not None and boot_disk.id in previous_block_devices:
         boot_disk = None
     if node.boot_disk != boot_disk:
         node.boot_disk = boot_disk
         node.save()
 
     # Delete all the previous block devices that are no longer present
-    # on the commissioned node.
-    delete_block_device_ids = [
-        bd.id
-        for bd in previous_block_devices
-    ]
-    if len(delete_block_device_ids) > 0:
+    # on the commissioned node. This is done first so their names are free.
+    if len(previous_block_devices) > 0:
         PhysicalBlockDevice.objects.filter(
-            id__in=delete_block_device_ids).delete()
+            id__in=list(previous_block_devices)).delete()
+
+    _apply_block_device_changes(node, updated, renamed, created)
+
+    # Block device sizes feed into the sizes of the filesystem groups they
+    # belong to, which are normally updated when a block device is saved.
+    if len(resized) > 0:
+        groups = FilesystemGroup.objects.filter_by_block_devices(resized)
+        for group in groups:
+            group.save()
+
+
+def _apply_block_device_changes(node, updated, renamed, created):
+    """Write the changes computed by `update_node_physical_block_devices`.
+
+    Each step is a single statement per table. The block devices being
+    renamed are first given a unique temporary name, because Postgres checks
+    the unique name constraint row by row, so swapping the names of two
+    devices in one statement would otherwise fail.
+    """
+    parent_table = BlockDevice._meta.db_table
+    child_table = PhysicalBlockDevice._meta.db_table
+    with connection.cursor() as cursor:
+        if len(renamed) > 0:
+            cursor.execute(
+                "UPDATE " + parent_table + " "
+                "SET name = name || '.' || id::text WHERE id = ANY(%s)",
+                [[block_device.id for block_device in renamed]])
+        if len(updated) > 0:
+            values, params = _values([
+                (block_device.id, block_device.name, block_device.id_path,
+                 block_device.size, block_device.block_size,
+                 block_device.tags)
+                for block_device in updated
+            ], "(%s::integer, %s::text, %s::text, %s::bigint, "
+               "%s::integer, %s::text[])")
+            cursor.execute(
+                "UPDATE " + parent_table + " AS bd "
+                "SET name = v.name, id_path = v.id_path, size = v.size, "
+                "block_size = v.block_size, tags = v.tags, updated = now() "
+                "FROM (VALUES " + values + ") "
+                "AS v (id, name, id_path, size, block_size, tags) "
+                "WHERE bd.id = v.id", params)
+            values, params = _values([
+                (block_device.id, block_device.model, block_device.serial)
+                for block_device in updated
+            ], "(%s::integer, %s::text, %s::text)")
+            cursor.execute(
+                "UPDATE " + child_table + " AS pbd "
+                "SET model = v.model, serial = v.serial "
+                "FROM (VALUES " + values + ") AS v (id, model, serial) "
+                "WHERE pbd.blockdevice_ptr_id = v.id", params)
+        if len(created) > 0:
+            # Rows are returned in the order they are inserted, so the new
+            # devices keep the order they were discovered in.
+            values, params = _values([
+                (node.id, block_device.name, block_device.id_path,
+                 block_device.size, block_device.block_size,
+                 block_device.tags)
+                for block_device in created
+            ], "(%s, %s, %s, %s, %s, %s::text[], now(), now())")
+            cursor.execute(
+                "INSERT INTO " + parent_table + " "
+                "(node_id, name, id_path, size, block_size, tags, "
+                "created, updated) VALUES " + values + " RETURNING id",
+                params)
+            ids = [row[0] for row in cursor.fetchall()]
+            values, params = _values([
+                (id, block_device.model, block_device.serial)
+                for id, block_device in zip(ids, created)
+            ], "(%s, %s, %s)")
+            cursor.execute(
+                "INSERT INTO " + child_table + " "
+                "(blockdevice_ptr_id, model, serial) VALUES " + values,
+                params)
 
 
 def set_tags_by_modalias(node, output: bytes, exit_status):
@@ -13,11 +13,13 @@ from textwrap import dedent
 
 from fixtures import FakeLogger
 from maasserver.enum import (
+    FILESYSTEM_TYPE,
     INTERFACE_TYPE,
     IPADDRESS_TYPE,
 )
 from maasserver.fields import MAC
 from maasserver.models.blockdevice import MIN_BLOCK_DEVICE_SIZE
+from maasserver.models.filesystemgroup import FilesystemGroup
 from maasserver.models.interface import Interface
 from maasserver.models.physicalblockdevice import PhysicalBlockDevice
 from maasserver.models.tag import Tag
@@ -25,6 +27,8 @@ from maasserver.models.vlan import VLAN
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
 from maasserver.utils.orm import reload_object
+from maastesting.djangotestcase import count_queries
+from maastesting.matchers import MockCalledOnceWith
 from metadataserver.builtin_scripts.hooks import (
     add_switch_vendor_model_tags,
     detect_switch_vendor_model,
@@ -697,6 +701,88 @@ class TestUpdateNodePhysicalBlockDevices(MAASServerTestCase):
             ]
         self.assertItemsEqual(created_ids_two, created_ids_one)
 
+    def test__swaps_block_device_names(self):
+        devices = [
+            self.make_block_device(name='sda', serial='first'),
+            self.make_block_device(name='sdb', serial='second'),
+        ]
+        node = factory.make_Node(with_boot_disk=False)
+        json_output = json.dumps(devices).encode('utf-8')
+        update_node_physical_block_devices(node, json_output, 0)
+        ids = {
+            device.serial: device.id
+            for device in PhysicalBlockDevice.objects.filter(node=node)
+        }
+        devices[0]['NAME'], devices[1]['NAME'] = 'sdb', 'sda'
+        json_output = json.dumps(devices).encode('utf-8')
+        update_node_physical_block_devices(node, json_output, 0)
+        self.assertItemsEqual(
+            [('first', 'sdb', ids['first']), ('second', 'sda', ids['second'])],
+            PhysicalBlockDevice.objects.filter(node=node).values_list(
+                'serial', 'name', 'id'))
+
+    def test__updates_changed_block_device(self):
+        device = self.make_block_device(serial='first')
+        node = factory.make_Node(with_boot_disk=False)
+        json_output = json.dumps([device]).encode('utf-8')
+        update_node_physical_block_devices(node, json_output, 0)
+        model = factory.make_name('model')
+        size = random.randint(
+            MIN_BLOCK_DEVICE_SIZE * 10, MIN_BLOCK_DEVICE_SIZE * 100)
+        device.update(MODEL=model, SIZE='%s' % size, ROTA='0')
+        json_output = json.dumps([device]).encode('utf-8')
+        update_node_physical_block_devices(node, json_output, 0)
+        self.assertThat(
+            PhysicalBlockDevice.objects.get(node=node),
+            MatchesStructure.byEquality(
+                name=device['NAME'], model=model, serial='first', size=size))
+        self.assertThat(
+            PhysicalBlockDevice.objects.get(node=node).tags, Contains('ssd'))
+
+    def test__resaves_filesystem_groups_of_resized_block_device(self):
+        device = self.make_block_device()
+        node = factory.make_Node(with_boot_disk=False)
+        json_output = json.dumps([device]).encode('utf-8')
+        update_node_physical_block_devices(node, json_output, 0)
+        block_device = PhysicalBlockDevice.objects.get(node=node)
+        factory.make_VolumeGroup(
+            filesystems=[factory.make_Filesystem(
+                fstype=FILESYSTEM_TYPE.LVM_PV, block_device=block_device)])
+        save = self.patch(FilesystemGroup, 'save')
+        device['SIZE'] = '%s' % (block_device.size * 2)
+        json_output = json.dumps([device]).encode('utf-8')
+        update_node_physical_block_devices(node, json_output, 0)
+        self.assertThat(save, MockCalledOnceWith())
+
+    def test__query_count_is_independent_of_number_of_devices(self):
+        # Reconciling a machine with 60 disks takes as many queries as one
+        # with a single disk, whether the disks are new, changed, the same
+        # or gone.
+        def count_reconciliation_queries(num_devices):
+            node = factory.make_Node(with_boot_disk=False)
+            devices = [
+                self.make_block_device(name='sd%d' % index)
+                for index in range(num_devices)
+            ]
+            outputs = [json.dumps(devices).encode('utf-8')]
+            # Rename the devices and change their models.
+            for index, device in enumerate(devices):
+                device['NAME'] = 'vd%d' % index
+                device['MODEL'] = factory.make_name('model')
+            outputs.append(json.dumps(devices).encode('utf-8'))
+            outputs.append(outputs[-1])
+            outputs.append(b'[]')
+            counts = []
+            for output in outputs:
+                count, _ = count_queries(
+                    update_node_physical_block_devices, node, output, 0)
+                counts.append(count)
+            return counts
+
+        self.assertEqual(
+            count_reconciliation_queries(1),
+            count_reconciliation_queries(60))
+
     def test__doesnt_reset_boot_disk(self):
         devices = [self.make_block_device() for _ in range(3)]
         node = factory.make_Node()
@@ -979,6 +1065,41 @@ class TestUpdateNodeNetworkInformation(MAASServerTestCase):
             self.assertThat(interface.mac_address, Equals(
                 expected_interfaces[interface.name]))
 
+    def make_ip_addr_output(self, num_interfaces, prefix='eth'):
+        lines = []
+        for index in range(num_interfaces):
+            lines.append(
+                "%d: %s%d: <BROADCAST,MULTICAST,UP,LOWER_UP> mtu 1500 qdisc "
+                "mq state UP mode DEFAULT group default qlen 1000" % (
+                    index + 2, prefix, index))
+            lines.append(
+                "    link/ether 00:16:3e:00:01:%02x brd ff:ff:ff:ff:ff:ff" % (
+                    index))
+        return "\n".join(lines).encode("ascii")
+
+    def test__query_count_is_independent_of_number_of_interfaces(self):
+        # Reconciling a machine with 16 NICs takes as many queries as one
+        # with a single NIC, whether the NICs are new, renamed or the same.
+        def count_reconciliation_queries(num_interfaces):
+            node = factory.make_Node()
+            outputs = [
+                self.make_ip_addr_output(num_interfaces),
+                self.make_ip_addr_output(num_interfaces, prefix='ens'),
+                self.make_ip_addr_output(num_interfaces, prefix='ens'),
+            ]
+            counts = []
+            for output in outputs:
+                count, _ = count_queries(
+                    update_node_network_information, node, output, 0)
+                counts.append(count)
+            self.assertEqual(
+                num_interfaces, Interface.objects.filter(node=node).count())
+            return counts
+
+        self.assertEqual(
+            count_reconciliation_queries(1),
+            count_reconciliation_queries(16))
+
     def test__does_nothing_if_skip_networking(self):
         node = factory.make_Node(interface=True, skip_networking=True)
         boot_interface = node.get_boot_interface()
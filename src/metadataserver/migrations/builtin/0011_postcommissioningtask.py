@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import (
+    migrations,
+    models,
+)
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maasserver', '0126_routable_address'),
+        ('metadataserver', '0010_scriptresult_time_and_script_title'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostCommissioningTask',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('node', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='post_commissioning_tasks', to='maasserver.Node')),
+                ('configure_node', models.BooleanField(default=True, editable=False)),
+                ('created', models.DateTimeField(editable=False)),
+                ('not_before', models.DateTimeField(editable=False)),
+                ('attempts', models.IntegerField(default=0, editable=False)),
+                ('error', models.TextField(blank=True, default='', editable=False)),
+            ],
+        ),
+    ]
@@ -7,6 +7,7 @@
 __all__ = [
     'NodeKey',
     'NodeUserData',
+    'PostCommissioningTask',
     'Script',
     'ScriptResult',
     'ScriptSet',
@@ -14,6 +15,7 @@ __all__ = [
 
 from metadataserver.models.nodekey import NodeKey
 from metadataserver.models.nodeuserdata import NodeUserData
+from metadataserver.models.postcommissioningtask import PostCommissioningTask
 from metadataserver.models.script import Script
 from metadataserver.models.scriptresult import ScriptResult
 from metadataserver.models.scriptset import ScriptSet
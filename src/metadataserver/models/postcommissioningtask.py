@@ -0,0 +1,95 @@
+# Copyright 2017 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+""":class:`PostCommissioningTask` model."""
+
+__all__ = [
+    'PostCommissioningTask',
+    ]
+
+from django.db.models import (
+    BooleanField,
+    CASCADE,
+    DateTimeField,
+    Exists,
+    ForeignKey,
+    IntegerField,
+    Manager,
+    Model,
+    OuterRef,
+    TextField,
+)
+from maasserver.models.cleansave import CleanSave
+from maasserver.models.timestampedmodel import now
+from maasserver.utils.orm import get_first
+from metadataserver import DefaultMeta
+
+
+class PostCommissioningTaskManager(Manager):
+    """Queue of nodes to process once they have finished commissioning."""
+
+    def enqueue(self, node, configure_node=True):
+        """Queue `node` to be processed.
+
+        :param configure_node: Whether to set up the node's default storage
+            layout and initial networking configuration, as well as
+            evaluating its tags.
+        """
+        time = now()
+        return self.create(
+            node=node, configure_node=configure_node,
+            created=time, not_before=time)
+
+    def claim_next(self):
+        """Lock and return the next task that is due, or `None`.
+
+        Tasks that are locked by another transaction are skipped, as are
+        tasks that have an earlier task queued for the same node; a node's
+        tasks are always processed in the order they were queued.
+        """
+        earlier = self.filter(
+            node_id=OuterRef('node_id'), id__lt=OuterRef('id'))
+        tasks = self.annotate(waiting=Exists(earlier)).filter(
+            waiting=False, not_before__lte=now())
+        tasks = tasks.order_by('id').select_for_update(skip_locked=True)
+        return get_first(tasks[:1])
+
+
+class PostCommissioningTask(CleanSave, Model):
+    """Work to be done on a node once it has finished commissioning.
+
+    Setting a node's default storage layout, its initial networking
+    configuration and evaluating its tags are too slow to do while the node
+    waits for a response to its final commissioning signal. They're queued
+    here instead, for the region's `PostCommissioningService` to perform.
+
+    :ivar node: The node to process.
+    :ivar configure_node: Whether to set up the node's storage and networking,
+        or only to evaluate its tags.
+    :ivar created: When the task was queued.
+    :ivar not_before: The earliest time at which to (re)try the task.
+    :ivar attempts: The number of failed attempts to process the task.
+    :ivar error: The error from the last failed attempt.
+    """
+
+    class Meta(DefaultMeta):
+        """Needed for South to recognize this model."""
+
+    objects = PostCommissioningTaskManager()
+
+    node = ForeignKey(
+        'maasserver.Node', on_delete=CASCADE, editable=False,
+        related_name='post_commissioning_tasks')
+
+    configure_node = BooleanField(default=True, editable=False)
+
+    created = DateTimeField(editable=False)
+
+    not_before = DateTimeField(editable=False)
+
+    attempts = IntegerField(default=0, editable=False)
+
+    error = TextField(blank=True, default='', editable=False)
+
+    def __str__(self):
+        return "%s (attempts: %d)" % (self.node.system_id, self.attempts)
@@ -2,6 +2,7 @@
 # GNU Affero General Public License version 3 (see the file LICENSE).
 
 __all__ = [
+    "DEFERRED_SCRIPT_RESULT_FIELDS",
     "ScriptSet",
 ]
 from datetime import timedelta
@@ -15,8 +16,11 @@ from django.db.models import (
     CharField,
     DateTimeField,
     ForeignKey,
+    Count,
     IntegerField,
     Manager,
+    Max,
+    Min,
     Model,
     Q,
 )
@@ -39,6 +43,10 @@ from metadataserver.enum import (
 from metadataserver.models.script import Script
 from provisioningserver.refresh.node_info_scripts import NODE_INFO_SCRIPTS
 
+# ScriptResult fields which may each hold up to 1MiB of data. Defer loading
+# them whenever the contents of the result aren't going to be displayed.
+DEFERRED_SCRIPT_RESULT_FIELDS = ('output', 'stdout', 'stderr')
+
 
 class ScriptSetManager(Manager):
 
@@ -201,19 +209,22 @@ class ScriptSet(CleanSave, Model):
 
     @property
     def status(self):
-        qs = self.scriptresult_set.all()
+        # Only fetch the distinct statuses of the results, loading every
+        # ScriptResult would also load its output, stdout, and stderr.
+        statuses = set(
+            self.scriptresult_set.order_by().values_list(
+                'status', flat=True).distinct())
         # The status order below represents the order of precedence.
         for status in (
                 SCRIPT_STATUS.RUNNING, SCRIPT_STATUS.PENDING,
                 SCRIPT_STATUS.ABORTED, SCRIPT_STATUS.FAILED,
                 SCRIPT_STATUS.TIMEDOUT):
-            for script_result in qs:
-                if (script_result.status == status and
-                        status == SCRIPT_STATUS.TIMEDOUT):
+            if status in statuses:
+                if status == SCRIPT_STATUS.TIMEDOUT:
                     # A timeout causes the node to go into a failed status
                     # so show the scriptset as failed.
                     return SCRIPT_STATUS.FAILED
-                elif script_result.status == status:
+                else:
                     return status
         return SCRIPT_STATUS.PASSED
 
@@ -221,28 +232,35 @@ class ScriptSet(CleanSave, Model):
     def status_name(self):
         return SCRIPT_STATUS_CHOICES[self.status][1]
 
+    def _get_times(self):
+        """Return the started and ended times of this `ScriptSet`.
+
+        Both values are calculated with a single aggregate query. ended is
+        None unless every `ScriptResult` in the set has ended.
+        """
+        times = self.scriptresult_set.order_by().aggregate(
+            started=Min('started'), ended=Max('ended'),
+            results=Count('id'), results_ended=Count('ended'))
+        if times['results'] != times['results_ended']:
+            return times['started'], None
+        else:
+            return times['started'], times['ended']
+
     @property
     def started(self):
-        qs = self.scriptresult_set.all()
-        if qs.exists():
-            return qs.earliest('started').started
-        else:
-            return None
+        started, _ = self._get_times()
+        return started
 
     @property
     def ended(self):
-        qs = self.scriptresult_set.all()
-        if not qs.exists():
-            return None
-        elif qs.filter(ended=None).exists():
-            return None
-        else:
-            return qs.latest('ended').ended
+        _, ended = self._get_times()
+        return ended
 
     @property
     def runtime(self):
-        if None not in (self.ended, self.started):
-            runtime = self.ended - self.started
+        started, ended = self._get_times()
+        if None not in (ended, started):
+            runtime = ended - started
             return str(runtime - timedelta(microseconds=runtime.microseconds))
         else:
             return ''
@@ -255,7 +273,9 @@ class ScriptSet(CleanSave, Model):
             except ObjectDoesNotExist:
                 pass
         else:
-            for script_result in self:
+            qs = self.scriptresult_set.select_related('script').defer(
+                *DEFERRED_SCRIPT_RESULT_FIELDS)
+            for script_result in qs:
                 if script_result.name == script_name:
                     return script_result
         return None
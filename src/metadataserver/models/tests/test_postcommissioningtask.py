@@ -0,0 +1,88 @@
+# Copyright 2017 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for :class:`PostCommissioningTask` model and manager."""
+
+__all__ = []
+
+from datetime import timedelta
+import threading
+
+from django.db import transaction
+from maasserver.models.timestampedmodel import now
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import (
+    MAASServerTestCase,
+    MAASTransactionServerTestCase,
+)
+from maasserver.utils.orm import transactional
+from metadataserver.models import PostCommissioningTask
+
+
+class TestPostCommissioningTaskManager(MAASServerTestCase):
+
+    def test_enqueue_creates_task_that_is_due(self):
+        node = factory.make_Node()
+        task = PostCommissioningTask.objects.enqueue(
+            node, configure_node=False)
+        self.assertEqual(node, task.node)
+        self.assertFalse(task.configure_node)
+        self.assertEqual(0, task.attempts)
+        self.assertEqual(task, PostCommissioningTask.objects.claim_next())
+
+    def test_claim_next_returns_None_if_queue_is_empty(self):
+        self.assertIsNone(PostCommissioningTask.objects.claim_next())
+
+    def test_claim_next_returns_oldest_task(self):
+        first = PostCommissioningTask.objects.enqueue(factory.make_Node())
+        PostCommissioningTask.objects.enqueue(factory.make_Node())
+        self.assertEqual(first, PostCommissioningTask.objects.claim_next())
+
+    def test_claim_next_skips_tasks_that_are_not_yet_due(self):
+        waiting = PostCommissioningTask.objects.enqueue(factory.make_Node())
+        waiting.not_before = now() + timedelta(minutes=1)
+        waiting.save()
+        due = PostCommissioningTask.objects.enqueue(factory.make_Node())
+        self.assertEqual(due, PostCommissioningTask.objects.claim_next())
+
+    def test_claim_next_skips_later_tasks_for_the_same_node(self):
+        node = factory.make_Node()
+        first = PostCommissioningTask.objects.enqueue(node)
+        first.not_before = now() + timedelta(minutes=1)
+        first.save()
+        PostCommissioningTask.objects.enqueue(node)
+        self.assertIsNone(PostCommissioningTask.objects.claim_next())
+
+
+class TestPostCommissioningTaskClaims(MAASTransactionServerTestCase):
+
+    def test_claim_next_skips_tasks_claimed_by_other_transactions(self):
+        with transaction.atomic():
+            node = factory.make_Node()
+            first = PostCommissioningTask.objects.enqueue(node)
+            PostCommissioningTask.objects.enqueue(node)
+            other = PostCommissioningTask.objects.enqueue(factory.make_Node())
+
+        claimed = []
+        held = threading.Event()
+        done = threading.Event()
+
+        @transactional
+        def claim_in_other_thread():
+            claimed.append(PostCommissioningTask.objects.claim_next())
+            held.set()
+            done.wait(10)
+
+        thread = threading.Thread(target=claim_in_other_thread)
+        thread.start()
+        try:
+            held.wait(10)
+            with transaction.atomic():
+                task = PostCommissioningTask.objects.claim_next()
+        finally:
+            done.set()
+            thread.join()
+
+        # The second task for the node waits for the first to be done.
+        self.assertEqual([first], claimed)
+        self.assertEqual(other, task)
@@ -17,6 +17,7 @@ from maasserver.preseed import CURTIN_INSTALL_LOG
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
 from maasserver.utils.orm import reload_object
+from maastesting.djangotestcase import count_queries
 from metadataserver.enum import (
     RESULT_TYPE,
     SCRIPT_STATUS,
@@ -360,6 +361,14 @@ class TestScriptSet(MAASServerTestCase):
                 status = SCRIPT_STATUS.FAILED
             self.assertEquals(status, script_set.status)
 
+    def test_status_uses_one_query(self):
+        script_set = factory.make_ScriptSet()
+        for _ in range(3):
+            factory.make_ScriptResult(script_set=script_set)
+        script_set = reload_object(script_set)
+        count, _ = count_queries(lambda: script_set.status)
+        self.assertEquals(1, count)
+
     def test_started(self):
         script_set = factory.make_ScriptSet()
         now = datetime.now()
@@ -385,6 +394,20 @@ class TestScriptSet(MAASServerTestCase):
             script_set=script_set, status=SCRIPT_STATUS.RUNNING)
         self.assertIsNone(script_set.ended)
 
+    def test_ended_returns_none_when_no_results(self):
+        script_set = factory.make_ScriptSet()
+        self.assertIsNone(script_set.ended)
+
+    def test_started_and_ended_use_one_query_each(self):
+        script_set = factory.make_ScriptSet()
+        for _ in range(3):
+            factory.make_ScriptResult(
+                script_set=script_set, status=SCRIPT_STATUS.PASSED)
+        script_set = reload_object(script_set)
+        started_count, _ = count_queries(lambda: script_set.started)
+        ended_count, _ = count_queries(lambda: script_set.ended)
+        self.assertEquals((1, 1), (started_count, ended_count))
+
     def test_get_runtime(self):
         script_set = factory.make_ScriptSet()
         runtime_seconds = random.randint(1, 59)
@@ -0,0 +1,186 @@
+# Copyright 2017 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Process nodes once they have finished commissioning."""
+
+__all__ = [
+    "PostCommissioningService",
+    "process_next_task",
+]
+
+from datetime import timedelta
+
+from maasserver.enum import (
+    NODE_STATUS,
+    NODE_STATUS_CHOICES_DICT,
+)
+from maasserver.models import Tag
+from maasserver.models.timestampedmodel import now
+from maasserver.populate_tags import populate_tags_for_single_node
+from maasserver.utils.orm import (
+    is_retryable_failure,
+    savepoint,
+    transactional,
+)
+from maasserver.utils.threads import deferToDatabase
+from metadataserver.models import PostCommissioningTask
+from provisioningserver.logger import (
+    get_maas_logger,
+    LegacyLogger,
+)
+from twisted.application.internet import TimerService
+from twisted.internet.defer import inlineCallbacks
+
+
+log = LegacyLogger()
+maaslog = get_maas_logger("post_commissioning")
+
+# Give up on a task once it has failed this many times.
+MAX_ATTEMPTS = 5
+
+# A node's storage and networking are only configured while it's in one of
+# these states, i.e. once commissioning has finished but before anyone can
+# have allocated it.
+CONFIGURABLE_STATUSES = {
+    NODE_STATUS.READY,
+    NODE_STATUS.TESTING,
+    NODE_STATUS.FAILED_TESTING,
+}
+
+
+def run_task(task):
+    """Do the work described by `task`.
+
+    The node's storage and networking are only configured while it is unowned
+    and READY, or still testing after commissioning; they must never be reset
+    under a user who has allocated or deployed it.
+    """
+    node = task.node.as_self()
+    if task.configure_node:
+        if node.status in CONFIGURABLE_STATUSES and node.owner_id is None:
+            node.set_default_storage_layout()
+            node.set_initial_networking_configuration()
+        else:
+            maaslog.warning(
+                "%s: Not configuring storage and networking after "
+                "commissioning; the node is %s.", node.hostname,
+                NODE_STATUS_CHOICES_DICT[node.status].lower())
+    populate_tags_for_single_node(Tag.objects.all(), node)
+
+
+@transactional
+def process_next_task():
+    """Claim and process the next post-commissioning task that is due.
+
+    The task is locked while it is processed and deleted once done, in the
+    same transaction, so it's processed exactly once even with many workers
+    across many regions. If the work fails the task is kept, and is retried
+    with an increasing delay, up to `MAX_ATTEMPTS` times.
+
+    :return: `None` if there is no task due, otherwise a tuple of `(outcome,
+        latency)`, where `outcome` is one of "processed", "retried" or
+        "failed" and `latency` is the number of seconds since the task was
+        queued.
+    """
+    task = PostCommissioningTask.objects.claim_next()
+    if task is None:
+        return None
+    try:
+        with savepoint():
+            run_task(task)
+    except Exception as error:
+        if is_retryable_failure(error):
+            raise
+        task.attempts += 1
+        if task.attempts >= MAX_ATTEMPTS:
+            maaslog.error(
+                "%s: Giving up processing the node after commissioning: %s",
+                task.node.hostname, error)
+            task.delete()
+            outcome = "failed"
+        else:
+            task.not_before = now() + timedelta(seconds=2 ** task.attempts)
+            task.error = str(error)
+            task.save()
+            outcome = "retried"
+    else:
+        task.delete()
+        outcome = "processed"
+    return outcome, (now() - task.created).total_seconds()
+
+
+@transactional
+def get_queue_depth():
+    """Return the number of post-commissioning tasks waiting."""
+    return PostCommissioningTask.objects.count()
+
+
+class PostCommissioningService(TimerService, object):
+    """Service to process nodes that have finished commissioning.
+
+    Every `check_interval` seconds this checks the depth of the queue of
+    `PostCommissioningTask`s and, if there's work to do, starts up to
+    `concurrency` workers. Each worker processes one task at a time, each in
+    its own transaction, until no more are due.
+    """
+
+    check_interval = 1  # Every second.
+
+    # The number of workers in this process.
+    concurrency = 2
+
+    def __init__(self):
+        super(PostCommissioningService, self).__init__(
+            self.check_interval, self._tryProcessTasks)
+        self.workers = 0
+        self.stats = {
+            "queue_depth": 0,
+            "processed": 0,
+            "retried": 0,
+            "failed": 0,
+            "last_latency": None,
+            "max_latency": 0.0,
+        }
+
+    def getStats(self):
+        """Return the statistics of this service.
+
+        `queue_depth` is the number of tasks waiting as of the last check and
+        the latencies are the number of seconds between a task being queued
+        and it being done.
+        """
+        stats = dict(self.stats)
+        stats["workers"] = self.workers
+        return stats
+
+    def _tryProcessTasks(self):
+        d = deferToDatabase(get_queue_depth)
+        d.addCallback(self._startWorkers)
+        d.addErrback(log.err, "Failed to check post-commissioning tasks.")
+        return d
+
+    def _startWorkers(self, queue_depth):
+        self.stats["queue_depth"] = queue_depth
+        while self.workers < min(queue_depth, self.concurrency):
+            self.workers += 1
+            d = self._work()
+            d.addErrback(log.err, "Failed to process post-commissioning task.")
+            d.addBoth(self._workerDone)
+
+    def _workerDone(self, result):
+        self.workers -= 1
+        return result
+
+    @inlineCallbacks
+    def _work(self):
+        # Return the database thread between tasks so that a long queue
+        # doesn't starve other users of the database thread pool.
+        while self.running:
+            result = yield deferToDatabase(process_next_task)
+            if result is None:
+                break
+            outcome, latency = result
+            self.stats[outcome] += 1
+            self.stats["last_latency"] = latency
+            self.stats["max_latency"] = max(
+                self.stats["max_latency"], latency)
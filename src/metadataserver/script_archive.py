@@ -0,0 +1,180 @@
+# Copyright 2017 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Build the tar archives of scripts that are sent to nodes."""
+
+__all__ = [
+    "ScriptArchive",
+    "TarMemberCache",
+    "get_builtin_script_key",
+    "get_script_key",
+]
+
+from collections import OrderedDict
+from functools import lru_cache
+import hashlib
+import tarfile
+import threading
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+
+class TarMemberCache:
+    """Least recently used cache of the content of tar members.
+
+    The content is kept padded to the tar block size, ready to be written
+    straight after the member's header. Entries are keyed on something which
+    identifies the content, such as the id of an immutable
+    `VersionedTextFile`, so they never need to be invalidated; changing a
+    script creates a new version with a new key, and the old entry is
+    eventually evicted.
+    """
+
+    def __init__(self, max_size=64 * 1024 * 1024):
+        super(TarMemberCache, self).__init__()
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, get_content):
+        """Return a tuple of `(size, padded content)` for `key`.
+
+        :param get_content: A callable that returns the content as bytes. It
+            is only called when `key` is not already in the cache.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        content = get_content()
+        assert isinstance(content, bytes), "Script content must be binary."
+        entry = len(content), pad_to_block(content)
+        with self._lock:
+            self.misses += 1
+            if key not in self._entries:
+                self._entries[key] = entry
+                self.size += len(entry[1])
+            while self.size > self.max_size and len(self._entries) > 1:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+# Shared by every request in this process.
+member_cache = TarMemberCache()
+
+
+def pad_to_block(content):
+    """Pad `content` with NULs to a multiple of the tar block size."""
+    remainder = len(content) % tarfile.BLOCKSIZE
+    if remainder == 0:
+        return content
+    return content + tarfile.NUL * (tarfile.BLOCKSIZE - remainder)
+
+
+def get_script_key(version_id):
+    """Return the cache key for the script stored in a `VersionedTextFile`."""
+    return "version:%d" % version_id
+
+
+@lru_cache(maxsize=None)
+def get_builtin_script_key(name, content):
+    """Return the cache key for a builtin script.
+
+    Builtin scripts only change when MAAS is upgraded, so a digest of the
+    content is used; it's the same for every region process.
+    """
+    return "builtin:%s:%s" % (name, hashlib.sha1(content).hexdigest())
+
+
+class ScriptArchive:
+    """A tar archive of scripts.
+
+    Only the headers of the members are built for each archive; the content
+    comes from `member_cache`. Each member gets `mtime` as its modification
+    time, so the archive itself is never cached, but its entity tag is
+    derived from the keys of its members and stays the same until one of
+    them changes.
+    """
+
+    def __init__(self, mtime, cache=None):
+        super(ScriptArchive, self).__init__()
+        self.mtime = mtime
+        self.cache = member_cache if cache is None else cache
+        self._members = []
+        self._digest = hashlib.sha1()
+
+    def add(self, path, key, get_content, permission=0o755):
+        """Add the script identified by `key` to the archive at `path`.
+
+        :param get_content: A callable that returns the script as bytes. It
+            is only called when the script is not already cached.
+        """
+        size, padded = self.cache.get(key, get_content)
+        self._add(path, size, padded, permission)
+        self._update_digest(path, permission, key.encode("utf-8"))
+
+    def add_file(self, path, content, permission=0o755):
+        """Add `content`, which isn't worth caching, to the archive."""
+        assert isinstance(content, bytes), "File content must be binary."
+        self._add(path, len(content), pad_to_block(content), permission)
+        self._update_digest(path, permission, content)
+
+    def _add(self, path, size, padded, permission):
+        tarinfo = tarfile.TarInfo(name=path)
+        tarinfo.size = size
+        tarinfo.mode = permission
+        # Modification time defaults to Epoch, which elicits annoying
+        # warnings when decompressing.
+        tarinfo.mtime = self.mtime
+        self._members.append(tarinfo.tobuf(
+            tarfile.DEFAULT_FORMAT, tarfile.ENCODING, "surrogateescape"))
+        self._members.append(padded)
+
+    def _update_digest(self, path, permission, identity):
+        self._digest.update(b"%s\0%o\0%d\0%s\0" % (
+            path.encode("utf-8"), permission, len(identity), identity))
+
+    @property
+    def etag(self):
+        """A weak entity tag for the archive.
+
+        It's weak because the modification times of the members differ from
+        one response to the next.
+        """
+        return 'W/"%s"' % self._digest.hexdigest()
+
+    def getvalue(self):
+        """Return the archive as bytes."""
+        # End the archive with two zero blocks, then pad it to a whole
+        # record, just as `tarfile` does when it's closed.
+        data = b"".join(self._members) + tarfile.NUL * (tarfile.BLOCKSIZE * 2)
+        remainder = len(data) % tarfile.RECORDSIZE
+        if remainder > 0:
+            data += tarfile.NUL * (tarfile.RECORDSIZE - remainder)
+        return data
+
+    def make_response(self, request, content_type):
+        """Return a response for `request` containing the archive.
+
+        When the request carries an entity tag for an archive with the same
+        content, a 304 response is returned instead, without assembling the
+        archive.
+        """
+        response = get_conditional_response(request, etag=self.etag)
+        if response is None:
+            response = HttpResponse(
+                self.getvalue(), content_type=content_type)
+        response["ETag"] = self.etag
+        return response
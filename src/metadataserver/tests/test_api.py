@@ -20,10 +20,7 @@ import os.path
 import random
 import tarfile
 import time
-from unittest.mock import (
-    ANY,
-    Mock,
-)
+from unittest.mock import Mock
 
 from django.conf import settings
 from django.core.exceptions import PermissionDenied
@@ -58,10 +55,7 @@ from maasserver.testing.testcase import (
 )
 from maasserver.testing.testclient import MAASSensibleOAuthClient
 from maasserver.utils.orm import reload_object
-from maastesting.matchers import (
-    MockCalledOnceWith,
-    MockNotCalled,
-)
+from maastesting.matchers import MockCalledOnceWith
 from maastesting.utils import sample_binary_data
 from metadataserver import api
 from metadataserver.api import (
@@ -85,6 +79,7 @@ from metadataserver.enum import (
 from metadataserver.models import (
     NodeKey,
     NodeUserData,
+    PostCommissioningTask,
 )
 from metadataserver.nodeinituser import get_node_init_user
 from netaddr import IPNetwork
@@ -906,9 +901,7 @@ class TestInstallingAPI(MAASServerTestCase):
         self.assertEqual(http.client.OK, response.status_code)
         self.assertEqual(NODE_STATUS.DEPLOYING, reload_object(node).status)
 
-    def test_signaling_installation_success_does_not_populate_tags(self):
-        populate_tags_for_single_node = self.patch(
-            api, "populate_tags_for_single_node")
+    def test_signaling_installation_success_does_not_queue_post_task(self):
         node = factory.make_Node(
             interface=True, status=NODE_STATUS.DEPLOYING,
             with_empty_script_sets=True)
@@ -916,7 +909,8 @@ class TestInstallingAPI(MAASServerTestCase):
         response = call_signal(client, status=SIGNAL_STATUS.OK)
         self.assertEqual(http.client.OK, response.status_code)
         self.assertEqual(NODE_STATUS.DEPLOYING, reload_object(node).status)
-        self.assertThat(populate_tags_for_single_node, MockNotCalled())
+        self.assertFalse(
+            PostCommissioningTask.objects.filter(node=node).exists())
 
     def test_signaling_installation_success_is_idempotent(self):
         node = factory.make_Node(
@@ -1230,6 +1224,54 @@ class TestMAASScripts(MAASServerTestCase):
                         'name', 'script_result_id')),
             }}, meta_data)
 
+    def test__returns_not_modified_for_matching_etag(self):
+        node = factory.make_Node(
+            status=NODE_STATUS.COMMISSIONING, with_empty_script_sets=True)
+        client = make_node_client(node=node)
+        url = reverse('maas-scripts', args=['latest'])
+
+        response = client.get(url)
+        self.assertThat(response, HasStatusCode(http.client.OK))
+        etag = response['ETag']
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertThat(response, HasStatusCode(http.client.NOT_MODIFIED))
+        self.assertEquals(etag, response['ETag'])
+
+    def test__etag_changes_when_script_results_change(self):
+        node = factory.make_Node(
+            status=NODE_STATUS.TESTING, with_empty_script_sets=True)
+        client = make_node_client(node=node)
+        url = reverse('maas-scripts', args=['latest'])
+
+        etag = client.get(url)['ETag']
+        script_result = (
+            node.current_testing_script_set.scriptresult_set.first())
+        script_result.status = SCRIPT_STATUS.PASSED
+        script_result.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertThat(response, HasStatusCode(http.client.OK))
+        self.assertNotEqual(etag, response['ETag'])
+
+    def test__etag_changes_when_script_changes(self):
+        node = factory.make_Node(
+            status=NODE_STATUS.TESTING, with_empty_script_sets=True)
+        client = make_node_client(node=node)
+        url = reverse('maas-scripts', args=['latest'])
+
+        etag = client.get(url)['ETag']
+        script = (
+            node.current_testing_script_set.scriptresult_set.first().script)
+        new_content = factory.make_string()
+        script.script = script.script.update(new_content)
+        script.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertThat(response, HasStatusCode(http.client.OK))
+        self.assertNotEqual(etag, response['ETag'])
+        tar = tarfile.open(mode='r', fileobj=BytesIO(response.content))
+        self.assertEquals(
+            new_content.encode(),
+            tar.extractfile(os.path.join('testing', script.name)).read())
+
 
 class TestCommissioningAPI(MAASServerTestCase):
 
@@ -1295,6 +1337,18 @@ class TestCommissioningAPI(MAASServerTestCase):
             text_script.script.data,
             archive.extractfile(path).read().decode('utf-8'))
 
+    def test_commissioning_scripts_not_modified_for_matching_etag(self):
+        url = reverse('commissioning-scripts', args=['latest'])
+        client = make_node_client()
+        etag = client.get(url)['ETag']
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertThat(response, HasStatusCode(http.client.NOT_MODIFIED))
+
+        factory.make_Script(script_type=SCRIPT_TYPE.COMMISSIONING)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertThat(response, HasStatusCode(http.client.OK))
+        self.assertNotEqual(etag, response['ETag'])
+
     def test_other_user_than_node_cannot_signal_commissioning_result(self):
         node = factory.make_Node(status=NODE_STATUS.COMMISSIONING)
         client = MAASSensibleOAuthClient(factory.make_User())
@@ -1314,20 +1368,6 @@ class TestCommissioningAPI(MAASServerTestCase):
         self.assertEqual(
             NODE_STATUS.COMMISSIONING, reload_object(other_node).status)
 
-    def test_signaling_commissioning_OK_repopulates_tags(self):
-        populate_tags_for_single_node = self.patch(
-            api, "populate_tags_for_single_node")
-        node = factory.make_Node(
-            status=NODE_STATUS.COMMISSIONING, with_empty_script_sets=True)
-        client = make_node_client(node)
-        response = call_signal(
-            client, status=SIGNAL_STATUS.OK, script_result=0)
-        self.assertEqual(http.client.OK, response.status_code)
-        self.assertEqual(NODE_STATUS.READY, reload_object(node).status)
-        self.assertThat(
-            populate_tags_for_single_node,
-            MockCalledOnceWith(ANY, node))
-
     def test_signaling_requires_status_code(self):
         node = factory.make_Node(status=NODE_STATUS.COMMISSIONING)
         client = make_node_client(node=node)
@@ -1454,15 +1494,14 @@ class TestCommissioningAPI(MAASServerTestCase):
         for script_result in node.current_testing_script_set:
             self.assertEqual(SCRIPT_STATUS.ABORTED, script_result.status)
 
-    def test_signaling_commissioning_failure_does_not_populate_tags(self):
-        populate_tags_for_single_node = self.patch(
-            api, "populate_tags_for_single_node")
+    def test_signaling_commissioning_failure_does_not_queue_post_task(self):
         node = factory.make_Node(
             status=NODE_STATUS.COMMISSIONING, with_empty_script_sets=True)
         client = make_node_client(node=node)
         response = call_signal(client, status=SIGNAL_STATUS.FAILED)
         self.assertEqual(http.client.OK, response.status_code)
-        self.assertThat(populate_tags_for_single_node, MockNotCalled())
+        self.assertFalse(
+            PostCommissioningTask.objects.filter(node=node).exists())
 
     def test_signaling_commissioning_clears_status_expires(self):
         node = factory.make_Node(
@@ -1764,8 +1803,7 @@ class TestCommissioningAPI(MAASServerTestCase):
             response.content.decode(settings.DEFAULT_CHARSET),
             Equals("Failed to parse JSON power_parameters"))
 
-    def test_signal_sets_default_storage_layout_if_OK(self):
-        self.patch_autospec(Node, "set_default_storage_layout")
+    def test_signal_queues_post_commissioning_if_OK(self):
         node = factory.make_Node(
             status=NODE_STATUS.COMMISSIONING, with_empty_script_sets=True)
         client = make_node_client(node)
@@ -1773,77 +1811,12 @@ class TestCommissioningAPI(MAASServerTestCase):
             client, status=SIGNAL_STATUS.OK, script_result=0)
         self.assertEqual(http.client.OK, response.status_code)
         self.assertEqual(NODE_STATUS.READY, reload_object(node).status)
-        self.assertThat(
-            Node.set_default_storage_layout,
-            MockCalledOnceWith(node))
-
-    def test_signal_sets_default_storage_layout_if_TESTING(self):
-        self.patch_autospec(Node, "set_default_storage_layout")
-        node = factory.make_Node(
-            status=NODE_STATUS.COMMISSIONING, with_empty_script_sets=True)
-        client = make_node_client(node)
-        response = call_signal(
-            client, status=SIGNAL_STATUS.TESTING, script_result=0)
-        self.assertEqual(http.client.OK, response.status_code)
-        self.assertEqual(NODE_STATUS.TESTING, reload_object(node).status)
-        self.assertThat(
-            Node.set_default_storage_layout,
-            MockCalledOnceWith(node))
-
-    def test_signal_does_not_set_default_storage_layout_if_rack(self):
-        self.patch_autospec(Node, "set_default_storage_layout")
-        node = factory.make_RackController(with_empty_script_sets=True)
-        client = make_node_client(node)
-        response = call_signal(
-            client, status=SIGNAL_STATUS.OK, script_result=0)
-        self.assertEqual(http.client.OK, response.status_code)
-        self.assertThat(
-            Node.set_default_storage_layout,
-            MockNotCalled())
-
-    def test_signal_does_not_set_default_storage_layout_if_WORKING(self):
-        self.patch_autospec(Node, "set_default_storage_layout")
-        node = factory.make_Node(
-            status=NODE_STATUS.COMMISSIONING, with_empty_script_sets=True)
-        client = make_node_client(node)
-        response = call_signal(
-            client, status=SIGNAL_STATUS.WORKING, script_result=0)
-        self.assertEqual(http.client.OK, response.status_code)
-        self.assertThat(
-            Node.set_default_storage_layout,
-            MockNotCalled())
-
-    def test_signal_does_not_set_default_storage_layout_if_FAILED(self):
-        self.patch_autospec(Node, "set_default_storage_layout")
-        node = factory.make_Node(
-            status=NODE_STATUS.COMMISSIONING, with_empty_script_sets=True)
-        client = make_node_client(node)
-        response = call_signal(
-            client, status=SIGNAL_STATUS.FAILED, script_result=0)
-        self.assertEqual(http.client.OK, response.status_code)
-        self.assertThat(
-            Node.set_default_storage_layout,
-            MockNotCalled())
-
-    def test_signal_calls_sets_initial_network_config_if_OK(self):
-        self.useFixture(SignalsDisabled("power"))
-        mock_set_initial_networking_configuration = self.patch_autospec(
-            Node, "set_initial_networking_configuration")
-        node = factory.make_Node(
-            status=NODE_STATUS.COMMISSIONING, with_empty_script_sets=True)
-        client = make_node_client(node)
-        response = call_signal(
-            client, status=SIGNAL_STATUS.OK, script_result=0)
-        self.assertEqual(http.client.OK, response.status_code)
-        self.assertEqual(NODE_STATUS.READY, reload_object(node).status)
-        self.assertThat(
-            mock_set_initial_networking_configuration,
-            MockCalledOnceWith(node))
+        self.assertEqual(
+            [True],
+            [task.configure_node for task in
+             PostCommissioningTask.objects.filter(node=node)])
 
-    def test_signal_calls_sets_initial_network_config_if_TESTING(self):
-        self.useFixture(SignalsDisabled("power"))
-        mock_set_initial_networking_configuration = self.patch_autospec(
-            Node, "set_initial_networking_configuration")
+    def test_signal_queues_post_commissioning_if_TESTING(self):
         node = factory.make_Node(
             status=NODE_STATUS.COMMISSIONING, with_empty_script_sets=True)
         client = make_node_client(node)
@@ -1851,47 +1824,41 @@ class TestCommissioningAPI(MAASServerTestCase):
             client, status=SIGNAL_STATUS.TESTING, script_result=0)
         self.assertEqual(http.client.OK, response.status_code)
         self.assertEqual(NODE_STATUS.TESTING, reload_object(node).status)
-        self.assertThat(
-            mock_set_initial_networking_configuration,
-            MockCalledOnceWith(node))
+        self.assertEqual(
+            [True],
+            [task.configure_node for task in
+             PostCommissioningTask.objects.filter(node=node)])
 
-    def test_signal_doesnt_call_sets_initial_network_config_if_rack(self):
-        mock_set_initial_networking_configuration = self.patch_autospec(
-            Node, "set_initial_networking_configuration")
+    def test_signal_does_not_queue_node_configuration_if_rack(self):
         node = factory.make_RackController(with_empty_script_sets=True)
         client = make_node_client(node)
         response = call_signal(
             client, status=SIGNAL_STATUS.OK, script_result=0)
         self.assertEqual(http.client.OK, response.status_code)
-        self.assertThat(
-            mock_set_initial_networking_configuration,
-            MockNotCalled())
+        self.assertEqual(
+            [False],
+            [task.configure_node for task in
+             PostCommissioningTask.objects.filter(node=node)])
 
-    def test_signal_doesnt_call_sets_initial_network_config_if_WORKING(self):
-        mock_set_initial_networking_configuration = self.patch_autospec(
-            Node, "set_initial_networking_configuration")
+    def test_signal_does_not_queue_post_commissioning_if_WORKING(self):
         node = factory.make_Node(
             status=NODE_STATUS.COMMISSIONING, with_empty_script_sets=True)
         client = make_node_client(node)
         response = call_signal(
             client, status=SIGNAL_STATUS.WORKING, script_result=0)
         self.assertEqual(http.client.OK, response.status_code)
-        self.assertThat(
-            mock_set_initial_networking_configuration,
-            MockNotCalled())
+        self.assertFalse(
+            PostCommissioningTask.objects.filter(node=node).exists())
 
-    def test_signal_doesnt_call_sets_initial_network_config_if_FAILED(self):
-        mock_set_initial_networking_configuration = self.patch_autospec(
-            Node, "set_initial_networking_configuration")
+    def test_signal_does_not_queue_post_commissioning_if_FAILED(self):
         node = factory.make_Node(
             status=NODE_STATUS.COMMISSIONING, with_empty_script_sets=True)
         client = make_node_client(node)
         response = call_signal(
             client, status=SIGNAL_STATUS.FAILED, script_result=0)
         self.assertEqual(http.client.OK, response.status_code)
-        self.assertThat(
-            mock_set_initial_networking_configuration,
-            MockNotCalled())
+        self.assertFalse(
+            PostCommissioningTask.objects.filter(node=node).exists())
 
     def test_signaling_commissioning_updates_last_ping(self):
         start_time = floor(time.time())
@@ -11,6 +11,7 @@ from datetime import datetime
 from io import BytesIO
 import json
 from unittest.mock import (
+    ANY,
     call,
     Mock,
     sentinel,
@@ -41,23 +42,28 @@ from maastesting.matchers import (
     MockNotCalled,
 )
 from maastesting.testcase import MAASTestCase
-from metadataserver import api
 from metadataserver.api_twisted import (
     StatusHandlerResource,
     StatusWorkerService,
 )
 from metadataserver.enum import SCRIPT_STATUS
-from metadataserver.models import NodeKey
+from metadataserver.models import (
+    NodeKey,
+    PostCommissioningTask,
+)
 from testtools import ExpectedException
 from testtools.matchers import (
+    ContainsDict,
     Equals,
     MatchesListwise,
     MatchesSetwise,
 )
 from twisted.internet.defer import (
     inlineCallbacks,
+    QueueOverflow,
     succeed,
 )
+from twisted.internet.task import Clock
 from twisted.web.server import NOT_DONE_YET
 from twisted.web.test.requesthelper import DummyRequest
 
@@ -187,7 +193,7 @@ class TestStatusWorkerServiceTransactional(MAASTransactionServerTestCase):
         worker = StatusWorkerService(sentinel.dbtasks, clock=sentinel.reactor)
         self.assertEqual(sentinel.dbtasks, worker.dbtasks)
         self.assertEqual(sentinel.reactor, worker.clock)
-        self.assertEqual(60, worker.step)
+        self.assertEqual(1, worker.step)
         self.assertEqual((worker._tryUpdateNodes, tuple(), {}), worker.call)
 
     def test__tryUpdateNodes_returns_None_when_empty_queue(self):
@@ -206,29 +212,74 @@ class TestStatusWorkerServiceTransactional(MAASTransactionServerTestCase):
             for node, _ in nodes_with_tokens
         }
         dbtasks = Mock()
-        dbtasks.addTask = Mock()
+        dbtasks.deferTask = Mock(return_value=succeed((9, 0)))
         worker = StatusWorkerService(dbtasks)
         for node, token in nodes_with_tokens:
             for message in node_messages[node]:
                 worker.queueMessage(token.key, message)
         yield worker._tryUpdateNodes()
-        call_args = [
-            (call_arg[0][1], call_arg[0][2])
-            for call_arg in dbtasks.addTask.call_args_list
-        ]
-        self.assertThat(call_args, MatchesSetwise(*[
+        self.assertThat(dbtasks.deferTask, MockCalledOnceWith(
+            worker._processMessagesForNodes, ANY))
+        [tasks] = dbtasks.deferTask.call_args[0][1:]
+        self.assertThat(tasks, MatchesSetwise(*[
             MatchesListwise([Equals(node), Equals(messages)])
             for node, messages in node_messages.items()
         ]))
+        self.assertThat(worker.getStats(), ContainsDict({
+            "queued": Equals(9),
+            "processed": Equals(9),
+            "flushes": Equals(1),
+            "queue_depth": Equals(0),
+        }))
 
     @wait_for_reactor
     @inlineCallbacks
-    def test__processMessages_fails_when_in_transaction(self):
+    def test__tryUpdateNodes_requeues_messages_when_dbtasks_full(self):
+        nodes_with_tokens = yield deferToDatabase(self.make_nodes_with_tokens)
+        dbtasks = Mock()
+        dbtasks.deferTask = Mock(side_effect=QueueOverflow())
+        worker = StatusWorkerService(dbtasks)
+        node, token = nodes_with_tokens[0]
+        messages = [self.make_message() for _ in range(3)]
+        for message in messages:
+            worker.queueMessage(token.key, message)
+        yield worker._tryUpdateNodes()
+        self.assertEqual({token.key: messages}, worker.queue)
+        self.assertEqual(3, worker.queueDepth)
+        self.assertIsNone(worker.flushing)
+
+    def test_queueMessage_schedules_flush_at_flush_threshold(self):
+        clock = Clock()
+        worker = StatusWorkerService(sentinel.dbtasks, clock=clock)
+        worker.flush_threshold = 3
+        token = factory.make_name("token")
+        for _ in range(2):
+            worker.queueMessage(token, self.make_message())
+        self.assertEqual([], clock.getDelayedCalls())
+        worker.queueMessage(token, self.make_message())
+        self.assertEqual(1, len(clock.getDelayedCalls()))
+
+    def test_queueMessage_waits_for_flush_at_max_queue_size(self):
+        clock = Clock()
+        worker = StatusWorkerService(sentinel.dbtasks, clock=clock)
+        worker.max_queue_size = 2
+        token = factory.make_name("token")
+        d1 = worker.queueMessage(token, self.make_message())
+        d2 = worker.queueMessage(token, self.make_message())
+        self.assertTrue(d1.called)
+        self.assertFalse(d2.called)
+        self.assertEqual(1, worker.getStats()["waiting"])
+        worker._flushDone(None)
+        self.assertTrue(d2.called)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test__processMessagesForNodes_fails_when_in_transaction(self):
         worker = StatusWorkerService(sentinel.dbtasks)
         with ExpectedException(TransactionManagementError):
             yield deferToDatabase(
-                transactional(worker._processMessages),
-                sentinel.node, [sentinel.message])
+                transactional(worker._processMessagesForNodes),
+                [(sentinel.node, [sentinel.message])])
 
     @wait_for_reactor
     @inlineCallbacks
@@ -241,21 +292,41 @@ class TestStatusWorkerServiceTransactional(MAASTransactionServerTestCase):
 
     @wait_for_reactor
     @inlineCallbacks
-    def test__processMessages_calls_processMessage_and_updateLastPing(self):
+    def test__processMessagesForNodes_calls_processMessage_and_updateLastPing(
+            self):
         worker = StatusWorkerService(sentinel.dbtasks)
         mock_processMessage = self.patch(worker, "_processMessage")
         mock_updateLastPing = self.patch(worker, "_updateLastPing")
-        yield deferToDatabase(
-            worker._processMessages, sentinel.node,
-            [sentinel.message1, sentinel.message2])
+        counts = yield deferToDatabase(
+            worker._processMessagesForNodes, [
+                (sentinel.node1, [sentinel.message1, sentinel.message2]),
+                (sentinel.node2, [sentinel.message3]),
+            ])
+        self.assertEqual((3, 0), counts)
         self.assertThat(
             mock_processMessage,
             MockCallsMatch(
-                call(sentinel.node, sentinel.message1),
-                call(sentinel.node, sentinel.message2)))
+                call(sentinel.node1, sentinel.message1),
+                call(sentinel.node1, sentinel.message2),
+                call(sentinel.node2, sentinel.message3)))
         self.assertThat(
             mock_updateLastPing,
-            MockCalledOnceWith(sentinel.node, sentinel.message2))
+            MockCallsMatch(
+                call(sentinel.node1, sentinel.message2),
+                call(sentinel.node2, sentinel.message3)))
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test__processMessagesForNodes_counts_failed_messages(self):
+        worker = StatusWorkerService(sentinel.dbtasks)
+        self.patch(worker, "_processMessage").side_effect = [
+            None, factory.make_exception()]
+        self.patch(worker, "_updateLastPing")
+        node = yield deferToDatabase(transactional(factory.make_Node))
+        counts = yield deferToDatabase(
+            worker._processMessagesForNodes,
+            [(node, [sentinel.message1, sentinel.message2])])
+        self.assertEqual((1, 1), counts)
 
     @wait_for_reactor
     @inlineCallbacks
@@ -471,9 +542,7 @@ class TestStatusWorkerService(MAASServerTestCase):
             NODE_STATUS.FAILED_DEPLOYMENT, reload_object(node).status)
         self.assertIsNotNone(reload_object(node).owner)
 
-    def test_status_commissioning_failure_does_not_populate_tags(self):
-        populate_tags_for_single_node = self.patch(
-            api, "populate_tags_for_single_node")
+    def test_status_commissioning_failure_does_not_queue_post_task(self):
         node = factory.make_Node(
             interface=True, status=NODE_STATUS.COMMISSIONING)
         payload = {
@@ -487,7 +556,8 @@ class TestStatusWorkerService(MAASServerTestCase):
         self.processMessage(node, payload)
         self.assertEqual(
             NODE_STATUS.FAILED_COMMISSIONING, reload_object(node).status)
-        self.assertThat(populate_tags_for_single_node, MockNotCalled())
+        self.assertFalse(
+            PostCommissioningTask.objects.filter(node=node).exists())
 
     def test_status_erasure_failure_leaves_node_failed(self):
         node = factory.make_Node(
@@ -508,9 +578,7 @@ class TestStatusWorkerService(MAASServerTestCase):
             "Failed to erase disks.",
             Event.objects.filter(node=node).last().description)
 
-    def test_status_erasure_failure_does_not_populate_tags(self):
-        populate_tags_for_single_node = self.patch(
-            api, "populate_tags_for_single_node")
+    def test_status_erasure_failure_does_not_queue_post_commissioning(self):
         node = factory.make_Node(
             interface=True, status=NODE_STATUS.DISK_ERASING)
         payload = {
@@ -524,7 +592,8 @@ class TestStatusWorkerService(MAASServerTestCase):
         self.processMessage(node, payload)
         self.assertEqual(
             NODE_STATUS.FAILED_DISK_ERASING, reload_object(node).status)
-        self.assertThat(populate_tags_for_single_node, MockNotCalled())
+        self.assertFalse(
+            PostCommissioningTask.objects.filter(node=node).exists())
 
     def test_status_erasure_failure_doesnt_clear_owner(self):
         user = factory.make_User()
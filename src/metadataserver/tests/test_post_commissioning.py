@@ -0,0 +1,185 @@
+# Copyright 2017 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `metadataserver.post_commissioning`."""
+
+__all__ = []
+
+from unittest.mock import ANY
+
+from crochet import wait_for
+from maasserver.enum import (
+    IPADDRESS_TYPE,
+    NODE_STATUS,
+)
+from maasserver.models import Node
+from maasserver.models.signals.testing import SignalsDisabled
+from maasserver.models.timestampedmodel import now
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import (
+    MAASServerTestCase,
+    MAASTransactionServerTestCase,
+)
+from maasserver.utils.orm import (
+    reload_object,
+    transactional,
+)
+from maasserver.utils.threads import deferToDatabase
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockNotCalled,
+)
+from metadataserver import post_commissioning
+from metadataserver.models import PostCommissioningTask
+from metadataserver.post_commissioning import (
+    MAX_ATTEMPTS,
+    PostCommissioningService,
+    process_next_task,
+)
+from testtools.matchers import (
+    ContainsDict,
+    Equals,
+)
+from twisted.internet.defer import (
+    Deferred,
+    inlineCallbacks,
+)
+
+
+wait_for_reactor = wait_for(30)
+
+
+class TestProcessNextTask(MAASServerTestCase):
+
+    def setUp(self):
+        super(TestProcessNextTask, self).setUp()
+        self.set_default_storage_layout = self.patch_autospec(
+            Node, "set_default_storage_layout")
+        self.set_initial_networking_configuration = self.patch_autospec(
+            Node, "set_initial_networking_configuration")
+        self.populate_tags_for_single_node = self.patch(
+            post_commissioning, "populate_tags_for_single_node")
+
+    def test__returns_None_when_no_task_is_due(self):
+        self.assertIsNone(process_next_task())
+
+    def test__configures_node_and_populates_tags(self):
+        node = factory.make_Node(status=NODE_STATUS.READY)
+        task = PostCommissioningTask.objects.enqueue(node)
+        outcome, _ = process_next_task()
+        self.assertEqual("processed", outcome)
+        self.assertIsNone(reload_object(task))
+        self.assertThat(
+            self.set_default_storage_layout, MockCalledOnceWith(node))
+        self.assertThat(
+            self.set_initial_networking_configuration,
+            MockCalledOnceWith(node))
+        self.assertThat(
+            self.populate_tags_for_single_node, MockCalledOnceWith(ANY, node))
+
+    def test__does_not_configure_node_acquired_before_task_ran(self):
+        node = factory.make_Node(status=NODE_STATUS.READY)
+        PostCommissioningTask.objects.enqueue(node)
+        # Acquired by a path that didn't check for pending tasks.
+        node.status = NODE_STATUS.ALLOCATED
+        node.owner = factory.make_User()
+        node.save()
+        outcome, _ = process_next_task()
+        self.assertEqual("processed", outcome)
+        self.assertThat(self.set_default_storage_layout, MockNotCalled())
+        self.assertThat(
+            self.set_initial_networking_configuration, MockNotCalled())
+        self.assertThat(
+            self.populate_tags_for_single_node, MockCalledOnceWith(ANY, node))
+
+    def test__only_populates_tags_when_not_configuring_node(self):
+        node = factory.make_Node()
+        PostCommissioningTask.objects.enqueue(node, configure_node=False)
+        outcome, _ = process_next_task()
+        self.assertEqual("processed", outcome)
+        self.assertThat(self.set_default_storage_layout, MockNotCalled())
+        self.assertThat(
+            self.set_initial_networking_configuration, MockNotCalled())
+        self.assertThat(
+            self.populate_tags_for_single_node, MockCalledOnceWith(ANY, node))
+
+    def test__retries_failed_task_later(self):
+        self.populate_tags_for_single_node.side_effect = ValueError("broken")
+        task = PostCommissioningTask.objects.enqueue(factory.make_Node())
+        outcome, _ = process_next_task()
+        self.assertEqual("retried", outcome)
+        task = reload_object(task)
+        self.assertEqual(1, task.attempts)
+        self.assertEqual("broken", task.error)
+        self.assertGreater(task.not_before, now())
+        self.assertIsNone(process_next_task())
+
+    def test__gives_up_after_too_many_attempts(self):
+        self.populate_tags_for_single_node.side_effect = ValueError("broken")
+        task = PostCommissioningTask.objects.enqueue(factory.make_Node())
+        task.attempts = MAX_ATTEMPTS - 1
+        task.save()
+        outcome, _ = process_next_task()
+        self.assertEqual("failed", outcome)
+        self.assertIsNone(reload_object(task))
+
+
+class TestProcessNextTaskConfiguresNode(MAASServerTestCase):
+    """Tests for `process_next_task` that really configure the node."""
+
+    scenarios = (
+        ("ready", {"status": NODE_STATUS.READY}),
+        ("testing", {"status": NODE_STATUS.TESTING}),
+        ("failed_testing", {"status": NODE_STATUS.FAILED_TESTING}),
+    )
+
+    def test__sets_storage_layout_and_links(self):
+        self.useFixture(SignalsDisabled("power"))
+        node = factory.make_Node_with_Interface_on_Subnet(status=self.status)
+        boot_interface = node.get_boot_interface()
+        node._clear_networking_configuration()
+        PostCommissioningTask.objects.enqueue(node)
+        outcome, _ = process_next_task()
+        self.assertEqual("processed", outcome)
+        self.assertIsNotNone(node.get_boot_disk().get_partitiontable())
+        self.assertTrue(
+            reload_object(boot_interface).ip_addresses.filter(
+                alloc_type=IPADDRESS_TYPE.AUTO).exists())
+
+
+class TestPostCommissioningService(MAASTransactionServerTestCase):
+
+    def test__starts_no_more_workers_than_there_are_tasks(self):
+        service = PostCommissioningService()
+        self.patch(service, "_work").return_value = Deferred()
+        service._startWorkers(1)
+        self.assertEqual(1, service.workers)
+        self.assertEqual(1, service.getStats()["queue_depth"])
+
+    def test__starts_no_more_workers_than_its_concurrency(self):
+        service = PostCommissioningService()
+        self.patch(service, "_work").return_value = Deferred()
+        service._startWorkers(service.concurrency * 10)
+        self.assertEqual(service.concurrency, service.workers)
+
+    @transactional
+    def enqueue_tasks(self, count):
+        for _ in range(count):
+            PostCommissioningTask.objects.enqueue(factory.make_Node())
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test__work_processes_tasks_until_none_are_due(self):
+        self.patch(post_commissioning, "run_task")
+        yield deferToDatabase(self.enqueue_tasks, 3)
+        service = PostCommissioningService()
+        service.running = True
+        yield service._work()
+        self.assertThat(service.getStats(), ContainsDict({
+            "processed": Equals(3),
+            "retried": Equals(0),
+            "failed": Equals(0),
+        }))
+        count = yield deferToDatabase(
+            transactional(PostCommissioningTask.objects.count))
+        self.assertEqual(0, count)
@@ -0,0 +1,116 @@
+# Copyright 2017 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `metadataserver.script_archive`."""
+
+__all__ = []
+
+import http.client
+from io import BytesIO
+import tarfile
+from unittest.mock import Mock
+
+from django.test.client import RequestFactory
+from maasserver.testing.factory import factory
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockNotCalled,
+)
+from maastesting.testcase import MAASTestCase
+from metadataserver.script_archive import (
+    get_builtin_script_key,
+    get_script_key,
+    ScriptArchive,
+    TarMemberCache,
+)
+
+
+class TestTarMemberCache(MAASTestCase):
+
+    def test__pads_content_to_block_size(self):
+        cache = TarMemberCache()
+        size, padded = cache.get(factory.make_name("key"), lambda: b"abc")
+        self.assertEqual(3, size)
+        self.assertEqual(b"abc".ljust(tarfile.BLOCKSIZE, b"\0"), padded)
+
+    def test__only_gets_content_once(self):
+        cache = TarMemberCache()
+        key = factory.make_name("key")
+        get_content = Mock(return_value=b"abc")
+        cache.get(key, get_content)
+        get_content.reset_mock()
+        self.assertEqual(
+            (3, b"abc".ljust(tarfile.BLOCKSIZE, b"\0")),
+            cache.get(key, get_content))
+        self.assertThat(get_content, MockNotCalled())
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    def test__evicts_least_recently_used(self):
+        cache = TarMemberCache(max_size=tarfile.BLOCKSIZE * 2)
+        cache.get("a", lambda: b"a")
+        cache.get("b", lambda: b"b")
+        cache.get("a", lambda: b"a")
+        cache.get("c", lambda: b"c")
+        get_content = Mock(return_value=b"b")
+        cache.get("b", get_content)
+        self.assertThat(get_content, MockCalledOnceWith())
+        self.assertEqual(tarfile.BLOCKSIZE * 2, cache.size)
+
+
+class TestScriptArchive(MAASTestCase):
+
+    def make_archive(self):
+        archive = ScriptArchive(mtime=1500000000, cache=TarMemberCache())
+        archive.add("scripts/a", get_script_key(1), lambda: b"#!/bin/sh\n")
+        archive.add_file("index.json", b"{}" * 300, 0o644)
+        return archive
+
+    def test__matches_tarfile(self):
+        expected = BytesIO()
+        with tarfile.open(mode="w", fileobj=expected) as tar:
+            for name, content, mode in (
+                    ("scripts/a", b"#!/bin/sh\n", 0o755),
+                    ("index.json", b"{}" * 300, 0o644)):
+                tarinfo = tarfile.TarInfo(name=name)
+                tarinfo.size = len(content)
+                tarinfo.mode = mode
+                tarinfo.mtime = 1500000000
+                tar.addfile(tarinfo, BytesIO(content))
+        self.assertEqual(expected.getvalue(), self.make_archive().getvalue())
+
+    def test__etag_ignores_mtime(self):
+        archive = self.make_archive()
+        archive.mtime += 1
+        self.assertEqual(self.make_archive().etag, archive.etag)
+
+    def test__etag_changes_with_members(self):
+        archive = self.make_archive()
+        archive.add("scripts/b", get_script_key(2), lambda: b"#!/bin/sh\n")
+        self.assertNotEqual(self.make_archive().etag, archive.etag)
+
+    def test__builtin_script_key_changes_with_content(self):
+        name = factory.make_name("script")
+        self.assertNotEqual(
+            get_builtin_script_key(name, b"a"),
+            get_builtin_script_key(name, b"b"))
+
+    def test__make_response_returns_archive(self):
+        archive = self.make_archive()
+        request = RequestFactory().get("/")
+        response = archive.make_response(request, "application/x-tar")
+        self.assertEqual(http.client.OK, response.status_code)
+        self.assertEqual(archive.getvalue(), response.content)
+        self.assertEqual(archive.etag, response["ETag"])
+
+    def test__make_response_returns_not_modified(self):
+        archive = self.make_archive()
+        request = RequestFactory().get("/", HTTP_IF_NONE_MATCH=archive.etag)
+        response = archive.make_response(request, "application/x-tar")
+        self.assertEqual(http.client.NOT_MODIFIED, response.status_code)
+
+    def test__make_response_compares_etags_weakly(self):
+        archive = self.make_archive()
+        request = RequestFactory().get(
+            "/", HTTP_IF_NONE_MATCH='"other", %s' % archive.etag[2:])
+        response = archive.make_response(request, "application/x-tar")
+        self.assertEqual(http.client.NOT_MODIFIED, response.status_code)
@@ -111,12 +111,16 @@ __all__ = [
     "UUID_NOT_SET",
 ]
 
+from collections import namedtuple
 from contextlib import (
     closing,
     contextmanager,
 )
 from copy import deepcopy
-from itertools import islice
+from itertools import (
+    count,
+    islice,
+)
 import json
 import logging
 import os
@@ -127,6 +131,7 @@ import sqlite3
 from threading import RLock
 from time import time
 import traceback
+from types import MappingProxyType
 
 from formencode import (
     ForEach,
@@ -153,6 +158,10 @@ from provisioningserver.utils.fs import (
     atomic_write,
     RunLock,
 )
+from provisioningserver.utils.inotify import (
+    IN,
+    Inotify,
+)
 import yaml
 
 
@@ -345,6 +354,13 @@ def touch(path, mode=default_file_mode):
     os.close(os.open(path, os.O_CREAT | os.O_APPEND, mode))
 
 
+def ensure_directory_for(path):
+    """Ensure that the directory containing `path` exists."""
+    dirname = os.path.dirname(path)
+    if len(dirname) != 0:
+        os.makedirs(dirname, exist_ok=True)
+
+
 class ConfigurationImmutable(Exception):
     """The configuration is read-only; it cannot be mutated."""
 
@@ -419,6 +435,7 @@ class ConfigurationDatabase:
         database READ-ONLY.
         """
         # Ensure `dbpath` exists...
+        ensure_directory_for(dbpath)
         touch(dbpath)
         # before opening it with sqlite.
         database = sqlite3.connect(dbpath)
@@ -441,6 +458,7 @@ class ConfigurationDatabase:
         database on exit, COMMITTING changes if the exit is clean.
         """
         # Ensure `dbpath` exists...
+        ensure_directory_for(dbpath)
         touch(dbpath)
         # before opening it with sqlite.
         database = sqlite3.connect(dbpath)
@@ -542,14 +560,15 @@ class ConfigurationFile:
         This avoids all the locking that happens in `open_for_update`. However,
         it will create the configuration file if it does not yet exist.
 
+        The configuration is the process-wide snapshot of the file kept by
+        `configuration_snapshots`, so the file is only read again once it
+        has changed.
+
         **Note** that this returns a context manager which will DISCARD
         changes to the configuration on exit.
         """
-        # Ensure `path` exists...
-        touch(path)
-        # before loading it in.
         configfile = cls(path, mutable=False)
-        configfile.load()
+        configfile.config = configuration_snapshots.get(path).config
         yield configfile
 
     @classmethod
@@ -567,6 +586,7 @@ class ConfigurationFile:
         to the configuration on a clean exit.
         """
         time_opened = None
+        ensure_directory_for(path)
         try:
             # Only one reader or writer at a time.
             with RunLock(path).wait(timeout=5.0):
@@ -583,6 +603,8 @@ class ConfigurationFile:
                 else:
                     if configfile.dirty:
                         configfile.save()
+                        configuration_snapshots.publish(
+                            path, configfile.config)
         finally:
             if time_opened is not None:
                 time_open = time() - time_opened
@@ -596,6 +618,148 @@ class ConfigurationFile:
                         time_open, mini_stack)
 
 
+# An immutable view of a configuration file. `version` increases with every
+# snapshot taken in this process. `state` identifies the file as it was when
+# the snapshot was taken; see `get_file_state`.
+ConfigurationSnapshot = namedtuple(
+    "ConfigurationSnapshot", ("version", "config", "state"))
+
+
+def get_file_state(path):
+    """Return the inode, modification time and size of `path`, or `None`."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    else:
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class ConfigurationSnapshots:
+    """Process-wide snapshots of configuration files.
+
+    Reading a snapshot is a dictionary lookup, made after a non-blocking read
+    of pending inotify events for the directories holding the files. Events
+    for a file whose state no longer matches its snapshot discard the
+    snapshot, and the file is read again the next time it's wanted. Where
+    inotify isn't available the state of the file is checked on every read
+    instead.
+
+    Snapshots are only ever replaced, never changed. Pending events are read
+    and applied with `lock` held, as are all other changes to the maps of
+    snapshots and watches, so a reader waits for events that another thread
+    has read to be applied rather than returning a snapshot they discard.
+    Writers publish a new snapshot once they've saved a file, so this process
+    sees its own changes straight away.
+    """
+
+    # Events that may mean a file in a watched directory has changed.
+    watch_mask = (
+        IN.CLOSE_WRITE | IN.MOVED_TO | IN.MOVED_FROM | IN.CREATE |
+        IN.DELETE | IN.ATTRIB | IN.DELETE_SELF | IN.MOVE_SELF | IN.ONLYDIR)
+
+    def __init__(self):
+        super(ConfigurationSnapshots, self).__init__()
+        self.lock = RLock()
+        self.versions = count(1)
+        self.reset()
+        # A forked child shares the inotify instance with its parent, and
+        # would steal its events. Without fork hooks, check the process ID.
+        self.check_pid = not hasattr(os, "register_at_fork")
+        if not self.check_pid:
+            os.register_at_fork(after_in_child=self.reset)
+
+    def reset(self):
+        """Forget all snapshots, and stop watching for changes."""
+        self.snapshots = {}
+        self.watches = {}
+        if getattr(self, "inotify", None) is not None:
+            self.inotify.close()
+        self.inotify = None
+        self.polling = False
+        self.pid = os.getpid()
+
+    def get(self, path):
+        """Return the current `ConfigurationSnapshot` of `path`.
+
+        The file is created if it does not yet exist.
+        """
+        if self.check_pid and self.pid != os.getpid():
+            self.reset()
+        inotify = self.inotify
+        if inotify is not None:
+            self._process_events(inotify)
+        snapshot = self.snapshots.get(path)
+        if snapshot is None:
+            return self._load(path)
+        elif self.polling and snapshot.state != get_file_state(path):
+            return self._load(path)
+        else:
+            return snapshot
+
+    def publish(self, path, config):
+        """Publish a snapshot of `config`, just saved to `path`."""
+        with self.lock:
+            snapshot = ConfigurationSnapshot(
+                next(self.versions), MappingProxyType(deepcopy(config)),
+                get_file_state(path))
+            self.snapshots[path] = snapshot
+            return snapshot
+
+    def _load(self, path):
+        with self.lock:
+            ensure_directory_for(path)
+            # Watch before reading so that no change goes unnoticed.
+            self._watch(os.path.dirname(path))
+            # Ensure `path` exists...
+            touch(path)
+            # before loading it in.
+            configfile = ConfigurationFile(path)
+            configfile.load()
+            return self.publish(path, configfile.config)
+
+    def _watch(self, dirname):
+        if self.polling or dirname in self.watches.values():
+            return
+        try:
+            if self.inotify is None:
+                self.inotify = Inotify()
+            wd = self.inotify.add_watch(dirname, self.watch_mask)
+        except OSError as error:
+            logger.info(
+                "Polling configuration files; cannot watch %s: %s",
+                dirname, error)
+            # Any inotify instance is left open: other threads may be reading
+            # from it, and the directories it watches are still watched.
+            self.polling = True
+        else:
+            self.watches[wd] = dirname
+
+    def _process_events(self, inotify):
+        with self.lock:
+            for event in inotify.read_events():
+                if event.mask & IN.Q_OVERFLOW:
+                    # Events were lost; start again.
+                    self.snapshots.clear()
+                elif event.mask & IN.IGNORED:
+                    # The directory has gone, or is on a file-system that has
+                    # been unmounted. Forget its files; they'll be watched
+                    # again when they're next loaded.
+                    dirname = self.watches.pop(event.wd, None)
+                    for path in list(self.snapshots):
+                        if os.path.dirname(path) == dirname:
+                            self.snapshots.pop(path, None)
+                elif event.wd in self.watches:
+                    path = os.path.join(self.watches[event.wd], event.name)
+                    snapshot = self.snapshots.get(path)
+                    if snapshot is not None:
+                        if snapshot.state != get_file_state(path):
+                            self.snapshots.pop(path, None)
+
+
+configuration_snapshots = ConfigurationSnapshots()
+
+
 class ConfigurationMeta(type):
     """Metaclass for configuration objects.
 
@@ -693,7 +857,6 @@ class Configuration:
     def open(cls, filepath=None):
         if filepath is None:
             filepath = cls.DEFAULT_FILENAME
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
         with cls.backend.open(filepath) as store:
             yield cls(store)
 
@@ -702,7 +865,6 @@ class Configuration:
     def open_for_update(cls, filepath=None):
         if filepath is None:
             filepath = cls.DEFAULT_FILENAME
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
         with cls.backend.open_for_update(filepath) as store:
             yield cls(store)
 
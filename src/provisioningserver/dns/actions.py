@@ -68,14 +68,16 @@ def bind_reload_with_retries(attempts=10, interval=2):
 
     :param attempts: The number of attempts.
     :param interval: The time in seconds to sleep between each attempt.
+    :return: True if success, False otherwise.
     """
     for countdown in range(attempts - 1, -1, -1):
         if bind_reload():
-            break
+            return True
         if countdown == 0:
             break
         else:
             sleep(interval)
+    return False
 
 
 def bind_reload_zones(zone_list):
@@ -104,7 +104,7 @@ class TestReloadWithRetries(MAASTestCase):
         bind_reload = self.patch_autospec(actions, "bind_reload")
         bind_reload.return_value = False
         attempts = randint(3, 13)
-        actions.bind_reload_with_retries(attempts=attempts)
+        self.assertFalse(actions.bind_reload_with_retries(attempts=attempts))
         expected_calls = [call()] * attempts
         self.assertThat(
             actions.bind_reload,
@@ -117,7 +117,7 @@ class TestReloadWithRetries(MAASTestCase):
         bind_reload.side_effect = lambda: (
             bind_reload_return_values.pop(0))
 
-        actions.bind_reload_with_retries(attempts=5)
+        self.assertTrue(actions.bind_reload_with_retries(attempts=5))
         expected_calls = [call(), call(), call()]
         self.assertThat(
             actions.bind_reload,
@@ -32,6 +32,7 @@ from provisioningserver.rpc.region import (
     RegisterEventType,
     SendEvent,
     SendEventMACAddress,
+    SendEvents,
 )
 from provisioningserver.utils.env import get_maas_id
 from provisioningserver.utils.twisted import (
@@ -41,10 +42,15 @@ from provisioningserver.utils.twisted import (
     FOREVER,
     suppress,
 )
+from twisted.internet import reactor
 from twisted.internet.defer import (
+    Deferred,
+    DeferredList,
     maybeDeferred,
     succeed,
 )
+from twisted.protocols.amp import UnhandledCommand
+from twisted.python.failure import Failure
 
 
 maaslog = get_maas_logger("events")
@@ -336,12 +342,25 @@ class NodeEventHub:
 
     This automatically ensures that the event type is registered before
     sending logs to the region.
+
+    Events logged with `queueByID` or `queueByMAC` are buffered and sent to
+    the region in batches, once `flush_size` events are waiting or after at
+    most `flush_interval` seconds.
     """
 
-    def __init__(self):
+    # Send buffered events once this many are waiting.
+    flush_size = 100
+
+    # Send buffered events at most this many seconds after the first one.
+    flush_interval = 0.5
+
+    def __init__(self, clock=reactor):
         super(NodeEventHub, self).__init__()
         self._types_registering = dict()
         self._types_registered = set()
+        self._queue = []
+        self._flush_call = None
+        self.clock = clock
 
     @asynchronous
     def registerEventType(self, event_type):
@@ -468,6 +487,96 @@ class NodeEventHub:
 
         return d
 
+    @asynchronous
+    def queueByID(self, event_type, system_id, description=""):
+        """Buffer the given node event to be sent to the region in a batch.
+
+        The node is specified by its ID.
+
+        :return: :class:`Deferred` that fires once the batch containing this
+            event has been sent.
+        """
+        return self._queueEvent(event_type, {
+            "system_id": system_id, "type_name": event_type,
+            "description": description})
+
+    @asynchronous
+    def queueByMAC(self, event_type, mac_address, description=""):
+        """Buffer the given node event to be sent to the region in a batch.
+
+        The node is specified by its MAC address. Events for nodes unknown to
+        the region are dropped, see `logByMAC`.
+
+        :return: :class:`Deferred` that fires once the batch containing this
+            event has been sent.
+        """
+        return self._queueEvent(event_type, {
+            "mac_address": mac_address, "type_name": event_type,
+            "description": description})
+
+    def _queueEvent(self, event_type, event):
+        def queue(_):
+            done = Deferred()
+            self._queue.append((event, done))
+            if len(self._queue) >= self.flush_size:
+                self.flush()
+            elif self._flush_call is None:
+                self._flush_call = self.clock.callLater(
+                    self.flush_interval, self.flush)
+            return done
+
+        return self.ensureEventTypeRegistered(event_type).addCallback(queue)
+
+    @asynchronous
+    def flush(self):
+        """Send all buffered events to the region now.
+
+        Regions that predate `SendEvents` are sent each event individually.
+
+        :return: :class:`Deferred` that fires once the events have been sent.
+        """
+        if self._flush_call is not None and self._flush_call.active():
+            self._flush_call.cancel()
+        self._flush_call = None
+        queue, self._queue = self._queue, []
+        if len(queue) == 0:
+            return succeed(None)
+
+        events = [event for event, _ in queue]
+
+        def send(client):
+            d = client(SendEvents, events=events)
+            d.addErrback(self._sendEventsIndividually, client, events)
+            return d
+
+        def notify(result):
+            for _, done in queue:
+                if done.called:
+                    continue
+                elif isinstance(result, Failure):
+                    done.errback(result)
+                else:
+                    done.callback(None)
+
+        d = maybeDeferred(getRegionClient).addCallback(send)
+        d.addBoth(notify)
+        return d
+
+    def _sendEventsIndividually(self, failure, client, events):
+        """Send `events` one at a time to a region without `SendEvents`."""
+        failure.trap(UnhandledCommand)
+        ds = []
+        for event in events:
+            if "system_id" in event:
+                d = client(SendEvent, **event)
+            else:
+                d = client(SendEventMACAddress, **event)
+                d.addErrback(suppress, NoSuchNode)
+            d.addErrback(
+                self._checkEventTypeRegistered, event["type_name"])
+            ds.append(d)
+        return DeferredList(ds, consumeErrors=True)
+
 
 # Singleton.
 nodeEventHub = NodeEventHub()
@@ -492,6 +601,8 @@ def send_node_event(event_type, system_id, hostname, description=''):
 def send_node_event_mac_address(event_type, mac_address, description=''):
     """Send the given node event to the region for the given mac address.
 
+    These events are sent in batches; see `NodeEventHub.queueByMAC`.
+
     :param event_type: The type of the event.
     :type event_type: unicode
     :param mac_address: The MAC Address of the node of the event.
@@ -499,7 +610,7 @@ def send_node_event_mac_address(event_type, mac_address, description=''):
     :param description: An optional description of the event.
     :type description: unicode
     """
-    return nodeEventHub.logByMAC(event_type, mac_address, description)
+    return nodeEventHub.queueByMAC(event_type, mac_address, description)
 
 
 @asynchronous
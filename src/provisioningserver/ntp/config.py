@@ -21,7 +21,7 @@ from netaddr import (
     IPAddress,
 )
 from provisioningserver.path import get_tentative_data_path
-from provisioningserver.utils.fs import sudo_write_file
+from provisioningserver.utils.fs import sudo_write_files
 
 
 _ntp_conf_name = "ntp.conf"
@@ -43,16 +43,12 @@ def configure(servers, peers, offset):
     """
     ntp_maas_conf = _render_ntp_maas_conf(servers, peers, offset)
     ntp_maas_conf_path = get_tentative_data_path("etc", _ntp_maas_conf_name)
-    sudo_write_file(
-        ntp_maas_conf_path,
-        ntp_maas_conf.encode("ascii"),
-        mode=0o644)
     ntp_conf = _render_ntp_conf(ntp_maas_conf_path)
     ntp_conf_path = get_tentative_data_path("etc", _ntp_conf_name)
-    sudo_write_file(
-        ntp_conf_path,
-        ntp_conf.encode("ascii"),
-        mode=0o644)
+    sudo_write_files([
+        (ntp_maas_conf_path, ntp_maas_conf.encode("ascii"), 0o644),
+        (ntp_conf_path, ntp_conf.encode("ascii"), 0o644),
+    ])
 
 
 configure_region = partial(configure, offset=0)
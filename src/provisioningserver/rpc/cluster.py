@@ -8,6 +8,7 @@ These are commands that a cluster controller ought to respond to.
 
 __all__ = [
     "Authenticate",
+    "Batch",
     "ConfigureDHCPv4",
     "ConfigureDHCPv4",
     "ConfigureDHCPv4_V2",
@@ -49,6 +50,7 @@ from provisioningserver.rpc.arguments import (
 )
 from provisioningserver.rpc.common import (
     Authenticate,
+    Batch,
     Identify,
 )
 from twisted.protocols import amp
@@ -5,21 +5,37 @@
 
 __all__ = [
     "Authenticate",
+    "Batch",
     "Client",
+    "get_command_latencies",
     "Identify",
     "RPCProtocol",
 ]
 
+from bisect import bisect_left
+from collections import (
+    defaultdict,
+    OrderedDict,
+)
 from os import getpid
 from socket import gethostname
+from time import monotonic
 
 from provisioningserver.logger import LegacyLogger
+from provisioningserver.rpc.arguments import CompressedAmpList
 from provisioningserver.rpc.interfaces import (
     IConnection,
     IConnectionToRegion,
 )
 from provisioningserver.utils.twisted import asynchronous
-from twisted.internet.defer import Deferred
+from twisted.internet.defer import (
+    Deferred,
+    DeferredList,
+    FirstError,
+    gatherResults,
+    maybeDeferred,
+    succeed,
+)
 from twisted.protocols import amp
 from twisted.python.failure import Failure
 
@@ -74,6 +90,139 @@ class Authenticate(amp.Command):
     errors = []
 
 
+class Batch(amp.Command):
+    """Call several commands on the remote side in a single round trip.
+
+    Each call names a command and carries its arguments, serialised as an
+    AMP box. The remote side dispatches the calls concurrently and returns
+    one result per call, in the same order: either the serialised response
+    box, or the error code and description that the call failed with.
+
+    :since: 2.3
+    """
+
+    arguments = [
+        (b"calls", CompressedAmpList([
+            (b"command", amp.Unicode()),
+            (b"arguments", amp.String()),
+        ])),
+    ]
+    response = [
+        (b"results", CompressedAmpList([
+            (b"response", amp.String(optional=True)),
+            (b"error", amp.String(optional=True)),
+            (b"description", amp.Unicode(optional=True)),
+        ])),
+    ]
+    errors = []
+
+
+class LatencyHistogram:
+    """A histogram of call latencies, in seconds."""
+
+    # The upper bound of each bucket; slower calls go into a final bucket.
+    bounds = (
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self):
+        super(LatencyHistogram, self).__init__()
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def snapshot(self):
+        """Return the histogram as a dict.
+
+        The `buckets` entry maps the upper bound of each bucket to the number
+        of calls that fell into it; the final bound is infinity.
+        """
+        bounds = self.bounds + (float("inf"), )
+        return {
+            "count": self.count,
+            "total": self.total,
+            "buckets": OrderedDict(zip(bounds, self.counts)),
+        }
+
+
+# Latencies of calls made from this process, keyed by command name.
+command_latencies = defaultdict(LatencyHistogram)
+
+
+def get_command_latencies():
+    """Return a snapshot of the latency histogram of every command called.
+
+    :return: A dict mapping command names to `LatencyHistogram.snapshot`s.
+    """
+    return {
+        name: histogram.snapshot()
+        for name, histogram in command_latencies.items()
+    }
+
+
+def _record_latency(result, command, started):
+    name = command.commandName.decode("ascii")
+    command_latencies[name].observe(monotonic() - started)
+    return result
+
+
+def _serialise_call(command, kwargs, proto):
+    """Serialise a call to `command` for inclusion in a `Batch`."""
+    box = amp.AmpBox(command.makeArguments(kwargs, proto))
+    return {
+        "command": command.commandName.decode("ascii"),
+        "arguments": box.serialize(),
+    }
+
+
+# The serialised calls in each `Batch` are kept well within AMP's limit on the
+# length of a value; more calls than fit are split over several batches.
+BATCH_SIZE_LIMIT = amp.MAX_VALUE_LENGTH // 2
+
+# The bytes each call adds to a `Batch` besides its command name and arguments:
+# the length prefixes and names of both keys, and the end of the box.
+BATCH_CALL_OVERHEAD = 2 * (2 + 2) + len(b"command") + len(b"arguments") + 2
+
+
+def _chunk_calls(calls):
+    """Split `calls` into lists that each fit into a single `Batch`.
+
+    :param calls: A sequence of `(cmd, kwargs, serialised)` tuples, where
+        `serialised` is from `_serialise_call`.
+    """
+    chunk, size = [], 0
+    for call in calls:
+        serialised = call[2]
+        call_size = (
+            len(serialised["command"]) + len(serialised["arguments"]) +
+            BATCH_CALL_OVERHEAD)
+        if len(chunk) != 0 and size + call_size > BATCH_SIZE_LIMIT:
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(call)
+        size += call_size
+    if len(chunk) != 0:
+        yield chunk
+
+
+def _parse_result(command, result, proto):
+    """Parse one result from a `Batch` into a `DeferredList`-style tuple."""
+    code = result["error"]
+    if code is None:
+        box = amp.parseString(result["response"])[0]
+        return True, command.parseResponse(box, proto)
+    elif code in amp.PROTOCOL_ERRORS:
+        error = amp.PROTOCOL_ERRORS[code](code, result["description"])
+    else:
+        error_type = command.reverseErrors.get(code, amp.UnknownRemoteError)
+        error = error_type(result["description"])
+    return False, Failure(error)
+
+
 class Client:
     """Wrapper around an :class:`amp.AMP` instance.
 
@@ -152,6 +301,58 @@ class Client:
 
         return self._conn.callRemote(cmd, **kwargs)
 
+    @asynchronous
+    def batch(self, calls):
+        """Call several remote RPC methods in a single round trip.
+
+        If the far end does not understand `Batch` the calls are made one by
+        one instead. Calls that together are too large for a single `Batch`
+        are split over several, sent concurrently.
+
+        :param calls: A sequence of `(cmd, kwargs)` tuples, where `cmd` is the
+            `amp.Command` child class to invoke and `kwargs` its parameters.
+        :return: A deferred list of `(success, result)` tuples, one for each
+            call and in the same order, as from a `DeferredList`.
+        """
+        calls = [
+            (cmd, kwargs, _serialise_call(cmd, kwargs, self._conn))
+            for cmd, kwargs in calls
+        ]
+        started = monotonic()
+
+        def parse_results(response, chunk):
+            results = []
+            for (cmd, _, _), result in zip(chunk, response["results"]):
+                _record_latency(None, cmd, started)
+                results.append(_parse_result(cmd, result, self._conn))
+            return results
+
+        def call_one_by_one(failure, chunk):
+            failure.trap(amp.UnhandledCommand)
+            return DeferredList([
+                self._conn.callRemote(cmd, **kwargs)
+                for cmd, kwargs, _ in chunk
+            ], consumeErrors=True)
+
+        def call_batch(chunk):
+            d = self._conn.callRemote(Batch, calls=[
+                serialised for _, _, serialised in chunk])
+            return d.addCallbacks(
+                parse_results, call_one_by_one,
+                callbackArgs=(chunk, ), errbackArgs=(chunk, ))
+
+        def join_results(results):
+            return [result for chunk in results for result in chunk]
+
+        def unwrap_error(failure):
+            failure.trap(FirstError)
+            return failure.value.subFailure
+
+        d = gatherResults(
+            [call_batch(chunk) for chunk in _chunk_calls(calls)],
+            consumeErrors=True)
+        return d.addCallbacks(join_results, unwrap_error)
+
     @asynchronous
     def getHostCertificate(self):
         return self._conn.hostCertificate
@@ -211,12 +412,15 @@ class RPCProtocol(amp.AMP, object):
         been called, i.e. this protocol is now connected.
     :ivar onConnectionLost: A `Deferred` that fires when `connectionLost` has
         been called, i.e. this protocol is no longer connected.
+    :ivar inFlight: The number of calls made on this protocol that are still
+        awaiting a response.
     """
 
     def __init__(self):
         super(RPCProtocol, self).__init__()
         self.onConnectionMade = Deferred()
         self.onConnectionLost = Deferred()
+        self.inFlight = 0
 
     def connectionMade(self):
         super(RPCProtocol, self).connectionMade()
@@ -226,6 +430,72 @@ class RPCProtocol(amp.AMP, object):
         super(RPCProtocol, self).connectionLost(reason)
         self.onConnectionLost.callback(None)
 
+    def callRemote(self, command, **kwargs):
+        """Call up, counting calls in flight and recording their latency."""
+        started = monotonic()
+        d = super(RPCProtocol, self).callRemote(command, **kwargs)
+        if d is not None:
+            self.inFlight += 1
+            d.addBoth(self._callFinished)
+            d.addBoth(_record_latency, command, started)
+        return d
+
+    def _callFinished(self, result):
+        self.inFlight -= 1
+        return result
+
+    @Batch.responder
+    def batch(self, calls):
+        """batch(calls)
+
+        Implementation of :py:class:`~provisioningserver.rpc.common.Batch`.
+        """
+        d = gatherResults([
+            self._dispatchBatchedCall(call["command"], call["arguments"])
+            for call in calls
+        ])
+        return d.addCallback(lambda results: {"results": results})
+
+    def _dispatchBatchedCall(self, command, arguments):
+        """Dispatch one call from a `Batch`, returning a result for it."""
+        name = command.encode("ascii")
+        responder = self.locateResponder(name)
+        if responder is None:
+            return succeed({
+                "error": amp.UNHANDLED_ERROR_CODE,
+                "description": "Unhandled Command: %r" % name,
+            })
+
+        def serialise_response(response):
+            return {"response": amp.AmpBox(response).serialize()}
+
+        def serialise_error(failure):
+            if failure.check(amp.RemoteAmpError):
+                description = failure.value.description
+                if isinstance(description, bytes):
+                    description = description.decode("utf-8", "replace")
+                return {
+                    "error": failure.value.errorCode,
+                    "description": description,
+                }
+            else:
+                box = amp.AmpBox(_command=name)
+                command_ref = make_command_ref(box)
+                log.err(failure, (
+                    "Unhandled failure dispatching batched AMP command. This "
+                    "is probably a bug. Please ensure that this error is "
+                    "handled within application code or declared in the "
+                    "signature of the %s command. [%s]") % (
+                        command, command_ref))
+                return {
+                    "error": amp.UNHANDLED_ERROR_CODE,
+                    "description": "Unknown Error [%s]" % command_ref,
+                }
+
+        box = amp.parseString(arguments)[0]
+        d = maybeDeferred(responder, box)
+        return d.addCallbacks(serialise_response, serialise_error)
+
     def dispatchCommand(self, box):
         """Call up, but coerce errors into non-fatal failures.
 
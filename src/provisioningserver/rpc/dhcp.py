@@ -34,7 +34,7 @@ from provisioningserver.rpc.exceptions import (
 from provisioningserver.service_monitor import service_monitor
 from provisioningserver.utils.fs import (
     sudo_delete_file,
-    sudo_write_file,
+    sudo_write_files,
 )
 from provisioningserver.utils.service_monitor import (
     SERVICE_STATE,
@@ -153,11 +153,12 @@ def _write_config(server, state):
     """Write the configuration file."""
     dhcpd_config, interfaces_config = state.get_config(server)
     try:
-        sudo_write_file(
-            server.config_filename, dhcpd_config.encode("utf-8"))
-        sudo_write_file(
-            server.interfaces_filename,
-            interfaces_config.encode("utf-8"))
+        sudo_write_files([
+            (server.config_filename,
+             dhcpd_config.encode("utf-8"), 0o644),
+            (server.interfaces_filename,
+             interfaces_config.encode("utf-8"), 0o644),
+        ])
     except ExternalProcessError as e:
         # ExternalProcessError.__str__ contains a generic failure message
         # as well as the command and its error output. On the other hand,
@@ -22,6 +22,9 @@ class IConnection(interface.Interface):
     peerCertificate = interface.Attribute(
         "peerCertificate", "The certificate used remotely for TLS.")
 
+    inFlight = interface.Attribute(
+        "inFlight", "The number of calls awaiting a response.")
+
     def callRemote(cmd, **arguments):
         """Call a remote method with the given arguments."""
 
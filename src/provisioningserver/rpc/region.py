@@ -8,6 +8,7 @@ These are commands that a region controller ought to respond to.
 
 __all__ = [
     "Authenticate",
+    "Batch",
     "CommissionNode",
     "CreateNode",
     "GetArchiveMirrors",
@@ -30,6 +31,7 @@ __all__ = [
     "RequestNodeInfoByMACAddress",
     "SendEvent",
     "SendEventMACAddress",
+    "SendEvents",
     "UpdateInterfaces",
     "UpdateLastImageSync",
     "UpdateNodePowerState",
@@ -43,6 +45,7 @@ from provisioningserver.rpc.arguments import (
 )
 from provisioningserver.rpc.common import (
     Authenticate,
+    Batch,
     Identify,
 )
 from provisioningserver.rpc.exceptions import (
@@ -362,6 +365,27 @@ class SendEventMACAddress(amp.Command):
     }
 
 
+class SendEvents(amp.Command):
+    """Send many events at once.
+
+    Each event identifies its node either by `system_id` or by
+    `mac_address`. Event types must already be registered; events of unknown
+    types, or for unknown nodes, are dropped by the region.
+
+    :since: 2.3
+    """
+
+    arguments = [
+        (b"events", AmpList(
+            [(b"system_id", amp.Unicode(optional=True)),
+             (b"mac_address", amp.Unicode(optional=True)),
+             (b"type_name", amp.Unicode()),
+             (b"description", amp.Unicode())])),
+    ]
+    response = []
+    errors = []
+
+
 class ReportForeignDHCPServer(amp.Command):
     """Report a foreign DHCP server on a rack controller's interface.
 
@@ -30,6 +30,8 @@ class DummyConnection:
     Implements `IConnection`.
     """
 
+    inFlight = 0
+
 
 @attr.s(cmp=False)
 @implementer(IConnection)
@@ -39,6 +41,7 @@ class FakeConnection:
     ident = attr.ib(default=sentinel.ident)
     hostCertificate = attr.ib(default=sentinel.hostCertificate)
     peerCertificate = attr.ib(default=sentinel.peerCertificate)
+    inFlight = attr.ib(default=0)
 
     def callRemote(self, cmd, **arguments):
         return succeed(sentinel.response)
@@ -56,6 +59,7 @@ class FakeConnectionToRegion:
     address = attr.ib(default=(sentinel.host, sentinel.port))
     hostCertificate = attr.ib(default=sentinel.hostCertificate)
     peerCertificate = attr.ib(default=sentinel.peerCertificate)
+    inFlight = attr.ib(default=0)
 
     def callRemote(self, cmd, **arguments):
         return succeed(sentinel.response)
@@ -5,6 +5,7 @@
 
 __all__ = []
 
+from collections import defaultdict
 import random
 import re
 from unittest.mock import sentinel
@@ -22,6 +23,7 @@ from maastesting.twisted import (
     TwistedLoggerFixture,
 )
 from provisioningserver.rpc import common
+from provisioningserver.rpc.testing import call_responder
 from provisioningserver.rpc.testing.doubles import (
     DummyConnection,
     FakeConnection,
@@ -34,12 +36,35 @@ from testtools.matchers import (
     IsInstance,
     Not,
 )
-from twisted.internet.defer import Deferred
+from twisted.internet.defer import (
+    Deferred,
+    fail,
+)
 from twisted.internet.protocol import connectionDone
 from twisted.protocols import amp
 from twisted.test.proto_helpers import StringTransport
 
 
+class Echo(amp.Command):
+    """Echo the given text.
+
+    :since: 2.3
+    """
+
+    arguments = [(b"text", amp.Unicode())]
+    response = [(b"text", amp.Unicode())]
+    errors = {ValueError: b"VALUE_ERROR"}
+
+
+class EchoProtocol(common.RPCProtocol):
+
+    @Echo.responder
+    def echo(self, text):
+        if len(text) == 0:
+            raise ValueError("Nothing to echo.")
+        return {"text": text}
+
+
 class TestClient(MAASTestCase):
 
     def test_init(self):
@@ -138,6 +163,106 @@ class TestClient(MAASTestCase):
         self.assertThat(hash(conn), Equals(hash(client)))
 
 
+class TestClientBatch(MAASTestCase):
+
+    def make_client(self, protocol):
+        conn = FakeConnection()
+        conn.callRemote = (
+            lambda cmd, **arguments: call_responder(protocol, cmd, arguments))
+        return common.Client(conn)
+
+    def test_batch_returns_results_in_order(self):
+        client = self.make_client(EchoProtocol())
+        texts = [factory.make_name("text") for _ in range(3)]
+        results = extract_result(client.batch(
+            (Echo, {"text": text}) for text in texts))
+        self.assertThat(results, Equals([
+            (True, {"text": text}) for text in texts]))
+
+    def test_batch_returns_failures_for_failed_calls(self):
+        client = self.make_client(EchoProtocol())
+        results = extract_result(client.batch([
+            (Echo, {"text": ""}),
+            (Echo, {"text": "foo"}),
+        ]))
+        (success, failure), second = results
+        self.assertFalse(success)
+        self.assertTrue(failure.check(ValueError))
+        self.assertThat(str(failure.value), Equals("Nothing to echo."))
+        self.assertThat(second, Equals((True, {"text": "foo"})))
+
+    def test_batch_returns_failures_for_unhandled_commands(self):
+        client = self.make_client(common.RPCProtocol())
+        [(success, failure)] = extract_result(
+            client.batch([(Echo, {"text": "foo"})]))
+        self.assertFalse(success)
+        self.assertTrue(failure.check(amp.UnhandledCommand))
+
+    def test_batch_calls_one_by_one_when_batch_is_unhandled(self):
+        protocol = EchoProtocol()
+
+        def callRemote(cmd, **arguments):
+            if cmd is common.Batch:
+                return fail(amp.UnhandledCommand())
+            else:
+                return call_responder(protocol, cmd, arguments)
+
+        conn = FakeConnection()
+        conn.callRemote = callRemote
+        results = extract_result(common.Client(conn).batch([
+            (Echo, {"text": "foo"}),
+            (Echo, {"text": "bar"}),
+        ]))
+        self.assertThat(results, Equals([
+            (True, {"text": "foo"}),
+            (True, {"text": "bar"}),
+        ]))
+
+    def test_batch_splits_calls_that_do_not_fit_into_one_batch(self):
+        protocol = EchoProtocol()
+        batches = []
+
+        def callRemote(cmd, **arguments):
+            if cmd is common.Batch:
+                batches.append(len(arguments["calls"]))
+            return call_responder(protocol, cmd, arguments)
+
+        conn = FakeConnection()
+        conn.callRemote = callRemote
+        # Each of these calls takes 80 bytes in a batch.
+        self.patch(common, "BATCH_SIZE_LIMIT", 200)
+        texts = [factory.make_string(40) for _ in range(5)]
+        results = extract_result(common.Client(conn).batch(
+            (Echo, {"text": text}) for text in texts))
+        self.assertThat(batches, Equals([2, 2, 1]))
+        self.assertThat(results, Equals([
+            (True, {"text": text}) for text in texts]))
+
+    def test_batch_fails_when_a_batch_fails(self):
+        conn = FakeConnection()
+        conn.callRemote = always_fail_with(amp.ProtocolSwitched())
+        d = common.Client(conn).batch([
+            (Echo, {"text": "foo"}),
+            (Echo, {"text": "bar"}),
+        ])
+        self.assertRaises(amp.ProtocolSwitched, extract_result, d)
+
+
+class TestLatencyHistogram(MAASTestCase):
+
+    def test_observe_counts_calls_into_buckets(self):
+        histogram = common.LatencyHistogram()
+        for seconds in (0.001, 0.005, 0.2, 60.0):
+            histogram.observe(seconds)
+        snapshot = histogram.snapshot()
+        self.assertThat(snapshot["count"], Equals(4))
+        self.assertAlmostEqual(snapshot["total"], 60.206)
+        self.assertThat(snapshot["buckets"][0.005], Equals(2))
+        self.assertThat(snapshot["buckets"][0.25], Equals(1))
+        self.assertThat(snapshot["buckets"][float("inf")], Equals(1))
+        self.assertThat(sum(snapshot["buckets"].values()), Equals(4))
+
+
 class TestRPCProtocol(MAASTestCase):
 
     def test_init(self):
@@ -157,6 +282,21 @@ class TestRPCProtocol(MAASTestCase):
         protocol.connectionLost(connectionDone)
         self.assertThat(protocol.onConnectionLost, IsFiredDeferred())
 
+    def test_callRemote_counts_calls_in_flight_and_records_latency(self):
+        self.patch(
+            common, "command_latencies",
+            defaultdict(common.LatencyHistogram))
+        protocol = common.RPCProtocol()
+        protocol.makeConnection(StringTransport())
+        d = protocol.callRemote(common.Identify)
+        self.assertThat(protocol.inFlight, Equals(1))
+        [box] = amp.parseString(protocol.transport.value())
+        protocol.ampBoxReceived(amp.AmpBox(_answer=box[amp.ASK], ident=b""))
+        self.assertThat(extract_result(d), Equals({"ident": ""}))
+        self.assertThat(protocol.inFlight, Equals(0))
+        self.assertThat(
+            common.get_command_latencies()["Identify"]["count"], Equals(1))
+
 
 class TestRPCProtocol_UnhandledErrorsWhenHandlingResponses(MAASTestCase):
 
@@ -484,8 +484,8 @@ class TestConfigureDHCP(MAASTestCase):
     def patch_sudo_delete_file(self):
         return self.patch_autospec(dhcp, 'sudo_delete_file')
 
-    def patch_sudo_write_file(self):
-        return self.patch_autospec(dhcp, 'sudo_write_file')
+    def patch_sudo_write_files(self):
+        return self.patch_autospec(dhcp, 'sudo_write_files')
 
     def patch_restartService(self):
         return self.patch(dhcp.service_monitor, 'restartService')
@@ -546,7 +546,7 @@ class TestConfigureDHCP(MAASTestCase):
 
     @inlineCallbacks
     def test__writes_config_and_calls_restart_when_no_current_state(self):
-        write_file = self.patch_sudo_write_file()
+        write_files = self.patch_sudo_write_files()
         restart_service = self.patch_restartService()
 
         failover_peers = make_failover_peer_config()
@@ -570,15 +570,15 @@ class TestConfigureDHCP(MAASTestCase):
             global_dhcp_snippets)
 
         self.assertThat(
-            write_file,
-            MockCallsMatch(
-                call(
+            write_files,
+            MockCalledOnceWith([
+                (
                     self.server.config_filename,
-                    expected_config.encode("utf-8")),
-                call(
+                    expected_config.encode("utf-8"), 0o644),
+                (
                     self.server.interfaces_filename,
-                    interface["name"].encode("utf-8")),
-                ))
+                    interface["name"].encode("utf-8"), 0o644),
+            ]))
         self.assertThat(on, MockCalledOnceWith())
         self.assertThat(
             restart_service, MockCalledOnceWith(self.server.dhcp_service))
@@ -590,7 +590,7 @@ class TestConfigureDHCP(MAASTestCase):
 
     @inlineCallbacks
     def test__writes_config_and_calls_restart_when_non_host_state_diff(self):
-        write_file = self.patch_sudo_write_file()
+        write_files = self.patch_sudo_write_files()
         restart_service = self.patch_restartService()
 
         failover_peers = make_failover_peer_config()
@@ -619,15 +619,15 @@ class TestConfigureDHCP(MAASTestCase):
             global_dhcp_snippets)
 
         self.assertThat(
-            write_file,
-            MockCallsMatch(
-                call(
+            write_files,
+            MockCalledOnceWith([
+                (
                     self.server.config_filename,
-                    expected_config.encode("utf-8")),
-                call(
+                    expected_config.encode("utf-8"), 0o644),
+                (
                     self.server.interfaces_filename,
-                    interface["name"].encode("utf-8")),
-                ))
+                    interface["name"].encode("utf-8"), 0o644),
+            ]))
         self.assertThat(on, MockCalledOnceWith())
         self.assertThat(
             restart_service, MockCalledOnceWith(self.server.dhcp_service))
@@ -639,7 +639,7 @@ class TestConfigureDHCP(MAASTestCase):
 
     @inlineCallbacks
     def test__writes_config_and_calls_ensure_when_nothing_changed(self):
-        write_file = self.patch_sudo_write_file()
+        write_files = self.patch_sudo_write_files()
         restart_service = self.patch_restartService()
         ensure_service = self.patch_ensureService()
 
@@ -669,15 +669,15 @@ class TestConfigureDHCP(MAASTestCase):
             dhcp_snippets)
 
         self.assertThat(
-            write_file,
-            MockCallsMatch(
-                call(
+            write_files,
+            MockCalledOnceWith([
+                (
                     self.server.config_filename,
-                    expected_config.encode("utf-8")),
-                call(
+                    expected_config.encode("utf-8"), 0o644),
+                (
                     self.server.interfaces_filename,
-                    interface["name"].encode("utf-8")),
-                ))
+                    interface["name"].encode("utf-8"), 0o644),
+            ]))
         self.assertThat(on, MockCalledOnceWith())
         self.assertThat(
             restart_service, MockNotCalled())
@@ -691,7 +691,7 @@ class TestConfigureDHCP(MAASTestCase):
 
     @inlineCallbacks
     def test__writes_config_and_doesnt_use_omapi_when_was_off(self):
-        write_file = self.patch_sudo_write_file()
+        write_files = self.patch_sudo_write_files()
         get_service_state = self.patch_getServiceState()
         get_service_state.return_value = ServiceState(
             SERVICE_STATE.OFF, "dead")
@@ -726,15 +726,15 @@ class TestConfigureDHCP(MAASTestCase):
             global_dhcp_snippets)
 
         self.assertThat(
-            write_file,
-            MockCallsMatch(
-                call(
+            write_files,
+            MockCalledOnceWith([
+                (
                     self.server.config_filename,
-                    expected_config.encode("utf-8")),
-                call(
+                    expected_config.encode("utf-8"), 0o644),
+                (
                     self.server.interfaces_filename,
-                    interface["name"].encode("utf-8")),
-                ))
+                    interface["name"].encode("utf-8"), 0o644),
+            ]))
         self.assertThat(on, MockCalledOnceWith())
         self.assertThat(
             get_service_state,
@@ -753,7 +753,7 @@ class TestConfigureDHCP(MAASTestCase):
 
     @inlineCallbacks
     def test__writes_config_and_uses_omapi_to_update_hosts(self):
-        write_file = self.patch_sudo_write_file()
+        write_files = self.patch_sudo_write_files()
         get_service_state = self.patch_getServiceState()
         get_service_state.return_value = ServiceState(
             SERVICE_STATE.ON, "running")
@@ -797,15 +797,15 @@ class TestConfigureDHCP(MAASTestCase):
             global_dhcp_snippets)
 
         self.assertThat(
-            write_file,
-            MockCallsMatch(
-                call(
+            write_files,
+            MockCalledOnceWith([
+                (
                     self.server.config_filename,
-                    expected_config.encode("utf-8")),
-                call(
+                    expected_config.encode("utf-8"), 0o644),
+                (
                     self.server.interfaces_filename,
-                    interface["name"].encode("utf-8")),
-                ))
+                    interface["name"].encode("utf-8"), 0o644),
+            ]))
         self.assertThat(on, MockCalledOnceWith())
         self.assertThat(
             get_service_state,
@@ -826,7 +826,7 @@ class TestConfigureDHCP(MAASTestCase):
 
     @inlineCallbacks
     def test__writes_config_and_restarts_when_omapi_fails(self):
-        write_file = self.patch_sudo_write_file()
+        write_files = self.patch_sudo_write_files()
         get_service_state = self.patch_getServiceState()
         get_service_state.return_value = ServiceState(
             SERVICE_STATE.ON, "running")
@@ -872,15 +872,15 @@ class TestConfigureDHCP(MAASTestCase):
                 global_dhcp_snippets)
 
         self.assertThat(
-            write_file,
-            MockCallsMatch(
-                call(
+            write_files,
+            MockCalledOnceWith([
+                (
                     self.server.config_filename,
-                    expected_config.encode("utf-8")),
-                call(
+                    expected_config.encode("utf-8"), 0o644),
+                (
                     self.server.interfaces_filename,
-                    interface["name"].encode("utf-8")),
-                ))
+                    interface["name"].encode("utf-8"), 0o644),
+            ]))
         self.assertThat(on, MockCalledOnceWith())
         self.assertThat(
             get_service_state,
@@ -906,7 +906,7 @@ class TestConfigureDHCP(MAASTestCase):
     @inlineCallbacks
     def test__converts_failure_writing_file_to_CannotConfigureDHCP(self):
         self.patch_sudo_delete_file()
-        self.patch_sudo_write_file().side_effect = (
+        self.patch_sudo_write_files().side_effect = (
             ExternalProcessError(1, "sudo something"))
         self.patch_restartService()
         failover_peers = [make_failover_peer_config()]
@@ -920,7 +920,7 @@ class TestConfigureDHCP(MAASTestCase):
 
     @inlineCallbacks
     def test__converts_dhcp_restart_failure_to_CannotConfigureDHCP(self):
-        self.patch_sudo_write_file()
+        self.patch_sudo_write_files()
         self.patch_sudo_delete_file()
         self.patch_restartService().side_effect = ServiceActionError()
         failover_peers = [make_failover_peer_config()]
@@ -934,7 +934,7 @@ class TestConfigureDHCP(MAASTestCase):
 
     @inlineCallbacks
     def test__converts_stop_dhcp_server_failure_to_CannotConfigureDHCP(self):
-        self.patch_sudo_write_file()
+        self.patch_sudo_write_files()
         self.patch_sudo_delete_file()
         self.patch_ensureService().side_effect = ServiceActionError()
         with ExpectedException(exceptions.CannotConfigureDHCP):
@@ -943,7 +943,7 @@ class TestConfigureDHCP(MAASTestCase):
 
     @inlineCallbacks
     def test__does_not_log_ServiceActionError(self):
-        self.patch_sudo_write_file()
+        self.patch_sudo_write_files()
         self.patch_sudo_delete_file()
         self.patch_ensureService().side_effect = ServiceActionError()
         with FakeLogger("maas") as logger:
@@ -954,7 +954,7 @@ class TestConfigureDHCP(MAASTestCase):
 
     @inlineCallbacks
     def test__does_log_other_exceptions(self):
-        self.patch_sudo_write_file()
+        self.patch_sudo_write_files()
         self.patch_sudo_delete_file()
         self.patch_ensureService().side_effect = (
             factory.make_exception("DHCP is on strike today"))
@@ -968,7 +968,7 @@ class TestConfigureDHCP(MAASTestCase):
 
     @inlineCallbacks
     def test__does_not_log_ServiceActionError_when_restarting(self):
-        self.patch_sudo_write_file()
+        self.patch_sudo_write_files()
         self.patch_restartService().side_effect = ServiceActionError()
         failover_peers = [make_failover_peer_config()]
         shared_networks = fix_shared_networks_failover(
@@ -984,7 +984,7 @@ class TestConfigureDHCP(MAASTestCase):
 
     @inlineCallbacks
     def test__does_log_other_exceptions_when_restarting(self):
-        self.patch_sudo_write_file()
+        self.patch_sudo_write_files()
         self.patch_restartService().side_effect = (
             factory.make_exception("DHCP is on strike today"))
         failover_peers = [make_failover_peer_config()]
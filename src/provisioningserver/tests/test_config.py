@@ -13,6 +13,7 @@ from operator import (
 )
 import os.path
 import sqlite3
+import threading
 from unittest.mock import sentinel
 from uuid import uuid4
 
@@ -35,8 +36,10 @@ from provisioningserver.config import (
     ConfigurationImmutable,
     ConfigurationMeta,
     ConfigurationOption,
+    ConfigurationSnapshots,
     is_dev_environment,
 )
+from provisioningserver import config as config_module
 from provisioningserver.path import get_data_path
 from provisioningserver.testing.config import ClusterConfigurationFixture
 from provisioningserver.utils.fs import RunLock
@@ -45,6 +48,7 @@ from testtools.matchers import (
     Equals,
     FileContains,
     FileExists,
+    GreaterThan,
     Is,
     MatchesStructure,
 )
@@ -544,6 +548,173 @@ class TestConfigurationFile(MAASTestCase):
             "ConfigurationFile(%r)" % config_file))
 
 
+class TestConfigurationSnapshots(MAASTestCase):
+    """Tests for `ConfigurationSnapshots`."""
+
+    scenarios = (
+        ("inotify", dict(polling=False)),
+        ("polling", dict(polling=True)),
+    )
+
+    def setUp(self):
+        super(TestConfigurationSnapshots, self).setUp()
+        if self.polling:
+            self.patch(config_module, "Inotify").side_effect = OSError()
+        self.snapshots = ConfigurationSnapshots()
+        self.addCleanup(self.snapshots.reset)
+        self.path = os.path.join(self.make_dir(), "config")
+        self.mtime = 0
+
+    def write_config(self, config):
+        # Write as another process would, behind the snapshots' back.
+        with open(self.path, "w") as fd:
+            yaml.safe_dump(config, fd)
+        # Make sure that the change is visible even with coarse timestamps.
+        self.mtime += 1
+        os.utime(self.path, (self.mtime, self.mtime))
+
+    def test_get_creates_file(self):
+        snapshot = self.snapshots.get(self.path)
+        self.assertEqual({}, snapshot.config)
+        self.assertThat(self.path, FileExists())
+
+    def test_get_returns_same_snapshot_while_file_is_unchanged(self):
+        self.write_config({"alice": 1})
+        load = self.patch(ConfigurationFile, "load")
+        load.side_effect = lambda: None
+        snapshot = self.snapshots.get(self.path)
+        self.assertIs(snapshot, self.snapshots.get(self.path))
+        self.assertThat(load, MockCalledOnceWith())
+
+    def test_get_reads_file_again_once_changed(self):
+        self.write_config({"alice": 1})
+        snapshot1 = self.snapshots.get(self.path)
+        self.write_config({"alice": 2})
+        snapshot2 = self.snapshots.get(self.path)
+        self.assertEqual({"alice": 2}, snapshot2.config)
+        self.assertThat(snapshot2.version, GreaterThan(snapshot1.version))
+
+    def test_get_reads_file_again_once_replaced(self):
+        self.snapshots.get(self.path)
+        replacement = os.path.join(self.make_dir(), "config")
+        with open(replacement, "w") as fd:
+            yaml.safe_dump({"alice": 3}, fd)
+        os.rename(replacement, self.path)
+        self.assertEqual({"alice": 3}, self.snapshots.get(self.path).config)
+
+    def test_get_creates_file_again_once_deleted(self):
+        self.write_config({"alice": 1})
+        self.snapshots.get(self.path)
+        os.unlink(self.path)
+        self.assertEqual({}, self.snapshots.get(self.path).config)
+        self.assertThat(self.path, FileExists())
+
+    def test_snapshots_are_immutable(self):
+        self.write_config({"alice": [1]})
+        snapshot = self.snapshots.get(self.path)
+        self.assertRaises(TypeError, setitem, snapshot.config, "alice", 2)
+
+    def test_publish_replaces_snapshot(self):
+        snapshot1 = self.snapshots.get(self.path)
+        config = {"alice": [1]}
+        snapshot2 = self.snapshots.publish(self.path, config)
+        self.assertIs(snapshot2, self.snapshots.get(self.path))
+        self.assertThat(snapshot2.version, GreaterThan(snapshot1.version))
+        # The snapshot is a copy.
+        config["alice"].append(2)
+        self.assertEqual({"alice": [1]}, snapshot2.config)
+
+    def test_reset_forgets_snapshots(self):
+        snapshot = self.snapshots.get(self.path)
+        self.snapshots.reset()
+        self.assertIsNot(snapshot, self.snapshots.get(self.path))
+
+    def test_get_from_many_threads_while_files_change(self):
+        paths = [
+            os.path.join(self.make_dir(), "config") for _ in range(5)]
+        errors = []
+
+        def read():
+            try:
+                for _ in range(50):
+                    for path in paths:
+                        self.snapshots.get(path)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for value in range(50):
+            for path in paths:
+                # Replace, so that readers never see a partial write.
+                with open(path + ".new", "w") as fd:
+                    yaml.safe_dump({"alice": value}, fd)
+                os.replace(path + ".new", path)
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+
+    def test_get_waits_for_events_being_applied(self):
+        if self.polling:
+            self.skipTest("Only applies when watching with inotify.")
+        self.snapshots.get(self.path)
+        self.write_config({"alice": 5})
+        snapshots = []
+        reader = threading.Thread(
+            target=lambda: snapshots.append(self.snapshots.get(self.path)))
+        # As if another thread has read events and is applying them.
+        with self.snapshots.lock:
+            reader.start()
+            reader.join(0.1)
+            self.assertTrue(reader.is_alive())
+        reader.join()
+        [snapshot] = snapshots
+        self.assertEqual({"alice": 5}, snapshot.config)
+
+    def test_failing_to_watch_falls_back_to_polling_and_keeps_watches(self):
+        if self.polling:
+            self.skipTest("Only applies when watching with inotify.")
+        self.snapshots.get(self.path)
+        inotify = self.snapshots.inotify
+        self.patch(inotify, "add_watch").side_effect = OSError()
+        other = os.path.join(self.make_dir(), "config")
+        self.snapshots.get(other)
+        self.assertTrue(self.snapshots.polling)
+        # Other threads may be reading from it, so it's left open.
+        self.assertIs(inotify, self.snapshots.inotify)
+        self.assertEqual([], inotify.read_events())
+        self.write_config({"alice": 4})
+        self.assertEqual({"alice": 4}, self.snapshots.get(self.path).config)
+
+
+class TestConfigurationFileSnapshots(MAASTestCase):
+    """Tests for `ConfigurationFile` reading through snapshots."""
+
+    def setUp(self):
+        super(TestConfigurationFileSnapshots, self).setUp()
+        self.addCleanup(config_module.configuration_snapshots.reset)
+        self.path = os.path.join(self.make_dir(), "config")
+
+    def test_open_reads_changes_saved_by_open_for_update(self):
+        with ConfigurationFile.open(self.path) as config:
+            self.assertEqual({}, config.config)
+        with ConfigurationFile.open_for_update(self.path) as config:
+            config["alice"] = "bob"
+        load = self.patch(ConfigurationFile, "load")
+        with ConfigurationFile.open(self.path) as config:
+            self.assertEqual("bob", config["alice"])
+        self.assertThat(load, MockNotCalled())
+
+    def test_open_reads_changes_saved_elsewhere(self):
+        with ConfigurationFile.open(self.path) as config:
+            self.assertEqual({}, config.config)
+        with open(self.path, "w") as fd:
+            yaml.safe_dump({"alice": "carol"}, fd)
+        with ConfigurationFile.open(self.path) as config:
+            self.assertEqual("carol", config["alice"])
+
+
 class TestConfigurationFileMutability(MAASTestCase):
     """Tests for `ConfigurationFile` mutability."""
 
@@ -49,10 +49,12 @@ from testtools.matchers import (
     IsInstance,
 )
 from twisted.internet.defer import (
+    DeferredList,
     fail,
     inlineCallbacks,
     succeed,
 )
+from twisted.internet.task import Clock
 
 
 class TestEvents(MAASTestCase):
@@ -80,12 +82,12 @@ class TestSendEventNode(MAASTestCase):
 class TestSendEventNodeMACAddress(MAASTestCase):
     """Tests for `send_node_event_mac_address`."""
 
-    def test__calls_singleton_hub_logByMAC_directly(self):
-        self.patch(nodeEventHub, "logByMAC").return_value = sentinel.d
+    def test__calls_singleton_hub_queueByMAC_directly(self):
+        self.patch(nodeEventHub, "queueByMAC").return_value = sentinel.d
         result = send_node_event_mac_address(
             sentinel.event_type, sentinel.mac_address, sentinel.description)
         self.assertThat(result, Is(sentinel.d))
-        self.assertThat(nodeEventHub.logByMAC, MockCalledOnceWith(
+        self.assertThat(nodeEventHub.queueByMAC, MockCalledOnceWith(
             sentinel.event_type, sentinel.mac_address, sentinel.description))
 
 
@@ -278,3 +280,87 @@ class TestSendEventMACAddress(MAASTestCase):
             yield event_hub.logByMAC(event_name, mac_address, description)
         # The event has been removed from the cache.
         self.assertThat(event_hub._types_registered, HasLength(0))
+
+
+class TestNodeEventHubQueue(MAASTestCase):
+    """Tests for `NodeEventHub.queueByID` and `NodeEventHub.queueByMAC`."""
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
+
+    def patch_rpc_methods(self, *commands):
+        fixture = self.useFixture(MockLiveClusterToRegionRPCFixture())
+        protocol, connecting = fixture.makeEventLoop(
+            region.RegisterEventType, *commands)
+        return protocol, connecting
+
+    def make_events(self, count):
+        return [
+            (
+                random.choice(list(map_enum(EVENT_TYPES))),
+                factory.make_name('system_id'),
+                factory.make_name('description'),
+            )
+            for _ in range(count)
+        ]
+
+    @inlineCallbacks
+    def test__events_are_sent_in_one_batch_after_flush_interval(self):
+        protocol, connecting = self.patch_rpc_methods(region.SendEvents)
+        self.addCleanup((yield connecting))
+        clock = Clock()
+        event_hub = NodeEventHub(clock=clock)
+        events = self.make_events(3)
+        ds = [
+            event_hub.queueByID(event_type, system_id, description)
+            for event_type, system_id, description in events
+        ]
+        self.assertThat(protocol.SendEvents, MockNotCalled())
+        clock.advance(event_hub.flush_interval)
+        yield DeferredList(ds, fireOnOneErrback=True)
+        self.assertThat(protocol.SendEvents, MockCalledOnceWith(
+            ANY, events=[
+                {
+                    "system_id": system_id,
+                    "type_name": event_type,
+                    "description": description,
+                }
+                for event_type, system_id, description in events
+            ]))
+
+    @inlineCallbacks
+    def test__events_are_sent_once_flush_size_is_reached(self):
+        protocol, connecting = self.patch_rpc_methods(region.SendEvents)
+        self.addCleanup((yield connecting))
+        clock = Clock()
+        event_hub = NodeEventHub(clock=clock)
+        event_hub.flush_size = 2
+        mac_address = factory.make_mac_address()
+        event_type = random.choice(list(map_enum(EVENT_TYPES)))
+        yield DeferredList([
+            event_hub.queueByMAC(event_type, mac_address),
+            event_hub.queueByMAC(event_type, mac_address),
+        ], fireOnOneErrback=True)
+        self.assertThat(protocol.SendEvents, MockCalledOnce())
+        self.assertEqual([], clock.getDelayedCalls())
+
+    @inlineCallbacks
+    def test__events_are_sent_individually_to_older_regions(self):
+        protocol, connecting = self.patch_rpc_methods(
+            region.SendEvent, region.SendEventMACAddress)
+        self.addCleanup((yield connecting))
+        event_hub = NodeEventHub(clock=Clock())
+        event_type = random.choice(list(map_enum(EVENT_TYPES)))
+        system_id = factory.make_name('system_id')
+        mac_address = factory.make_mac_address()
+        ds = [
+            event_hub.queueByID(event_type, system_id, "by id"),
+            event_hub.queueByMAC(event_type, mac_address, "by mac"),
+        ]
+        yield event_hub.flush()
+        yield DeferredList(ds, fireOnOneErrback=True)
+        self.assertThat(protocol.SendEvent, MockCalledOnceWith(
+            ANY, system_id=system_id, type_name=event_type,
+            description="by id"))
+        self.assertThat(protocol.SendEventMACAddress, MockCalledOnceWith(
+            ANY, mac_address=mac_address, type_name=event_type,
+            description="by mac"))
@@ -314,7 +314,7 @@ def observe_arp_packets(
             # Not an Ethernet interface. Need to exit here, because our
             # assumptions about the link layer header won't be correct.
             return 4
-        for header, packet in pcap:
+        for header, packet in pcap.iter_packets(ethertypes={ETHERTYPE.ARP}):
             ethernet = Ethernet(packet, time=header.timestamp_seconds)
             if not ethernet.is_valid():
                 # Ignore packets with a truncated Ethernet header.
@@ -322,9 +322,6 @@ def observe_arp_packets(
             if len(ethernet.payload) < SIZEOF_ARP_PACKET:
                 # Ignore truncated ARP packets.
                 continue
-            if ethernet.ethertype != ETHERTYPE.ARP:
-                # Ignore non-ARP packets.
-                continue
             arp = ARP(
                 ethernet.payload, src_mac=ethernet.src_mac,
                 dst_mac=ethernet.dst_mac, vid=ethernet.vid,
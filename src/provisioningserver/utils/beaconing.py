@@ -38,6 +38,7 @@ from provisioningserver.security import (
     fernet_encrypt_psk,
 )
 from provisioningserver.utils import sudo
+from provisioningserver.utils.ethernet import ETHERTYPE
 from provisioningserver.utils.network import format_eui
 from provisioningserver.utils.pcap import (
     PCAP,
@@ -265,10 +266,12 @@ def observe_beaconing_packets(input=sys.stdin.buffer, out=sys.stdout):
             # Not an Ethernet interface. Need to exit here, because our
             # assumptions about the link layer header won't be correct.
             return 4
-        for pcap_header, packet_bytes in pcap:
+        # XXX Need to support IPv6 as well.
+        packets = pcap.iter_packets(ethertypes={ETHERTYPE.IPV4})
+        for pcap_header, packet_bytes in packets:
             try:
                 packet = decode_ethernet_udp_packet(packet_bytes, pcap_header)
-                beacon = BeaconingPacket(packet.payload)
+                beacon = BeaconingPacket(bytes(packet.payload))
                 if not beacon.valid:
                     continue
                 output_json = {
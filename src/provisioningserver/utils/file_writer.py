@@ -0,0 +1,232 @@
+# Copyright 2017 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Privileged helper that writes and deletes files for MAAS.
+
+Writing a file as root with `sudo maas-write-file` costs a `sudo` and a new
+Python interpreter for every file. `maas-file-writer` is a long-lived helper
+that runs as root instead and listens on a UNIX socket. It only serves the
+users it's told to trust, identified with ``SO_PEERCRED``, and only touches
+the files on its allow-list.
+
+A request is a JSON object sent on a fresh connection, ended by shutting
+down the writing side of the socket::
+
+  {"writes": [{"path": ..., "mode": ..., "content": <base64>}, ...],
+   "deletes": [path, ...]}
+
+The whole request is checked against the allow-list before anything is
+done, then files are written with `atomic_write` and deleted with
+`atomic_delete`, in order. The reply is ``{"error": null}`` or ``{"error":
+"..."}``. Each file is updated atomically, but a batch is not: if a write
+fails part way, the files before it have already been updated.
+"""
+
+__all__ = [
+    "FileWriterError",
+    "FileWriterServer",
+    "get_file_writer_socket_path",
+    "update_files",
+]
+
+from base64 import (
+    b64decode,
+    b64encode,
+)
+import json
+import os
+import socket
+import socketserver
+import struct
+
+from provisioningserver.logger import get_maas_logger
+from provisioningserver.path import get_tentative_data_path
+from provisioningserver.utils.fs import (
+    atomic_delete,
+    atomic_write,
+)
+from provisioningserver.utils.shell import ExternalProcessError
+
+
+maaslog = get_maas_logger("file-writer")
+
+# Files that may be written, and the permission bits each may be given.
+writable_files = {
+    "/etc/ntp.conf": 0o644,
+    "/etc/ntp/maas.conf": 0o644,
+    "/var/lib/maas/dhcpd-interfaces": 0o644,
+    "/var/lib/maas/dhcpd.conf": 0o644,
+    "/var/lib/maas/dhcpd6-interfaces": 0o644,
+    "/var/lib/maas/dhcpd6.conf": 0o644,
+}
+
+# Files that may be deleted.
+deletable_files = {
+    "/var/lib/maas/dhcpd.conf",
+    "/var/lib/maas/dhcpd6.conf",
+}
+
+# The largest request that will be read, in bytes.
+MAX_REQUEST_SIZE = 64 * 1024 * 1024
+
+# Seconds to wait for the file writer before giving up on a request.
+TIMEOUT = 30
+
+# The struct ucred that SO_PEERCRED returns: pid, uid, gid.
+UCRED = struct.Struct("3i")
+
+
+def get_file_writer_socket_path():
+    """Return the path of the socket that `maas-file-writer` listens on."""
+    return get_tentative_data_path("/run/maas/file-writer.sock")
+
+
+class FileWriterError(ExternalProcessError):
+    """The file writer refused or failed to update files."""
+
+    def __init__(self, message):
+        super(FileWriterError, self).__init__(
+            1, ["maas-file-writer"], message.encode("utf-8"))
+
+
+def update_files(writes=(), deletes=(), path=None, timeout=TIMEOUT):
+    """Ask `maas-file-writer` to write and delete files.
+
+    :param writes: An iterable of ``(filename, contents, mode)`` tuples.
+    :param deletes: An iterable of file names.
+    :param path: The path of the file writer's socket. Defaults to
+        `get_file_writer_socket_path`.
+    :param timeout: Seconds to wait for the file writer to respond.
+    :return: True if the file writer did the work, or False if it can't be
+        reached, in which case nothing was done.
+    :raise FileWriterError: When the file writer refused or failed, or did
+        not respond within `timeout` seconds.
+    """
+    request = json.dumps({
+        "writes": [
+            {"path": filename, "mode": mode,
+             "content": b64encode(contents).decode("ascii")}
+            for filename, contents, mode in writes
+        ],
+        "deletes": list(deletes),
+    }).encode("utf-8")
+    if path is None:
+        path = get_file_writer_socket_path()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        try:
+            sock.connect(path)
+        except OSError:
+            # It's not running, or it's not usable by this process; either
+            # way the caller can fall back to sudo.
+            return False
+        try:
+            sock.sendall(request)
+            sock.shutdown(socket.SHUT_WR)
+            reply = b"".join(iter(lambda: sock.recv(65536), b""))
+        except socket.timeout:
+            raise FileWriterError(
+                "No response within %s seconds." % timeout)
+    finally:
+        sock.close()
+    try:
+        error = json.loads(reply.decode("utf-8"))["error"]
+    except (ValueError, KeyError):
+        raise FileWriterError("Malformed reply: %r" % (reply, ))
+    if error is not None:
+        raise FileWriterError(error)
+    return True
+
+
+class FileWriterHandler(socketserver.BaseRequestHandler):
+    """Serve one request to write and delete files."""
+
+    def handle(self):
+        try:
+            self.check_peer()
+            writes, deletes = self.read_request()
+            for filename, contents, mode in writes:
+                atomic_write(contents, filename, overwrite=True, mode=mode)
+            for filename in deletes:
+                try:
+                    atomic_delete(filename)
+                except FileNotFoundError:
+                    pass  # Ignore; it's already gone.
+        except Exception as error:
+            maaslog.warning("Refused or failed to update files: %s", error)
+            reply = {"error": str(error)}
+        else:
+            reply = {"error": None}
+        self.request.sendall(json.dumps(reply).encode("utf-8"))
+
+    def check_peer(self):
+        """Check that the connected process belongs to a trusted user."""
+        _, uid, _ = UCRED.unpack(self.request.getsockopt(
+            socket.SOL_SOCKET, socket.SO_PEERCRED, UCRED.size))
+        if uid not in self.server.allowed_uids:
+            raise PermissionError("User %d is not permitted." % uid)
+
+    def read_request(self):
+        """Read and check a request.
+
+        :return: ``(writes, deletes)``, where `writes` is a list of
+            ``(filename, contents, mode)`` tuples, and `deletes` is a list of
+            file names.
+        """
+        data = bytearray()
+        while len(data) <= MAX_REQUEST_SIZE:
+            chunk = self.request.recv(65536)
+            if len(chunk) == 0:
+                break
+            data.extend(chunk)
+        else:
+            raise ValueError("Request is too large.")
+        request = json.loads(data.decode("utf-8"))
+        writes = [
+            (write["path"], b64decode(write["content"]), write["mode"])
+            for write in request.get("writes", ())
+        ]
+        deletes = list(request.get("deletes", ()))
+        for filename, _, mode in writes:
+            if filename not in self.server.writable:
+                raise PermissionError(
+                    "%s is not in the allow-list for writing." % filename)
+            elif not isinstance(mode, int):
+                raise ValueError("File mode %r is not an integer." % (mode, ))
+            elif mode & self.server.writable[filename] != mode:
+                raise PermissionError(
+                    "File mode 0o%o is not permitted for %s." % (
+                        mode, filename))
+        for filename in deletes:
+            if filename not in self.server.deletable:
+                raise PermissionError(
+                    "%s is not in the allow-list for deleting." % filename)
+        return writes, deletes
+
+
+class FileWriterServer(socketserver.UnixStreamServer):
+    """Write and delete files for trusted users.
+
+    Requests are served one at a time, so updates to the same file are never
+    interleaved.
+
+    :ivar allowed_uids: The user IDs that requests are accepted from.
+    :ivar writable: A mapping of the files that may be written to the
+        permission bits each may be given.
+    :ivar deletable: The files that may be deleted.
+    """
+
+    def __init__(
+            self, path, allowed_uids, writable=None, deletable=None):
+        self.allowed_uids = frozenset(allowed_uids)
+        self.writable = writable_files if writable is None else writable
+        self.deletable = deletable_files if deletable is None else deletable
+        # Remove the socket left behind by a previous instance.
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        super(FileWriterServer, self).__init__(path, FileWriterHandler)
+        # Anyone may connect; check_peer decides who is served.
+        os.chmod(path, 0o666)
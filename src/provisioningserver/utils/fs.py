@@ -16,6 +16,7 @@ __all__ = [
     'RunLock',
     'sudo_delete_file',
     'sudo_write_file',
+    'sudo_write_files',
     'SystemLock',
     'tempdir',
     'write_text_file',
@@ -303,8 +304,9 @@ def _with_dev_python(*command):
 def sudo_write_file(filename, contents, mode=0o644):
     """Write (or overwrite) file as root.  USE WITH EXTREME CARE.
 
-    Runs an atomic update using non-interactive `sudo`.  This will fail if
-    it needs to prompt for a password.
+    Asks `maas-file-writer` to do it when it's running. Otherwise runs an
+    atomic update using non-interactive `sudo`.  This will fail if it needs
+    to prompt for a password.
 
     When running in a snap or devel mode, this function calls
     `atomic_write` directly.
@@ -312,11 +314,12 @@ def sudo_write_file(filename, contents, mode=0o644):
     :type contents: `bytes`.
     """
     from provisioningserver.config import is_dev_environment
+    from provisioningserver.utils.file_writer import update_files
     if not isinstance(contents, bytes):
         raise TypeError("Content must be bytes, got: %r" % (contents, ))
     if snappy.running_in_snap():
         atomic_write(contents, filename, mode=mode)
-    else:
+    elif not update_files(writes=[(filename, contents, mode)]):
         maas_write_file = get_library_script_path("maas-write-file")
         command = _with_dev_python(maas_write_file, filename, "%.4o" % mode)
         if not is_dev_environment():
@@ -327,18 +330,38 @@ def sudo_write_file(filename, contents, mode=0o644):
             raise ExternalProcessError(proc.returncode, command, stderr)
 
 
+def sudo_write_files(files):
+    """Write (or overwrite) several files as root.  USE WITH EXTREME CARE.
+
+    When `maas-file-writer` is running this takes a single request to it;
+    otherwise each file is written in turn with `sudo_write_file`.
+
+    :param files: An iterable of ``(filename, contents, mode)`` tuples.
+    """
+    from provisioningserver.utils.file_writer import update_files
+    files = list(files)
+    for filename, contents, mode in files:
+        if not isinstance(contents, bytes):
+            raise TypeError("Content must be bytes, got: %r" % (contents, ))
+    if snappy.running_in_snap() or not update_files(writes=files):
+        for filename, contents, mode in files:
+            sudo_write_file(filename, contents, mode)
+
+
 def sudo_delete_file(filename):
     """Delete file as root.  USE WITH EXTREME CARE.
 
-    Runs an atomic update using non-interactive `sudo`.  This will fail if
-    it needs to prompt for a password.
+    Asks `maas-file-writer` to do it when it's running. Otherwise runs an
+    atomic update using non-interactive `sudo`.  This will fail if it needs
+    to prompt for a password.
 
     When running in a snap this function calls `atomic_write` directly.
     """
     from provisioningserver.config import is_dev_environment
+    from provisioningserver.utils.file_writer import update_files
     if snappy.running_in_snap():
         atomic_delete(filename)
-    else:
+    elif not update_files(deletes=[filename]):
         maas_delete_file = get_library_script_path("maas-delete-file")
         command = _with_dev_python(maas_delete_file, filename)
         if not is_dev_environment():
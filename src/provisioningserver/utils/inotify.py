@@ -0,0 +1,116 @@
+# Copyright 2017 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""A minimal binding for Linux's inotify, using `ctypes`."""
+
+__all__ = [
+    "IN",
+    "Inotify",
+    "InotifyEvent",
+]
+
+from collections import namedtuple
+import ctypes
+import ctypes.util
+import errno
+import os
+import struct
+
+
+class IN:
+    """inotify event masks (from <sys/inotify.h>)."""
+    MODIFY = 0x00000002
+    ATTRIB = 0x00000004
+    CLOSE_WRITE = 0x00000008
+    MOVED_FROM = 0x00000040
+    MOVED_TO = 0x00000080
+    CREATE = 0x00000100
+    DELETE = 0x00000200
+    DELETE_SELF = 0x00000400
+    MOVE_SELF = 0x00000800
+    Q_OVERFLOW = 0x00004000
+    IGNORED = 0x00008000
+    ONLYDIR = 0x01000000
+
+
+# Flags for inotify_init1; they have the same values as the O_* flags.
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+# struct inotify_event, without the name that follows it: watch descriptor,
+# mask, cookie, length of the name.
+INOTIFY_EVENT = struct.Struct("=iIII")
+
+# An event; `name` is relative to the watched directory, or empty.
+InotifyEvent = namedtuple("InotifyEvent", ("wd", "mask", "name"))
+
+
+def _get_libc():
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    # Raises AttributeError when this libc has no inotify.
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [
+        ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+
+def _check(result):
+    if result < 0:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error))
+    return result
+
+
+class Inotify:
+    """A non-blocking inotify instance.
+
+    Events are only read when `read_events` is called; nothing is done in
+    the background.
+    """
+
+    def __init__(self):
+        """Create an inotify instance.
+
+        :raise OSError: When inotify isn't available, either because this
+            isn't Linux or because the per-user limit has been reached.
+        """
+        super(Inotify, self).__init__()
+        try:
+            self._libc = _get_libc()
+        except (OSError, AttributeError):
+            raise OSError(errno.ENOSYS, "inotify is not available.")
+        self.fd = _check(self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC))
+
+    def add_watch(self, path, mask):
+        """Watch `path` for the events in `mask`; return the watch ID."""
+        return _check(self._libc.inotify_add_watch(
+            self.fd, os.fsencode(path), mask))
+
+    def read_events(self):
+        """Return the `InotifyEvent`s that are ready, without blocking.
+
+        Once closed, there are never any events.
+        """
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return events
+            except OSError as error:
+                if error.errno == errno.EBADF:
+                    return events  # Closed, perhaps by another thread.
+                else:
+                    raise
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                events.append(InotifyEvent(wd, mask, os.fsdecode(name)))
+
+    def close(self):
+        fd, self.fd = self.fd, -1
+        if fd != -1:
+            os.close(fd)
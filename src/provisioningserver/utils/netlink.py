@@ -0,0 +1,156 @@
+# Copyright 2017 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Utilities for subscribing to rtnetlink (routing socket) notifications."""
+
+__all__ = [
+    "NetlinkReader",
+    "open_route_netlink_socket",
+    "parse_netlink_messages",
+    "RTM",
+]
+
+from collections import namedtuple
+import errno
+import socket
+import struct
+
+from twisted.internet.interfaces import IReadDescriptor
+from zope.interface import implementer
+
+
+# Value of `socket.AF_NETLINK` on Linux; not every Python build exposes it.
+AF_NETLINK = getattr(socket, "AF_NETLINK", 16)
+NETLINK_ROUTE = 0
+
+# struct nlmsghdr: length, type, flags, sequence number, port ID.
+NLMSGHDR = struct.Struct("=LHHLL")
+
+# Netlink control message types.
+NLMSG_NOOP = 1
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLMSG_OVERRUN = 4
+
+
+class RTM:
+    """rtnetlink message types (from <linux/rtnetlink.h>)."""
+    NEWLINK = 16
+    DELLINK = 17
+    NEWADDR = 20
+    DELADDR = 21
+    NEWROUTE = 24
+    DELROUTE = 25
+
+
+# rtnetlink multicast groups (from <linux/rtnetlink.h>).
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+RTMGRP_IPV6_IFADDR = 0x100
+RTMGRP_IPV6_ROUTE = 0x400
+
+# The groups that affect the output of `get_all_interfaces_definition`.
+RTMGRP_INTERFACES = (
+    RTMGRP_LINK |
+    RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR |
+    RTMGRP_IPV4_ROUTE | RTMGRP_IPV6_ROUTE
+)
+
+# The message types that correspond to `RTMGRP_INTERFACES`.
+RTM_INTERFACES = frozenset({
+    RTM.NEWLINK, RTM.DELLINK,
+    RTM.NEWADDR, RTM.DELADDR,
+    RTM.NEWROUTE, RTM.DELROUTE,
+})
+
+# Large enough for a burst of notifications, e.g. when a bridge with many
+# VLANs comes up. Overflowing it is not fatal; see `NetlinkReader.doRead`.
+RECEIVE_BUFFER_SIZE = 1024 * 1024
+
+NetlinkMessage = namedtuple("NetlinkMessage", ("type", "flags", "payload"))
+
+
+def parse_netlink_messages(data: bytes):
+    """Yields a `NetlinkMessage` for each message in the specified datagram.
+
+    Parsing stops at the first truncated or malformed header.
+    """
+    data = memoryview(data)
+    offset = 0
+    while offset + NLMSGHDR.size <= len(data):
+        length, msg_type, flags, _, _ = NLMSGHDR.unpack_from(data, offset)
+        if length < NLMSGHDR.size or offset + length > len(data):
+            break
+        yield NetlinkMessage(
+            msg_type, flags, data[offset + NLMSGHDR.size:offset + length])
+        # Messages are aligned to four bytes (NLMSG_ALIGN).
+        offset += (length + 3) & ~3
+
+
+def open_route_netlink_socket(groups=RTMGRP_INTERFACES):
+    """Returns a non-blocking rtnetlink socket subscribed to `groups`.
+
+    :raise OSError: If the socket cannot be created; for example, if this is
+        not a Linux host.
+    """
+    sock = socket.socket(AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+    try:
+        sock.setsockopt(
+            socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER_SIZE)
+        sock.bind((0, groups))
+        sock.setblocking(False)
+    except Exception:
+        sock.close()
+        raise
+    return sock
+
+
+@implementer(IReadDescriptor)
+class NetlinkReader:
+    """Reads rtnetlink notifications for the reactor.
+
+    Calls `callback` (with no arguments) at most once per read when any
+    interface, address or route notification arrives. The callback is also
+    called if the kernel reports that notifications were dropped, since the
+    caller must then assume that anything might have changed.
+
+    :param callback: A callable taking no arguments.
+    :param sock: An rtnetlink socket, as returned by
+        `open_route_netlink_socket`.
+    """
+
+    def __init__(self, callback, sock):
+        super().__init__()
+        self.callback = callback
+        self.socket = sock
+
+    def fileno(self):
+        return self.socket.fileno()
+
+    def logPrefix(self):
+        return "netlink"
+
+    def doRead(self):
+        changed = False
+        while True:
+            try:
+                data = self.socket.recv(65536)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                if e.errno == errno.ENOBUFS:
+                    # The kernel dropped notifications because we were too
+                    # slow reading them. Treat it as a change of everything.
+                    changed = True
+                    continue
+                raise
+            for message in parse_netlink_messages(data):
+                if (message.type in RTM_INTERFACES or
+                        message.type == NLMSG_OVERRUN):
+                    changed = True
+        if changed:
+            self.callback()
+
+    def connectionLost(self, reason):
+        self.socket.close()
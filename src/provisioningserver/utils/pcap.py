@@ -15,11 +15,22 @@ from pprint import pprint
 import struct
 import sys
 
+from provisioningserver.utils.ethernet import ETHERTYPE
+
 # See documentation here for explanation of magic numbers, formats, etc:
 #     https://wiki.wireshark.org/Development/LibpcapFileFormat
 PCAP_NATIVE_BYTE_ORDER_MAGIC_NUMBER = 0xa1b2c3d4
 PCAP_HEADER_SIZE = 24
 PCAP_PACKET_HEADER_SIZE = 16
+PCAP_PACKET_HEADER = struct.Struct('IIII')
+
+# Number of bytes `PCAP.iter_packets` asks the stream for at a time.
+PCAP_READ_SIZE = 64 * 1024
+
+# Offsets of the Ethertype in an Ethernet frame, and in an 802.1q-tagged
+# Ethernet frame.
+ETHERTYPE_OFFSET = 12
+VLAN_ETHERTYPE_OFFSET = 16
 
 PCAPHeader = namedtuple('PCAPHeader', (
     'magic_number',
@@ -64,6 +75,8 @@ class PCAP:
        """
         super().__init__()
         self.stream = stream
+        # Bytes read from the stream by `iter_packets` but not yet consumed.
+        self.pending = b''
         global_header_bytes = stream.read(PCAP_HEADER_SIZE)
         if len(global_header_bytes) == 0:
             raise EOFError("No PCAP output found.")
@@ -94,7 +107,7 @@ class PCAP:
         :raise EOFError: If this is an attempt to read beyond the last packet.
         :raise PCAPError: If the PCAP stream was invalid.
         """
-        pcap_packet_header_bytes = self.stream.read(PCAP_PACKET_HEADER_SIZE)
+        pcap_packet_header_bytes = self._read(PCAP_PACKET_HEADER_SIZE)
         if len(pcap_packet_header_bytes) == 0:
             raise EOFError("End of PCAP stream.")
         if len(pcap_packet_header_bytes) != PCAP_PACKET_HEADER_SIZE:
@@ -108,11 +121,99 @@ class PCAP:
         # } pcaprec_hdr_t;
         pcap_packet_header = PCAPPacketHeader._make(
             struct.unpack('IIII', pcap_packet_header_bytes))
-        packet = self.stream.read(pcap_packet_header.bytes_captured)
+        packet = self._read(pcap_packet_header.bytes_captured)
         if len(packet) != pcap_packet_header.bytes_captured:
             raise PCAPError("Unexpected end of PCAP stream: invalid packet.")
         return pcap_packet_header, packet
 
+    def _read(self, size):
+        """Reads up to `size` bytes, starting with any pending bytes."""
+        if len(self.pending) == 0:
+            return self.stream.read(size)
+        data, self.pending = self.pending[:size], self.pending[size:]
+        if len(data) < size:
+            data += self.stream.read(size - len(data))
+        return data
+
+    def _read_chunk(self):
+        """Reads whatever the stream has available, up to `PCAP_READ_SIZE`.
+
+        Uses `read1` where the stream supports it, so that a live capture
+        from a pipe is processed as soon as packets arrive rather than once
+        the buffer is full.
+        """
+        read = getattr(self.stream, "read1", self.stream.read)
+        return read(PCAP_READ_SIZE)
+
+    def iter_packets(self, ethertypes=None):
+        """Iterates packets in the PCAP stream, reading it in bulk.
+
+        Rather than issuing two reads per packet, this reads large chunks of
+        the stream and decodes every complete packet record in them. Packets
+        are yielded as `memoryview` slices of the chunk, so no packet data is
+        copied.
+
+        :param ethertypes: If specified, a collection of Ethertypes (as
+            `bytes`, such as `ETHERTYPE.ARP`) to yield packets for. Other
+            packets (including those too short to have an Ethertype) are
+            skipped before any objects are constructed for them. 802.1q
+            frames are matched on the Ethertype of the encapsulated frame.
+        :returns: an iterator of tuples (pcap_packet_header, packet), where
+            pcap_packet_header is a `PCAPPacketHeader` and packet is a
+            `memoryview`.
+        :raise PCAPError: If the PCAP stream was invalid.
+        """
+        if ethertypes is not None:
+            ethertypes = frozenset(ethertypes)
+        unpack_header = PCAP_PACKET_HEADER.unpack_from
+        make_header = PCAPPacketHeader._make
+        data, self.pending = self.pending, b''
+        offset = 0
+        try:
+            while True:
+                chunk = self._read_chunk()
+                if len(chunk) == 0:
+                    if offset == len(data):
+                        return
+                    elif len(data) - offset < PCAP_PACKET_HEADER_SIZE:
+                        raise PCAPError(
+                            "Unexpected end of PCAP stream: invalid packet "
+                            "header.")
+                    else:
+                        raise PCAPError(
+                            "Unexpected end of PCAP stream: invalid packet.")
+                # Only the partial record left over from the previous chunk
+                # is copied here, never the packets that were yielded.
+                if offset == len(data):
+                    data = chunk
+                else:
+                    data = data[offset:] + chunk
+                offset = 0
+                view = memoryview(data)
+                end = len(data)
+                while end - offset >= PCAP_PACKET_HEADER_SIZE:
+                    header = unpack_header(data, offset)
+                    start = offset + PCAP_PACKET_HEADER_SIZE
+                    stop = start + header[2]
+                    if stop > end:
+                        break
+                    offset = stop
+                    if ethertypes is not None:
+                        ethertype = data[
+                            start + ETHERTYPE_OFFSET:
+                            start + ETHERTYPE_OFFSET + 2]
+                        if ethertype == ETHERTYPE.VLAN:
+                            ethertype = data[
+                                start + VLAN_ETHERTYPE_OFFSET:
+                                start + VLAN_ETHERTYPE_OFFSET + 2]
+                        if ethertype not in ethertypes:
+                            continue
+                    yield make_header(header), view[start:stop]
+        finally:
+            # Keep anything not yet consumed for a subsequent `read` or
+            # `iter_packets`, in case iteration is stopped early.
+            self.pending = data[offset:]
+
     def __iter__(self):
         """Iterate this PCAP stream.
 
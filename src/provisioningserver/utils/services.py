@@ -40,6 +40,10 @@ from provisioningserver.utils.fs import (
     get_maas_provision_command,
     NamedLock,
 )
+from provisioningserver.utils.netlink import (
+    NetlinkReader,
+    open_route_netlink_socket,
+)
 from provisioningserver.utils.network import (
     enumerate_ipv4_addresses,
     get_all_interfaces_definition,
@@ -63,7 +67,10 @@ from twisted.internet.error import (
     ProcessDone,
     ProcessTerminated,
 )
-from twisted.internet.interfaces import IReactorMulticast
+from twisted.internet.interfaces import (
+    IReactorFDSet,
+    IReactorMulticast,
+)
 from twisted.internet.protocol import (
     DatagramProtocol,
     ProcessProtocol,
@@ -718,6 +725,16 @@ class NetworksMonitoringService(MultiService, metaclass=ABCMeta):
 
     interval = timedelta(seconds=30).total_seconds()
 
+    # When interface changes are signalled via rtnetlink, wait this long for
+    # related notifications (e.g. a link coming up, then its addresses and
+    # routes) before re-reading the interface definitions.
+    settle_interval = timedelta(seconds=1).total_seconds()
+
+    # When interface changes are signalled via rtnetlink, re-read the
+    # interface definitions at least this often anyway, in case a change was
+    # not signalled (e.g. to dhclient or /etc/network/interfaces).
+    consistency_interval = timedelta(minutes=10).total_seconds()
+
     def __init__(self, clock=None, enable_monitoring=True):
         # Order is very important here. First we set the clock to the passed-in
         # reactor, so that unit tests can fake out the clock if necessary.
@@ -747,6 +764,23 @@ class NetworksMonitoringService(MultiService, metaclass=ABCMeta):
         self.interface_monitor.clock = self.clock
         self.interface_monitor.setServiceParent(self)
         self.beaconing_protocol = None
+        # Reads rtnetlink notifications, if the host supports them.
+        self._netlink = None
+        # When the interface definitions were last read; whether they may
+        # have changed since; and the pending call to re-read them.
+        self._interfacesRead = None
+        self._interfacesStale = True
+        self._interfacesChangedCall = None
+        self._interfacesUpdating = None
+
+    def startService(self):
+        """Start the service.
+
+        Subscribes to rtnetlink notifications so that interface changes are
+        picked up promptly rather than on the next polling interval.
+        """
+        super().startService()
+        self._startNetlink()
 
     def updateInterfaces(self):
         """Update interfaces, catching and logging errors.
@@ -758,8 +792,9 @@ class NetworksMonitoringService(MultiService, metaclass=ABCMeta):
 
         def update(responsible):
             if responsible:
-                d = maybeDeferred(self.getInterfaces)
+                d = maybeDeferred(self._getInterfacesIfStale)
                 d.addCallback(self._updateInterfaces)
+                d.addErrback(self._interfacesUpdateFailed)
                 return d
 
         def failed(failure):
@@ -783,6 +818,92 @@ class NetworksMonitoringService(MultiService, metaclass=ABCMeta):
         """
         return deferToThread(get_all_interfaces_definition)
 
+    def _getInterfacesIfStale(self):
+        """Get the network interfaces configuration if it may have changed.
+
+        Without rtnetlink notifications every call reads the configuration.
+        With them, the last recorded configuration is reused until a change
+        is signalled, or until `consistency_interval` has passed.
+        """
+        now = self.clock.seconds() if self.clock else reactor.seconds()
+        if (self._netlink is None or self._recorded is None or
+                self._interfacesStale or self._interfacesRead is None or
+                now - self._interfacesRead >= self.consistency_interval):
+            self._interfacesStale = False
+            self._interfacesRead = now
+            return maybeDeferred(self.getInterfaces)
+        else:
+            return self._recorded
+
+    def _interfacesUpdateFailed(self, failure):
+        """Reading or recording the interfaces failed.
+
+        The staleness flag was cleared when the interfaces were read, before
+        they were recorded, so that changes signalled in the meantime are not
+        lost. Set it again so that the next update reads and records them.
+        """
+        self._interfacesStale = True
+        return failure
+
+    def _startNetlink(self):
+        """Subscribe to rtnetlink interface, address and route changes.
+
+        This is a no-op if the clock is not a real reactor (e.g. in tests) or
+        if the host does not support rtnetlink; polling continues as before.
+        """
+        if self._netlink is not None:
+            return
+        try:
+            verifyObject(IReactorFDSet, self.clock)
+        except DoesNotImplement:
+            return
+        try:
+            sock = open_route_netlink_socket()
+        except OSError as e:
+            log.msg(
+                "Unable to monitor interfaces via netlink; "
+                "polling instead: %s" % e)
+        else:
+            self._netlink = NetlinkReader(self._interfacesChanged, sock)
+            self.clock.addReader(self._netlink)
+
+    def _stopNetlink(self):
+        """Stop reading rtnetlink notifications."""
+        if self._interfacesChangedCall is not None:
+            if self._interfacesChangedCall.active():
+                self._interfacesChangedCall.cancel()
+            self._interfacesChangedCall = None
+        if self._netlink is not None:
+            self.clock.removeReader(self._netlink)
+            self._netlink.socket.close()
+            self._netlink = None
+
+    def _interfacesChanged(self):
+        """Called when rtnetlink signals an interface change.
+
+        Marks the recorded interfaces as stale and schedules an update after
+        `settle_interval`, so that a burst of notifications results in a
+        single update.
+        """
+        self._interfacesStale = True
+        if self._interfacesChangedCall is None:
+            self._interfacesChangedCall = self.clock.callLater(
+                self.settle_interval, self._updateChangedInterfaces)
+
+    def _updateChangedInterfaces(self):
+        """Update interfaces after a change was signalled by rtnetlink."""
+        self._interfacesChangedCall = None
+        if self._interfacesUpdating is None:
+            self._interfacesUpdating = self.updateInterfaces()
+            self._interfacesUpdating.addBoth(self._changedInterfacesUpdated)
+
+    def _changedInterfacesUpdated(self, result):
+        """Reschedule if further changes were signalled during an update."""
+        self._interfacesUpdating = None
+        if self._interfacesStale and self._netlink is not None:
+            self._interfacesChanged()
+        return result
+
     @abstractmethod
     def getDiscoveryState(self):
         """Record the interfaces information.
@@ -822,6 +943,7 @@ class NetworksMonitoringService(MultiService, metaclass=ABCMeta):
 
         Ensures that sole responsibility for monitoring networks is released.
         """
+        self._stopNetlink()
         d = super().stopService()
         if self.beaconing_protocol is not None:
             self.beaconing_protocol.stopProtocol()
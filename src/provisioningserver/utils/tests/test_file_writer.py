@@ -0,0 +1,176 @@
+# Copyright 2017 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `provisioningserver.utils.file_writer`."""
+
+__all__ = []
+
+from contextlib import closing
+import os
+import socket
+import stat
+import threading
+
+from maastesting.factory import factory
+from maastesting.matchers import FileContains
+from maastesting.testcase import MAASTestCase
+from provisioningserver.utils.file_writer import (
+    FileWriterError,
+    FileWriterServer,
+    get_file_writer_socket_path,
+    update_files,
+)
+from provisioningserver.utils.shell import ExternalProcessError
+from testtools.matchers import (
+    EndsWith,
+    FileExists,
+    Not,
+)
+
+
+class TestUpdateFiles(MAASTestCase):
+    """Tests for `update_files` against a stand-in `maas-file-writer`.
+
+    The stand-in runs in a thread as the current user, and may only touch
+    files in a scratch directory.
+    """
+
+    def setUp(self):
+        super(TestUpdateFiles, self).setUp()
+        self.dir = self.make_dir()
+        self.socket_path = os.path.join(self.dir, "file-writer.sock")
+        self.writable = os.path.join(self.dir, "writable")
+        self.deletable = os.path.join(self.dir, "deletable")
+
+    def start_server(self, allowed_uids=None):
+        if allowed_uids is None:
+            allowed_uids = {os.getuid()}
+        server = FileWriterServer(
+            self.socket_path, allowed_uids,
+            writable={self.writable: 0o644, self.deletable: 0o644},
+            deletable={self.deletable})
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(thread.join)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def update_files(self, **kwargs):
+        return update_files(path=self.socket_path, **kwargs)
+
+    def test__returns_false_when_file_writer_is_not_running(self):
+        self.assertFalse(self.update_files(deletes=[self.deletable]))
+
+    def test__returns_false_when_file_writer_has_gone(self):
+        # A socket left behind with nothing listening on it.
+        with closing(socket.socket(socket.AF_UNIX)) as sock:
+            sock.bind(self.socket_path)
+        self.assertFalse(self.update_files(deletes=[self.deletable]))
+
+    def test__returns_false_when_file_writer_cannot_be_reached(self):
+        # Any error connecting, here ENOTDIR, means falling back to sudo.
+        path = factory.make_file(self.dir)
+        self.assertFalse(update_files(
+            deletes=[self.deletable], path=os.path.join(path, "socket")))
+
+    def test__raises_error_when_file_writer_does_not_respond(self):
+        # A socket that accepts connections but never replies.
+        sock = socket.socket(socket.AF_UNIX)
+        self.addCleanup(sock.close)
+        sock.bind(self.socket_path)
+        sock.listen(1)
+        error = self.assertRaises(
+            FileWriterError, self.update_files,
+            deletes=[self.deletable], timeout=0.1)
+        self.assertIn("No response", error.output_as_unicode)
+
+    def test__writes_file(self):
+        self.start_server()
+        contents = factory.make_bytes()  # Binary safe.
+        self.assertTrue(
+            self.update_files(writes=[(self.writable, contents, 0o640)]))
+        self.assertThat(self.writable, FileContains(contents))
+        self.assertEqual(0o640, stat.S_IMODE(os.stat(self.writable).st_mode))
+
+    def test__overwrites_file(self):
+        self.start_server()
+        factory.make_file(self.dir, "writable", factory.make_bytes())
+        contents = factory.make_bytes()
+        self.update_files(writes=[(self.writable, contents, 0o644)])
+        self.assertThat(self.writable, FileContains(contents))
+
+    def test__deletes_file(self):
+        self.start_server()
+        factory.make_file(self.dir, "deletable")
+        self.assertTrue(self.update_files(deletes=[self.deletable]))
+        self.assertThat(self.deletable, Not(FileExists()))
+
+    def test__is_okay_when_the_file_to_delete_does_not_exist(self):
+        self.start_server()
+        self.assertTrue(self.update_files(deletes=[self.deletable]))
+
+    def test__writes_and_deletes_in_one_request(self):
+        self.start_server()
+        contents = factory.make_bytes()
+        self.update_files(
+            writes=[
+                (self.deletable, factory.make_bytes(), 0o644),
+                (self.writable, contents, 0o644),
+            ],
+            deletes=[self.deletable])
+        self.assertThat(self.writable, FileContains(contents))
+        self.assertThat(self.deletable, Not(FileExists()))
+
+    def test__refuses_file_not_on_allow_list(self):
+        self.start_server()
+        filename = os.path.join(self.dir, factory.make_name("file"))
+        error = self.assertRaises(
+            FileWriterError, self.update_files,
+            writes=[(filename, factory.make_bytes(), 0o644)])
+        self.assertIn("not in the allow-list", error.output_as_unicode)
+        self.assertThat(filename, Not(FileExists()))
+
+    def test__refuses_to_delete_file_not_on_allow_list(self):
+        self.start_server()
+        factory.make_file(self.dir, "writable")
+        self.assertRaises(
+            FileWriterError, self.update_files, deletes=[self.writable])
+        self.assertThat(self.writable, FileExists())
+
+    def test__refuses_mode_not_on_allow_list(self):
+        self.start_server()
+        self.assertRaises(
+            FileWriterError, self.update_files,
+            writes=[(self.writable, factory.make_bytes(), 0o4755)])
+        self.assertThat(self.writable, Not(FileExists()))
+
+    def test__refuses_whole_request_when_any_part_is_not_permitted(self):
+        self.start_server()
+        self.assertRaises(
+            FileWriterError, self.update_files,
+            writes=[
+                (self.writable, factory.make_bytes(), 0o644),
+                (self.deletable, factory.make_bytes(), 0o777),
+            ])
+        self.assertThat(self.writable, Not(FileExists()))
+
+    def test__refuses_untrusted_user(self):
+        self.start_server(allowed_uids={os.getuid() + 1})
+        error = self.assertRaises(
+            FileWriterError, self.update_files,
+            writes=[(self.writable, factory.make_bytes(), 0o644)])
+        self.assertIn("is not permitted", error.output_as_unicode)
+        self.assertThat(self.writable, Not(FileExists()))
+
+    def test__errors_are_external_process_errors(self):
+        # Callers of sudo_write_file already handle these.
+        self.assertTrue(issubclass(FileWriterError, ExternalProcessError))
+
+
+class TestGetFileWriterSocketPath(MAASTestCase):
+
+    def test__is_in_run_maas(self):
+        self.assertThat(
+            get_file_writer_socket_path(),
+            EndsWith("/run/maas/file-writer.sock"))
@@ -58,10 +58,12 @@ from provisioningserver.utils.fs import (
     RunLock,
     sudo_delete_file,
     sudo_write_file,
+    sudo_write_files,
     SystemLock,
     tempdir,
     write_text_file,
 )
+from provisioningserver.utils import file_writer
 import provisioningserver.utils.fs as fs_module
 from testtools.matchers import (
     AllMatch,
@@ -423,11 +425,18 @@ def patch_dev(test, is_dev_environment):
     ide.return_value = bool(is_dev_environment)
 
 
+def patch_file_writer(test, running):
+    update_files = test.patch_autospec(file_writer, "update_files")
+    update_files.return_value = bool(running)
+    return update_files
+
+
 class TestSudoWriteFile(MAASTestCase):
     """Testing for `sudo_write_file`."""
 
     def test_calls_atomic_write(self):
         patch_popen(self)
+        patch_file_writer(self, False)
         patch_sudo(self)
         patch_dev(self, False)
 
@@ -441,6 +450,7 @@ class TestSudoWriteFile(MAASTestCase):
 
     def test_calls_atomic_write_dev_mode(self):
         patch_popen(self)
+        patch_file_writer(self, False)
         patch_dev(self, True)
 
         path = os.path.join(self.make_dir(), factory.make_name('file'))
@@ -457,6 +467,7 @@ class TestSudoWriteFile(MAASTestCase):
 
     def test_catches_failures(self):
         patch_popen(self, 1)
+        patch_file_writer(self, False)
         self.assertRaises(
             CalledProcessError,
             sudo_write_file, self.make_file(), factory.make_bytes())
@@ -469,12 +480,57 @@ class TestSudoWriteFile(MAASTestCase):
         self.assertThat(filename, FileContains(contents))
         self.assertThat(os.stat(filename).st_mode & 0o777, Equals(mode))
 
+    def test_uses_file_writer_when_running(self):
+        patch_popen(self)
+        update_files = patch_file_writer(self, True)
+        path = os.path.join(self.make_dir(), factory.make_name('file'))
+        contents = factory.make_bytes()
+        sudo_write_file(path, contents, 0o640)
+        self.assertThat(update_files, MockCalledOnceWith(
+            writes=[(path, contents, 0o640)]))
+        self.assertThat(fs_module.Popen, MockNotCalled())
+
+
+class TestSudoWriteFiles(MAASTestCase):
+    """Testing for `sudo_write_files`."""
+
+    def make_files(self):
+        return [
+            (os.path.join(self.make_dir(), factory.make_name('file')),
+             factory.make_bytes(), 0o644)
+            for _ in range(3)
+        ]
+
+    def test_uses_one_file_writer_request(self):
+        patch_popen(self)
+        update_files = patch_file_writer(self, True)
+        files = self.make_files()
+        sudo_write_files(files)
+        self.assertThat(update_files, MockCalledOnceWith(writes=files))
+        self.assertThat(fs_module.Popen, MockNotCalled())
+
+    def test_writes_each_file_when_file_writer_not_running(self):
+        patch_file_writer(self, False)
+        sudo_write_file = self.patch_autospec(fs_module, "sudo_write_file")
+        files = self.make_files()
+        sudo_write_files(files)
+        self.assertThat(
+            sudo_write_file, MockCallsMatch(*(call(*file) for file in files)))
+
+    def test_rejects_non_bytes_contents(self):
+        update_files = patch_file_writer(self, True)
+        self.assertRaises(
+            TypeError, sudo_write_files,
+            [(self.make_file(), factory.make_string(), 0o644)])
+        self.assertThat(update_files, MockNotCalled())
+
 
 class TestSudoDeleteFile(MAASTestCase):
     """Testing for `sudo_delete_file`."""
 
     def test_calls_atomic_delete(self):
         patch_popen(self)
+        patch_file_writer(self, False)
         patch_sudo(self)
         patch_dev(self, False)
 
@@ -486,6 +542,7 @@ class TestSudoDeleteFile(MAASTestCase):
 
     def test_calls_atomic_delete_dev_mode(self):
         patch_popen(self)
+        patch_file_writer(self, False)
         patch_dev(self, True)
 
         path = os.path.join(self.make_dir(), factory.make_name('file'))
@@ -496,6 +553,7 @@ class TestSudoDeleteFile(MAASTestCase):
 
     def test_catches_failures(self):
         patch_popen(self, 1)
+        patch_file_writer(self, False)
         self.assertRaises(
             CalledProcessError,
             sudo_delete_file, self.make_file())
@@ -507,6 +565,14 @@ class TestSudoDeleteFile(MAASTestCase):
         sudo_delete_file(filename)
         self.assertThat(filename, Not(FileExists()))
 
+    def test_uses_file_writer_when_running(self):
+        patch_popen(self)
+        update_files = patch_file_writer(self, True)
+        path = os.path.join(self.make_dir(), factory.make_name('file'))
+        sudo_delete_file(path)
+        self.assertThat(update_files, MockCalledOnceWith(deletes=[path]))
+        self.assertThat(fs_module.Popen, MockNotCalled())
+
 
 def load_script(filename):
     """Load the Python script at `filename` into a new module."""
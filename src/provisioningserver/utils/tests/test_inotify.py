@@ -0,0 +1,55 @@
+# Copyright 2017 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `provisioningserver.utils.inotify`."""
+
+__all__ = []
+
+import os
+
+from maastesting.factory import factory
+from maastesting.testcase import MAASTestCase
+from provisioningserver.utils.inotify import (
+    IN,
+    Inotify,
+    InotifyEvent,
+)
+
+
+class TestInotify(MAASTestCase):
+
+    def setUp(self):
+        super(TestInotify, self).setUp()
+        try:
+            self.inotify = Inotify()
+        except OSError as error:
+            self.skipTest("inotify is not available: %s" % error)
+        self.addCleanup(self.inotify.close)
+        self.dir = self.make_dir()
+
+    def test_read_events_returns_nothing_when_nothing_happened(self):
+        self.inotify.add_watch(self.dir, IN.CLOSE_WRITE)
+        self.assertEqual([], self.inotify.read_events())
+
+    def test_read_events_returns_events_for_watched_directory(self):
+        wd = self.inotify.add_watch(self.dir, IN.CLOSE_WRITE | IN.DELETE)
+        path = factory.make_file(self.dir)
+        os.unlink(path)
+        name = os.path.basename(path)
+        self.assertEqual(
+            [InotifyEvent(wd, IN.CLOSE_WRITE, name),
+             InotifyEvent(wd, IN.DELETE, name)],
+            self.inotify.read_events())
+        # The events have been consumed.
+        self.assertEqual([], self.inotify.read_events())
+
+    def test_add_watch_raises_OSError_for_missing_directory(self):
+        self.assertRaises(
+            OSError, self.inotify.add_watch,
+            os.path.join(self.dir, "missing"), IN.CLOSE_WRITE)
+
+    def test_read_events_returns_nothing_once_closed(self):
+        self.inotify.add_watch(self.dir, IN.CLOSE_WRITE)
+        factory.make_file(self.dir)
+        self.inotify.close()
+        self.assertEqual([], self.inotify.read_events())
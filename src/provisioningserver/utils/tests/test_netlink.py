@@ -0,0 +1,99 @@
+# Copyright 2017 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for ``provisioningserver.utils.netlink``."""
+
+__all__ = []
+
+import errno
+import socket
+from unittest.mock import Mock
+
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockNotCalled,
+)
+from maastesting.testcase import MAASTestCase
+from provisioningserver.utils.netlink import (
+    NetlinkReader,
+    NLMSG_DONE,
+    NLMSG_OVERRUN,
+    NLMSGHDR,
+    parse_netlink_messages,
+    RTM,
+)
+from testtools.matchers import Equals
+
+
+def make_message(msg_type, payload=b''):
+    """Returns a netlink message, padded to a four byte boundary."""
+    length = NLMSGHDR.size + len(payload)
+    message = NLMSGHDR.pack(length, msg_type, 0, 0, 0) + payload
+    return message + b'\0' * (-length % 4)
+
+
+class TestParseNetlinkMessages(MAASTestCase):
+
+    def test__parses_aligned_messages(self):
+        data = (
+            make_message(RTM.NEWLINK, b'abcde') +
+            make_message(RTM.DELADDR, b'fghi'))
+        messages = [
+            (message.type, bytes(message.payload))
+            for message in parse_netlink_messages(data)
+        ]
+        self.assertThat(messages, Equals([
+            (RTM.NEWLINK, b'abcde'),
+            (RTM.DELADDR, b'fghi'),
+        ]))
+
+    def test__stops_at_truncated_message(self):
+        data = make_message(RTM.NEWROUTE) + make_message(RTM.NEWADDR)[:-1]
+        messages = [
+            message.type for message in parse_netlink_messages(data)]
+        self.assertThat(messages, Equals([RTM.NEWROUTE]))
+
+    def test__stops_at_malformed_length(self):
+        data = NLMSGHDR.pack(0, RTM.NEWLINK, 0, 0, 0)
+        self.assertThat(list(parse_netlink_messages(data)), Equals([]))
+
+
+class TestNetlinkReader(MAASTestCase):
+
+    def makeReader(self):
+        callback = Mock()
+        sender, receiver = socket.socketpair(
+            socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.addCleanup(sender.close)
+        self.addCleanup(receiver.close)
+        receiver.setblocking(False)
+        return NetlinkReader(callback, receiver), sender, callback
+
+    def test__calls_back_once_for_many_interface_messages(self):
+        reader, sender, callback = self.makeReader()
+        sender.send(make_message(RTM.NEWLINK) + make_message(RTM.NEWADDR))
+        sender.send(make_message(RTM.DELROUTE))
+        reader.doRead()
+        self.assertThat(callback, MockCalledOnceWith())
+
+    def test__ignores_unrelated_messages(self):
+        reader, sender, callback = self.makeReader()
+        sender.send(make_message(NLMSG_DONE))
+        reader.doRead()
+        self.assertThat(callback, MockNotCalled())
+
+    def test__calls_back_on_overrun(self):
+        reader, sender, callback = self.makeReader()
+        sender.send(make_message(NLMSG_OVERRUN))
+        reader.doRead()
+        self.assertThat(callback, MockCalledOnceWith())
+
+    def test__calls_back_when_notifications_were_dropped(self):
+        callback = Mock()
+        sock = Mock()
+        sock.recv.side_effect = [
+            OSError(errno.ENOBUFS, "No buffer space available"),
+            BlockingIOError(),
+        ]
+        NetlinkReader(callback, sock).doRead()
+        self.assertThat(callback, MockCalledOnceWith())
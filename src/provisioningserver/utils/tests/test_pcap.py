@@ -8,12 +8,17 @@ __all__ = []
 import io
 
 from maastesting.testcase import MAASTestCase
+from provisioningserver.utils import pcap as pcap_module
+from provisioningserver.utils.ethernet import ETHERTYPE
 from provisioningserver.utils.pcap import (
     PCAP,
     PCAPError,
 )
 from testtools import ExpectedException
-from testtools.matchers import Equals
+from testtools.matchers import (
+    Equals,
+    HasLength,
+)
 
 # Created with:
 # $ sudo tcpdump -i eth0 -U --immediate-mode -s 64 -n -c 2 -w - arp \
@@ -121,3 +126,62 @@ class TestPCAP(MAASTestCase):
                 PCAPError,
                 "Unexpected end of PCAP stream: invalid packet."):
             pcap.read()
+
+
+class TestPCAPIterPackets(MAASTestCase):
+
+    def test__yields_same_packets_as_read(self):
+        expected = list(PCAP(io.BytesIO(TESTDATA)))
+        pcap = PCAP(io.BytesIO(TESTDATA))
+        packets = [
+            (header, bytes(packet))
+            for header, packet in pcap.iter_packets()
+        ]
+        self.assertThat(packets, Equals(expected))
+
+    def test__yields_memoryviews(self):
+        pcap = PCAP(io.BytesIO(TESTDATA))
+        for _, packet in pcap.iter_packets():
+            self.assertIsInstance(packet, memoryview)
+
+    def test__handles_records_split_across_reads(self):
+        expected = list(PCAP(io.BytesIO(TESTDATA)))
+        self.patch(pcap_module, "PCAP_READ_SIZE", 7)
+        pcap = PCAP(io.BytesIO(TESTDATA))
+        packets = [
+            (header, bytes(packet))
+            for header, packet in pcap.iter_packets()
+        ]
+        self.assertThat(packets, Equals(expected))
+
+    def test__filters_by_ethertype(self):
+        pcap = PCAP(io.BytesIO(TESTDATA))
+        self.assertThat(
+            list(pcap.iter_packets(ethertypes={ETHERTYPE.ARP})),
+            HasLength(2))
+        pcap = PCAP(io.BytesIO(TESTDATA))
+        self.assertThat(
+            list(pcap.iter_packets(ethertypes={ETHERTYPE.IPV4})),
+            HasLength(0))
+
+    def test__leaves_unconsumed_packets_for_read(self):
+        expected = list(PCAP(io.BytesIO(TESTDATA)))
+        pcap = PCAP(io.BytesIO(TESTDATA))
+        packets = pcap.iter_packets()
+        next(packets)
+        packets.close()
+        self.assertThat(pcap.read(), Equals(expected[1]))
+
+    def test__raises_PCAPError_for_invalid_packet_header(self):
+        pcap = PCAP(io.BytesIO(TESTDATA_INVALID_PACKET_HEADER))
+        with ExpectedException(
+                PCAPError,
+                "Unexpected end of PCAP stream: invalid packet header."):
+            list(pcap.iter_packets())
+
+    def test__raises_PCAPError_for_invalid_packet(self):
+        pcap = PCAP(io.BytesIO(TESTDATA_INVALID_PACKET))
+        with ExpectedException(
+                PCAPError,
+                "Unexpected end of PCAP stream: invalid packet."):
+            list(pcap.iter_packets())
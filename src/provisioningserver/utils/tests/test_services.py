@@ -283,6 +283,109 @@ class TestNetworksMonitoringService(MAASTestCase):
         self.assertThat(service.interfaces, Not(Equals([])))
 
 
+class TestNetworksMonitoringServiceNetlink(MAASTestCase):
+    """Tests of `NetworksMonitoringService` driven by rtnetlink."""
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
+
+    def makeService(self):
+        clock = Clock()
+        service = StubNetworksMonitoringService(clock=clock)
+        self.addCleanup(service._releaseSoleResponsibility)
+        # Pretend that rtnetlink notifications are being received.
+        service._netlink = sentinel.netlink
+        return service, clock
+
+    def test__does_not_subscribe_with_fake_reactor(self):
+        open_socket = self.patch(services, "open_route_netlink_socket")
+        service = StubNetworksMonitoringService(clock=Clock())
+        service._startNetlink()
+        self.assertThat(open_socket, MockNotCalled())
+        self.assertThat(service._netlink, Is(None))
+
+    @inlineCallbacks
+    def test__reuses_recorded_interfaces_until_changed(self):
+        get_interfaces = self.patch(services, "get_all_interfaces_definition")
+        get_interfaces.side_effect = [{"eth0": {}}, {"eth1": {}}]
+        service, clock = self.makeService()
+        yield service.updateInterfaces()
+        yield service.updateInterfaces()
+        self.assertThat(get_interfaces, MockCalledOnceWith())
+        self.assertThat(service.interfaces, Equals([{"eth0": {}}]))
+        service._interfacesChanged()
+        yield service.updateInterfaces()
+        self.assertThat(get_interfaces, MockCallsMatch(call(), call()))
+        self.assertThat(
+            service.interfaces, Equals([{"eth0": {}}, {"eth1": {}}]))
+
+    @inlineCallbacks
+    def test__records_changed_interfaces_after_recording_fails(self):
+        get_interfaces = self.patch(services, "get_all_interfaces_definition")
+        get_interfaces.side_effect = [{"eth0": {}}, {"eth1": {}}, {"eth1": {}}]
+        service, clock = self.makeService()
+        yield service.updateInterfaces()
+        service._interfacesChanged()
+        recordInterfaces = self.patch(service, "recordInterfaces")
+        recordInterfaces.side_effect = [Exception, None]
+        # Using the logger fixture prevents the test case from failing due
+        # to the logged exception.
+        with TwistedLoggerFixture():
+            yield service.updateInterfaces()
+        self.assertThat(recordInterfaces, MockCalledOnceWith({"eth1": {}}))
+        # The next tick reads the interfaces again and records them, even
+        # though no further change has been signalled.
+        yield service.updateInterfaces()
+        self.assertThat(
+            recordInterfaces, MockCallsMatch(
+                call({"eth1": {}}), call({"eth1": {}})))
+        self.assertThat(service._recorded, Equals({"eth1": {}}))
+
+    @inlineCallbacks
+    def test__rereads_interfaces_after_consistency_interval(self):
+        get_interfaces = self.patch(services, "get_all_interfaces_definition")
+        get_interfaces.return_value = {}
+        service, clock = self.makeService()
+        yield service.updateInterfaces()
+        clock.advance(service.consistency_interval - 1)
+        yield service.updateInterfaces()
+        self.assertThat(get_interfaces, MockCalledOnceWith())
+        clock.advance(1)
+        yield service.updateInterfaces()
+        self.assertThat(get_interfaces, MockCallsMatch(call(), call()))
+
+    def test__coalesces_changes_into_one_update(self):
+        service, clock = self.makeService()
+        updateInterfaces = self.patch(service, "updateInterfaces")
+        updateInterfaces.return_value = Deferred()
+        service._interfacesChanged()
+        service._interfacesChanged()
+        self.assertThat(updateInterfaces, MockNotCalled())
+        clock.advance(service.settle_interval)
+        self.assertThat(updateInterfaces, MockCalledOnceWith())
+
+    def test__reschedules_if_changed_during_update(self):
+        service, clock = self.makeService()
+        updateInterfaces = self.patch(service, "updateInterfaces")
+        updating = updateInterfaces.return_value = Deferred()
+        service._interfacesChanged()
+        clock.advance(service.settle_interval)
+        # A change arrives while the update is in progress.
+        service._interfacesChanged()
+        clock.advance(service.settle_interval)
+        self.assertThat(updateInterfaces, MockCalledOnceWith())
+        updating.callback(None)
+        updateInterfaces.return_value = Deferred()
+        clock.advance(service.settle_interval)
+        self.assertThat(updateInterfaces, MockCallsMatch(call(), call()))
+
+    def test__stopNetlink_cancels_pending_update(self):
+        service, clock = self.makeService()
+        service._netlink = None
+        service._interfacesChanged()
+        service._stopNetlink()
+        self.assertThat(clock.getDelayedCalls(), Equals([]))
+
+
 class TestJSONPerLineProtocol(MAASTestCase):
     """Tests for `JSONPerLineProtocol`."""
 